@@ -128,7 +128,9 @@ def plan(job_description: str, project: str, use_llm: bool):
 @click.option('--mode', type=click.Choice(['auto', 'manual', 'api']), default='manual', 
               help='Kiro実行モード (auto: 自動実行, manual: 手動実行, api: API経由)')
 @click.option('--show-progress/--no-progress', default=True, help='進捗を表示')
-def execute(project_name: str, workers: int, mode: str, show_progress: bool):
+@click.option('--policy', type=click.Choice(['critical_path', 'priority', 'dependencies']),
+              default=None, help='実行可能なタスクを割り当てる順序（省略時はタスク定義の順）')
+def execute(project_name: str, workers: int, mode: str, show_progress: bool, policy: Optional[str]):
     """タスクを並列実行"""
     click.echo(f"プロジェクト '{project_name}' を実行中...")
     click.echo(f"並列ワーカー数: {workers}")
@@ -138,7 +140,8 @@ def execute(project_name: str, workers: int, mode: str, show_progress: bool):
         Path("."), 
         max_workers=workers, 
         kiro_mode=mode,
-        show_progress=show_progress
+        show_progress=show_progress,
+        scheduling_policy=policy
     )
     orchestrator.execute_parallel(project_name)
     
@@ -229,6 +232,29 @@ def _print_project_status(summary: dict) -> None:
         click.echo(f"  {icon} [{task['state']}] Task {task['id']}: {task['title']}{deps_str}")
 
 
+def _follow_events(registry: TaskRegistry, project: str, output_format: str) -> None:
+    """プロジェクトのイベントを購読し、届いた順に表示."""
+    
+    def show(event) -> None:
+        if output_format == 'json':
+            click.echo(event.to_jsonl())
+            return
+        state = event.details.get("new_state")
+        suffix = f" → {state}" if state else ""
+        click.echo(f"{event.timestamp.isoformat()} {event.event_type.value} Task {event.task_id}{suffix}")
+    
+    subscription = registry.subscribe(project, from_end=True, poll_interval=0.2)
+    if output_format != 'json':
+        click.echo("\nイベントを購読中... (Ctrl+Cで終了)")
+    try:
+        subscription.run(show)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        subscription.close()
+        registry.close()
+
+
 @cli.command()
 @click.option('--project', default=None, help='プロジェクト名')
 @click.option(
@@ -238,10 +264,15 @@ def _print_project_status(summary: dict) -> None:
     default='table',
     help='表示形式 (table/json)',
 )
-def status(project: str, output_format: str):
+@click.option('--follow', is_flag=True, help='表示後もイベントを購読して変更を表示し続ける (--project が必要)')
+def status(project: str, output_format: str, follow: bool):
     """Task Registryを元に実行状況を表示"""
     registry = TaskRegistry(Path(".kiro/registry"))
     
+    if follow and not project:
+        click.echo("エラー: --follow には --project を指定してください")
+        return
+    
     if project:
         summary = _load_taskset_summary(registry, project, include_tasks=True)
         if summary is None:
@@ -252,6 +283,9 @@ def status(project: str, output_format: str):
             click.echo(json.dumps(summary, ensure_ascii=False, indent=2))
         else:
             _print_project_status(summary)
+        
+        if follow:
+            _follow_events(registry, project, output_format)
         return
     
     projects = registry.task_store.list_tasksets()
@@ -278,6 +312,140 @@ def status(project: str, output_format: str):
         )
 
 
+@cli.command('migrate-registry')
+@click.option('--registry-dir', default='.kiro/registry', help='移行元のTask Registryディレクトリ')
+@click.option('--database', default=None, help='移行先のSQLiteファイル (既定: <registry-dir>/registry.db)')
+@click.option(
+    '--persistence-mode',
+    type=click.Choice(['full', 'incremental', 'event_sourced']),
+    default='full',
+    help='移行元のpersistence_mode (event_sourcedではスナップショット以降のイベントを再生して移行)'
+)
+def migrate_registry(registry_dir: str, database: Optional[str], persistence_mode: str):
+    """Task Registry (JSON/JSONL) をSQLiteバックエンドへ移行"""
+    from necrocode.task_registry.sqlite_store import migrate_to_sqlite
+    
+    registry_path = Path(registry_dir)
+    if not registry_path.exists():
+        click.echo(f"エラー: Task Registry '{registry_path}' が見つかりません")
+        return
+    
+    database_path = Path(database) if database else None
+    migrated = migrate_to_sqlite(registry_path, database_path, persistence_mode)
+    
+    click.echo(
+        f"✓ {migrated['tasksets']}個のタスクセットと"
+        f"{migrated['events']}件のイベントを移行しました"
+    )
+    click.echo(f"  保存先: {database_path or registry_path / 'registry.db'}")
+    click.echo("  RegistryConfig(storage_backend=\"sqlite\") で利用できます")
+
+
+@cli.command('watch-kiro')
+@click.option('--specs-dir', default='.kiro/specs', help='監視するspecディレクトリ')
+@click.option('--registry-dir', default='.kiro/registry', help='Task Registryディレクトリ')
+@click.option('--interval', default=1.0, type=float, help='ポーリング間隔（秒）')
+@click.option('--debounce', default=0.5, type=float, help='編集が落ち着くまで待つ時間（秒）')
+@click.option('--workers', default=4, type=int, help='同時に同期するspecの数')
+def watch_kiro(specs_dir: str, registry_dir: str, interval: float, debounce: float, workers: int):
+    """tasks.mdとTask Registryを継続的に双方向同期"""
+    from necrocode.task_registry.kiro_watcher import KiroWatcher
+    
+    registry = TaskRegistry(Path(registry_dir))
+    
+    def report(spec_name: str, direction: str, changes: int, errors: List[str]) -> None:
+        arrow = "tasks.md → Registry" if direction == "from_kiro" else "Registry → tasks.md"
+        if errors:
+            click.echo(f"✗ {spec_name} ({arrow}): {'; '.join(errors)}")
+        else:
+            click.echo(f"✓ {spec_name} ({arrow}): {changes}件の変更")
+    
+    watcher = KiroWatcher(
+        registry,
+        specs_dir=Path(specs_dir),
+        poll_interval=interval,
+        debounce=debounce,
+        max_workers=workers,
+        on_sync=report,
+    )
+    click.echo(f"'{specs_dir}' を監視中... (Ctrl+Cで終了)")
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        click.echo("\n監視を終了します")
+    finally:
+        watcher.close()
+        registry.close()
+
+
+@cli.command('lock-stats')
+@click.option('--locks-dir', default='.kiro/registry/locks',
+              help='ロックディレクトリ（Repo Poolの場合は<workspaces>/locks）')
+@click.option('--top', default=10, type=int, help='表示する競合の多いロックの数')
+@click.option(
+    '--format',
+    'output_format',
+    type=click.Choice(['table', 'json']),
+    default='table',
+    help='出力形式'
+)
+@click.option('--reset', is_flag=True, help='表示後に保存された統計を削除')
+def lock_stats(locks_dir: str, top: int, output_format: str, reset: bool):
+    """ロックの取得回数・競合・待機時間の統計を表示"""
+    from necrocode.lock_metrics import LockMetrics
+    
+    metrics = LockMetrics.load(Path(locks_dir))
+    stats = metrics.stats()
+    
+    if output_format == 'json':
+        payload = {
+            "locks": {key: value.to_dict() for key, value in stats.items()},
+            "top_contended": [key for key, _ in metrics.top_contended(top)],
+        }
+        click.echo(json.dumps(payload, ensure_ascii=False, indent=2))
+    elif not stats:
+        click.echo(f"'{locks_dir}' に保存されたロックの統計がありません")
+    else:
+        total = sum(value.acquisitions for value in stats.values())
+        contended = sum(value.contended for value in stats.values())
+        timeouts = sum(value.timeouts for value in stats.values())
+        click.echo(f"ロック: {len(stats)}件 | 取得: {total}回 | 競合: {contended}回 | タイムアウト: {timeouts}回")
+        cas_commits = sum(value.cas_commits for value in stats.values())
+        cas_conflicts = sum(value.cas_conflicts for value in stats.values())
+        if cas_commits or cas_conflicts:
+            click.echo(
+                f"楽観的書き込み: 成功 {cas_commits}回 | バージョン競合 {cas_conflicts}回 "
+                f"({cas_conflicts / (cas_commits + cas_conflicts):.1%}) | "
+                f"再試行上限 {sum(value.cas_failures for value in stats.values())}回"
+            )
+        
+        ranked = metrics.top_contended(top)
+        if not ranked:
+            click.echo("競合したロックはありません")
+        else:
+            click.echo("\n競合の多いロック (待機/保持時間 p50 / p99 / max, ms):")
+            for key, value in ranked:
+                wait, hold = value.wait, value.hold
+                click.echo(
+                    f"  {key}: 取得 {value.acquisitions} | 競合 {value.contended} | "
+                    f"タイムアウト {value.timeouts} | "
+                    f"待機 {wait.percentile(0.5) * 1000:.1f} / {wait.percentile(0.99) * 1000:.1f} / "
+                    f"{wait.max * 1000:.1f} | "
+                    f"保持 {hold.percentile(0.5) * 1000:.1f} / {hold.percentile(0.99) * 1000:.1f} / "
+                    f"{hold.max * 1000:.1f}"
+                )
+                if value.cas_commits or value.cas_conflicts:
+                    click.echo(
+                        f"    楽観的書き込み: 成功 {value.cas_commits} | 競合 {value.cas_conflicts} "
+                        f"({value.conflict_rate:.1%}) | 再試行上限 {value.cas_failures}"
+                    )
+    
+    if reset:
+        removed = LockMetrics.clear_saved(Path(locks_dir))
+        if output_format == 'table':
+            click.echo(f"{removed}件の統計ファイルを削除しました")
+
+
 @cli.command()
 @click.option('--force', is_flag=True, help='強制的にクリーンアップ')
 def cleanup(force: bool):
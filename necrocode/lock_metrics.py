@@ -0,0 +1,386 @@
+"""
+Lock contention metrics shared by the Task Registry and Repo Pool LockManagers
+
+Each LockManager owns a LockMetrics instance that counts acquisitions,
+contended acquisitions (the lock was held when first tried) and timeouts, and
+keeps fixed-bucket wait-time and hold-time histograms per lock key (spec name
+or slot id). Optimistic (compare-and-swap) writes of the Task Registry also
+record their commits and version conflicts under the spec name. Recording is a few integer updates under a thread lock, so the
+metrics can stay enabled in production.
+
+Metrics live in process memory. ``save()`` writes one JSON file per process
+under ``<locks_dir>/metrics/`` and ``load()`` merges every saved file, which is
+how ``necrocode lock-stats`` reports on other processes.
+"""
+
+import bisect
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+# ヒストグラムのバケットの上限（秒）。最後のバケットはそれ以上のすべて
+BUCKET_BOUNDS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+
+# locks_dir以下の保存先
+METRICS_DIRNAME = "metrics"
+
+
+class Histogram:
+    """固定バケットの所要時間ヒストグラム"""
+    
+    __slots__ = ("counts", "count", "total", "max")
+    
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+    
+    def observe(self, seconds: float) -> None:
+        """所要時間を1件記録"""
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+    
+    def percentile(self, fraction: float) -> float:
+        """
+        パーセンタイルの推定値を取得
+        
+        Args:
+            fraction: 0.0〜1.0（0.99で99パーセンタイル）
+        
+        Returns:
+            該当するバケットの上限（秒）。最後のバケットの場合は最大値
+        """
+        if self.count == 0:
+            return 0.0
+        rank = max(1, int(round(fraction * self.count)))
+        seen = 0
+        for position, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                if position < len(BUCKET_BOUNDS):
+                    return min(BUCKET_BOUNDS[position], self.max)
+                break
+        return self.max
+    
+    @property
+    def mean(self) -> float:
+        """平均値（秒）"""
+        return self.total / self.count if self.count else 0.0
+    
+    def merge(self, other: "Histogram") -> None:
+        """他のヒストグラムの値を加算"""
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+    
+    def to_dict(self) -> dict:
+        """JSONに変換可能な辞書に変換"""
+        return {"counts": list(self.counts), "count": self.count, "total": self.total, "max": self.max}
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> "Histogram":
+        """to_dict()の結果から復元"""
+        histogram = cls()
+        counts = data.get("counts", [])
+        if len(counts) == len(histogram.counts):
+            histogram.counts = list(counts)
+        histogram.count = data.get("count", 0)
+        histogram.total = data.get("total", 0.0)
+        histogram.max = data.get("max", 0.0)
+        return histogram
+
+
+@dataclass
+class LockStats:
+    """1つのロック（specまたはslot）の統計"""
+    acquisitions: int = 0
+    # 最初の試行でロックを取得できず待機した回数
+    contended: int = 0
+    timeouts: int = 0
+    # 取得までの待機時間（タイムアウトを含む）
+    wait: Histogram = field(default_factory=Histogram)
+    # 取得から解放までの保持時間
+    hold: Histogram = field(default_factory=Histogram)
+    # 楽観的書き込みの成功回数・バージョン競合の回数・再試行を使い切った回数
+    cas_commits: int = 0
+    cas_conflicts: int = 0
+    cas_failures: int = 0
+    
+    @property
+    def conflict_rate(self) -> float:
+        """楽観的書き込みの試行のうち競合した割合"""
+        attempts = self.cas_commits + self.cas_conflicts
+        return self.cas_conflicts / attempts if attempts else 0.0
+    
+    def merge(self, other: "LockStats") -> None:
+        """他の統計の値を加算"""
+        self.acquisitions += other.acquisitions
+        self.contended += other.contended
+        self.timeouts += other.timeouts
+        self.wait.merge(other.wait)
+        self.hold.merge(other.hold)
+        self.cas_commits += other.cas_commits
+        self.cas_conflicts += other.cas_conflicts
+        self.cas_failures += other.cas_failures
+    
+    def to_dict(self) -> dict:
+        """JSONに変換可能な辞書に変換"""
+        return {
+            "acquisitions": self.acquisitions,
+            "contended": self.contended,
+            "timeouts": self.timeouts,
+            "wait": self.wait.to_dict(),
+            "hold": self.hold.to_dict(),
+            "cas_commits": self.cas_commits,
+            "cas_conflicts": self.cas_conflicts,
+            "cas_failures": self.cas_failures,
+        }
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> "LockStats":
+        """to_dict()の結果から復元"""
+        return cls(
+            acquisitions=data.get("acquisitions", 0),
+            contended=data.get("contended", 0),
+            timeouts=data.get("timeouts", 0),
+            wait=Histogram.from_dict(data.get("wait", {})),
+            hold=Histogram.from_dict(data.get("hold", {})),
+            cas_commits=data.get("cas_commits", 0),
+            cas_conflicts=data.get("cas_conflicts", 0),
+            cas_failures=data.get("cas_failures", 0),
+        )
+
+
+class LockMetrics:
+    """Per-key lock acquisition, contention and timing metrics"""
+    
+    def __init__(self, enabled: bool = True):
+        """
+        Args:
+            enabled: Falseの場合は何も記録しない
+        """
+        self.enabled = enabled
+        self.started_at = time.time()
+        self._stats: Dict[str, LockStats] = {}
+        self._lock = threading.Lock()
+    
+    def _get(self, key: str) -> LockStats:
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = LockStats()
+        return stats
+    
+    def record_acquired(self, key: str, wait: float, contended: bool) -> None:
+        """
+        ロックの取得を記録
+        
+        Args:
+            key: Spec名またはslot ID
+            wait: 取得までの待機時間（秒）
+            contended: 最初の試行で取得できなかった場合True
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self._get(key)
+            stats.acquisitions += 1
+            if contended:
+                stats.contended += 1
+            stats.wait.observe(wait)
+    
+    def record_timeout(self, key: str, wait: float) -> None:
+        """
+        ロック取得のタイムアウトを記録
+        
+        Args:
+            key: Spec名またはslot ID
+            wait: タイムアウトまでの待機時間（秒）
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self._get(key)
+            stats.timeouts += 1
+            stats.contended += 1
+            stats.wait.observe(wait)
+    
+    def record_released(self, key: str, hold: float) -> None:
+        """
+        ロックの解放を記録
+        
+        Args:
+            key: Spec名またはslot ID
+            hold: 保持時間（秒）
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._get(key).hold.observe(hold)
+    
+    def record_cas(self, key: str, conflicts: int, committed: bool) -> None:
+        """
+        楽観的書き込み（バージョンの比較と保存）の結果を記録
+        
+        Args:
+            key: Spec名
+            conflicts: バージョンが競合して再試行した回数
+            committed: 最終的に保存できた場合True
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self._get(key)
+            stats.cas_conflicts += conflicts
+            if committed:
+                stats.cas_commits += 1
+            else:
+                stats.cas_failures += 1
+    
+    def stats(self) -> Dict[str, LockStats]:
+        """
+        すべてのキーの統計のコピーを取得
+        
+        Returns:
+            キー -> LockStats
+        """
+        with self._lock:
+            return {key: LockStats.from_dict(stats.to_dict()) for key, stats in self._stats.items()}
+    
+    def top_contended(self, limit: int = 10) -> List[Tuple[str, LockStats]]:
+        """
+        競合の多いキーを取得
+        
+        Args:
+            limit: 最大件数
+        
+        Returns:
+            (キー, LockStats) のリスト（ロックの競合とバージョン競合の回数、
+            合計待機時間の降順）
+        """
+        ranked = sorted(
+            self.stats().items(),
+            key=lambda item: (item[1].contended + item[1].cas_conflicts, item[1].wait.total),
+            reverse=True
+        )
+        return [
+            (key, stats) for key, stats in ranked[:limit]
+            if stats.contended or stats.cas_conflicts
+        ]
+    
+    def merge(self, other: "LockMetrics") -> None:
+        """他のLockMetricsの値を加算"""
+        for key, stats in other.stats().items():
+            with self._lock:
+                self._get(key).merge(stats)
+    
+    def reset(self) -> None:
+        """記録した統計をすべて破棄"""
+        with self._lock:
+            self._stats.clear()
+    
+    def to_dict(self) -> dict:
+        """JSONに変換可能な辞書に変換"""
+        with self._lock:
+            return {
+                "started_at": self.started_at,
+                "bucket_bounds": list(BUCKET_BOUNDS),
+                "locks": {key: stats.to_dict() for key, stats in self._stats.items()},
+            }
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> "LockMetrics":
+        """to_dict()の結果から復元"""
+        metrics = cls()
+        metrics.started_at = data.get("started_at", metrics.started_at)
+        if list(data.get("bucket_bounds", BUCKET_BOUNDS)) != list(BUCKET_BOUNDS):
+            # バケットの異なるヒストグラムは合算できない
+            return metrics
+        metrics._stats = {
+            key: LockStats.from_dict(stats) for key, stats in data.get("locks", {}).items()
+        }
+        return metrics
+    
+    def save(self, locks_dir: Path) -> Optional[Path]:
+        """
+        このプロセスの統計を<locks_dir>/metrics/へ書き出す
+        
+        同じインスタンスは常に同じファイルを上書きする。
+        
+        Args:
+            locks_dir: LockManagerのロックディレクトリ
+        
+        Returns:
+            書き出したファイルのパス、記録がない場合はNone
+        """
+        data = self.to_dict()
+        if not data["locks"]:
+            return None
+        
+        metrics_dir = Path(locks_dir) / METRICS_DIRNAME
+        metrics_dir.mkdir(parents=True, exist_ok=True)
+        path = metrics_dir / f"{os.getpid()}-{int(self.started_at * 1000)}.json"
+        temp_path = path.with_suffix(".tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(temp_path, path)
+        return path
+    
+    @classmethod
+    def load(cls, locks_dir: Path) -> "LockMetrics":
+        """
+        <locks_dir>/metrics/に保存されたすべてのプロセスの統計を合算
+        
+        Args:
+            locks_dir: LockManagerのロックディレクトリ
+        
+        Returns:
+            合算したLockMetrics
+        """
+        merged = cls()
+        metrics_dir = Path(locks_dir) / METRICS_DIRNAME
+        if not metrics_dir.is_dir():
+            return merged
+        
+        for path in sorted(metrics_dir.glob("*.json")):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    saved = cls.from_dict(json.load(f))
+            except (OSError, ValueError):
+                continue
+            merged.started_at = min(merged.started_at, saved.started_at)
+            merged.merge(saved)
+        return merged
+    
+    @staticmethod
+    def clear_saved(locks_dir: Path) -> int:
+        """
+        <locks_dir>/metrics/に保存された統計を削除
+        
+        Args:
+            locks_dir: LockManagerのロックディレクトリ
+        
+        Returns:
+            削除したファイル数
+        """
+        metrics_dir = Path(locks_dir) / METRICS_DIRNAME
+        if not metrics_dir.is_dir():
+            return 0
+        
+        removed = 0
+        for path in metrics_dir.glob("*.json"):
+            try:
+                path.unlink()
+                removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
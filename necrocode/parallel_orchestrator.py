@@ -1,7 +1,7 @@
 """並列タスク実行のオーケストレーション"""
 from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from typing import List, Dict, Set
+from typing import List, Dict, Optional, Set
 import json
 import subprocess
 
@@ -10,9 +10,13 @@ from necrocode.task_registry import (
     InvalidStateTransitionError,
     TaskNotFoundError,
     TaskRegistry,
+    Task,
     TaskRegistryError,
     TaskState,
+    Taskset,
     TasksetNotFoundError,
+    build_execution_plan,
+    validate_dependencies,
 )
 from necrocode.progress_monitor import ProgressMonitor
 
@@ -20,18 +24,48 @@ from necrocode.progress_monitor import ProgressMonitor
 class ParallelOrchestrator:
     """並列タスク実行の調整"""
     
-    def __init__(self, project_dir: Path, max_workers: int = 3, kiro_mode: str = "manual", show_progress: bool = True):
+    def __init__(
+        self,
+        project_dir: Path,
+        max_workers: int = 3,
+        kiro_mode: str = "manual",
+        show_progress: bool = True,
+        scheduling_policy: Optional[str] = None,
+        use_history: bool = True,
+    ):
         self.project_dir = Path(project_dir)
         self.max_workers = max_workers
         self.kiro_mode = kiro_mode
         self.show_progress = show_progress
         self.worktree_mgr = WorktreeManager(project_dir)
         self.task_registry = TaskRegistry(project_dir / ".kiro/registry")
+        # 空きワーカーに割り当てる順序（Noneの場合はtasks.jsonの順、
+        # critical_path: 残りの最長パスが長いタスクから）
+        self.scheduler = None
+        if scheduling_policy is not None:
+            self.scheduler = self.task_registry.get_scheduling_policy(scheduling_policy)
+        self.use_history = use_history
+        # タスクID -> 実行の優先順位（小さいほど先）
+        self._schedule_rank: Dict[str, int] = {}
+        self._known_ids: Set[str] = set()
     
     def execute_parallel(self, project_name: str):
         """依存関係を解決して並列実行"""
         tasks = self._load_tasks(project_name)
         
+        # 循環依存があると完了しないタスクを待ち続けるため、実行前に検出する
+        dependencies = {task["id"]: task.get("dependencies", []) for task in tasks}
+        report = validate_dependencies(dependencies)
+        for message in report.dangling_messages():
+            print(f"⚠️ {message} (ignored)")
+        self._known_ids = set(dependencies)
+        plan = build_execution_plan(dependencies)
+        print(
+            f"📋 {len(tasks)} tasks in {len(plan.levels)} levels "
+            f"(critical path: {plan.critical_path_length}, max parallelism: {plan.max_width})"
+        )
+        self._schedule_rank = self._build_schedule(project_name, tasks)
+        
         if self.show_progress:
             monitor = ProgressMonitor(len(tasks))
         
@@ -108,15 +142,43 @@ class ParallelOrchestrator:
             data = json.load(f)
         return data["tasks"]
     
+    def _build_schedule(self, project_name: str, tasks: List[Dict]) -> Dict[str, int]:
+        """スケジューリングポリシーでタスク全体の実行順位を決める"""
+        if self.scheduler is None:
+            return {}
+        taskset = Taskset(
+            spec_name=project_name,
+            version=0,
+            tasks=[
+                Task(
+                    id=task["id"],
+                    title=task.get("title", ""),
+                    description=task.get("description", ""),
+                    state=TaskState.READY,
+                    dependencies=list(task.get("dependencies", [])),
+                    required_skill=task.get("required_skill") or task.get("type"),
+                    priority=task.get("priority", 0),
+                )
+                for task in tasks
+            ],
+        )
+        durations = None
+        if self.use_history and self.scheduler.uses_graph:
+            durations = self.task_registry.duration_history.estimates(taskset)
+        ranked = self.scheduler.rank(taskset.tasks, taskset, durations)
+        return {task.id: rank for rank, task in enumerate(ranked)}
+    
     def _get_ready_tasks(self, tasks: List[Dict], completed: Set[str]) -> List[Dict]:
-        """依存関係が満たされたタスクを返す"""
+        """依存関係が満たされたタスクを実行すべき順に返す"""
         ready = []
         for task in tasks:
             if task["id"] in completed:
                 continue
-            deps = set(task.get("dependencies", []))
+            # 存在しないタスクへの依存は無視する
+            deps = set(task.get("dependencies", [])) & self._known_ids
             if deps.issubset(completed):
                 ready.append(task)
+        ready.sort(key=lambda task: self._schedule_rank.get(task["id"], 0))
         return ready
 
     def _update_task_state(self, spec_name: str, task_id: str, new_state: TaskState) -> None:
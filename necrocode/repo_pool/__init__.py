@@ -24,6 +24,7 @@ from necrocode.repo_pool.config import PoolConfig
 from necrocode.repo_pool.git_operations import GitOperations
 from necrocode.repo_pool.slot_store import SlotStore
 from necrocode.repo_pool.lock_manager import LockManager
+from necrocode.lock_metrics import LockMetrics, LockStats
 from necrocode.repo_pool.slot_cleaner import SlotCleaner, CleanupRecord, RepairResult
 from necrocode.repo_pool.slot_allocator import SlotAllocator
 # Use WorktreePoolManager as the default PoolManager
@@ -58,6 +59,8 @@ __all__ = [
     "SlotStore",
     # Lock Manager
     "LockManager",
+    "LockMetrics",
+    "LockStats",
     # Slot Cleaner
     "SlotCleaner",
     "CleanupRecord",
@@ -2,11 +2,14 @@
 Lock Manager for Repo Pool Manager
 
 Provides file-based locking mechanism for slot allocation concurrency control.
+
+Every acquisition is recorded in ``LockManager.metrics`` (see
+necrocode.lock_metrics).
 """
 
 from contextlib import contextmanager
 from pathlib import Path
-from typing import Generator, List
+from typing import Generator, List, Optional
 import time
 import logging
 from datetime import datetime, timedelta
@@ -18,6 +21,8 @@ except ImportError:
         "filelock library is required. Install it with: pip install filelock"
     )
 
+from necrocode.lock_metrics import LockMetrics
+
 from .exceptions import LockTimeoutError
 
 
@@ -27,16 +32,19 @@ logger = logging.getLogger(__name__)
 class LockManager:
     """Slot lock manager for concurrent access control."""
     
-    def __init__(self, locks_dir: Path):
+    def __init__(self, locks_dir: Path, metrics: Optional[LockMetrics] = None):
         """
         Initialize lock manager.
         
         Args:
             locks_dir: Directory to store lock files
+            metrics: Where lock contention and timing metrics are recorded
+                (a new LockMetrics if omitted)
         """
         self.locks_dir = Path(locks_dir)
         self.locks_dir.mkdir(parents=True, exist_ok=True)
-        logger.debug(f"LockManager initialized with locks_dir: {self.locks_dir}")
+        self.metrics = metrics if metrics is not None else LockMetrics()
+        logger.debug("LockManager initialized with locks_dir: %s", self.locks_dir)
     
     def _get_lock_path(self, slot_id: str) -> Path:
         """
@@ -82,36 +90,34 @@ class LockManager:
         lock_path = self._get_lock_path(slot_id)
         lock = FileLock(lock_path, timeout=timeout)
         
-        start_time = time.time()
-        logger.debug(
-            f"Attempting to acquire lock for slot '{slot_id}' "
-            f"(timeout={timeout}s)"
-        )
-        
-        acquired = False
+        start_time = time.monotonic()
+        contended = False
         try:
-            lock.acquire(timeout=timeout)
-            acquired = True
-            elapsed = time.time() - start_time
-            logger.info(
-                f"Lock acquired for slot '{slot_id}' ({elapsed:.2f}s)"
-            )
-            yield
-            logger.debug(f"Lock released for slot '{slot_id}'")
+            try:
+                lock.acquire(timeout=0)
+            except FileLockTimeout:
+                # Held by someone else: wait for the remaining timeout
+                contended = True
+                lock.acquire(timeout=timeout)
         except FileLockTimeout:
-            elapsed = time.time() - start_time
-            logger.error(
-                f"Lock acquisition timeout for slot '{slot_id}' ({elapsed:.2f}s)"
-            )
+            elapsed = time.monotonic() - start_time
+            self.metrics.record_timeout(slot_id, elapsed)
+            logger.error("Lock acquisition timeout for slot '%s' (%.2fs)", slot_id, elapsed)
             raise LockTimeoutError(
                 f"Failed to acquire lock for slot '{slot_id}' within {timeout}s"
             )
-        except Exception as e:
-            logger.error(f"Error during lock acquisition for slot '{slot_id}': {e}")
-            raise
+        
+        acquired_at = time.monotonic()
+        self.metrics.record_acquired(slot_id, acquired_at - start_time, contended)
+        logger.debug(
+            "Lock acquired for slot '%s' (%.3fs)", slot_id, acquired_at - start_time
+        )
+        try:
+            yield
         finally:
-            if acquired and lock.is_locked:
+            if lock.is_locked:
                 lock.release()
+            self.metrics.record_released(slot_id, time.monotonic() - acquired_at)
     
     def is_locked(self, slot_id: str) -> bool:
         """
@@ -129,7 +135,7 @@ class LockManager:
         
         # If lock file doesn't exist, it's not locked
         if not lock_path.exists():
-            logger.debug(f"Lock check for slot '{slot_id}': not locked (no lock file)")
+            logger.debug("Lock check for slot '%s': not locked (no lock file)", slot_id)
             return False
         
         lock = FileLock(lock_path, timeout=0.01)
@@ -138,13 +144,25 @@ class LockManager:
             # Try to acquire lock immediately
             with lock.acquire(timeout=0.01):
                 # Successfully acquired = not locked
-                logger.debug(f"Lock check for slot '{slot_id}': not locked")
+                logger.debug("Lock check for slot '%s': not locked", slot_id)
                 return False
         except FileLockTimeout:
             # Failed to acquire = locked
-            logger.debug(f"Lock check for slot '{slot_id}': locked")
+            logger.debug("Lock check for slot '%s': locked", slot_id)
             return True
     
+    def save_metrics(self) -> Optional[Path]:
+        """
+        Write this process's lock metrics to <locks_dir>/metrics/.
+        
+        ``necrocode lock-stats --locks-dir <workspaces>/locks`` merges the
+        saved files of every process.
+        
+        Returns:
+            Path of the written file, or None if nothing was recorded
+        """
+        return self.metrics.save(self.locks_dir)
+    
     def force_unlock(self, slot_id: str) -> None:
         """
         Force unlock a slot (deadlock recovery).
@@ -1548,6 +1548,7 @@ class PoolManager:
         metrics = {
             "timestamp": datetime.now().isoformat(),
             "pools": self.get_performance_metrics(),
+            "locks": self.lock_manager.metrics.to_dict()["locks"],
             "system": {
                 "total_pools": len(self.list_pools()),
                 "workspaces_dir": str(self.workspaces_dir),
@@ -18,16 +18,47 @@ from necrocode.task_registry.exceptions import (
     InvalidStateTransitionError,
     CircularDependencyError,
     LockTimeoutError,
+    VersionConflictError,
     SyncError,
 )
 from necrocode.task_registry.config import RegistryConfig
+from necrocode.task_registry.batch import (
+    AddArtifact,
+    BatchOperation,
+    StateTransition,
+    UpdateMetadata,
+)
+from necrocode.task_registry.serializers import TasksetSerializer, available_formats, get_serializer
 from necrocode.task_registry.task_store import TaskStore
+from necrocode.task_registry.taskset_cache import TasksetCache
 from necrocode.task_registry.event_store import EventStore
+from necrocode.task_registry.change_feed import EventCursor, EventSubscription
+from necrocode.task_registry.segment_manager import SegmentManager, SegmentPolicy
+from necrocode.task_registry.event_sourcing import EventSourcedTaskStore
+from necrocode.task_registry.sqlite_store import (
+    SQLiteTaskStore,
+    SQLiteEventStore,
+    migrate_to_sqlite,
+)
 from necrocode.task_registry.kiro_sync import KiroSyncManager, TaskDefinition, SyncResult
+from necrocode.task_registry.kiro_watcher import KiroWatcher, WatchStats
 from necrocode.task_registry.lock_manager import LockManager
+from necrocode.lock_metrics import LockMetrics, LockStats
 from necrocode.task_registry.query_engine import QueryEngine
-from necrocode.task_registry.graph_visualizer import GraphVisualizer
+from necrocode.task_registry.dependency_validator import (
+    DependencyReport,
+    analyze_dependencies,
+    validate_dependencies,
+)
+from necrocode.task_registry.graph_visualizer import ExecutionPlan, GraphVisualizer, build_execution_plan
+from necrocode.task_registry.scheduling import (
+    DurationHistory,
+    SchedulingPolicy,
+    available_policies,
+    get_policy,
+)
 from necrocode.task_registry.task_registry import TaskRegistry
+from necrocode.task_registry.async_registry import AsyncTaskRegistry
 
 __all__ = [
     "Taskset",
@@ -43,15 +74,46 @@ __all__ = [
     "InvalidStateTransitionError",
     "CircularDependencyError",
     "LockTimeoutError",
+    "VersionConflictError",
     "SyncError",
     "RegistryConfig",
+    "StateTransition",
+    "AddArtifact",
+    "UpdateMetadata",
+    "BatchOperation",
+    "TasksetSerializer",
+    "available_formats",
+    "get_serializer",
     "TaskStore",
+    "TasksetCache",
     "EventStore",
+    "EventCursor",
+    "EventSubscription",
+    "SegmentManager",
+    "SegmentPolicy",
+    "EventSourcedTaskStore",
+    "SQLiteTaskStore",
+    "SQLiteEventStore",
+    "migrate_to_sqlite",
     "KiroSyncManager",
     "TaskDefinition",
     "SyncResult",
+    "KiroWatcher",
+    "WatchStats",
     "LockManager",
+    "LockMetrics",
+    "LockStats",
     "QueryEngine",
     "GraphVisualizer",
+    "ExecutionPlan",
+    "build_execution_plan",
+    "DependencyReport",
+    "analyze_dependencies",
+    "validate_dependencies",
+    "SchedulingPolicy",
+    "DurationHistory",
+    "available_policies",
+    "get_policy",
     "TaskRegistry",
+    "AsyncTaskRegistry",
 ]
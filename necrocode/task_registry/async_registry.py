@@ -0,0 +1,323 @@
+"""
+AsyncTaskRegistry - asyncio facade for TaskRegistry
+
+TaskRegistry blocks on file I/O and file locks, so every call is run on a
+dedicated, bounded thread pool instead of the event loop (or the loop's
+shared default executor). On top of that:
+
+- Concurrent identical reads (get_taskset, get_ready_tasks, event queries)
+  share one in-flight load instead of each reading the files.
+- Writes to the same spec that arrive while a previous write of that spec is
+  running are applied together with one apply_batch() (one lock, one save,
+  one event append). If the combined batch fails, its operations are applied
+  one by one so that an invalid transition only fails its own caller.
+- ``async with registry.lock(spec_name)`` holds the spec lock without
+  blocking the event loop.
+
+An instance must be used from a single event loop.
+"""
+
+import asyncio
+import functools
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from .batch import AddArtifact, BatchOperation, StateTransition
+from .config import RegistryConfig
+from .kiro_sync import TaskDefinition
+from .models import ArtifactType, EventType, Task, TaskEvent, Taskset, TaskState
+from .task_registry import TaskRegistry
+
+
+class AsyncTaskRegistry:
+    """Awaitable TaskRegistry API backed by a bounded I/O thread pool"""
+    
+    # iter_events()が1回のスレッド呼び出しで読み込むイベント数
+    EVENT_CHUNK_SIZE = 256
+    
+    def __init__(
+        self,
+        registry: Optional[TaskRegistry] = None,
+        config: Optional[RegistryConfig] = None,
+        max_workers: int = 8,
+        coalesce_writes: bool = True
+    ):
+        """
+        Initialize AsyncTaskRegistry
+        
+        Args:
+            registry: 使用するTaskRegistry（Noneの場合はconfigから作成し、aclose()で閉じる）
+            config: registryを作成する場合の設定
+            max_workers: ファイルI/Oを実行するスレッド数の上限
+            coalesce_writes: Trueの場合、同じspecへの同時の書き込みを1回のapply_batch()にまとめる
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        
+        self._owns_registry = registry is None
+        self.registry = registry if registry is not None else TaskRegistry(config=config)
+        self.coalesce_writes = coalesce_writes
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="task-registry-io")
+        # 読み込みのキー -> 実行中の読み込み
+        self._reads: Dict[Hashable, "asyncio.Future[Any]"] = {}
+        # spec_name -> 適用待ちの (操作, 呼び出し元のFuture)
+        self._pending_writes: Dict[str, List[Tuple[BatchOperation, "asyncio.Future[None]"]]] = {}
+        # spec_name -> 適用待ちの書き込みを処理しているタスク
+        self._writers: Dict[str, "asyncio.Task[None]"] = {}
+    
+    async def __aenter__(self) -> "AsyncTaskRegistry":
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.aclose()
+    
+    async def _run(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """I/Oスレッドで関数を実行"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+    
+    async def _read(self, key: Hashable, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        読み込みを実行（同じキーの読み込みが実行中の場合はその結果を共有）
+        
+        Args:
+            key: 読み込みを識別するキー
+            func: 読み込みを行う関数
+        
+        Returns:
+            funcの戻り値（同時の呼び出し元の間で同じオブジェクト）
+        """
+        future = self._reads.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._run(func, *args, **kwargs))
+            self._reads[key] = future
+            
+            def forget(done: "asyncio.Future[Any]") -> None:
+                if self._reads.get(key) is done:
+                    del self._reads[key]
+            
+            future.add_done_callback(forget)
+        # 呼び出し元のキャンセルで共有の読み込みを中断しない
+        return await asyncio.shield(future)
+    
+    async def _write(self, spec_name: str, operation: BatchOperation) -> None:
+        """
+        操作を適用（実行中の書き込みがある場合は次のバッチにまとめる）
+        
+        バッチの適用が始まる前に呼び出し元がキャンセルされた場合、その操作は
+        適用しない（適用が始まった後のキャンセルでは保存は取り消されない）。
+        
+        Args:
+            spec_name: Spec名
+            operation: 操作
+        """
+        if not self.coalesce_writes:
+            await self._run(self.registry.apply_batch, spec_name, [operation])
+            return
+        
+        future = asyncio.get_running_loop().create_future()
+        self._pending_writes.setdefault(spec_name, []).append((operation, future))
+        if spec_name not in self._writers:
+            self._writers[spec_name] = asyncio.ensure_future(self._drain_writes(spec_name))
+        await future
+    
+    async def _drain_writes(self, spec_name: str) -> None:
+        """specへの適用待ちの書き込みがなくなるまでバッチで適用"""
+        try:
+            while True:
+                pending = self._pending_writes.pop(spec_name, None)
+                if not pending:
+                    return
+                # 待っている間にキャンセルされた呼び出し元の操作は適用しない
+                pending = [entry for entry in pending if not entry[1].cancelled()]
+                if pending:
+                    await self._apply_pending(spec_name, pending)
+        finally:
+            del self._writers[spec_name]
+    
+    async def _apply_pending(
+        self,
+        spec_name: str,
+        pending: List[Tuple[BatchOperation, "asyncio.Future[None]"]]
+    ) -> None:
+        """
+        まとめた書き込みを適用し、呼び出し元に結果を通知
+        
+        Args:
+            spec_name: Spec名
+            pending: (操作, 呼び出し元のFuture) のリスト
+        """
+        try:
+            await self._run(self.registry.apply_batch, spec_name, [operation for operation, _ in pending])
+        except Exception as e:
+            if len(pending) == 1:
+                _resolve(pending[0][1], e)
+                return
+            # バッチは何も保存していないため、1つずつ適用し直して失敗を呼び出し元ごとに返す
+            for operation, future in pending:
+                if future.cancelled():
+                    continue
+                try:
+                    await self._run(self.registry.apply_batch, spec_name, [operation])
+                except Exception as single_error:
+                    _resolve(future, single_error)
+                else:
+                    _resolve(future, None)
+            return
+        
+        for _, future in pending:
+            _resolve(future, None)
+    
+    @asynccontextmanager
+    async def lock(self, spec_name: str, shared: bool = False) -> AsyncIterator[None]:
+        """
+        specのロックを取得（async with で使用）
+        
+        ロックの取得と解放はI/Oスレッドで行うため、待機中もイベントループは停止しない。
+        ロックは再入できないため、保持中にこのレジストリの書き込みを呼び出さないこと。
+        
+        Args:
+            spec_name: Spec名
+            shared: Trueの場合は共有ロック（読み込み用）
+        
+        Raises:
+            LockTimeoutError: ロック取得がタイムアウトした場合
+        """
+        config = self.registry.config
+        lock = self.registry.lock_manager.acquire_lock(
+            spec_name,
+            timeout=config.lock_timeout,
+            retry_interval=config.lock_retry_interval,
+            shared=shared
+        )
+        await self._run(lock.__enter__)
+        try:
+            yield
+        finally:
+            await self._run(lock.__exit__, None, None, None)
+    
+    async def create_taskset(
+        self,
+        spec_name: str,
+        tasks: List[TaskDefinition],
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> Taskset:
+        """TaskRegistry.create_taskset()の非同期版"""
+        return await self._run(self.registry.create_taskset, spec_name, tasks, metadata)
+    
+    async def get_taskset(self, spec_name: str) -> Taskset:
+        """TaskRegistry.get_taskset()の非同期版（同時の呼び出しは1回の読み込みを共有し、呼び出し元ごとにコピーを返す）"""
+        taskset = await self._read(("taskset", spec_name), self.registry.task_store.load_shared_taskset, spec_name)
+        return await self._run(taskset.copy)
+    
+    async def update_task_state(
+        self,
+        spec_name: str,
+        task_id: str,
+        new_state: TaskState,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """TaskRegistry.update_task_state()の非同期版"""
+        await self._write(spec_name, StateTransition(task_id, new_state, metadata))
+    
+    async def add_artifact(
+        self,
+        spec_name: str,
+        task_id: str,
+        artifact_type: ArtifactType,
+        uri: str,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """TaskRegistry.add_artifact()の非同期版"""
+        await self._write(spec_name, AddArtifact(task_id, artifact_type, uri, metadata))
+    
+    async def apply_batch(self, spec_name: str, operations: List[BatchOperation]) -> List[TaskEvent]:
+        """TaskRegistry.apply_batch()の非同期版（他の書き込みとはまとめない）"""
+        return await self._run(self.registry.apply_batch, spec_name, operations)
+    
+    async def get_ready_tasks(
+        self,
+        spec_name: str,
+        required_skill: Optional[str] = None,
+        policy: Optional[str] = None,
+        use_history: Optional[bool] = None
+    ) -> List[Task]:
+        """TaskRegistry.get_ready_tasks()の非同期版（同時の同じ呼び出しは結果を共有）"""
+        return await self._read(
+            ("ready", spec_name, required_skill, policy, use_history),
+            self.registry.get_ready_tasks, spec_name, required_skill, policy, use_history
+        )
+    
+    async def get_events_by_task(self, spec_name: str, task_id: str) -> List[TaskEvent]:
+        """EventStore.get_events_by_task()の非同期版"""
+        return await self._read(
+            ("events_by_task", spec_name, task_id),
+            self.registry.event_store.get_events_by_task, spec_name, task_id
+        )
+    
+    async def get_events_by_timerange(
+        self,
+        spec_name: str,
+        start_time: datetime,
+        end_time: datetime
+    ) -> List[TaskEvent]:
+        """EventStore.get_events_by_timerange()の非同期版"""
+        return await self._read(
+            ("events_by_timerange", spec_name, start_time, end_time),
+            self.registry.event_store.get_events_by_timerange, spec_name, start_time, end_time
+        )
+    
+    async def iter_events(
+        self,
+        spec_name: str,
+        task_id: Optional[str] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        event_types: Optional[Iterable[EventType]] = None,
+        reverse: bool = False
+    ) -> AsyncIterator[TaskEvent]:
+        """
+        EventStore.iter_events()の非同期版
+        
+        EVENT_CHUNK_SIZE件ずつI/Oスレッドで読み込むため、途中で打ち切った場合は
+        残りのログを読まない。
+        """
+        events = self.registry.event_store.iter_events(
+            spec_name,
+            task_id=task_id,
+            start_time=start_time,
+            end_time=end_time,
+            event_types=event_types,
+            reverse=reverse
+        )
+        while True:
+            chunk = await self._run(list, itertools.islice(events, self.EVENT_CHUNK_SIZE))
+            for event in chunk:
+                yield event
+            if len(chunk) < self.EVENT_CHUNK_SIZE:
+                return
+    
+    async def aclose(self) -> None:
+        """
+        適用待ちの書き込みの完了を待ち、I/Oスレッドを停止
+        
+        registryを渡さずに作成した場合はTaskRegistryも閉じる。
+        """
+        while self._writers:
+            await asyncio.gather(*self._writers.values(), return_exceptions=True)
+        if self._owns_registry:
+            await self._run(self.registry.close)
+        await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+
+
+def _resolve(future: "asyncio.Future[None]", error: Optional[BaseException]) -> None:
+    """呼び出し元のFutureに結果を設定（キャンセル済みの場合は何もしない）"""
+    if future.done():
+        return
+    if error is None:
+        future.set_result(None)
+    else:
+        future.set_exception(error)
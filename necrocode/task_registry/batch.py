@@ -0,0 +1,38 @@
+"""
+Batch operations for TaskRegistry.apply_batch()
+
+Each operation targets one task of the spec the batch is applied to.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Union
+
+from .models import ArtifactType, TaskState
+
+
+@dataclass
+class StateTransition:
+    """タスクの状態遷移（update_task_state()と同じ）"""
+    task_id: str
+    new_state: TaskState
+    # assigned_slot, reserved_branch, runner_id等（イベントにも記録される）
+    metadata: Optional[Dict[str, Any]] = None
+
+
+@dataclass
+class AddArtifact:
+    """成果物の参照の追加（add_artifact()と同じ）"""
+    task_id: str
+    artifact_type: ArtifactType
+    uri: str
+    metadata: Optional[Dict[str, Any]] = None
+
+
+@dataclass
+class UpdateMetadata:
+    """Task.metadataの更新（指定したキーのみ上書き）"""
+    task_id: str
+    metadata: Dict[str, Any]
+
+
+BatchOperation = Union[StateTransition, AddArtifact, UpdateMetadata]
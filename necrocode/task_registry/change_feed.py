@@ -0,0 +1,338 @@
+"""
+Change feed over a spec's event log
+
+An EventSubscription tails the events of one spec from a cursor and delivers
+them to a callback (poll() / run()) or to an ``async for`` loop. Delivery is
+at-least-once: the cursor is committed only after the events before it have
+been handled, so a consumer that crashes or raises sees the uncommitted
+events again. A named subscription saves its committed cursor under
+``<events_dir>/<spec>/cursors/<name>.json`` and resumes from it the next time
+it is created.
+
+Writes made through the same EventStore wake subscribers immediately; writes
+made by other processes are picked up by polling every ``poll_interval``
+seconds (one fstat/read from the cursor position per poll).
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Deque, Iterable, List, Optional, Tuple
+
+from .models import EventType, TaskEvent
+
+
+logger = logging.getLogger(__name__)
+
+# Specのイベントディレクトリ以下の保存先
+CURSORS_DIRNAME = "cursors"
+
+
+@dataclass(frozen=True, order=True)
+class EventCursor:
+    """
+    イベントログ上の位置
+    
+    JSONLバックエンドでは、セグメント番号（現在のevents.jsonlはローテーション時に
+    付く番号）とセグメント内のバイトオフセット。SQLiteバックエンドではsegmentは0で、
+    offsetは最後に読んだイベントの行ID。
+    """
+    segment: int
+    offset: int
+    
+    def __str__(self) -> str:
+        return f"{self.segment}:{self.offset}"
+    
+    @classmethod
+    def parse(cls, value: str) -> "EventCursor":
+        """
+        str()の結果から復元
+        
+        Raises:
+            ValueError: 形式が正しくない場合
+        """
+        segment, _, offset = value.partition(":")
+        return cls(int(segment), int(offset))
+    
+    def to_dict(self) -> dict:
+        """JSONに変換可能な辞書に変換"""
+        return {"segment": self.segment, "offset": self.offset}
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> "EventCursor":
+        """to_dict()の結果から復元"""
+        return cls(int(data["segment"]), int(data["offset"]))
+
+
+class EventSubscription:
+    """Deliver a spec's events from a resumable cursor with at-least-once semantics"""
+    
+    def __init__(
+        self,
+        event_store,
+        spec_name: str,
+        name: Optional[str] = None,
+        cursor: Optional[EventCursor] = None,
+        from_end: bool = False,
+        task_id: Optional[str] = None,
+        event_types: Optional[Iterable[EventType]] = None,
+        poll_interval: float = 0.05,
+        batch_size: int = 1000
+    ):
+        """
+        Initialize EventSubscription (通常はEventStore.subscribe()から作成する)
+        
+        Args:
+            event_store: EventStore instance
+            spec_name: Spec名
+            name: 購読名（指定した場合はコミットしたカーソルを保存し、次回はその位置から再開する）
+            cursor: 開始位置（保存されたカーソルより優先）
+            from_end: 開始位置も保存されたカーソルもない場合、Trueなら現在の末尾から、
+                Falseなら最も古いイベントから配信する
+            task_id: タスクID（指定した場合はそのタスクのイベントのみ配信）
+            event_types: イベントタイプ（指定した場合はいずれかに一致するイベントのみ配信）
+            poll_interval: 他のプロセスの書き込みを確認する間隔（秒）
+            batch_size: 1回の読み込みで配信する最大イベント数
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        
+        self.event_store = event_store
+        self.spec_name = spec_name
+        self.name = name
+        self.task_id = task_id
+        self.event_types = list(event_types) if event_types is not None else None
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.cursor_path: Optional[Path] = (
+            Path(event_store.events_dir) / spec_name / CURSORS_DIRNAME / f"{name}.json"
+            if name is not None else None
+        )
+        
+        if cursor is None:
+            cursor = self._load_cursor()
+        if cursor is None:
+            cursor = event_store.tail_cursor(spec_name) if from_end else event_store.head_cursor(spec_name)
+        # コミット済みの位置（再開位置）
+        self.cursor: EventCursor = cursor
+        # 次に読み込む位置
+        self._position = cursor
+        self.delivered = 0
+        
+        self._wakeup = threading.Event()
+        self._closed = threading.Event()
+        # async forで待機中のイベントループと通知先
+        self._async_wakeup: Optional[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = None
+        # async forで未配信のイベントと、最後に配信したイベントの位置
+        self._undelivered: Deque[Tuple[TaskEvent, EventCursor]] = deque()
+        self._last_yielded: Optional[EventCursor] = None
+    
+    def __enter__(self) -> "EventSubscription":
+        return self
+    
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+    
+    def _load_cursor(self) -> Optional[EventCursor]:
+        """保存されたカーソルを読み込む"""
+        if self.cursor_path is None:
+            return None
+        try:
+            with open(self.cursor_path, "r", encoding="utf-8") as f:
+                return EventCursor.from_dict(json.load(f))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning("Ignoring unreadable cursor %s: %s", self.cursor_path, e)
+            return None
+    
+    def _save_cursor(self, cursor: EventCursor) -> None:
+        """カーソルをアトミックに保存"""
+        self.cursor_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.cursor_path.with_suffix(".tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(cursor.to_dict(), f)
+        os.replace(temp_path, self.cursor_path)
+    
+    def _notify(self) -> None:
+        """EventStoreへの書き込みを通知（書き込んだスレッドから呼ばれる）"""
+        self._wakeup.set()
+        waiter = self._async_wakeup
+        if waiter is not None:
+            loop, event = waiter
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # イベントループが終了している
+                pass
+    
+    def fetch(self, max_events: Optional[int] = None) -> List[Tuple[TaskEvent, EventCursor]]:
+        """
+        次のイベントを読み込む（カーソルはコミットしない）
+        
+        処理が終わったイベントの位置をcommit()に渡す。commit()せずにrewind()すると
+        同じイベントを再度読み込む。
+        
+        Args:
+            max_events: 最大イベント数（Noneの場合はbatch_size）
+        
+        Returns:
+            (イベント, そのイベントの直後の位置) のリスト（古い順）
+        """
+        # 読み込み中の書き込みの通知を見逃さないよう、読み込む前にクリアする
+        self._wakeup.clear()
+        events, self._position = self.event_store.read_from(
+            self.spec_name,
+            self._position,
+            max_events=max_events or self.batch_size,
+            task_id=self.task_id,
+            event_types=self.event_types
+        )
+        return events
+    
+    def commit(self, cursor: Optional[EventCursor] = None) -> None:
+        """
+        処理済みの位置を記録（名前付きの購読では保存する）
+        
+        Args:
+            cursor: 位置（Noneの場合はfetch()で読み込んだ位置）
+        """
+        cursor = cursor if cursor is not None else self._position
+        if cursor == self.cursor:
+            return
+        self.cursor = cursor
+        if self.cursor_path is not None:
+            self._save_cursor(cursor)
+    
+    def rewind(self) -> None:
+        """コミットしていないイベントを再度読み込むよう、読み込み位置をコミット済みの位置に戻す"""
+        self._position = self.cursor
+        self._undelivered.clear()
+        self._last_yielded = None
+    
+    def poll(self, callback: Callable[[TaskEvent], Any], max_events: Optional[int] = None) -> int:
+        """
+        新しいイベントを読み込んでcallbackに渡し、カーソルをコミット
+        
+        callbackが例外を送出した場合は、それまでのイベントだけをコミットして
+        例外を送出する（失敗したイベントから次回再配信される）。
+        
+        Args:
+            callback: イベントごとに呼び出す関数
+            max_events: 最大イベント数（Noneの場合はbatch_size）
+        
+        Returns:
+            配信したイベント数
+        """
+        delivered = 0
+        handled: Optional[EventCursor] = None
+        try:
+            for event, cursor in self.fetch(max_events):
+                callback(event)
+                handled = cursor
+                delivered += 1
+        except BaseException:
+            if handled is not None:
+                self.commit(handled)
+            self.rewind()
+            raise
+        finally:
+            self.delivered += delivered
+        
+        self.commit()
+        return delivered
+    
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        このプロセスからの書き込みの通知を待つ
+        
+        Args:
+            timeout: 最大待機時間（秒）、Noneの場合はpoll_interval
+        
+        Returns:
+            通知があった場合True
+        """
+        return self._wakeup.wait(self.poll_interval if timeout is None else timeout)
+    
+    def run(self, callback: Callable[[TaskEvent], Any], max_polls: Optional[int] = None) -> None:
+        """
+        close()が呼ばれるまでイベントをcallbackに配信し続ける
+        
+        callbackの例外はログに記録し、poll_interval後に同じイベントから再配信する。
+        
+        Args:
+            callback: イベントごとに呼び出す関数
+            max_polls: 読み込み回数の上限（Noneの場合は無制限）
+        """
+        polls = 0
+        while not self._closed.is_set():
+            try:
+                delivered = self.poll(callback)
+            except Exception:
+                logger.exception("Subscriber of spec '%s' failed; retrying", self.spec_name)
+                delivered = 0
+            polls += 1
+            if max_polls is not None and polls >= max_polls:
+                break
+            if delivered < self.batch_size and not self._closed.is_set():
+                self.wait()
+    
+    def __aiter__(self) -> "EventSubscription":
+        return self
+    
+    async def __anext__(self) -> TaskEvent:
+        """
+        次のイベントを待って返す
+        
+        前回返したイベントは、次のイベントを要求された時点で処理済みとしてコミットする。
+        """
+        if self._last_yielded is not None:
+            await self._commit_async(self._last_yielded)
+            self._last_yielded = None
+        
+        loop = asyncio.get_running_loop()
+        while not self._undelivered:
+            if self._closed.is_set():
+                raise StopAsyncIteration
+            wakeup = asyncio.Event()
+            self._async_wakeup = (loop, wakeup)
+            try:
+                batch = await loop.run_in_executor(None, self.fetch)
+                if batch:
+                    self._undelivered.extend(batch)
+                    break
+                # 条件に一致しない行だけを読み進めた場合
+                await self._commit_async(None)
+                try:
+                    await asyncio.wait_for(wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+            finally:
+                self._async_wakeup = None
+        
+        event, cursor = self._undelivered.popleft()
+        self._last_yielded = cursor
+        self.delivered += 1
+        return event
+    
+    async def _commit_async(self, cursor: Optional[EventCursor]) -> None:
+        """commit()を実行（カーソルを保存する場合はスレッドで行う）"""
+        if self.cursor_path is None:
+            self.commit(cursor)
+        else:
+            await asyncio.get_running_loop().run_in_executor(None, self.commit, cursor)
+    
+    def close(self) -> None:
+        """
+        配信を終了し、EventStoreからの通知を解除
+        
+        コミットしていないイベントは次回（名前付きの購読では再作成後）再配信される。
+        """
+        self._closed.set()
+        self._notify()
+        self.event_store.unsubscribe(self)
@@ -5,6 +5,10 @@ Configuration for Task Registry
 from dataclasses import dataclass
 from pathlib import Path
 
+from .segment_manager import SegmentPolicy
+from .scheduling import available_policies
+from .serializers import available_formats
+
 
 @dataclass
 class RegistryConfig:
@@ -12,9 +16,49 @@ class RegistryConfig:
     registry_dir: Path = Path.home() / ".necrocode" / "registry"
     lock_timeout: float = 30.0
     lock_retry_interval: float = 0.01
+    # ロックの取得回数・競合・待機/保持時間を記録する（close()時にlocks/metrics/へ保存）
+    lock_metrics: bool = True
+    # "locking": 読み込みから保存までspecのロックを保持
+    # "optimistic": ロックなしで読み込み・適用し、保存時にバージョンを比較（競合した場合は再試行）
+    write_concurrency: str = "locking"
+    # optimisticモードの再試行回数と待機時間（秒、再試行ごとに倍増・ジッターあり）
+    optimistic_max_retries: int = 8
+    optimistic_backoff: float = 0.002
+    optimistic_backoff_max: float = 0.1
     event_log_max_size_mb: int = 100
+    # 書き込み時にサイズ・経過時間でローテーションする
+    event_log_auto_rotate: bool = False
+    event_log_max_age_hours: float = 0.0
+    # ローテーション済みセグメントの圧縮 ("none" / "gzip" / "zstd")。既定では圧縮しない
+    event_log_compression: str = "none"
+    # 保持するセグメント数・日数（0で無制限）
+    event_log_retention_segments: int = 0
+    event_log_retention_days: float = 0.0
     backup_enabled: bool = True
     backup_interval_hours: int = 24
+    # "full": 更新ごとにtaskset.jsonを書き換え / "incremental": 変更タスクのみジャーナルへ追記
+    # "event_sourced": イベントのみ追記し、taskset.jsonは定期的なスナップショット
+    persistence_mode: str = "full"
+    journal_compact_threshold: int = 500
+    # event_sourcedモードでスナップショットを書き出すバージョン間隔
+    snapshot_interval: int = 100
+    # "json": tasksets/・events/ のファイル群 / "sqlite": registry.db (WALモード)
+    storage_backend: str = "json"
+    # taskset.jsonの書き込み形式 ("json" / "json-pretty" / "orjson" / "msgpack" / "marshal" / "auto")
+    # 読み込みは形式を自動判別する（"marshal"は書き込んだPythonのバージョンでのみ読み込める）
+    taskset_format: str = "json"
+    # パース済みTasksetのLRUキャッシュ件数（0で無効）
+    taskset_cache_size: int = 32
+    # イベントをバッファしてまとめて追記する（ロック解放時・閾値・終了時に書き込み）
+    event_buffering: bool = False
+    event_flush_bytes: int = 65536
+    event_flush_interval: float = 0.5
+    # "never": fsyncしない / "commit": 書き込みごとにfsync
+    event_fsync: str = "never"
+    # get_ready_tasks()の既定の並び順 ("critical_path" / "priority" / "dependencies")
+    scheduling_policy: str = "dependencies"
+    # TaskAssigned -> TaskCompleted の実績から所要時間を推定して重み付けする
+    scheduling_use_history: bool = False
     
     def __post_init__(self):
         """設定の検証と初期化"""
@@ -29,11 +73,72 @@ class RegistryConfig:
         if self.lock_retry_interval <= 0:
             raise ValueError("lock_retry_interval must be positive")
         
+        if self.write_concurrency not in ("locking", "optimistic"):
+            raise ValueError("write_concurrency must be 'locking' or 'optimistic'")
+        
+        if self.write_concurrency == "optimistic" and self.persistence_mode == "event_sourced":
+            # 状態はイベントの追記で確定するため、保存時のバージョン比較ができない
+            raise ValueError("write_concurrency 'optimistic' is not supported with persistence_mode 'event_sourced'")
+        
+        if self.optimistic_max_retries < 0:
+            raise ValueError("optimistic_max_retries must be non-negative")
+        
+        if self.optimistic_backoff < 0 or self.optimistic_backoff_max < 0:
+            raise ValueError("optimistic_backoff and optimistic_backoff_max must be non-negative")
+        
         if self.event_log_max_size_mb <= 0:
             raise ValueError("event_log_max_size_mb must be positive")
         
+        if self.event_log_max_age_hours < 0:
+            raise ValueError("event_log_max_age_hours must be non-negative")
+        
+        if self.event_log_compression not in ("none", "gzip", "zstd"):
+            raise ValueError("event_log_compression must be 'none', 'gzip' or 'zstd'")
+        
+        if self.event_log_retention_segments < 0:
+            raise ValueError("event_log_retention_segments must be non-negative")
+        
+        if self.event_log_retention_days < 0:
+            raise ValueError("event_log_retention_days must be non-negative")
+        
         if self.backup_interval_hours <= 0:
             raise ValueError("backup_interval_hours must be positive")
+        
+        if self.persistence_mode not in ("full", "incremental", "event_sourced"):
+            raise ValueError("persistence_mode must be 'full', 'incremental' or 'event_sourced'")
+        
+        if self.journal_compact_threshold <= 0:
+            raise ValueError("journal_compact_threshold must be positive")
+        
+        if self.snapshot_interval <= 0:
+            raise ValueError("snapshot_interval must be positive")
+        
+        if self.storage_backend not in ("json", "sqlite"):
+            raise ValueError("storage_backend must be 'json' or 'sqlite'")
+        
+        if self.storage_backend == "sqlite" and self.persistence_mode == "event_sourced":
+            raise ValueError("persistence_mode 'event_sourced' requires storage_backend 'json'")
+        
+        if self.taskset_format not in available_formats():
+            raise ValueError(
+                f"taskset_format must be one of {available_formats()} "
+                "(orjson/msgpack require the library to be installed)"
+            )
+        
+        if self.taskset_cache_size < 0:
+            raise ValueError("taskset_cache_size must be non-negative")
+        
+        if self.event_flush_bytes <= 0:
+            raise ValueError("event_flush_bytes must be positive")
+        
+        if self.event_flush_interval <= 0:
+            raise ValueError("event_flush_interval must be positive")
+        
+        if self.event_fsync not in ("never", "commit"):
+            raise ValueError("event_fsync must be 'never' or 'commit'")
+        
+        if self.scheduling_policy not in available_policies():
+            raise ValueError(f"scheduling_policy must be one of {available_policies()}")
     
     @property
     def tasksets_dir(self) -> Path:
@@ -45,6 +150,25 @@ class RegistryConfig:
         """イベントログ保存ディレクトリ"""
         return self.registry_dir / "events"
     
+    @property
+    def database_path(self) -> Path:
+        """SQLiteバックエンドのデータベースファイル"""
+        return self.registry_dir / "registry.db"
+    
+    @property
+    def segment_policy(self) -> SegmentPolicy:
+        """イベントログのローテーション・圧縮・保持の設定"""
+        return SegmentPolicy(
+            max_bytes=self.event_log_max_size_mb * 1024 * 1024 if self.event_log_auto_rotate else None,
+            max_age_seconds=(
+                self.event_log_max_age_hours * 3600
+                if self.event_log_auto_rotate and self.event_log_max_age_hours > 0 else None
+            ),
+            compression=self.event_log_compression,
+            retain_segments=self.event_log_retention_segments or None,
+            retain_seconds=self.event_log_retention_days * 86400 or None,
+        )
+    
     @property
     def locks_dir(self) -> Path:
         """ロックファイル保存ディレクトリ"""
@@ -0,0 +1,183 @@
+"""
+Dependency validation for tasksets
+
+Finds every dependency cycle (strongly connected component) and every
+dependency on an unknown task id in one pass, using an iterative Tarjan's
+algorithm so arbitrarily long dependency chains are not limited by the
+recursion limit. Shared by TaskRegistry.create_taskset, KiroSyncManager and
+ParallelOrchestrator.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Set
+
+from .exceptions import CircularDependencyError
+
+
+@dataclass
+class DependencyReport:
+    """依存関係の検証結果"""
+    # 循環依存を構成するタスクIDの集合（強連結成分）ごとのリスト（タスクセットの記述順）
+    cycles: List[List[str]] = field(default_factory=list)
+    # 各強連結成分の中の循環の例（先頭のタスクに戻るパス）
+    cycle_paths: List[List[str]] = field(default_factory=list)
+    # タスクID -> 存在しない依存先のID
+    dangling: Dict[str, List[str]] = field(default_factory=dict)
+    
+    @property
+    def has_cycles(self) -> bool:
+        """循環依存があるかどうか"""
+        return bool(self.cycles)
+    
+    @property
+    def cycle_members(self) -> Set[str]:
+        """循環依存を構成するすべてのタスクID"""
+        return {task_id for component in self.cycles for task_id in component}
+    
+    def dangling_messages(self) -> List[str]:
+        """存在しない依存先の一覧を表示用の文字列で取得"""
+        return [
+            f"Task {task_id} depends on unknown task(s): {', '.join(deps)}"
+            for task_id, deps in self.dangling.items()
+        ]
+    
+    def raise_for_cycles(self) -> None:
+        """
+        循環依存がある場合に例外を送出
+        
+        Raises:
+            CircularDependencyError: 循環依存がある場合（すべての循環を含む）
+        """
+        if self.cycle_paths:
+            raise CircularDependencyError(self.cycle_paths[0], cycles=self.cycle_paths)
+
+
+def analyze_dependencies(dependencies: Dict[str, List[str]]) -> DependencyReport:
+    """
+    依存関係グラフの強連結成分と存在しない依存先を求める（反復版Tarjan法、O(V+E)）
+    
+    Args:
+        dependencies: タスクID -> 依存先のタスクIDのリスト（タスクセットの記述順）
+    
+    Returns:
+        DependencyReport
+    """
+    report = DependencyReport()
+    for task_id, deps in dependencies.items():
+        missing = [dep_id for dep_id in deps if dep_id not in dependencies]
+        if missing:
+            report.dangling[task_id] = missing
+    
+    index: Dict[str, int] = {}
+    lowlink: Dict[str, int] = {}
+    on_stack: Set[str] = set()
+    stack: List[str] = []
+    components: List[Set[str]] = []
+    
+    for root in dependencies:
+        if root in index:
+            continue
+        
+        # (タスクID, 次に調べる依存先の位置) の明示的なスタック
+        work = [(root, 0)]
+        while work:
+            task_id, position = work.pop()
+            if position == 0:
+                index[task_id] = lowlink[task_id] = len(index)
+                stack.append(task_id)
+                on_stack.add(task_id)
+            
+            deps = dependencies[task_id]
+            descended = False
+            while position < len(deps):
+                dep_id = deps[position]
+                position += 1
+                if dep_id not in dependencies:
+                    continue
+                if dep_id not in index:
+                    work.append((task_id, position))
+                    work.append((dep_id, 0))
+                    descended = True
+                    break
+                if dep_id in on_stack:
+                    lowlink[task_id] = min(lowlink[task_id], index[dep_id])
+            if descended:
+                continue
+            
+            if lowlink[task_id] == index[task_id]:
+                component = set()
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.add(member)
+                    if member == task_id:
+                        break
+                if len(component) > 1 or task_id in deps:
+                    components.append(component)
+            
+            if work:
+                parent = work[-1][0]
+                lowlink[parent] = min(lowlink[parent], lowlink[task_id])
+    
+    position_of = {task_id: position for position, task_id in enumerate(dependencies)}
+    components.sort(key=lambda component: min(position_of[t] for t in component))
+    for component in components:
+        members = sorted(component, key=position_of.__getitem__)
+        report.cycles.append(members)
+        report.cycle_paths.append(_cycle_path(dependencies, component, members[0]))
+    
+    return report
+
+
+def _cycle_path(
+    dependencies: Dict[str, List[str]],
+    component: Set[str],
+    start: str
+) -> List[str]:
+    """
+    強連結成分の中でstartから始まりstartに戻る最短の循環を求める
+    
+    Args:
+        dependencies: タスクID -> 依存先のタスクIDのリスト
+        component: 強連結成分
+        start: 循環の起点
+    
+    Returns:
+        startで始まりstartで終わるタスクIDのリスト
+    """
+    previous: Dict[str, str] = {}
+    frontier = [start]
+    while frontier:
+        next_frontier = []
+        for task_id in frontier:
+            for dep_id in dependencies[task_id]:
+                if dep_id == start:
+                    # 終点から起点へ辿ったパスを依存の向きに並べ直す
+                    chain = []
+                    while task_id != start:
+                        chain.append(task_id)
+                        task_id = previous[task_id]
+                    return [start] + chain[::-1] + [start]
+                if dep_id in component and dep_id not in previous and dep_id != start:
+                    previous[dep_id] = task_id
+                    next_frontier.append(dep_id)
+        frontier = next_frontier
+    return [start, start]
+
+
+def validate_dependencies(dependencies: Dict[str, List[str]]) -> DependencyReport:
+    """
+    依存関係に循環がないことを検証
+    
+    Args:
+        dependencies: タスクID -> 依存先のタスクIDのリスト
+    
+    Returns:
+        DependencyReport（存在しない依存先の確認に使用する）
+    
+    Raises:
+        CircularDependencyError: 循環依存がある場合
+    """
+    report = analyze_dependencies(dependencies)
+    report.raise_for_cycles()
+    return report
@@ -0,0 +1,274 @@
+"""
+Sidecar index for JSONL event log segments
+
+Each segment file (``events.jsonl``, ``events.jsonl.N``) gets a tab-separated
+``<segment>.idx`` file with one line per event::
+
+    <byte offset>\t<byte length>\t<task_id>\t<timestamp>
+
+Timestamps are not guaranteed to be non-decreasing within a log: callers may
+record events with their own timestamps, buffered events are flushed later,
+and clocks of different hosts drift. The in-memory index therefore groups
+every CHECKPOINT_INTERVAL entries into a block and keeps the minimum and
+maximum timestamp of each block; time-range scans read only the blocks whose
+bounds overlap the range. While the block bounds are in order the blocks are
+found by binary search, otherwise by checking every block.
+
+Sidecars written by older versions carry a timestamp only on every
+CHECKPOINT_INTERVAL-th line; blocks with entries of unknown time are always read.
+"""
+
+import json
+import os
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+# (offset, length, task_id, timestamp ISO文字列)
+IndexEntry = Tuple[int, int, str, str]
+
+
+class SegmentIndex:
+    """In-memory view of one segment's sidecar index, kept in sync incrementally"""
+    
+    CHECKPOINT_INTERVAL = 64
+    
+    def __init__(self, segment_path: Path):
+        """
+        Args:
+            segment_path: イベントログのセグメントファイル
+        """
+        self.segment_path = Path(segment_path)
+        self.index_path = self.segment_path.with_name(self.segment_path.name + ".idx")
+        self._reset()
+    
+    def _reset(self) -> None:
+        """インメモリの索引を破棄"""
+        self._inode: Optional[int] = None
+        self._index_read_pos = 0
+        self.task_offsets: Dict[str, List[Tuple[int, int]]] = {}
+        # ブロックごとの先頭オフセットと最小・最大時刻（時刻が不明なエントリを含む場合はNone）
+        self.block_offsets: List[int] = []
+        self.block_min: List[Optional[datetime]] = []
+        self.block_max: List[Optional[datetime]] = []
+        # block_minとblock_maxがどちらも非減少（二分探索できる）かどうか
+        self.blocks_ordered = True
+        self.indexed_upto = 0
+        self.entry_count = 0
+    
+    @property
+    def oldest_timestamp(self) -> Optional[datetime]:
+        """セグメント内で最も古いイベントのタイムスタンプ（時刻が分かるものの中で）"""
+        known = [time for time in self.block_min if time is not None]
+        if not known:
+            return None
+        return known[0] if self.blocks_ordered else min(known)
+    
+    def time_bounds(self) -> Optional[Tuple[datetime, datetime]]:
+        """
+        セグメント内のイベントの最小・最大時刻
+        
+        Returns:
+            (最小, 最大)。イベントがないか、時刻が不明なエントリを含む場合はNone
+        """
+        if not self.block_min or any(time is None for time in self.block_min):
+            return None
+        if self.blocks_ordered:
+            return self.block_min[0], self.block_max[-1]
+        return min(self.block_min), max(self.block_max)
+    
+    def sync(self) -> None:
+        """
+        サイドカーとセグメントの追記分を取り込む
+        
+        他プロセスが追記したサイドカー行を読み込み、サイドカーに載っていない
+        セグメント末尾のイベント（旧バージョンの書き込みやクラッシュ）を索引化する。
+        """
+        try:
+            stat = os.stat(self.segment_path)
+        except FileNotFoundError:
+            self._reset()
+            return
+        
+        # ローテーション等でファイルが置き換えられた場合は作り直す
+        if self._inode is not None and (
+            stat.st_ino != self._inode or stat.st_size < self.indexed_upto
+        ):
+            self._reset()
+        self._inode = stat.st_ino
+        
+        self._load_sidecar()
+        
+        if stat.st_size > self.indexed_upto:
+            self._catch_up()
+    
+    def _load_sidecar(self) -> None:
+        """前回以降にサイドカーへ追記された行を読み込む"""
+        try:
+            with open(self.index_path, 'rb') as f:
+                f.seek(self._index_read_pos)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        
+        # 書き込み途中の末尾行は次回に回す
+        end = data.rfind(b'\n') + 1
+        self._index_read_pos += end
+        
+        for line in data[:end].splitlines():
+            parts = line.decode('utf-8').split('\t')
+            try:
+                timestamp = parts[3] if len(parts) > 3 else None
+                self._add(int(parts[0]), int(parts[1]), parts[2], timestamp)
+            except (IndexError, ValueError):
+                continue
+    
+    def _catch_up(self) -> None:
+        """サイドカーに載っていないセグメント末尾を走査して索引化"""
+        entries: List[IndexEntry] = []
+        position = self.indexed_upto
+        
+        with open(self.segment_path, 'rb') as f:
+            f.seek(position)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                stripped = line.strip()
+                if stripped:
+                    try:
+                        data = json.loads(stripped)
+                        entries.append((position, len(line), data["task_id"], data["timestamp"]))
+                    except (json.JSONDecodeError, ValueError, KeyError, TypeError):
+                        # 破損したログ行は索引化しない
+                        pass
+                position += len(line)
+        
+        self.append(entries)
+    
+    def _add(self, offset: int, length: int, task_id: str, timestamp: Optional[str]) -> None:
+        """エントリをインメモリの索引に追加（索引済みの範囲は無視）"""
+        if offset < self.indexed_upto:
+            return
+        
+        self.task_offsets.setdefault(task_id, []).append((offset, length))
+        time = datetime.fromisoformat(timestamp) if timestamp is not None else None
+        if self.entry_count % self.CHECKPOINT_INTERVAL == 0:
+            self.block_offsets.append(offset)
+            self.block_min.append(time)
+            self.block_max.append(time)
+        elif self.block_min[-1] is not None:
+            if time is None:
+                self.block_min[-1] = self.block_max[-1] = None
+            elif time < self.block_min[-1]:
+                self.block_min[-1] = time
+            elif time > self.block_max[-1]:
+                self.block_max[-1] = time
+        self._check_order()
+        self.indexed_upto = offset + length
+        self.entry_count += 1
+    
+    def _check_order(self) -> None:
+        """最後のブロックの追加・更新で、ブロックの最小・最大時刻の順序が崩れていないか確認"""
+        if not self.blocks_ordered:
+            return
+        current_min, current_max = self.block_min[-1], self.block_max[-1]
+        if current_min is None:
+            self.blocks_ordered = False
+        elif len(self.block_min) > 1 and (
+            current_min < self.block_min[-2] or current_max < self.block_max[-2]
+        ):
+            self.blocks_ordered = False
+    
+    def record(self, entries: List[IndexEntry]) -> None:
+        """
+        セグメントに追記したイベントを索引化
+        
+        直前までの索引との間に隙間がある場合（他プロセスの追記や未同期の状態）は
+        sync()で隙間ごと取り込む。
+        
+        Args:
+            entries: 書き込まれたイベントの (offset, length, task_id, timestamp)
+        """
+        if entries and entries[0][0] > self.indexed_upto:
+            self.sync()
+        else:
+            self.append(entries)
+    
+    def append(self, entries: List[IndexEntry]) -> None:
+        """
+        新しく書き込まれたイベントを索引に追加し、サイドカーへ追記
+        
+        Args:
+            entries: 書き込まれたイベントの (offset, length, task_id, timestamp)
+        """
+        lines = []
+        for offset, length, task_id, timestamp in entries:
+            if offset < self.indexed_upto:
+                continue
+            self._add(offset, length, task_id, timestamp)
+            lines.append(f"{offset}\t{length}\t{task_id}\t{timestamp}\n")
+        
+        if not lines:
+            return
+        
+        data = ''.join(lines).encode('utf-8')
+        fd = os.open(self.index_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+            end = os.lseek(fd, 0, os.SEEK_CUR)
+        finally:
+            os.close(fd)
+        
+        # 自分の書き込みだけなら再読み込みを省略
+        if end - len(data) == self._index_read_pos:
+            self._index_read_pos = end
+    
+    def offsets_for_task(self, task_id: str) -> List[Tuple[int, int]]:
+        """
+        タスクのイベントの位置を取得
+        
+        Args:
+            task_id: タスクID
+        
+        Returns:
+            (offset, length) のリスト（記録順）
+        """
+        return self.task_offsets.get(task_id, [])
+    
+    def scan_bounds(
+        self,
+        start_time: Optional[datetime],
+        end_time: Optional[datetime]
+    ) -> Tuple[int, Optional[int]]:
+        """
+        期間内のイベントを含みうるバイト範囲をブロックの最小・最大時刻から求める
+        
+        Args:
+            start_time: 開始時刻（Noneの場合は先頭から）
+            end_time: 終了時刻（Noneの場合は末尾まで）
+        
+        Returns:
+            (開始オフセット, 終了オフセット)。終了がNoneの場合は末尾まで。
+            期間と重なるブロックがない場合は (indexed_upto, indexed_upto)
+        """
+        count = len(self.block_offsets)
+        if self.blocks_ordered:
+            # 最大時刻がstart_time以上の最初のブロックから、最小時刻がend_time以下の最後のブロックまで
+            first = bisect_left(self.block_max, start_time) if start_time is not None else 0
+            last = bisect_right(self.block_min, end_time) - 1 if end_time is not None else count - 1
+        else:
+            overlapping = [
+                i for i in range(count)
+                if self.block_min[i] is None or (
+                    (start_time is None or self.block_max[i] >= start_time)
+                    and (end_time is None or self.block_min[i] <= end_time)
+                )
+            ]
+            first, last = (overlapping[0], overlapping[-1]) if overlapping else (count, -1)
+        
+        if first > last:
+            return self.indexed_upto, self.indexed_upto
+        end_offset = self.block_offsets[last + 1] if last + 1 < count else None
+        return self.block_offsets[first], end_offset
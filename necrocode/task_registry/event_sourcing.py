@@ -0,0 +1,345 @@
+"""
+Event-sourced persistence for Task Registry
+
+In event-sourced mode the event log is the source of truth. ``taskset.json``
+is only a periodic snapshot tagged with the taskset version it includes;
+every mutating event carries the version it produced (``details["version"]``),
+so a taskset is rebuilt by loading the snapshot and replaying the events
+with a newer version. State changes only append events, and the taskset is
+rewritten when a snapshot is taken.
+
+Before the event store deletes segments under its retention policy, a
+snapshot of the spec is written so that no event newer than the latest
+snapshot is lost; if the snapshot fails the segments are kept.
+"""
+
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .models import Artifact, EventType, Task, TaskEvent, TaskState, Taskset
+from .serializers import TasksetSerializer
+from .task_store import TaskStore
+from .event_store import EventStore
+from .taskset_cache import TasksetCache
+from .exceptions import TasksetNotFoundError
+
+
+def events_after(event_store: EventStore, spec_name: str, version: int) -> List[TaskEvent]:
+    """
+    Get the events that produced taskset versions newer than a snapshot
+    
+    The log is read newest-first and reading stops at the first event that
+    is already included in the snapshot, so only the tail is touched.
+    
+    Args:
+        event_store: The event store of the registry
+        spec_name: Name of the spec/taskset
+        version: The version included in the snapshot
+    
+    Returns:
+        Replayable events in the order they were recorded
+    """
+    events = []
+    for event in event_store.iter_events(spec_name, reverse=True):
+        event_version = event.details.get("version")
+        if event_version is None:
+            # バージョンを持たないイベント（Runnerのイベント等）は状態を変更しない
+            continue
+        if event_version <= version or event.event_type == EventType.TASK_CREATED:
+            # タスクセットの作成時には必ずスナップショットが書かれる
+            break
+        events.append(event)
+    events.reverse()
+    return events
+
+
+def apply_event(taskset: Taskset, tasks: Dict[str, Task], event: TaskEvent) -> None:
+    """
+    Apply one recorded state change to a taskset
+    
+    Args:
+        taskset: The taskset to update in place
+        tasks: Task id -> task of the taskset
+        event: An event carrying details["version"]
+    """
+    details = event.details
+    task = tasks.get(event.task_id)
+    
+    if task is not None and "changes" in details:
+        # tasks.mdからの同期で変更されたフィールド
+        for field_name, value in details["changes"].items():
+            setattr(task, field_name, value)
+        task.metadata.update(details.get("metadata", {}))
+        task.updated_at = event.timestamp
+    taskset.metadata.update(details.get("taskset_metadata", {}))
+    
+    if task is not None and "new_state" in details:
+        new_state = TaskState(details["new_state"])
+        task.state = new_state
+        task.updated_at = event.timestamp
+        if new_state == TaskState.RUNNING:
+            for field_name in ("assigned_slot", "reserved_branch", "runner_id"):
+                if field_name in details:
+                    setattr(task, field_name, details[field_name])
+        
+        for task_id in details.get("unblocked", []):
+            unblocked = tasks.get(task_id)
+            if unblocked is not None:
+                unblocked.state = TaskState.READY
+                unblocked.updated_at = event.timestamp
+    
+    elif task is not None and details.get("action") == "artifact_added" and "artifact" in details:
+        task.artifacts.append(Artifact.from_dict(details["artifact"]))
+        task.updated_at = event.timestamp
+    
+    elif task is not None and details.get("action") == "metadata_updated":
+        task.metadata.update(details["metadata"])
+        task.updated_at = event.timestamp
+    
+    taskset.version = details["version"]
+    taskset.updated_at = event.timestamp
+
+
+def replay_events(taskset: Taskset, events: List[TaskEvent]) -> int:
+    """
+    Replay events on top of a snapshot
+    
+    Args:
+        taskset: The snapshot to update in place
+        events: Events returned by events_after()
+    
+    Returns:
+        Number of events applied
+    """
+    tasks = {task.id: task for task in taskset.tasks}
+    applied = 0
+    for event in events:
+        if event.details["version"] <= taskset.version:
+            continue
+        apply_event(taskset, tasks, event)
+        applied += 1
+    return applied
+
+
+def _replayed_task_ids(events: List[TaskEvent]) -> List[str]:
+    """Get the ids of the tasks that replaying the events changes"""
+    task_ids = []
+    for event in events:
+        task_ids.append(event.task_id)
+        task_ids.extend(event.details.get("unblocked", ()))
+    return task_ids
+
+
+class EventSourcedTaskStore(TaskStore):
+    """TaskStore that persists changes as events and taskset.json as snapshots"""
+    
+    def __init__(
+        self,
+        storage_dir: Path,
+        event_store: EventStore,
+        snapshot_interval: int = 100,
+        cache: Optional[TasksetCache] = None,
+        serializer: Optional[TasksetSerializer] = None
+    ):
+        """
+        Initialize EventSourcedTaskStore
+        
+        Args:
+            storage_dir: Directory where snapshots will be stored
+            event_store: The event store holding the replayable events
+            snapshot_interval: Number of versions after which save_tasks()
+                writes a new snapshot
+            cache: Optional cache of parsed tasksets shared by all readers
+            serializer: Format used to write snapshots
+        """
+        super().__init__(storage_dir, cache=cache, serializer=serializer)
+        self.event_store = event_store
+        self.snapshot_interval = snapshot_interval
+        # spec_name -> 最新のスナップショットに含まれるバージョン
+        self._snapshot_versions: Dict[str, int] = {}
+        # spec_name -> キャッシュ済みのTasksetへのイベント再生を直列化するロック
+        self._replay_mutexes: Dict[str, threading.Lock] = {}
+        self._replay_mutexes_lock = threading.Lock()
+        event_store.add_retention_hook(self._snapshot_before_retention)
+    
+    def _replay_mutex(self, spec_name: str) -> threading.Lock:
+        """Get the in-process lock serializing replays onto the cached taskset of a spec"""
+        with self._replay_mutexes_lock:
+            mutex = self._replay_mutexes.get(spec_name)
+            if mutex is None:
+                mutex = self._replay_mutexes[spec_name] = threading.Lock()
+            return mutex
+    
+    def _snapshot_before_retention(self, spec_name: str) -> None:
+        """
+        Write a snapshot before the event store deletes segments of a spec
+        
+        Args:
+            spec_name: Name of the spec whose segments are about to expire
+        
+        Raises:
+            TaskRegistryError: If the snapshot could not be written (the
+                event store then keeps the segments)
+        """
+        try:
+            self.snapshot(spec_name)
+        except TasksetNotFoundError:
+            # タスクセットのないspec（Runnerのイベントのみ等）は再構築の対象外
+            pass
+    
+    def save_taskset(self, taskset: Taskset) -> None:
+        """
+        Write a snapshot of the taskset
+        
+        Args:
+            taskset: The taskset to save
+        
+        Raises:
+            TaskRegistryError: If save operation fails
+        """
+        super().save_taskset(taskset)
+        self._snapshot_versions[taskset.spec_name] = taskset.version
+    
+    def save_tasks(self, taskset: Taskset, tasks: List[Task]) -> None:
+        """
+        Persist changes to individual tasks of a taskset
+        
+        The changes themselves are persisted by the event the caller records
+        next; a snapshot is only written every snapshot_interval versions.
+        
+        Args:
+            taskset: The taskset the tasks belong to (already modified in memory)
+            tasks: The tasks that changed
+        
+        Raises:
+            TaskRegistryError: If save operation fails
+        """
+        spec_name = taskset.spec_name
+        snapshot_version = self._snapshot_versions.get(spec_name)
+        
+        if snapshot_version is None or taskset.version - snapshot_version >= self.snapshot_interval:
+            self.save_taskset(taskset)
+        else:
+            self._cache_put(taskset)
+    
+    def load_shared_taskset(self, spec_name: str) -> Taskset:
+        """
+        Load the latest snapshot and replay the events recorded after it
+        
+        A cached taskset is reused while the snapshot is unchanged; the
+        events newer than the cached version are replayed onto a copy of it,
+        which then replaces the cached entry. Replays of the same spec are
+        serialized so that concurrent readers replay the tail only once and
+        never replace the cached entry with an older version.
+        
+        Args:
+            spec_name: Name of the spec/taskset to load
+        
+        Returns:
+            The loaded Taskset object (read-only)
+        
+        Raises:
+            TasksetNotFoundError: If taskset doesn't exist
+            TaskRegistryError: If load operation fails
+        """
+        if self.cache is None:
+            return self._read_taskset(spec_name)
+        
+        fingerprint = self._fingerprint(spec_name)
+        if fingerprint is not None:
+            cached = self.cache.get(spec_name, fingerprint)
+            if cached is not None:
+                events = events_after(self.event_store, spec_name, cached.version)
+                if not events:
+                    return cached
+                with self._replay_mutex(spec_name):
+                    # 待っている間に他のスレッドが再生した結果があればそれを使う
+                    latest = self.cache.get(spec_name, fingerprint)
+                    if latest is not None and latest is not cached:
+                        cached = latest
+                        events = events_after(self.event_store, spec_name, cached.version)
+                        if not events:
+                            return cached
+                    return self._replay_cached(spec_name, fingerprint, cached, events)
+        
+        taskset = self._read_taskset(spec_name)
+        self.cache.put(spec_name, fingerprint, taskset)
+        return taskset
+    
+    def _replay_cached(
+        self,
+        spec_name: str,
+        fingerprint: tuple,
+        cached: Taskset,
+        events: List[TaskEvent]
+    ) -> Taskset:
+        """
+        Replay events onto a copy of a cached taskset and cache the result
+        (called with the replay mutex of the spec held)
+        
+        Args:
+            spec_name: Name of the spec/taskset
+            fingerprint: Fingerprint of the snapshot the cached taskset was read from
+            cached: The cached taskset (shared with other readers, not modified)
+            events: Events newer than the cached version
+        
+        Returns:
+            The updated taskset (read-only)
+        """
+        # キャッシュ済みのTasksetは他の読み込みと共有しているため変更しない
+        taskset = cached.copy(share_tasks=True)
+        tasks = {task.id: task for task in taskset.tasks}
+        positions = {task.id: i for i, task in enumerate(taskset.tasks)}
+        for task_id in _replayed_task_ids(events):
+            if task_id in tasks:
+                tasks[task_id] = taskset.tasks[positions[task_id]] = tasks[task_id].copy()
+        replay_events(taskset, events)
+        self.cache.put(spec_name, fingerprint, taskset)
+        return taskset
+    
+    def _read_taskset(self, spec_name: str) -> Taskset:
+        """
+        Read the snapshot and replay the events recorded after it
+        
+        Args:
+            spec_name: Name of the spec/taskset to load
+        
+        Returns:
+            The rebuilt Taskset object
+        
+        Raises:
+            TasksetNotFoundError: If taskset doesn't exist
+            TaskRegistryError: If load operation fails
+        """
+        taskset = super()._read_taskset(spec_name)
+        self._snapshot_versions[spec_name] = taskset.version
+        replay_events(taskset, events_after(self.event_store, spec_name, taskset.version))
+        return taskset
+    
+    def snapshot(self, spec_name: str) -> Taskset:
+        """
+        Write a snapshot including every recorded event
+        
+        Args:
+            spec_name: Name of the spec/taskset
+        
+        Returns:
+            The taskset that was written
+        """
+        taskset = self.load_taskset(spec_name)
+        self.save_taskset(taskset)
+        return taskset.copy()
+    
+    def delete_taskset(self, spec_name: str) -> None:
+        """
+        Delete a taskset snapshot
+        
+        Args:
+            spec_name: Name of the spec/taskset to delete
+        
+        Raises:
+            TasksetNotFoundError: If taskset doesn't exist
+        """
+        super().delete_taskset(spec_name)
+        self._snapshot_versions.pop(spec_name, None)
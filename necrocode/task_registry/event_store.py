@@ -3,29 +3,108 @@ EventStore implementation for Task Registry
 Handles event logging, searching, and log rotation
 """
 
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import List, Optional
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import atexit
 import json
+import logging
 import os
 import shutil
+import tempfile
+import threading
+import weakref
 
 from .models import TaskEvent, EventType
+from .change_feed import EventCursor, EventSubscription
+from .event_index import SegmentIndex
+from .segment_manager import (
+    ACTIVE_SEGMENT,
+    COMPRESSED_SUFFIXES,
+    MANIFEST_NAME,
+    SegmentManager,
+    SegmentPolicy,
+    is_compressed,
+    open_compressed,
+    read_lines_reverse,
+    segment_number,
+)
 from .exceptions import TaskRegistryError
 
 
+logger = logging.getLogger(__name__)
+
+
+# シャットダウン時にフラッシュするバッファ付きEventStore
+_buffered_stores: "weakref.WeakSet[EventStore]" = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_buffered_stores() -> None:
+    """プロセス終了時にバッファ中のイベントを書き出す"""
+    for store in list(_buffered_stores):
+        try:
+            store.close()
+        except Exception:
+            pass
+
+
 class EventStore:
     """イベント履歴の記録"""
     
-    def __init__(self, events_dir: Path):
+    FSYNC_POLICIES = ("never", "commit")
+    
+    def __init__(
+        self,
+        events_dir: Path,
+        buffered: bool = False,
+        flush_bytes: int = 65536,
+        flush_interval: float = 0.5,
+        fsync: str = "never",
+        segment_policy: Optional[SegmentPolicy] = None
+    ):
         """
         Initialize EventStore
         
         Args:
             events_dir: イベントログの保存ディレクトリ
+            buffered: Trueの場合、イベントをバッファしてまとめて書き込む（グループコミット）
+            flush_bytes: バッファがこのバイト数に達したら書き込む
+            flush_interval: バッファ中のイベントを書き込むまでの最大秒数
+            fsync: "never": OSに任せる / "commit": 書き込みごとにfsync
+            segment_policy: ローテーション・圧縮・保持の設定（Noneの場合は
+                自動ローテーションせず、rotate_logs()でgzip圧縮する）
         """
+        if fsync not in self.FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {self.FSYNC_POLICIES}")
+        
         self.events_dir = Path(events_dir)
         self.events_dir.mkdir(parents=True, exist_ok=True)
+        self.buffered = buffered
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        # セグメントファイルのパス -> サイドカー索引
+        self._indexes: Dict[str, SegmentIndex] = {}
+        self._lock = threading.RLock()
+        # バッファ付き書き込みの状態
+        self._pending: Dict[str, List[Tuple[TaskEvent, bytes]]] = {}
+        self._pending_bytes: Dict[str, int] = {}
+        self._handles: Dict[str, Tuple[int, int]] = {}
+        self._flusher: Optional[threading.Thread] = None
+        self._closed = threading.Event()
+        # セグメント管理とバックグラウンド圧縮
+        self.segment_policy = segment_policy or SegmentPolicy()
+        self._segment_managers: Dict[str, SegmentManager] = {}
+        self._compressor: Optional[ThreadPoolExecutor] = None
+        # 保持によるセグメントの削除前に呼び出す関数
+        self._retention_hooks: List[Callable[[str], None]] = []
+        # spec_name -> 書き込みを通知する購読
+        self._subscribers: Dict[str, "weakref.WeakSet[EventSubscription]"] = {}
+        
+        if buffered:
+            _buffered_stores.add(self)
     
     def _get_event_file_path(self, spec_name: str) -> Path:
         """
@@ -33,7 +112,7 @@ class EventStore:
         
         Args:
             spec_name: Spec名
-            
+        
         Returns:
             イベントログファイルのパス
         """
@@ -41,70 +120,581 @@ class EventStore:
         spec_dir.mkdir(parents=True, exist_ok=True)
         return spec_dir / "events.jsonl"
     
+    def _list_segments(self, spec_name: str) -> List[Path]:
+        """
+        イベントログのセグメントを古い順に取得
+        
+        Args:
+            spec_name: Spec名
+        
+        Returns:
+            ローテーション済みセグメント（番号順、圧縮済みを含む）と現在のログファイルのパス
+        """
+        event_file = self._get_event_file_path(spec_name)
+        rotated: Dict[int, Path] = {}
+        for path in event_file.parent.glob("events.jsonl.*"):
+            number = segment_number(path)
+            # 圧縮中で両方ある場合は未圧縮のセグメントを読む
+            if number is not None and (number not in rotated or not is_compressed(path)):
+                rotated[number] = path
+        
+        segments = [rotated[number] for number in sorted(rotated)]
+        if event_file.exists():
+            segments.append(event_file)
+        return segments
+    
+    def _segment_manager(self, spec_name: str) -> SegmentManager:
+        """Specのセグメントマネージャーを取得"""
+        manager = self._segment_managers.get(spec_name)
+        if manager is None:
+            manager = SegmentManager(
+                self._get_event_file_path(spec_name).parent, self.segment_policy
+            )
+            self._segment_managers[spec_name] = manager
+        return manager
+    
+    def add_retention_hook(self, hook: Callable[[str], None]) -> None:
+        """
+        保持数・保持期間によってセグメントを削除する前に呼び出す関数を登録
+        
+        イベントから状態を再構築するストアは、削除されるイベントを含むスナップショットを
+        ここで書き込む。関数が例外を送出した場合、そのセグメントは削除しない。
+        
+        Args:
+            hook: Spec名を受け取る関数
+        """
+        self._retention_hooks.append(hook)
+    
+    def _prepare_retention(self, spec_name: str) -> bool:
+        """
+        登録された関数を呼び出し、セグメントを削除してよいか判定
+        
+        Args:
+            spec_name: Spec名
+        
+        Returns:
+            すべての関数が成功した場合True
+        """
+        for hook in self._retention_hooks:
+            try:
+                hook(spec_name)
+            except Exception:
+                logger.exception(
+                    "Keeping expired segments of spec '%s': retention hook failed", spec_name
+                )
+                return False
+        return True
+    
+    def _index_for(self, segment: Path) -> SegmentIndex:
+        """セグメントのサイドカー索引を取得（_lockを保持して呼び出す）"""
+        index = self._indexes.get(str(segment))
+        if index is None:
+            index = SegmentIndex(segment)
+            self._indexes[str(segment)] = index
+        return index
+    
+    def _get_index(self, segment: Path) -> SegmentIndex:
+        """
+        セグメントのサイドカー索引を同期して取得（_lockを保持して呼び出す）
+        
+        Args:
+            segment: セグメントファイルのパス
+        
+        Returns:
+            同期済みのSegmentIndex
+        """
+        index = self._index_for(segment)
+        index.sync()
+        return index
+    
+    def _open_segment(self, event_file: Path) -> int:
+        """
+        追記用のファイルディスクリプタを取得（_lockを保持して呼び出す）
+        
+        バッファ付きモードではハンドルを開いたまま再利用し、ローテーション等で
+        ファイルが置き換えられていたら開き直す。
+        """
+        key = str(event_file)
+        handle = self._handles.get(key)
+        if handle is not None:
+            fd, inode = handle
+            try:
+                if os.stat(event_file).st_ino == inode:
+                    return fd
+            except FileNotFoundError:
+                pass
+            os.close(fd)
+            del self._handles[key]
+        
+        fd = os.open(event_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        if self.buffered:
+            self._handles[key] = (fd, os.fstat(fd).st_ino)
+        return fd
+    
+    def _write(self, spec_name: str, records: List[Tuple[TaskEvent, bytes]]) -> None:
+        """
+        エンコード済みのイベントを1回の書き込みでセグメントへ追記し、索引化する
+        
+        Args:
+            spec_name: Spec名
+            records: (イベント, JSON Lines形式のバイト列) のリスト
+        """
+        event_file = self._get_event_file_path(spec_name)
+        data = b''.join(line for _, line in records)
+        
+        with self._lock:
+            # O_APPENDで書き込み位置を確定させる
+            fd = self._open_segment(event_file)
+            try:
+                os.write(fd, data)
+                end = os.lseek(fd, 0, os.SEEK_CUR)
+                if self.fsync == "commit":
+                    os.fsync(fd)
+            finally:
+                if not self.buffered:
+                    os.close(fd)
+            
+            offset = end - len(data)
+            entries = []
+            for event, line in records:
+                entries.append((offset, len(line), event.task_id, event.timestamp.isoformat()))
+                offset += len(line)
+            index = self._index_for(event_file)
+            index.record(entries)
+            
+            if self.segment_policy.auto_rotate and self._segment_manager(spec_name).should_rotate(
+                index.indexed_upto, index.oldest_timestamp
+            ):
+                self._rotate(spec_name)
+            
+            self._notify_subscribers(spec_name)
+    
+    def _rotate(self, spec_name: str) -> Optional[int]:
+        """
+        現在のログをローテーションし、圧縮をバックグラウンドで開始
+        
+        Args:
+            spec_name: Spec名
+        
+        Returns:
+            ローテーション後のセグメント番号（ログが空の場合はNone）
+        """
+        event_file = self._get_event_file_path(spec_name)
+        with self._lock:
+            # 保持によって削除されるイベントをスナップショットに含めるため、先に呼び出す
+            retain = not self.segment_policy.retains or self._prepare_retention(spec_name)
+            
+            handle = self._handles.pop(str(event_file), None)
+            if handle is not None:
+                os.close(handle[0])
+            
+            index = self._indexes.pop(str(event_file), None)
+            if index is None:
+                index = SegmentIndex(event_file)
+            index.sync()
+            number = self._segment_manager(spec_name).rotate(
+                index.time_bounds(), apply_retention=retain
+            )
+        
+        if number is not None:
+            self._schedule_compression(spec_name, number)
+        return number
+    
+    def _schedule_compression(self, spec_name: str, number: int) -> None:
+        """ローテーション済みセグメントの圧縮をバックグラウンドスレッドに登録"""
+        if self.segment_policy.compression_suffix is None:
+            return
+        
+        with self._lock:
+            if self._compressor is None:
+                self._compressor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="necrocode-event-compressor"
+                )
+            future = self._compressor.submit(self._segment_manager(spec_name).compress, number)
+        
+        def report(done: Future) -> None:
+            if done.exception() is not None:
+                logger.error(
+                    f"Failed to compress event segment {number} of '{spec_name}': {done.exception()}"
+                )
+        
+        future.add_done_callback(report)
+    
     def record_event(self, event: TaskEvent) -> None:
         """
         イベントを記録
         
         Args:
             event: 記録するイベント
-            
+        
+        Raises:
+            TaskRegistryError: イベント記録に失敗した場合
+        """
+        self.record_events([event])
+    
+    def record_events(self, events: List[TaskEvent]) -> None:
+        """
+        複数のイベントをまとめて記録
+        
+        Specごとに1回の書き込みで追記する。バッファ付きモードではバッファに
+        積み、flush_bytes・flush_intervalの閾値、flush()、close()で書き込む。
+        
+        Args:
+            events: 記録するイベント（記録順）
+        
         Raises:
             TaskRegistryError: イベント記録に失敗した場合
         """
+        by_spec: Dict[str, List[Tuple[TaskEvent, bytes]]] = {}
+        for event in events:
+            line = (event.to_jsonl() + '\n').encode('utf-8')
+            by_spec.setdefault(event.spec_name, []).append((event, line))
+        
+        for spec_name, records in by_spec.items():
+            try:
+                if self.buffered:
+                    self._buffer(spec_name, records)
+                else:
+                    self._write(spec_name, records)
+            except Exception as e:
+                raise TaskRegistryError(
+                    f"Failed to record event for spec '{spec_name}': {e}"
+                ) from e
+    
+    def _buffer(self, spec_name: str, records: List[Tuple[TaskEvent, bytes]]) -> None:
+        """イベントをバッファに積み、サイズ閾値を超えたら書き込む"""
+        with self._lock:
+            if self._closed.is_set():
+                self._write(spec_name, records)
+                return
+            
+            self._pending.setdefault(spec_name, []).extend(records)
+            size = self._pending_bytes.get(spec_name, 0) + sum(len(line) for _, line in records)
+            self._pending_bytes[spec_name] = size
+            if size >= self.flush_bytes:
+                self._flush_spec(spec_name)
+            
+            if self._flusher is None:
+                self._flusher = threading.Thread(
+                    target=EventStore._flush_periodically,
+                    args=(weakref.ref(self),),
+                    name="necrocode-event-flusher",
+                    daemon=True
+                )
+                self._flusher.start()
+    
+    def _flush_spec(self, spec_name: str) -> None:
+        """Specのバッファを書き込む（_lockを保持して呼び出す）"""
+        # 書き込み中のローテーションから呼ばれるflushで二重に書き込まないよう、先に取り出す
+        records = self._pending.pop(spec_name, None)
+        size = self._pending_bytes.pop(spec_name, 0)
+        if not records:
+            return
         try:
-            event_file = self._get_event_file_path(event.spec_name)
+            self._write(spec_name, records)
+        except Exception:
+            # 書き込みに失敗したイベントはバッファに戻し、次回のflushで再試行する
+            self._pending[spec_name] = records + self._pending.get(spec_name, [])
+            self._pending_bytes[spec_name] = size + self._pending_bytes.get(spec_name, 0)
+            raise
+    
+    @staticmethod
+    def _flush_periodically(store_ref: "weakref.ref[EventStore]") -> None:
+        """
+        flush_intervalごとにバッファを書き込むバックグラウンドスレッド
+        
+        EventStoreを弱参照で保持し、close()されるか破棄されたら終了する。
+        """
+        while True:
+            store = store_ref()
+            if store is None:
+                return
+            closed, interval = store._closed, store.flush_interval
+            del store
             
-            # JSON Lines形式で追記
-            with open(event_file, 'a', encoding='utf-8') as f:
-                f.write(event.to_jsonl() + '\n')
-                
-        except Exception as e:
-            raise TaskRegistryError(
-                f"Failed to record event for spec '{event.spec_name}': {e}"
-            ) from e
+            if closed.wait(interval):
+                return
+            
+            store = store_ref()
+            if store is None:
+                return
+            try:
+                store.flush()
+            except TaskRegistryError:
+                # 失敗したイベントはバッファに残り、次回のflushで再試行される
+                pass
+            del store
     
-    def get_events_by_task(
-        self, 
-        spec_name: str, 
-        task_id: str
-    ) -> List[TaskEvent]:
+    def flush(self, spec_name: Optional[str] = None) -> None:
         """
-        特定タスクのイベントを取得
+        バッファ中のイベントを書き込む
+        
+        Args:
+            spec_name: Spec名（Noneの場合はすべてのSpec）
+        
+        Raises:
+            TaskRegistryError: 書き込みに失敗した場合
+        """
+        if not self._pending:
+            return
+        
+        with self._lock:
+            spec_names = [spec_name] if spec_name is not None else list(self._pending)
+            for name in spec_names:
+                try:
+                    self._flush_spec(name)
+                except Exception as e:
+                    raise TaskRegistryError(
+                        f"Failed to flush events for spec '{name}': {e}"
+                    ) from e
+    
+    def close(self) -> None:
+        """
+        バッファを書き込み、開いているハンドルを閉じ、実行中の圧縮を待つ
+        
+        close()後に記録されたイベントはバッファせずに直接書き込む。
+        """
+        self._closed.set()
+        with self._lock:
+            try:
+                self.flush()
+            finally:
+                for fd, _ in self._handles.values():
+                    os.close(fd)
+                self._handles.clear()
+                compressor, self._compressor = self._compressor, None
+        
+        # 実行中の圧縮の完了を待つ
+        if compressor is not None:
+            compressor.shutdown(wait=True)
+        _buffered_stores.discard(self)
+    
+    def _read_plan(
+        self,
+        spec_name: str,
+        task_id: Optional[str],
+        start_time: Optional[datetime],
+        end_time: Optional[datetime]
+    ) -> List[Tuple[Path, Optional[List[Tuple[int, int]]], int, Optional[int]]]:
+        """
+        読み込むセグメントと範囲を索引から決定する
+        
+        索引はロック下でスナップショットを取るため、読み込み中の追記は
+        反映されない（読み込み開始時点までのイベントを返す）。
         
         Args:
             spec_name: Spec名
-            task_id: タスクID
-            
+            task_id: タスクID（Noneの場合はすべて）
+            start_time: 開始時刻（Noneの場合は先頭から）
+            end_time: 終了時刻（Noneの場合は末尾まで）
+        
         Returns:
-            タスクに関連するイベントのリスト
+            (セグメント, タスクのイベント位置またはNone, 開始オフセット, 終了オフセット) のリスト
         """
-        event_file = self._get_event_file_path(spec_name)
+        plan = []
+        with self._lock:
+            segments = self._list_segments(spec_name)
+            manifest = (
+                self._segment_manager(spec_name).segments()
+                if start_time is not None or end_time is not None else {}
+            )
+            
+            def index_of(segment: Path) -> Optional[SegmentIndex]:
+                return None if is_compressed(segment) else self._get_index(segment)
+            
+            for segment in segments:
+                # マニフェストから期間外と分かるセグメントは開かない
+                info = manifest.get(segment_number(segment))
+                if info is not None and info.outside(start_time, end_time):
+                    continue
+                
+                index = index_of(segment)
+                if index is None:
+                    # 圧縮済みセグメントは先頭から走査する
+                    plan.append((segment, None, 0, None))
+                    continue
+                
+                # タイムスタンプは記録順とは限らないため、ブロックの最小・最大時刻で絞り込む
+                start_offset, end_offset = index.scan_bounds(start_time, end_time)
+                if end_offset is None:
+                    end_offset = index.indexed_upto
+                if start_offset >= end_offset:
+                    continue
+                
+                locations = None
+                if task_id is not None:
+                    locations = [
+                        (offset, length)
+                        for offset, length in index.offsets_for_task(task_id)
+                        if start_offset <= offset < end_offset
+                    ]
+                    if not locations:
+                        continue
+                plan.append((segment, locations, start_offset, end_offset))
         
-        if not event_file.exists():
-            return []
+        return plan
+    
+    def _iter_segment_lines(
+        self,
+        segment: Path,
+        locations: Optional[List[Tuple[int, int]]],
+        start_offset: int,
+        end_offset: Optional[int],
+        reverse: bool
+    ) -> Iterator[bytes]:
+        """
+        セグメントの行を読み込む
+        
+        Args:
+            segment: セグメントファイルのパス
+            locations: 読み込む行の (offset, length)（Noneの場合は範囲全体）
+            start_offset: 開始オフセット
+            end_offset: 終了オフセット（Noneの場合は末尾まで）
+            reverse: Trueの場合は末尾から読み込む
+        
+        Yields:
+            JSON Lines形式の行
+        """
+        if is_compressed(segment):
+            try:
+                f = open_compressed(segment)
+            except FileNotFoundError:
+                # 保持期限で削除された
+                return
+            
+            with f:
+                if not reverse:
+                    yield from f
+                    return
+                
+                # 圧縮ファイルは逆方向にシークできないため一時ファイルへ展開する
+                with tempfile.TemporaryFile() as spool:
+                    shutil.copyfileobj(f, spool)
+                    yield from read_lines_reverse(spool, 0, spool.tell())
+            return
         
-        events = []
         try:
-            with open(event_file, 'r', encoding='utf-8') as f:
+            f = open(segment, 'rb')
+        except FileNotFoundError:
+            # 読み込み前に圧縮された場合は圧縮済みのファイルを先頭から読む
+            for suffix in COMPRESSED_SUFFIXES:
+                compressed = segment.with_name(segment.name + suffix)
+                if compressed.exists():
+                    yield from self._iter_segment_lines(compressed, None, 0, None, reverse)
+                    break
+            return
+        
+        with f:
+            if locations is not None:
+                for offset, length in (reversed(locations) if reverse else locations):
+                    f.seek(offset)
+                    yield f.read(length)
+            elif reverse:
+                if end_offset is None:
+                    end_offset = f.seek(0, os.SEEK_END)
+                yield from read_lines_reverse(f, start_offset, end_offset)
+            else:
+                f.seek(start_offset)
+                position = start_offset
                 for line in f:
+                    if end_offset is not None and position >= end_offset:
+                        break
+                    position += len(line)
+                    yield line
+    
+    def iter_events(
+        self,
+        spec_name: str,
+        task_id: Optional[str] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        event_types: Optional[Iterable[EventType]] = None,
+        reverse: bool = False
+    ) -> Iterator[TaskEvent]:
+        """
+        イベントを順に読み込むイテレータ
+        
+        ローテーション済み（圧縮を含む）セグメントから現在のログまでを1行ずつ
+        読み込むため、ログの大きさに関わらずメモリ使用量は一定で、途中で
+        打ち切ることもできる。
+        
+        Args:
+            spec_name: Spec名
+            task_id: タスクID（指定した場合はそのタスクのイベントのみ）
+            start_time: 開始時刻（指定した場合はこの時刻以降のイベントのみ）
+            end_time: 終了時刻（指定した場合はこの時刻以前のイベントのみ）
+            event_types: イベントタイプ（指定した場合はいずれかに一致するイベントのみ）
+            reverse: Trueの場合は新しい順
+        
+        Yields:
+            条件に一致するイベント
+        
+        Raises:
+            TaskRegistryError: 読み込みに失敗した場合
+        """
+        type_values = None
+        type_tokens: Tuple[bytes, ...] = ()
+        if event_types is not None:
+            type_values = {EventType(event_type).value for event_type in event_types}
+            type_tokens = tuple(json.dumps(value).encode('utf-8') for value in type_values)
+        
+        try:
+            self.flush(spec_name)
+            plan = self._read_plan(spec_name, task_id, start_time, end_time)
+            if reverse:
+                plan.reverse()
+            
+            for segment, locations, start_offset, end_offset in plan:
+                for line in self._iter_segment_lines(
+                    segment, locations, start_offset, end_offset, reverse
+                ):
+                    # デコード前にイベントタイプで絞り込む
+                    if type_tokens and not any(token in line for token in type_tokens):
+                        continue
+                    
                     line = line.strip()
                     if not line:
                         continue
                     
                     try:
-                        event = TaskEvent.from_jsonl(line)
-                        if event.task_id == task_id:
-                            events.append(event)
-                    except (json.JSONDecodeError, ValueError, KeyError) as e:
+                        event = TaskEvent.from_jsonl(line.decode('utf-8'))
+                    except (json.JSONDecodeError, ValueError, KeyError):
                         # 破損したログ行をスキップ
                         continue
-                        
+                    
+                    if task_id is not None and event.task_id != task_id:
+                        continue
+                    if start_time is not None and event.timestamp < start_time:
+                        continue
+                    if end_time is not None and event.timestamp > end_time:
+                        continue
+                    if type_values is not None and event.event_type.value not in type_values:
+                        continue
+                    yield event
+        
+        except TaskRegistryError:
+            raise
         except Exception as e:
             raise TaskRegistryError(
                 f"Failed to read events for spec '{spec_name}': {e}"
             ) from e
+    
+    def get_events_by_task(
+        self, 
+        spec_name: str, 
+        task_id: str
+    ) -> List[TaskEvent]:
+        """
+        特定タスクのイベントを取得
         
-        return events
+        Args:
+            spec_name: Spec名
+            task_id: タスクID
+        
+        Returns:
+            タスクに関連するイベントのリスト
+        """
+        return list(self.iter_events(spec_name, task_id=task_id))
     
     def get_events_by_timerange(
         self,
@@ -119,49 +709,30 @@ class EventStore:
             spec_name: Spec名
             start_time: 開始時刻
             end_time: 終了時刻
-            
+        
         Returns:
             期間内のイベントのリスト
         """
-        event_file = self._get_event_file_path(spec_name)
-        
-        if not event_file.exists():
-            return []
-        
-        events = []
-        try:
-            with open(event_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-                    
-                    try:
-                        event = TaskEvent.from_jsonl(line)
-                        if start_time <= event.timestamp <= end_time:
-                            events.append(event)
-                    except (json.JSONDecodeError, ValueError, KeyError) as e:
-                        # 破損したログ行をスキップ
-                        continue
-                        
-        except Exception as e:
-            raise TaskRegistryError(
-                f"Failed to read events for spec '{spec_name}': {e}"
-            ) from e
-        
-        return events
+        return list(self.iter_events(spec_name, start_time=start_time, end_time=end_time))
     
-    def rotate_logs(self, max_size_mb: int = 100) -> None:
+    def rotate_logs(self, max_size_mb: Optional[int] = 100) -> None:
         """
         ログファイルをローテーション
         
+        サイズ（またはsegment_policyの経過時間）の閾値を超えた現在のログを
+        次の番号のセグメントへ移動し、バックグラウンドで圧縮する。保持数・
+        保持期間を超えたセグメントは削除される。
+        
         Args:
-            max_size_mb: 最大ファイルサイズ（MB）
-            
+            max_size_mb: 最大ファイルサイズ（MB）。Noneの場合はsegment_policyに従う
+        
         Raises:
             TaskRegistryError: ローテーションに失敗した場合
         """
-        max_size_bytes = max_size_mb * 1024 * 1024
+        max_bytes = (
+            max_size_mb * 1024 * 1024 if max_size_mb is not None else self.segment_policy.max_bytes
+        )
+        self.flush()
         
         try:
             # すべてのspecディレクトリを走査
@@ -169,29 +740,27 @@ class EventStore:
                 if not spec_dir.is_dir():
                     continue
                 
+                spec_name = spec_dir.name
                 event_file = spec_dir / "events.jsonl"
-                if not event_file.exists():
-                    continue
-                
-                # ファイルサイズをチェック
-                file_size = event_file.stat().st_size
-                if file_size < max_size_bytes:
-                    continue
+                manager = self._segment_manager(spec_name)
                 
-                # ローテーション番号を決定
-                rotation_num = 1
-                while True:
-                    rotated_file = spec_dir / f"events.jsonl.{rotation_num}"
-                    if not rotated_file.exists():
-                        break
-                    rotation_num += 1
-                
-                # ファイルをローテーション
-                shutil.move(str(event_file), str(rotated_file))
-                
-                # 新しい空のログファイルを作成
-                event_file.touch()
+                with self._lock:
+                    if not event_file.exists():
+                        continue
+                    
+                    size = event_file.stat().st_size
+                    index = self._get_index(event_file)
+                    if (max_bytes is not None and size >= max_bytes) or manager.should_rotate(
+                        size, index.oldest_timestamp
+                    ):
+                        self._rotate(spec_name)
+                    elif manager.has_expired() and self._prepare_retention(spec_name):
+                        manager.enforce_retention()
                 
+                # 前回のプロセスで圧縮されずに残ったセグメント
+                for number in manager.pending_compression():
+                    self._schedule_compression(spec_name, number)
+        
         except Exception as e:
             raise TaskRegistryError(
                 f"Failed to rotate logs: {e}"
@@ -203,36 +772,224 @@ class EventStore:
         
         Args:
             spec_name: Spec名
-            
+        
         Returns:
             すべてのイベントのリスト
         """
-        event_file = self._get_event_file_path(spec_name)
+        return list(self.iter_events(spec_name))
+    
+    def _rotated_segment(self, spec_name: str, number: int) -> Optional[Path]:
+        """ローテーション済みセグメントのパス（圧縮中は未圧縮のもの、存在しない場合はNone）"""
+        plain = self._get_event_file_path(spec_name).with_name(f"{ACTIVE_SEGMENT}.{number}")
+        # 圧縮は圧縮後のファイルを作成してから元のファイルを削除するため、この順に確認する
+        for path in [plain] + [plain.with_name(plain.name + suffix) for suffix in COMPRESSED_SUFFIXES]:
+            if path.exists():
+                return path
+        return None
+    
+    def _open_for_tail(self, spec_name: str, number: int) -> Tuple[Optional[BinaryIO], bool]:
+        """
+        カーソルのセグメントを開く
+        
+        Args:
+            spec_name: Spec名
+            number: セグメント番号
+        
+        Returns:
+            (ファイル, ローテーション済みかどうか)。セグメントが存在しない場合はファイルがNone
+        """
+        while True:
+            rotated = self._rotated_segment(spec_name, number)
+            if rotated is not None:
+                try:
+                    return (open_compressed(rotated) if is_compressed(rotated) else open(rotated, 'rb')), True
+                except FileNotFoundError:
+                    # 開く前に圧縮または削除された
+                    continue
+            
+            if self._segment_manager(spec_name).next_segment() != number:
+                return None, False
+            try:
+                f = open(self._get_event_file_path(spec_name), 'rb')
+            except FileNotFoundError:
+                return None, False
+            # 開く直前にローテーションされていた場合は開いたのは新しいログ
+            if self._rotated_segment(spec_name, number) is not None:
+                f.close()
+                continue
+            return f, False
+    
+    def head_cursor(self, spec_name: str) -> EventCursor:
+        """
+        最も古いイベントの位置を取得
+        
+        Args:
+            spec_name: Spec名
+        
+        Returns:
+            残っている最も古いセグメントの先頭
+        """
+        for segment in self._list_segments(spec_name):
+            number = segment_number(segment)
+            if number is not None:
+                return EventCursor(number, 0)
+        return EventCursor(self._segment_manager(spec_name).next_segment(), 0)
+    
+    def tail_cursor(self, spec_name: str) -> EventCursor:
+        """
+        記録済みのイベントの末尾の位置を取得
         
-        if not event_file.exists():
-            return []
+        Args:
+            spec_name: Spec名
         
-        events = []
+        Returns:
+            現在のログの末尾
+        """
+        self.flush(spec_name)
+        manager = self._segment_manager(spec_name)
+        while True:
+            number = manager.next_segment()
+            try:
+                size = self._get_event_file_path(spec_name).stat().st_size
+            except FileNotFoundError:
+                size = 0
+            if self._rotated_segment(spec_name, number) is None:
+                return EventCursor(number, size)
+    
+    def read_from(
+        self,
+        spec_name: str,
+        cursor: EventCursor,
+        max_events: int = 1000,
+        task_id: Optional[str] = None,
+        event_types: Optional[Iterable[EventType]] = None
+    ) -> Tuple[List[Tuple[TaskEvent, EventCursor]], EventCursor]:
+        """
+        カーソルの位置以降に記録されたイベントを読み込む
+        
+        ローテーション済み（圧縮を含む）セグメントを順に読み、現在のログの末尾まで
+        進む。書き込み途中の行は読み込まない。保持期限で削除されたセグメントは
+        読み飛ばす。
+        
+        Args:
+            spec_name: Spec名
+            cursor: 読み込みを開始する位置
+            max_events: 最大イベント数
+            task_id: タスクID（指定した場合はそのタスクのイベントのみ）
+            event_types: イベントタイプ（指定した場合はいずれかに一致するイベントのみ）
+        
+        Returns:
+            ((イベント, そのイベントの直後の位置) のリスト, 読み込んだ範囲の末尾の位置)
+        
+        Raises:
+            TaskRegistryError: 読み込みに失敗した場合
+        """
+        type_values = None
+        if event_types is not None:
+            type_values = {EventType(event_type).value for event_type in event_types}
+        
+        events: List[Tuple[TaskEvent, EventCursor]] = []
+        number, offset = cursor.segment, cursor.offset
         try:
-            with open(event_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
+            self.flush(spec_name)
+            while len(events) < max_events:
+                f, sealed = self._open_for_tail(spec_name, number)
+                if f is None:
+                    next_segment = self._segment_manager(spec_name).next_segment()
+                    if number < next_segment:
+                        if self._rotated_segment(spec_name, number) is not None:
+                            # 開こうとした時点ではローテーション中だった
+                            continue
+                        logger.warning(
+                            "Event segment %d of '%s' was removed before it was read", number, spec_name
+                        )
+                        number, offset = number + 1, 0
                         continue
-                    
-                    try:
-                        event = TaskEvent.from_jsonl(line)
-                        events.append(event)
-                    except (json.JSONDecodeError, ValueError, KeyError) as e:
-                        # 破損したログ行をスキップ
+                    if number > next_segment:
+                        if self._rotated_segment(spec_name, number - 1) is not None:
+                            # ローテーション直後でマニフェストがまだ更新されていない
+                            break
+                        # clear_events()等でログが作り直された
+                        logger.warning("Event log of '%s' was reset; reading from the start", spec_name)
+                        number, offset = next_segment, 0
                         continue
+                    break
+                
+                with f:
+                    if not sealed and offset > os.fstat(f.fileno()).st_size:
+                        logger.warning("Event log of '%s' was truncated; reading from the start", spec_name)
+                        offset = 0
+                    f.seek(offset)
+                    finished = False
+                    while len(events) < max_events:
+                        line = f.readline()
+                        if not line.endswith(b'\n'):
+                            if sealed:
+                                # ローテーション済みセグメントの末尾の壊れた行は読み飛ばす
+                                finished = True
+                                break
+                            if self._rotated_segment(spec_name, number) is None:
+                                break
+                            # 読み込み中にローテーションされたため、同じファイルの残りを読み切る
+                            sealed = True
+                            f.seek(offset)
+                            continue
                         
+                        offset += len(line)
+                        try:
+                            event = TaskEvent.from_jsonl(line.decode('utf-8'))
+                        except (json.JSONDecodeError, ValueError, KeyError):
+                            # 破損したログ行をスキップ
+                            continue
+                        if task_id is not None and event.task_id != task_id:
+                            continue
+                        if type_values is not None and event.event_type.value not in type_values:
+                            continue
+                        events.append((event, EventCursor(number, offset)))
+                
+                if not finished:
+                    break
+                number, offset = number + 1, 0
+        
+        except TaskRegistryError:
+            raise
         except Exception as e:
             raise TaskRegistryError(
                 f"Failed to read events for spec '{spec_name}': {e}"
             ) from e
         
-        return events
+        return events, EventCursor(number, offset)
+    
+    def subscribe(self, spec_name: str, **options) -> EventSubscription:
+        """
+        Specのイベントを購読
+        
+        Args:
+            spec_name: Spec名
+            **options: EventSubscriptionの引数（name, cursor, from_end, task_id,
+                event_types, poll_interval, batch_size）
+        
+        Returns:
+            EventSubscription（close()で購読を終了する）
+        """
+        subscription = EventSubscription(self, spec_name, **options)
+        with self._lock:
+            self._subscribers.setdefault(spec_name, weakref.WeakSet()).add(subscription)
+        return subscription
+    
+    def unsubscribe(self, subscription: EventSubscription) -> None:
+        """購読への書き込みの通知を解除"""
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.spec_name)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+    
+    def _notify_subscribers(self, spec_name: str) -> None:
+        """Specの購読に書き込みを通知"""
+        subscribers = self._subscribers.get(spec_name)
+        if subscribers:
+            for subscription in list(subscribers):
+                subscription._notify()
     
     def clear_events(self, spec_name: str) -> None:
         """
@@ -241,6 +998,20 @@ class EventStore:
         Args:
             spec_name: Spec名
         """
-        event_file = self._get_event_file_path(spec_name)
-        if event_file.exists():
-            event_file.unlink()
+        with self._lock:
+            self._pending.pop(spec_name, None)
+            self._pending_bytes.pop(spec_name, None)
+            handle = self._handles.pop(str(self._get_event_file_path(spec_name)), None)
+            if handle is not None:
+                os.close(handle[0])
+            
+            for segment in self._list_segments(spec_name):
+                segment.unlink()
+                index_file = segment.with_name(segment.name + ".idx")
+                if index_file.exists():
+                    index_file.unlink()
+                self._indexes.pop(str(segment), None)
+            
+            manifest = self._get_event_file_path(spec_name).parent / MANIFEST_NAME
+            if manifest.exists():
+                manifest.unlink()
@@ -2,6 +2,8 @@
 Exception classes for Task Registry
 """
 
+from typing import Optional
+
 
 class TaskRegistryError(Exception):
     """Base exception for Task Registry"""
@@ -44,7 +46,7 @@ class InvalidStateTransitionError(TaskRegistryError):
 class CircularDependencyError(TaskRegistryError):
     """Circular dependency detected"""
     
-    def __init__(self, cycle):
+    def __init__(self, cycle, cycles=None):
         # Handle both list and string inputs
         if isinstance(cycle, str):
             self.cycle = [cycle]
@@ -52,6 +54,10 @@ class CircularDependencyError(TaskRegistryError):
         else:
             self.cycle = cycle if isinstance(cycle, list) else list(cycle)
             cycle_str = " -> ".join(str(c) for c in self.cycle)
+        # All cycles found (one path per strongly connected component)
+        self.cycles = [list(c) for c in cycles] if cycles else [self.cycle]
+        if len(self.cycles) > 1:
+            cycle_str = "; ".join(" -> ".join(str(t) for t in c) for c in self.cycles)
         super().__init__(f"Circular dependency detected: {cycle_str}")
 
 
@@ -67,6 +73,19 @@ class LockTimeoutError(TaskRegistryError):
         )
 
 
+class VersionConflictError(TaskRegistryError):
+    """Optimistic write conflict: the stored taskset changed after it was loaded"""
+    
+    def __init__(self, spec_name: str, expected_version: int, actual_version: Optional[int]):
+        self.spec_name = spec_name
+        self.expected_version = expected_version
+        self.actual_version = actual_version
+        super().__init__(
+            f"Taskset '{spec_name}' was modified concurrently "
+            f"(expected version {expected_version}, found {actual_version})"
+        )
+
+
 class SyncError(TaskRegistryError):
     """Kiro sync error"""
     
@@ -1,11 +1,137 @@
 """
 Graph Visualizer - Dependency graph visualization
 
-Provides functionality to visualize task dependency graphs in DOT and Mermaid formats.
+Provides functionality to visualize task dependency graphs in DOT and Mermaid formats,
+and to plan execution order from the dependency graph.
 """
 
-from typing import List, Set
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Set
 from .models import Task, Taskset, TaskState
+from .dependency_validator import analyze_dependencies
+
+
+@dataclass
+class ExecutionPlan:
+    """依存関係グラフから計算した実行計画"""
+    # 並列実行可能なタスクIDのレベル（各レベル内はタスクセットの記述順）
+    levels: List[List[str]]
+    # 最長の依存チェーン（先頭から実行順）
+    critical_path: List[str]
+    # 循環依存を構成するタスク
+    cycle_members: List[str] = field(default_factory=list)
+    # 循環依存のタスクに（推移的に）依存しているため実行できないタスク
+    blocked_by_cycle: List[str] = field(default_factory=list)
+    # タスクID -> 存在しない依存先のID（実行順序の計算では無視される）
+    dangling_dependencies: Dict[str, List[str]] = field(default_factory=dict)
+    
+    @property
+    def critical_path_length(self) -> int:
+        """最長の依存チェーンのタスク数"""
+        return len(self.critical_path)
+    
+    @property
+    def level_widths(self) -> List[int]:
+        """各レベルのタスク数"""
+        return [len(level) for level in self.levels]
+    
+    @property
+    def max_width(self) -> int:
+        """同時に実行可能なタスクの最大数"""
+        return max(self.level_widths, default=0)
+    
+    @property
+    def average_width(self) -> float:
+        """レベルあたりの平均タスク数"""
+        return sum(self.level_widths) / len(self.levels) if self.levels else 0.0
+    
+    @property
+    def has_cycles(self) -> bool:
+        """循環依存があるかどうか"""
+        return bool(self.cycle_members)
+
+
+def build_execution_plan(dependencies: Dict[str, List[str]]) -> ExecutionPlan:
+    """
+    依存関係から実行計画を計算（隣接リストによるKahn法、O(V+E)）
+    
+    各タスクのレベルは最長の依存チェーン上の深さで、同じレベルのタスクは
+    並列に実行できる。存在しない依存先は実行順序に影響せず、
+    dangling_dependenciesとして報告される。
+    
+    Args:
+        dependencies: タスクID -> 依存先のタスクIDのリスト（タスクセットの記述順）
+    
+    Returns:
+        ExecutionPlan
+    """
+    dependents: Dict[str, List[str]] = {task_id: [] for task_id in dependencies}
+    in_degree: Dict[str, int] = {}
+    dangling: Dict[str, List[str]] = {}
+    
+    for task_id, deps in dependencies.items():
+        degree = 0
+        for dep_id in deps:
+            if dep_id in dependents:
+                dependents[dep_id].append(task_id)
+                degree += 1
+            else:
+                dangling.setdefault(task_id, []).append(dep_id)
+        in_degree[task_id] = degree
+    
+    # レベル = 最長の依存チェーン上の深さ。parentはその深さを決めた依存先
+    depth: Dict[str, int] = {}
+    parent: Dict[str, str] = {}
+    queue = deque(task_id for task_id, degree in in_degree.items() if degree == 0)
+    for task_id in queue:
+        depth[task_id] = 0
+    
+    processed: Set[str] = set()
+    while queue:
+        task_id = queue.popleft()
+        processed.add(task_id)
+        next_depth = depth[task_id] + 1
+        for dependent_id in dependents[task_id]:
+            if next_depth > depth.get(dependent_id, -1):
+                depth[dependent_id] = next_depth
+                parent[dependent_id] = task_id
+            in_degree[dependent_id] -= 1
+            if in_degree[dependent_id] == 0:
+                queue.append(dependent_id)
+    
+    # タスクセットの記述順を保ったままレベルに振り分ける
+    levels: List[List[str]] = [[] for _ in range(max((depth[t] for t in processed), default=-1) + 1)]
+    for task_id in dependencies:
+        if task_id in processed:
+            levels[depth[task_id]].append(task_id)
+    
+    critical_path: List[str] = []
+    if levels:
+        task_id = levels[-1][0]
+        critical_path.append(task_id)
+        while task_id in parent:
+            task_id = parent[task_id]
+            critical_path.append(task_id)
+        critical_path.reverse()
+    
+    cycle_members: List[str] = []
+    blocked_by_cycle: List[str] = []
+    if len(processed) < len(dependencies):
+        cycle_set = analyze_dependencies(dependencies).cycle_members
+        for task_id in dependencies:
+            if task_id in cycle_set:
+                cycle_members.append(task_id)
+            elif task_id not in processed:
+                blocked_by_cycle.append(task_id)
+    
+    return ExecutionPlan(
+        levels=levels,
+        critical_path=critical_path,
+        cycle_members=cycle_members,
+        blocked_by_cycle=blocked_by_cycle,
+        dangling_dependencies=dangling,
+    )
 
 
 class GraphVisualizer:
@@ -185,52 +311,29 @@ class GraphVisualizer:
         sanitized = sanitized.replace("-", "_")
         return f"task_{sanitized}"
     
-    def get_execution_order(self, taskset: Taskset) -> List[List[str]]:
+    def get_execution_plan(self, taskset: Taskset) -> ExecutionPlan:
         """
-        依存関係を考慮した実行順序を計算（トポロジカルソート）
+        依存関係を考慮した実行計画を計算
         
         Args:
             taskset: タスクセット
             
         Returns:
-            実行順序のリスト（各要素は並列実行可能なタスクIDのリスト）
+            実行レベル、クリティカルパス、循環依存・存在しない依存先を含むExecutionPlan
         """
-        # タスクIDからTaskオブジェクトへのマップを作成
-        task_map = {task.id: task for task in taskset.tasks}
-        
-        # 各タスクの入次数を計算
-        in_degree = {task.id: len(task.dependencies) for task in taskset.tasks}
+        return build_execution_plan({task.id: task.dependencies for task in taskset.tasks})
         
-        # 実行順序を格納するリスト
-        execution_order = []
+    def get_execution_order(self, taskset: Taskset) -> List[List[str]]:
+        """
+        依存関係を考慮した実行順序を計算（トポロジカルソート）
         
-        # 処理済みタスクのセット
-        processed: Set[str] = set()
+        循環依存のタスクとその下流のタスクは含まれない。
+        get_execution_plan()で確認できる。
         
-        while len(processed) < len(taskset.tasks):
-            # 入次数が0のタスク（依存関係が解決されたタスク）を取得
-            ready_tasks = [
-                task_id for task_id, degree in in_degree.items()
-                if degree == 0 and task_id not in processed
-            ]
-            
-            if not ready_tasks:
-                # 循環依存がある場合
-                remaining = [tid for tid in task_map.keys() if tid not in processed]
-                if remaining:
-                    # 残りのタスクを強制的に追加（循環依存を示す）
-                    execution_order.append(remaining)
-                    processed.update(remaining)
-                break
-            
-            # 現在のレベルのタスクを追加
-            execution_order.append(ready_tasks)
-            processed.update(ready_tasks)
-            
-            # 処理したタスクに依存するタスクの入次数を減らす
-            for task_id in ready_tasks:
-                for task in taskset.tasks:
-                    if task_id in task.dependencies:
-                        in_degree[task.id] -= 1
+        Args:
+            taskset: タスクセット
         
-        return execution_order
+        Returns:
+            実行順序のリスト（各要素は並列実行可能なタスクIDのリスト）
+        """
+        return self.get_execution_plan(taskset).levels
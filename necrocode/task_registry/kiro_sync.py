@@ -4,14 +4,19 @@ KiroSyncManager - Synchronization with Kiro tasks.md files
 Handles bidirectional sync between Task Registry and Kiro's .kiro/specs/{spec-name}/tasks.md
 """
 
+import hashlib
+import json
+import os
 import re
+import shutil
 from pathlib import Path
-from typing import Dict, List, Optional, Set, Tuple
-from dataclasses import dataclass
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+from dataclasses import dataclass, field
 from datetime import datetime
 
-from .models import Task, TaskState, Taskset
-from .exceptions import SyncError, CircularDependencyError
+from .models import EventType, Task, TaskEvent, TaskState, Taskset
+from .exceptions import SyncError, CircularDependencyError, TasksetNotFoundError
+from .dependency_validator import DependencyReport, validate_dependencies
 
 
 @dataclass
@@ -47,6 +52,7 @@ class SyncResult:
     tasks_updated: List[str]
     tasks_removed: List[str]
     errors: List[str]
+    warnings: List[str] = field(default_factory=list)
     
     def __str__(self) -> str:
         """文字列表現"""
@@ -60,6 +66,10 @@ class SyncResult:
             lines.append(f"  Errors: {len(self.errors)}")
             for error in self.errors:
                 lines.append(f"    - {error}")
+        if self.warnings:
+            lines.append(f"  Warnings: {len(self.warnings)}")
+            for warning in self.warnings:
+                lines.append(f"    - {warning}")
         return "\n".join(lines)
 
 
@@ -76,6 +86,10 @@ class KiroSyncManager:
         re.IGNORECASE
     )
     
+    # 前回の同期時の内容ハッシュを保持するメタデータのキー
+    CONTENT_HASH_KEY = "kiro_content_hash"  # Task.metadata
+    FILE_HASH_KEY = "kiro_file_hash"  # Taskset.metadata
+    
     def __init__(self, registry):
         """
         Initialize KiroSyncManager
@@ -89,25 +103,99 @@ class KiroSyncManager:
         """
         tasks.mdを解析してタスク定義を抽出
         
+        ファイルは1行ずつ読み込んで1パスで解析するため、大きなtasks.mdでも
+        ファイル全体をメモリに載せない。
+        
         Args:
             tasks_md_path: tasks.mdファイルのパス
             
         Returns:
             抽出されたタスク定義のリスト
             
+        Raises:
+            SyncError: ファイルの読み込みまたは解析に失敗した場合
+        """
+        return self._read_tasks_md(tasks_md_path)[0]
+    
+    def _read_tasks_md(self, tasks_md_path: Path) -> Tuple[List[TaskDefinition], str]:
+        """
+        tasks.mdを解析し、解析した内容のハッシュを同時に計算
+        
+        Args:
+            tasks_md_path: tasks.mdファイルのパス
+            
+        Returns:
+            (タスク定義のリスト, hash_tasks_md()と同じ方法で計算したハッシュ)
+            
         Raises:
             SyncError: ファイルの読み込みまたは解析に失敗した場合
         """
         if not tasks_md_path.exists():
             raise SyncError(f"tasks.md not found: {tasks_md_path}")
         
+        digest = hashlib.blake2b(digest_size=16)
+        
+        def hashed(lines: Iterable[str]) -> Iterator[str]:
+            for line in lines:
+                digest.update(line.encode('utf-8'))
+                yield line
+        
         try:
             with open(tasks_md_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-        except Exception as e:
+                task_defs = list(self._iter_task_definitions(hashed(f)))
+        except (OSError, UnicodeDecodeError) as e:
+            raise SyncError(f"Failed to read tasks.md: {e}") from e
+        
+        return task_defs, digest.hexdigest()
+    
+    def hash_tasks_md(self, tasks_md_path: Path) -> str:
+        """
+        tasks.md全体のハッシュを計算（解析はしない）
+        
+        Args:
+            tasks_md_path: tasks.mdファイルのパス
+            
+        Returns:
+            16進数のハッシュ文字列
+            
+        Raises:
+            SyncError: ファイルの読み込みに失敗した場合
+        """
+        if not tasks_md_path.exists():
+            raise SyncError(f"tasks.md not found: {tasks_md_path}")
+        
+        digest = hashlib.blake2b(digest_size=16)
+        try:
+            # 解析時と同じく改行を正規化したテキストをハッシュする
+            with open(tasks_md_path, 'r', encoding='utf-8') as f:
+                for chunk in iter(lambda: f.read(1 << 20), ''):
+                    digest.update(chunk.encode('utf-8'))
+        except (OSError, UnicodeDecodeError) as e:
             raise SyncError(f"Failed to read tasks.md: {e}") from e
         
-        return self._parse_content(content)
+        return digest.hexdigest()
+    
+    @staticmethod
+    def hash_tasks_md_content(data: bytes) -> str:
+        """
+        tasks.mdの内容のハッシュを計算（hash_tasks_md()と同じ値）
+        
+        Args:
+            data: tasks.mdのバイト列
+            
+        Returns:
+            16進数のハッシュ文字列
+            
+        Raises:
+            SyncError: UTF-8として解釈できない場合
+        """
+        try:
+            text = data.decode('utf-8')
+        except UnicodeDecodeError as e:
+            raise SyncError(f"Failed to read tasks.md: {e}") from e
+        # テキストモードでの読み込みと同じく改行を正規化する
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+        return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
     
     def _parse_content(self, content: str) -> List[TaskDefinition]:
         """
@@ -119,110 +207,94 @@ class KiroSyncManager:
         Returns:
             タスク定義のリスト
         """
-        tasks = []
-        lines = content.split('\n')
+        return list(self._iter_task_definitions(content.split('\n')))
+    
+    def _iter_task_definitions(self, lines: Iterable[str]) -> Iterator[TaskDefinition]:
+        """
+        tasks.mdの行を1パスで解析してタスク定義を順に返す
         
-        i = 0
-        while i < len(lines):
-            line = lines[i]
-            match = self.TASK_PATTERN.match(line)
-            
-            if not match:
-                i += 1
-                continue
-            
-            indent, checkbox, optional_mark, task_id, title = match.groups()
-            
-            # インデントレベルを計算（スペース2つまたはタブ1つで1レベル）
-            indent_level = len(indent.replace('\t', '  ')) // 2
-            
-            # チェックボックスの状態
-            is_completed = checkbox.lower() == 'x'
-            
-            # オプショナルマーク
-            is_optional = optional_mark == '*'
-            
-            # 親タスクの判定
-            parent_id = None
-            if indent_level > 0:
-                # サブタスクの場合、親タスクを探す
-                parent_id = self._find_parent_task(tasks, task_id, indent_level)
+        各行に対してTASK_PATTERNを高々一度だけ適用する。タスク行の後に続く説明行は
+        次のタスク行に到達するまで現在のタスクに蓄積し、到達した時点で確定する。
+        親タスクはインデントのスタックで決める。タスクIDの番号とは関係なく、
+        直前にあるインデントの浅いタスク行が親になる。
+        
+        Args:
+            lines: tasks.mdの行（末尾の改行の有無は問わない）
             
-            # タスクの説明と依存関係を抽出
-            description_lines = []
-            dependencies = []
+        Yields:
+            タスク定義（ファイル内の記述順）
+        """
+        # 親の候補: (インデント幅, タスクID)。インデントの浅い順
+        parents: List[Tuple[int, str]] = []
+        current: Optional[TaskDefinition] = None
+        description_lines: List[str] = []
+        task_match = self.TASK_PATTERN.match
+        
+        for line_number, line in enumerate(lines, 1):
+            if line.endswith('\n'):
+                line = line[:-1]
             
-            # 次の行から説明を収集
-            j = i + 1
-            while j < len(lines):
-                desc_line = lines[j]
+            # タスク行は必ず"- ["を含むため、それ以外の行では正規表現を適用しない
+            match = task_match(line) if '- [' in line else None
+            if match:
+                if current is not None:
+                    yield self._finish_task(current, description_lines)
                 
-                # 次のタスクに到達したら終了
-                if self.TASK_PATTERN.match(desc_line):
-                    break
+                indent, checkbox, optional_mark, task_id, title = match.groups()
                 
-                # 空行はスキップ
-                stripped = desc_line.strip()
-                if not stripped:
-                    j += 1
-                    continue
+                # インデント幅を計算（タブ1つはスペース2つ）
+                indent_width = len(indent.replace('\t', '  '))
                 
-                # 説明の箇条書き（インデントされた行）
-                if stripped.startswith('-') and not stripped.startswith('- ['):
-                    description_lines.append(stripped[1:].strip())
-                    
-                    # 依存関係を抽出
-                    req_match = self.REQUIREMENTS_PATTERN.search(stripped)
-                    if req_match:
-                        dependencies = self._parse_dependencies(req_match.group(1))
+                # 同じかより深いインデントのタスクは親にならない
+                while parents and parents[-1][0] >= indent_width:
+                    parents.pop()
+                parent_id = parents[-1][1] if parents else None
+                parents.append((indent_width, task_id))
                 
-                j += 1
-            
-            description = '\n'.join(description_lines) if description_lines else title
-            
-            task_def = TaskDefinition(
-                id=task_id,
-                title=title.strip(),
-                description=description,
-                is_optional=is_optional,
-                is_completed=is_completed,
-                dependencies=dependencies,
-                parent_id=parent_id,
-                line_number=i + 1
-            )
+                current = TaskDefinition(
+                    id=task_id,
+                    title=title,
+                    description='',
+                    is_optional=optional_mark == '*',
+                    is_completed=checkbox.lower() == 'x',
+                    dependencies=[],
+                    parent_id=parent_id,
+                    line_number=line_number
+                )
+                description_lines = []
+                continue
             
-            tasks.append(task_def)
-            i += 1
+            if current is None:
+                continue
+            
+            # 説明の箇条書き（空行とタスク以外のチェックボックスは無視）
+            stripped = line.strip()
+            if stripped.startswith('-') and not stripped.startswith('- ['):
+                description_lines.append(stripped[1:].strip())
+                
+                # 依存関係を抽出（複数ある場合は最後のものを使用）
+                req_match = self.REQUIREMENTS_PATTERN.search(stripped)
+                if req_match:
+                    current.dependencies = self._parse_dependencies(req_match.group(1))
         
-        return tasks
+        if current is not None:
+            yield self._finish_task(current, description_lines)
     
-    def _find_parent_task(
-        self,
-        tasks: List[TaskDefinition],
-        task_id: str,
-        indent_level: int
-    ) -> Optional[str]:
+    @staticmethod
+    def _finish_task(task_def: TaskDefinition, description_lines: List[str]) -> TaskDefinition:
         """
-        サブタスクの親タスクを見つける
+        蓄積した説明行でタスク定義を確定
         
         Args:
-            tasks: これまでに解析されたタスクのリスト
-            task_id: 現在のタスクID（例: "1.2"）
-            indent_level: インデントレベル
+            task_def: タスク行から作成したタスク定義（titleは未加工）
+            description_lines: タスク行に続く説明の箇条書き
             
         Returns:
-            親タスクのID、見つからない場合はNone
-        """
-        # タスクIDから親を推測（例: "1.2" -> "1"）
-        parts = task_id.split('.')
-        if len(parts) > 1:
-            parent_id = '.'.join(parts[:-1])
-            # 親タスクが存在するか確認
-            for task in reversed(tasks):
-                if task.id == parent_id:
-                    return parent_id
-        
-        return None
+            確定したタスク定義
+        """
+        task_def.description = '\n'.join(description_lines) if description_lines else task_def.title
+        task_def.title = task_def.title.strip()
+        return task_def
     
     def _parse_dependencies(self, deps_str: str) -> List[str]:
         """
@@ -277,52 +349,30 @@ class KiroSyncManager:
     def verify_no_circular_dependencies(
         self,
         tasks: List[TaskDefinition]
-    ) -> None:
+    ) -> DependencyReport:
         """
         循環参照がないことを検証
         
         Args:
             tasks: タスク定義のリスト
             
+        Returns:
+            検証結果（存在しない依存先を含む）
+            
         Raises:
-            CircularDependencyError: 循環参照が検出された場合
-        """
-        graph = self.build_dependency_graph(tasks)
-        visited = set()
-        rec_stack = set()
-        
-        def has_cycle(task_id: str, path: List[str]) -> Optional[List[str]]:
-            """DFSで循環を検出"""
-            visited.add(task_id)
-            rec_stack.add(task_id)
-            path.append(task_id)
-            
-            for dep in graph.get(task_id, []):
-                if dep not in visited:
-                    cycle = has_cycle(dep, path.copy())
-                    if cycle:
-                        return cycle
-                elif dep in rec_stack:
-                    # 循環を検出
-                    cycle_start = path.index(dep)
-                    return path[cycle_start:] + [dep]
-            
-            rec_stack.remove(task_id)
-            return None
-        
-        for task_id in graph:
-            if task_id not in visited:
-                cycle = has_cycle(task_id, [])
-                if cycle:
-                    cycle_str = ' -> '.join(cycle)
-                    raise CircularDependencyError(
-                        f"Circular dependency detected: {cycle_str}"
-                    )
+            CircularDependencyError: 循環参照が検出された場合（すべての循環を含む）
+        """
+        return validate_dependencies(self.build_dependency_graph(tasks))
     
     def sync_from_kiro(self, spec_name: str, tasks_md_path: Path) -> SyncResult:
         """
         tasks.mdからTask Registryへ同期
         
+        tasks.md全体のハッシュが前回の同期時と同じ場合は解析せずに終了する。
+        変更がある場合は各タスクの内容ハッシュを前回の同期時と比較し、
+        変更されたタスクのみを保存してTaskUpdatedイベントを記録する。
+        tasks.md上で変更されていないタスクは、Registry側の状態を上書きしない。
+        
         Args:
             spec_name: Spec名
             tasks_md_path: tasks.mdファイルのパス
@@ -339,103 +389,20 @@ class KiroSyncManager:
         )
         
         try:
+            # 前回の同期からtasks.mdが変更されていなければ何もしない
+            if self._synced_file_hash(spec_name) == self.hash_tasks_md(tasks_md_path):
+                result.success = True
+                return result
+            
             # tasks.mdを解析
-            task_defs = self.parse_tasks_md(tasks_md_path)
+            task_defs, file_hash = self._read_tasks_md(tasks_md_path)
             
             # 循環参照をチェック
-            self.verify_no_circular_dependencies(task_defs)
-            
-            # 既存のタスクセットを取得（存在しない場合は新規作成）
-            try:
-                taskset = self.registry.task_store.load_taskset(spec_name)
-                existing_task_ids = {task.id for task in taskset.tasks}
-            except Exception:
-                # 新規タスクセット
-                taskset = Taskset(
-                    spec_name=spec_name,
-                    version=1,
-                    created_at=datetime.now(),
-                    updated_at=datetime.now(),
-                    tasks=[],
-                    metadata={"kiro_spec_path": str(tasks_md_path)}
-                )
-                existing_task_ids = set()
+            report = self.verify_no_circular_dependencies(task_defs)
+            result.warnings.extend(report.dangling_messages())
             
-            # 新しいタスクリスト
-            new_tasks = []
-            new_task_ids = set()
-            
-            for task_def in task_defs:
-                new_task_ids.add(task_def.id)
-                
-                # 既存タスクを探す
-                existing_task = None
-                for task in taskset.tasks:
-                    if task.id == task_def.id:
-                        existing_task = task
-                        break
-                
-                if existing_task:
-                    # 既存タスクを更新
-                    updated = False
-                    
-                    # タイトルの更新
-                    if existing_task.title != task_def.title:
-                        existing_task.title = task_def.title
-                        updated = True
-                    
-                    # 説明の更新
-                    if existing_task.description != task_def.description:
-                        existing_task.description = task_def.description
-                        updated = True
-                    
-                    # 状態の更新（チェックボックスから）
-                    new_state = TaskState.DONE if task_def.is_completed else TaskState.READY
-                    if existing_task.state != new_state:
-                        existing_task.state = new_state
-                        updated = True
-                    
-                    # オプショナルフラグの更新
-                    if existing_task.is_optional != task_def.is_optional:
-                        existing_task.is_optional = task_def.is_optional
-                        updated = True
-                    
-                    # 依存関係の更新
-                    if set(existing_task.dependencies) != set(task_def.dependencies):
-                        existing_task.dependencies = task_def.dependencies
-                        updated = True
-                    
-                    if updated:
-                        existing_task.updated_at = datetime.now()
-                        result.tasks_updated.append(task_def.id)
-                    
-                    new_tasks.append(existing_task)
-                else:
-                    # 新規タスクを作成
-                    new_task = Task(
-                        id=task_def.id,
-                        title=task_def.title,
-                        description=task_def.description,
-                        state=TaskState.DONE if task_def.is_completed else TaskState.READY,
-                        dependencies=task_def.dependencies,
-                        is_optional=task_def.is_optional,
-                        created_at=datetime.now(),
-                        updated_at=datetime.now()
-                    )
-                    new_tasks.append(new_task)
-                    result.tasks_added.append(task_def.id)
-            
-            # 削除されたタスクを検出
-            removed_ids = existing_task_ids - new_task_ids
-            result.tasks_removed.extend(removed_ids)
-            
-            # タスクセットを更新
-            taskset.tasks = new_tasks
-            taskset.version += 1
-            taskset.updated_at = datetime.now()
-            
-            # 保存
-            self.registry.task_store.save_taskset(taskset)
+            with self.registry._write_lock(spec_name):
+                self._apply_task_definitions(spec_name, tasks_md_path, task_defs, file_hash, result)
             
             result.success = True
             
@@ -446,8 +413,215 @@ class KiroSyncManager:
         except Exception as e:
             result.errors.append(f"Unexpected error: {e}")
         
+        if not result.success:
+            # 途中で失敗した場合は次の読み込みで保存済みの状態を読み直す
+            self.registry.task_store.invalidate_cache(spec_name)
+        
         return result
     
+    def _synced_file_hash(self, spec_name: str) -> Optional[str]:
+        """
+        前回の同期時のtasks.md全体のハッシュを取得
+        
+        Args:
+            spec_name: Spec名
+            
+        Returns:
+            ハッシュ、タスクセットが存在しないか未同期の場合はNone
+        """
+        try:
+            taskset = self.registry.task_store.load_shared_taskset(spec_name)
+        except TasksetNotFoundError:
+            return None
+        return taskset.metadata.get(self.FILE_HASH_KEY)
+    
+    def _apply_task_definitions(
+        self,
+        spec_name: str,
+        tasks_md_path: Path,
+        task_defs: List[TaskDefinition],
+        file_hash: str,
+        result: SyncResult
+    ) -> None:
+        """
+        解析したタスク定義をタスクセットに反映して保存（specのロックを保持して呼び出す）
+        
+        Args:
+            spec_name: Spec名
+            tasks_md_path: tasks.mdファイルのパス
+            task_defs: tasks.mdのタスク定義
+            file_hash: 解析したtasks.md全体のハッシュ
+            result: 追加・更新・削除したタスクIDを記録する同期結果
+        """
+        task_store = self.registry.task_store
+        now = datetime.now()
+        
+        # 既存のタスクセットを取得（存在しない場合は新規作成）
+        try:
+            taskset = task_store.load_taskset(spec_name)
+            is_new = False
+        except TasksetNotFoundError:
+            taskset = Taskset(
+                spec_name=spec_name,
+                version=1,
+                created_at=now,
+                updated_at=now,
+                tasks=[],
+                metadata={"kiro_spec_path": str(tasks_md_path)}
+            )
+            is_new = True
+        
+        # ロック取得までの間に他のプロセスが同じ内容を同期済みの場合
+        if taskset.metadata.get(self.FILE_HASH_KEY) == file_hash:
+            return
+        
+        tasks_by_id = {task.id: task for task in taskset.tasks}
+        new_tasks = []
+        changed_tasks = []
+        # (タスク, 変更されたフィールド, 変更前の状態)
+        updates: List[Tuple[Task, Dict[str, Any], TaskState]] = []
+        
+        for task_def in task_defs:
+            content_hash = self._content_hash(task_def)
+            existing_task = tasks_by_id.get(task_def.id)
+            
+            if existing_task is None:
+                # 新規タスクを作成
+                existing_task = Task(
+                    id=task_def.id,
+                    title=task_def.title,
+                    description=task_def.description,
+                    state=TaskState.DONE if task_def.is_completed else TaskState.READY,
+                    dependencies=task_def.dependencies,
+                    is_optional=task_def.is_optional,
+                    created_at=now,
+                    updated_at=now,
+                    metadata={self.CONTENT_HASH_KEY: content_hash}
+                )
+                result.tasks_added.append(task_def.id)
+            
+            elif existing_task.metadata.get(self.CONTENT_HASH_KEY) != content_hash:
+                # tasks.md上で変更されたタスク（またはハッシュ未記録のタスク）のみ比較
+                old_state = existing_task.state
+                changes = self._update_task(existing_task, task_def)
+                existing_task.metadata[self.CONTENT_HASH_KEY] = content_hash
+                changed_tasks.append(existing_task)
+                if changes or existing_task.state != old_state:
+                    existing_task.updated_at = now
+                    updates.append((existing_task, changes, old_state))
+                    result.tasks_updated.append(task_def.id)
+            
+            new_tasks.append(existing_task)
+        
+        old_ids = [task.id for task in taskset.tasks]
+        new_ids = [task.id for task in new_tasks]
+        structure_changed = is_new or old_ids != new_ids
+        
+        # 削除されたタスクを検出
+        new_id_set = set(new_ids)
+        result.tasks_removed.extend(task_id for task_id in old_ids if task_id not in new_id_set)
+        
+        if not structure_changed and not changed_tasks:
+            # タスクに変化がない（見出し等のみの変更）
+            return
+        
+        # 更新イベントごとにバージョンを進める（イベントからの再構築に使用）
+        version = taskset.version
+        events = []
+        for task, changes, old_state in updates:
+            version += 1
+            details: Dict[str, Any] = {
+                "action": "kiro_sync",
+                "changes": changes,
+                "metadata": {self.CONTENT_HASH_KEY: task.metadata[self.CONTENT_HASH_KEY]},
+                "taskset_metadata": {self.FILE_HASH_KEY: file_hash},
+                "version": version,
+            }
+            if task.state != old_state:
+                details["old_state"] = old_state.value
+                details["new_state"] = task.state.value
+            events.append(TaskEvent(
+                event_type=EventType.TASK_UPDATED,
+                spec_name=spec_name,
+                task_id=task.id,
+                timestamp=now,
+                details=details
+            ))
+        
+        if version == taskset.version:
+            # イベントを伴わない変更（タスクの追加・削除、ハッシュの記録のみ）
+            version += 1
+        
+        taskset.tasks = new_tasks
+        taskset.version = version
+        taskset.updated_at = now
+        taskset.metadata[self.FILE_HASH_KEY] = file_hash
+        
+        # 保存（タスクの追加・削除・並べ替えがない場合は変更されたタスクのみ）。
+        # イベントを伴わない変更はイベントソーシングでは再構築できないため、
+        # スナップショットとして書き込む
+        if structure_changed or not events:
+            task_store.save_taskset(taskset)
+        else:
+            task_store.save_tasks(taskset, changed_tasks)
+        
+        if events:
+            self.registry.event_store.record_events(events)
+    
+    @staticmethod
+    def _update_task(task: Task, task_def: TaskDefinition) -> Dict[str, Any]:
+        """
+        既存タスクにタスク定義の内容を反映
+        
+        Args:
+            task: 既存タスク
+            task_def: tasks.mdのタスク定義
+            
+        Returns:
+            変更されたフィールド名 -> 新しい値（状態を除く）
+        """
+        changes: Dict[str, Any] = {}
+        
+        if task.title != task_def.title:
+            changes["title"] = task.title = task_def.title
+        
+        if task.description != task_def.description:
+            changes["description"] = task.description = task_def.description
+        
+        # 状態の更新（チェックボックスから）
+        task.state = TaskState.DONE if task_def.is_completed else TaskState.READY
+        
+        if task.is_optional != task_def.is_optional:
+            changes["is_optional"] = task.is_optional = task_def.is_optional
+        
+        if set(task.dependencies) != set(task_def.dependencies):
+            changes["dependencies"] = task.dependencies = task_def.dependencies
+        
+        return changes
+    
+    @staticmethod
+    def _content_hash(task_def: TaskDefinition) -> str:
+        """
+        タスク定義のうちRegistryに反映される内容のハッシュ
+        
+        Args:
+            task_def: タスク定義
+            
+        Returns:
+            16進数のハッシュ文字列
+        """
+        payload = json.dumps(
+            [
+                task_def.title,
+                task_def.description,
+                task_def.is_completed,
+                task_def.is_optional,
+                task_def.dependencies,
+            ],
+            ensure_ascii=False
+        )
+        return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+    
     def sync_to_kiro(self, spec_name: str, tasks_md_path: Path) -> SyncResult:
         """
         Task Registryからtasks.mdへ同期
@@ -469,7 +643,7 @@ class KiroSyncManager:
         
         try:
             # タスクセットを取得
-            taskset = self.registry.task_store.load_taskset(spec_name)
+            taskset = self.registry.task_store.load_shared_taskset(spec_name)
             
             # タスクの状態マップを作成
             task_states = {task.id: task.state for task in taskset.tasks}
@@ -490,6 +664,16 @@ class KiroSyncManager:
         
         return result
     
+    # タスクの状態 -> チェックボックスの文字（Failedは変更しない）
+    CHECKBOXES = {
+        TaskState.DONE: b'x',
+        TaskState.RUNNING: b'-',
+        TaskState.READY: b' ',
+        TaskState.BLOCKED: b' ',
+    }
+    # この間隔より近いチェックボックスの変更は1回の書き込みにまとめる
+    PATCH_GAP_BYTES = 4096
+    
     def update_tasks_md(
         self,
         tasks_md_path: Path,
@@ -498,6 +682,11 @@ class KiroSyncManager:
         """
         tasks.mdのチェックボックスを更新
         
+        すべての状態の変更をまとめて適用する。ファイルはその場で書き換え、
+        変更が必要なチェックボックスの周辺のバイトのみを書き込む（行の他の
+        内容は変更しない）。読み込んでから書き込むまでの間にファイルが変更
+        された場合は、読み直した内容に適用して一時ファイルからrenameで置き換える。
+        
         Args:
             tasks_md_path: tasks.mdファイルのパス
             task_states: タスクIDと状態のマップ
@@ -505,6 +694,30 @@ class KiroSyncManager:
         Returns:
             更新されたタスクの数
             
+        Raises:
+            SyncError: ファイルの読み書きに失敗した場合
+        """
+        return self.write_task_states(tasks_md_path, task_states)[0]
+    
+    def write_task_states(
+        self,
+        tasks_md_path: Path,
+        task_states: Dict[str, TaskState]
+    ) -> Tuple[int, Optional[str]]:
+        """
+        tasks.mdのチェックボックスを更新し、書き込んだ内容のハッシュを返す
+        
+        update_tasks_md()と同じ。ハッシュはファイルを読み直さずに書き込んだ
+        内容から計算するため、書き込み後に他のプロセスが変更した内容と区別できる。
+        
+        Args:
+            tasks_md_path: tasks.mdファイルのパス
+            task_states: タスクIDと状態のマップ
+            
+        Returns:
+            (更新されたタスクの数, hash_tasks_md_content()で計算した書き込んだ内容の
+            ハッシュ。書き込まなかった場合はNone)
+            
         Raises:
             SyncError: ファイルの読み書きに失敗した場合
         """
@@ -512,53 +725,133 @@ class KiroSyncManager:
             raise SyncError(f"tasks.md not found: {tasks_md_path}")
         
         try:
-            with open(tasks_md_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-        except Exception as e:
-            raise SyncError(f"Failed to read tasks.md: {e}") from e
+            with open(tasks_md_path, 'r+b') as f:
+                data = f.read()
+                patches = self._checkbox_patches(data, task_states)
+                if not patches:
+                    return 0, None
+                if self._patch_in_place(f, data, patches):
+                    written = self._apply_patches(data, patches)
+                    return len(patches), self.hash_tasks_md_content(written)
+            
+            # 読み込み後に他のプロセス（エディタ等）が書き換えた
+            data = tasks_md_path.read_bytes()
+            patches = self._checkbox_patches(data, task_states)
+            if not patches:
+                return 0, None
+            written = self._apply_patches(data, patches)
+            self._replace_file(tasks_md_path, written)
+            return len(patches), self.hash_tasks_md_content(written)
         
-        updated_count = 0
-        lines = content.split('\n')
-        new_lines = []
+        except OSError as e:
+            raise SyncError(f"Failed to write tasks.md: {e}") from e
+    
+    def _checkbox_patches(
+        self,
+        data: bytes,
+        task_states: Dict[str, TaskState]
+    ) -> List[Tuple[int, bytes]]:
+        """
+        変更が必要なチェックボックスのバイト位置を求める
+        
+        Args:
+            data: tasks.mdの内容
+            task_states: タスクIDと状態のマップ
+            
+        Returns:
+            (チェックボックスのバイト位置, 新しい文字) のリスト（位置の昇順）
+            
+        Raises:
+            SyncError: タスク行をUTF-8として解釈できない場合
+        """
+        patches = []
+        offset = 0
         
-        for line in lines:
+        for raw_line in data.splitlines(keepends=True):
+            line_offset = offset
+            offset += len(raw_line)
+            if b'- [' not in raw_line:
+                continue
+            
+            try:
+                line = raw_line.rstrip(b'\r\n').decode('utf-8')
+            except UnicodeDecodeError as e:
+                raise SyncError(f"Failed to read tasks.md: {e}") from e
+            
             match = self.TASK_PATTERN.match(line)
-            if match:
-                indent, checkbox, optional_mark, task_id, title = match.groups()
-                
-                # 状態を取得
-                if task_id in task_states:
-                    state = task_states[task_id]
-                    
-                    # チェックボックスを更新
-                    if state == TaskState.DONE and checkbox != 'x':
-                        new_checkbox = 'x'
-                        updated_count += 1
-                    elif state == TaskState.RUNNING and checkbox != '-':
-                        new_checkbox = '-'
-                        updated_count += 1
-                    elif state in (TaskState.READY, TaskState.BLOCKED) and checkbox != ' ':
-                        new_checkbox = ' '
-                        updated_count += 1
-                    else:
-                        new_checkbox = checkbox
-                    
-                    # 行を再構築
-                    optional_str = '*' if optional_mark else ''
-                    new_line = f"{indent}- [{new_checkbox}]{optional_str} {task_id}. {title}"
-                    new_lines.append(new_line)
-                else:
-                    new_lines.append(line)
+            if not match or match.group(4) not in task_states:
+                continue
+            
+            new_checkbox = self.CHECKBOXES.get(task_states[match.group(4)])
+            if new_checkbox is None or new_checkbox == match.group(2).encode('ascii'):
+                continue
+            
+            # インデントは非ASCIIの空白を含みうるため、バイト数に換算する
+            position = line_offset + len(line[:match.start(2)].encode('utf-8'))
+            patches.append((position, new_checkbox))
+        
+        return patches
+    
+    def _patch_in_place(
+        self,
+        f: BinaryIO,
+        data: bytes,
+        patches: List[Tuple[int, bytes]]
+    ) -> bool:
+        """
+        開いているファイルのチェックボックスをその場で書き換え
+        
+        書き込む範囲の現在の内容が読み込んだ時と同じことを確認してから書き込む。
+        
+        Args:
+            f: 'r+b'で開いたtasks.md
+            data: 読み込んだ時の内容
+            patches: _checkbox_patches()の結果
+            
+        Returns:
+            書き換えた場合はTrue、読み込み後にファイルが変更されていた場合はFalse
+        """
+        if os.fstat(f.fileno()).st_size != len(data):
+            return False
+        
+        # 近接する変更を1つの書き込み範囲にまとめる
+        runs: List[List[int]] = []
+        for position, _ in patches:
+            if runs and position - runs[-1][1] < self.PATCH_GAP_BYTES:
+                runs[-1][1] = position + 1
             else:
-                new_lines.append(line)
+                runs.append([position, position + 1])
         
-        # ファイルに書き戻す
-        if updated_count > 0:
-            try:
-                new_content = '\n'.join(new_lines)
-                with open(tasks_md_path, 'w', encoding='utf-8') as f:
-                    f.write(new_content)
-            except Exception as e:
-                raise SyncError(f"Failed to write tasks.md: {e}") from e
+        for start, end in runs:
+            f.seek(start)
+            if f.read(end - start) != data[start:end]:
+                return False
         
-        return updated_count
+        patched = self._apply_patches(data, patches)
+        for start, end in runs:
+            f.seek(start)
+            f.write(patched[start:end])
+        f.flush()
+        return True
+    
+    @staticmethod
+    def _apply_patches(data: bytes, patches: List[Tuple[int, bytes]]) -> bytes:
+        """チェックボックスを書き換えた内容を返す"""
+        buffer = bytearray(data)
+        for position, new_checkbox in patches:
+            buffer[position:position + 1] = new_checkbox
+        return bytes(buffer)
+    
+    @staticmethod
+    def _replace_file(path: Path, data: bytes) -> None:
+        """一時ファイルに書き出してrenameで置き換える（アトミック）"""
+        temp_file = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        try:
+            with open(temp_file, 'wb') as f:
+                f.write(data)
+            shutil.copymode(path, temp_file)
+            os.replace(temp_file, path)
+        except OSError:
+            if temp_file.exists():
+                temp_file.unlink()
+            raise
@@ -0,0 +1,341 @@
+"""
+KiroWatcher - Continuous synchronization of Kiro tasks.md files
+
+Replaces periodic ``sync_with_kiro`` runs over every spec with a long-running
+watcher. ``.kiro/specs/*/tasks.md`` is polled with an (mtime, size)
+fingerprint cache, so an idle poll costs one stat per spec and no file is
+read. A spec is synced once its tasks.md has stopped changing for the
+debounce period, on a bounded worker pool and never twice at the same time:
+
+- tasks.md changed: sync_from_kiro(), then the registry states are written
+  back to the checkboxes with write_task_states()
+- the stored taskset changed: write_task_states() only
+
+The watcher's own write is recorded as synced only while tasks.md still
+hashes to the content it wrote, so an edit made right after the write is
+picked up by the next poll.
+
+The standard library has no inotify binding, so changes are detected by
+polling.
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .exceptions import TasksetNotFoundError
+
+
+logger = logging.getLogger(__name__)
+
+# (mtime_ns, size)
+Fingerprint = Tuple[int, int]
+
+
+@dataclass
+class WatchStats:
+    """KiroWatcherの統計"""
+    polls: int = 0
+    synced_from_kiro: int = 0
+    synced_to_kiro: int = 0
+    errors: int = 0
+
+
+class KiroWatcher:
+    """Keep tasks.md files and the Task Registry in sync by polling"""
+    
+    def __init__(
+        self,
+        registry,
+        specs_dir: Path = Path(".kiro/specs"),
+        poll_interval: float = 1.0,
+        debounce: float = 0.5,
+        max_workers: int = 4,
+        on_sync: Optional[Callable[[str, str, int, List[str]], None]] = None
+    ):
+        """
+        Initialize KiroWatcher
+        
+        Args:
+            registry: TaskRegistry instance
+            specs_dir: Directory containing {spec-name}/tasks.md
+            poll_interval: Seconds between polls in run()
+            debounce: Seconds a changed tasks.md must stay unchanged before
+                it is synced
+            max_workers: Maximum number of specs synced concurrently
+            on_sync: Called as on_sync(spec_name, direction, changes, errors)
+                after each sync that changed something or failed; direction
+                is "from_kiro" or "to_kiro"
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        
+        self.registry = registry
+        self.specs_dir = Path(specs_dir)
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.max_workers = max_workers
+        self.on_sync = on_sync
+        self.stats = WatchStats()
+        
+        # spec_name -> 最後に同期したtasks.mdのフィンガープリント
+        self._md_fingerprints: Dict[str, Fingerprint] = {}
+        # spec_name -> 最後に同期したRegistry側のフィンガープリント
+        self._registry_fingerprints: Dict[str, Any] = {}
+        # spec_name -> (最後に変更を検出した時刻, その時点のフィンガープリント)
+        self._pending: Dict[str, Tuple[float, Fingerprint]] = {}
+        # spec_name -> 実行中の同期
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._stop = threading.Event()
+    
+    def _scan(self) -> Dict[str, Tuple[Path, Fingerprint]]:
+        """
+        specs_dir以下のtasks.mdのフィンガープリントを取得
+        
+        Returns:
+            spec_name -> (tasks.mdのパス, (mtime_ns, size))
+        """
+        found = {}
+        try:
+            entries = sorted(os.scandir(self.specs_dir), key=lambda entry: entry.name)
+        except FileNotFoundError:
+            return found
+        
+        for entry in entries:
+            if not entry.is_dir():
+                continue
+            path = Path(entry.path) / "tasks.md"
+            try:
+                stat = path.stat()
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            found[entry.name] = (path, (stat.st_mtime_ns, stat.st_size))
+        return found
+    
+    def _registry_fingerprint(self, spec_name: str) -> Any:
+        """
+        Registry側のタスクセットのフィンガープリントを取得
+        
+        保存されたタスクセットに加え、イベントログの末尾の位置（event_sourced
+        モードでは状態の変更はイベントとしてのみ追記される）の変化も検出する。
+        
+        Args:
+            spec_name: Spec名
+        
+        Returns:
+            比較可能な値、タスクセットが存在しない場合はNone
+        """
+        store_key = self.registry.task_store.fingerprint(spec_name)
+        if store_key is None:
+            return None
+        return (store_key, self.registry.event_store.tail_cursor(spec_name))
+    
+    def _written_fingerprint(self, tasks_md_path: Path, written_hash: str) -> Optional[Fingerprint]:
+        """
+        自身が書き込んだ内容のままの場合に、tasks.mdのフィンガープリントを取得
+        
+        ハッシュを計算した内容と同じファイル記述子のフィンガープリントを使うため、
+        書き込み後の編集を同期済みとして記録することはない。
+        
+        Args:
+            tasks_md_path: tasks.mdのパス
+            written_hash: 書き込んだ内容のハッシュ
+        
+        Returns:
+            (mtime_ns, size)、書き込み後に変更されていた場合はNone
+        """
+        try:
+            with open(tasks_md_path, 'rb') as f:
+                stat = os.fstat(f.fileno())
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        if self.registry.kiro_sync.hash_tasks_md_content(data) != written_hash:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+    
+    def poll(self) -> List[str]:
+        """
+        tasks.mdとRegistryの変更を1回確認し、変更されたspecの同期を開始
+        
+        Returns:
+            同期を開始したSpec名のリスト
+        """
+        now = time.monotonic()
+        current = self._scan()
+        started = []
+        
+        with self._lock:
+            self.stats.polls += 1
+            for spec_name in [name for name, future in self._in_flight.items() if future.done()]:
+                del self._in_flight[spec_name]
+            
+            # 削除されたtasks.md
+            for spec_name in list(self._md_fingerprints):
+                if spec_name not in current:
+                    self._md_fingerprints.pop(spec_name, None)
+                    self._registry_fingerprints.pop(spec_name, None)
+            for spec_name in list(self._pending):
+                if spec_name not in current:
+                    del self._pending[spec_name]
+            
+            for spec_name, (tasks_md_path, fingerprint) in current.items():
+                from_kiro = fingerprint != self._md_fingerprints.get(spec_name)
+                if from_kiro:
+                    # 編集が続いている間は待つ
+                    pending = self._pending.get(spec_name)
+                    if pending is None or pending[1] != fingerprint:
+                        self._pending[spec_name] = (now, fingerprint)
+                        if self.debounce > 0:
+                            continue
+                    elif now - pending[0] < self.debounce:
+                        continue
+                elif self._registry_fingerprint(spec_name) == self._registry_fingerprints.get(spec_name):
+                    continue
+                
+                # 同じspecは同時に同期しない。上限に達した分は次回以降に回す
+                if spec_name in self._in_flight or len(self._in_flight) >= self.max_workers:
+                    continue
+                
+                self._pending.pop(spec_name, None)
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix="kiro-watcher"
+                    )
+                self._in_flight[spec_name] = self._executor.submit(
+                    self._sync, spec_name, tasks_md_path, fingerprint, from_kiro
+                )
+                started.append(spec_name)
+        
+        return started
+    
+    def _sync(
+        self,
+        spec_name: str,
+        tasks_md_path: Path,
+        fingerprint: Fingerprint,
+        from_kiro: bool
+    ) -> None:
+        """
+        1つのspecを同期（ワーカースレッドで実行）
+        
+        Args:
+            spec_name: Spec名
+            tasks_md_path: tasks.mdのパス
+            fingerprint: 同期を開始した時点のtasks.mdのフィンガープリント
+            from_kiro: Trueの場合はtasks.mdの変更を先に取り込む
+        """
+        kiro_sync = self.registry.kiro_sync
+        # 同期中の変更を見逃さないよう、読み込む前の値を記録する
+        registry_fingerprint = self._registry_fingerprint(spec_name)
+        
+        try:
+            if from_kiro:
+                result = kiro_sync.sync_from_kiro(spec_name, tasks_md_path)
+                changes = len(result.tasks_added) + len(result.tasks_updated) + len(result.tasks_removed)
+                self._report(spec_name, "from_kiro", changes, result.errors)
+                if not result.success:
+                    # tasks.mdが再度変更されるまで再試行しない
+                    return
+                registry_fingerprint = self._registry_fingerprint(spec_name)
+            
+            try:
+                taskset = self.registry.task_store.load_shared_taskset(spec_name)
+            except TasksetNotFoundError:
+                return
+            
+            task_states = {task.id: task.state for task in taskset.tasks}
+            updated_count, written_hash = kiro_sync.write_task_states(tasks_md_path, task_states)
+            if written_hash is not None:
+                # 自身による書き込みを変更として検出しない。書き込み後に編集されていた
+                # 場合は同期前の値のままにして、次回のポーリングで取り込む
+                written_fingerprint = self._written_fingerprint(tasks_md_path, written_hash)
+                if written_fingerprint is not None:
+                    fingerprint = written_fingerprint
+            self._report(spec_name, "to_kiro", updated_count, [])
+        
+        except Exception as e:
+            logger.exception("Failed to sync spec '%s'", spec_name)
+            self._report(spec_name, "to_kiro", 0, [str(e)])
+        
+        finally:
+            with self._lock:
+                self._md_fingerprints[spec_name] = fingerprint
+                self._registry_fingerprints[spec_name] = registry_fingerprint
+    
+    def _report(self, spec_name: str, direction: str, changes: int, errors: List[str]) -> None:
+        """同期の結果を統計とコールバックに反映"""
+        with self._lock:
+            if errors:
+                self.stats.errors += 1
+            elif direction == "from_kiro":
+                self.stats.synced_from_kiro += 1
+            elif changes:
+                self.stats.synced_to_kiro += 1
+        
+        if errors:
+            logger.warning("Sync of spec '%s' (%s) failed: %s", spec_name, direction, "; ".join(errors))
+        elif changes:
+            logger.info("Synced spec '%s' (%s): %d change(s)", spec_name, direction, changes)
+        
+        if self.on_sync is not None and (changes or errors):
+            self.on_sync(spec_name, direction, changes, errors)
+    
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """
+        実行中の同期の完了を待つ
+        
+        Args:
+            timeout: 最大待機時間（秒）、Noneの場合は無制限
+        
+        Returns:
+            すべて完了した場合はTrue
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            futures = list(self._in_flight.values())
+        for future in futures:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                future.result(timeout=remaining)
+            except Exception:
+                return False
+        return True
+    
+    def run(self, max_polls: Optional[int] = None) -> None:
+        """
+        stop()が呼ばれるまでポーリングを続ける
+        
+        Args:
+            max_polls: ポーリング回数の上限（Noneの場合は無制限）
+        """
+        self._stop.clear()
+        polls = 0
+        while not self._stop.is_set():
+            self.poll()
+            polls += 1
+            if max_polls is not None and polls >= max_polls:
+                break
+            self._stop.wait(self.poll_interval)
+    
+    def stop(self) -> None:
+        """run()のループを終了"""
+        self._stop.set()
+    
+    def close(self) -> None:
+        """
+        ポーリングを終了し、実行中の同期の完了を待ってワーカーを停止
+        """
+        self.stop()
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
@@ -2,14 +2,31 @@
 Lock Manager for Task Registry
 
 Provides file-based locking mechanism for concurrent access control.
+
+Writers take an exclusive lock and readers that need one take a shared lock,
+so any number of readers can hold a spec's lock at once. On POSIX the locks
+are flock(2) locks (``LOCK_SH`` / ``LOCK_EX``): a contended acquisition
+blocks in the kernel until the lock is released instead of sleep-polling,
+and the lock is released by the kernel if the holder dies. Where fcntl is not
+available, an exclusive FileLock is used for both modes.
+
+Every acquisition is recorded in ``LockManager.metrics`` (see
+necrocode.lock_metrics).
 """
 
 from contextlib import contextmanager
 from pathlib import Path
-from typing import Generator, Optional
+from typing import Generator, Optional, Tuple
+import os
+import threading
 import time
 import logging
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
 try:
     from filelock import FileLock, Timeout as FileLockTimeout
 except ImportError:
@@ -17,23 +34,79 @@ except ImportError:
         "filelock library is required. Install it with: pip install filelock"
     )
 
+from necrocode.lock_metrics import LockMetrics
+
 from .exceptions import LockTimeoutError
 
 
 logger = logging.getLogger(__name__)
 
 
+class _BlockingWait:
+    """
+    ブロッキングのflock()を別スレッドで待機し、タイムアウトを可能にする
+    
+    flock()自体はタイムアウトを指定できないため、待機をヘルパースレッドで行う。
+    タイムアウト後に取得できたロックはヘルパースレッドが即座に解放する。
+    """
+    
+    def __init__(self, fd: int, operation: int):
+        self._fd = fd
+        self._operation = operation
+        self._done = threading.Event()
+        self._state_lock = threading.Lock()
+        self._abandoned = False
+        self._error: Optional[BaseException] = None
+        threading.Thread(target=self._run, name="lock-wait", daemon=True).start()
+    
+    def _run(self) -> None:
+        try:
+            fcntl.flock(self._fd, self._operation)
+        except BaseException as e:
+            self._error = e
+        with self._state_lock:
+            if self._abandoned:
+                # 待機をやめた呼び出し元の代わりに解放する
+                os.close(self._fd)
+                return
+            self._done.set()
+    
+    def wait(self, timeout: float) -> bool:
+        """
+        ロックの取得を待つ
+        
+        Args:
+            timeout: 最大待機時間（秒）
+        
+        Returns:
+            取得できた場合はTrue（Falseの場合fdはヘルパースレッドが閉じる）
+        
+        Raises:
+            OSError: flock()が失敗した場合
+        """
+        self._done.wait(timeout)
+        with self._state_lock:
+            if not self._done.is_set():
+                self._abandoned = True
+                return False
+        if self._error is not None:
+            raise self._error
+        return True
+
+
 class LockManager:
     """並行アクセス制御のためのロックマネージャー"""
     
-    def __init__(self, locks_dir: Path):
+    def __init__(self, locks_dir: Path, metrics: Optional[LockMetrics] = None):
         """
         Args:
             locks_dir: ロックファイルを保存するディレクトリ
+            metrics: ロックの競合・待機時間の統計の記録先（省略時は新規作成）
         """
         self.locks_dir = Path(locks_dir)
         self.locks_dir.mkdir(parents=True, exist_ok=True)
-        logger.debug(f"LockManager initialized with locks_dir: {self.locks_dir}")
+        self.metrics = metrics if metrics is not None else LockMetrics()
+        logger.debug("LockManager initialized with locks_dir: %s", self.locks_dir)
     
     def _get_lock_path(self, spec_name: str) -> Path:
         """
@@ -41,7 +114,7 @@ class LockManager:
         
         Args:
             spec_name: スペック名
-            
+        
         Returns:
             ロックファイルのパス
         """
@@ -52,58 +125,156 @@ class LockManager:
         self,
         spec_name: str,
         timeout: float = 30.0,
-        retry_interval: float = 0.1
+        retry_interval: float = 0.1,
+        shared: bool = False
     ) -> Generator[None, None, None]:
         """
         ロックを取得（コンテキストマネージャー）
         
+        ロックは呼び出しごとに独立しており、再入できない（同じspecのロックを
+        保持したまま再度取得するとタイムアウトする）。
+        
         Args:
             spec_name: スペック名
             timeout: タイムアウト時間（秒）
-            retry_interval: リトライ間隔（秒）
-            
+            retry_interval: リトライ間隔（秒）。fcntlを使用できずFileLockで
+                ポーリングする場合のみ使用
+            shared: Trueの場合は共有ロック（読み込み用）を取得
+        
         Yields:
             None
-            
+        
         Raises:
             LockTimeoutError: ロック取得がタイムアウトした場合
-            
+        
         Example:
             with lock_manager.acquire_lock("my-spec", timeout=10.0):
                 # クリティカルセクション
                 pass
         """
-        lock_path = self._get_lock_path(spec_name)
-        lock = FileLock(lock_path)
+        if fcntl is None:
+            with self._acquire_file_lock(spec_name, timeout, retry_interval):
+                yield
+            return
         
-        start_time = time.time()
-        logger.debug(
-            f"Attempting to acquire lock for '{spec_name}' "
-            f"(timeout={timeout}s, retry_interval={retry_interval}s)"
-        )
+        start_time = time.monotonic()
+        fd, contended = self._flock(spec_name, fcntl.LOCK_SH if shared else fcntl.LOCK_EX, timeout)
+        acquired_at = time.monotonic()
+        wait = acquired_at - start_time
+        if fd is None:
+            self.metrics.record_timeout(spec_name, wait)
+            logger.error("Lock acquisition timeout for '%s' (%.2fs)", spec_name, wait)
+            raise LockTimeoutError(spec_name, timeout)
         
-        acquired = False
-        try:
-            lock.acquire(timeout=timeout, poll_interval=retry_interval)
-            acquired = True
-            elapsed = time.time() - start_time
-            logger.info(
-                f"Lock acquired for '{spec_name}' ({elapsed:.2f}s)"
+        self.metrics.record_acquired(spec_name, wait, contended)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Lock acquired for '%s' (%s, %.3fs)",
+                spec_name, "shared" if shared else "exclusive", wait
             )
+        try:
             yield
-            logger.debug(f"Lock released for '{spec_name}'")
+        finally:
+            # fdを閉じるとロックも解放される
+            os.close(fd)
+            self.metrics.record_released(spec_name, time.monotonic() - acquired_at)
+    
+    def _flock(self, spec_name: str, operation: int, timeout: float) -> Tuple[Optional[int], bool]:
+        """
+        ロックファイルを開いてflock()でロックを取得
+        
+        force_unlock()でロックファイルが削除・再作成された場合、古いファイルの
+        ロックは無効なので取得し直す。
+        
+        Args:
+            spec_name: スペック名
+            operation: fcntl.LOCK_SHまたはfcntl.LOCK_EX
+            timeout: タイムアウト時間（秒）
+        
+        Returns:
+            (ロックを保持しているファイルディスクリプタ（タイムアウトした場合はNone),
+            待機が必要だったかどうか)
+        """
+        lock_path = self._get_lock_path(spec_name)
+        deadline = time.monotonic() + timeout
+        contended = False
+        
+        while True:
+            fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, operation | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # 競合している場合はカーネル内でブロックして待つ
+                contended = True
+                waiter = _BlockingWait(fd, operation)
+                try:
+                    acquired = waiter.wait(max(0.0, deadline - time.monotonic()))
+                except BaseException:
+                    os.close(fd)
+                    raise
+                if not acquired:
+                    return None, True
+            except BaseException:
+                os.close(fd)
+                raise
+            
+            try:
+                if os.fstat(fd).st_ino == os.stat(lock_path).st_ino:
+                    return fd, contended
+            except FileNotFoundError:
+                pass
+            os.close(fd)
+    
+    @contextmanager
+    def _acquire_file_lock(
+        self,
+        spec_name: str,
+        timeout: float,
+        retry_interval: float
+    ) -> Generator[None, None, None]:
+        """
+        FileLockで排他ロックを取得（fcntlを使用できない環境用）
+        
+        Args:
+            spec_name: スペック名
+            timeout: タイムアウト時間（秒）
+            retry_interval: リトライ間隔（秒）
+        
+        Raises:
+            LockTimeoutError: ロック取得がタイムアウトした場合
+        """
+        lock = FileLock(self._get_lock_path(spec_name))
+        
+        start_time = time.monotonic()
+        contended = False
+        try:
+            try:
+                lock.acquire(timeout=0)
+            except FileLockTimeout:
+                contended = True
+                lock.acquire(timeout=timeout, poll_interval=retry_interval)
         except FileLockTimeout:
-            elapsed = time.time() - start_time
-            logger.error(
-                f"Lock acquisition timeout for '{spec_name}' ({elapsed:.2f}s)"
-            )
+            wait = time.monotonic() - start_time
+            self.metrics.record_timeout(spec_name, wait)
+            logger.error("Lock acquisition timeout for '%s' (%.2fs)", spec_name, wait)
             raise LockTimeoutError(spec_name, timeout)
-        except Exception as e:
-            logger.error(f"Error during lock acquisition for '{spec_name}': {e}")
-            raise
+        
+        acquired_at = time.monotonic()
+        self.metrics.record_acquired(spec_name, acquired_at - start_time, contended)
+        try:
+            yield
         finally:
-            if acquired and lock.is_locked:
-                lock.release()
+            lock.release()
+            self.metrics.record_released(spec_name, time.monotonic() - acquired_at)
+    
+    def save_metrics(self) -> Optional[Path]:
+        """
+        ロックの統計を<locks_dir>/metrics/へ書き出す（necrocode lock-statsで集計する）
+        
+        Returns:
+            書き出したファイルのパス、記録がない場合はNone
+        """
+        return self.metrics.save(self.locks_dir)
     
     def is_locked(self, spec_name: str) -> bool:
         """
@@ -111,23 +282,35 @@ class LockManager:
         
         Args:
             spec_name: スペック名
-            
+        
         Returns:
-            ロックされている場合True、そうでない場合False
+            ロックされている場合True（共有ロックを含む）、そうでない場合False
         """
         lock_path = self._get_lock_path(spec_name)
-        lock = FileLock(lock_path, timeout=0.01)
+        
+        if fcntl is None:
+            lock = FileLock(lock_path, timeout=0.01)
+            try:
+                # 即座にロックを取得できるか試す
+                with lock.acquire(timeout=0.01):
+                    return False
+            except FileLockTimeout:
+                return True
         
         try:
-            # 即座にロックを取得できるか試す
-            with lock.acquire(timeout=0.01):
-                # ロックを取得できた = ロックされていない
-                logger.debug(f"Lock check for '{spec_name}': not locked")
-                return False
-        except FileLockTimeout:
-            # ロックを取得できなかった = ロックされている
-            logger.debug(f"Lock check for '{spec_name}': locked")
+            fd = os.open(lock_path, os.O_RDWR)
+        except FileNotFoundError:
+            return False
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            logger.debug("Lock check for '%s': locked", spec_name)
             return True
+        finally:
+            # ロックを取得できた場合も閉じれば解放される
+            os.close(fd)
+        logger.debug("Lock check for '%s': not locked", spec_name)
+        return False
     
     def force_unlock(self, spec_name: str) -> None:
         """
@@ -145,14 +328,12 @@ class LockManager:
             try:
                 lock_path.unlink()
                 logger.warning(
-                    f"Force unlocked '{spec_name}' by removing lock file: {lock_path}"
+                    "Force unlocked '%s' by removing lock file: %s", spec_name, lock_path
                 )
             except Exception as e:
-                logger.error(
-                    f"Failed to force unlock '{spec_name}': {e}"
-                )
+                logger.error("Failed to force unlock '%s': %s", spec_name, e)
                 raise
         else:
             logger.debug(
-                f"Force unlock requested for '{spec_name}', but lock file does not exist"
+                "Force unlock requested for '%s', but lock file does not exist", spec_name
             )
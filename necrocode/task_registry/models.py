@@ -2,11 +2,131 @@
 Data models for Task Registry
 """
 
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
 from datetime import datetime
 from enum import Enum
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
+import copy
 import json
+import sys
+
+
+class LazyTimestamp:
+    """
+    ISO形式の文字列のまま保持し、最初に参照されたときにdatetimeへ変換する属性
+    
+    from_dict()で読み込んだタイムスタンプは参照されるまでパースされず、
+    to_dict()では未参照の文字列をそのまま書き戻す。
+    """
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.storage_name = "_" + name
+    
+    def __get__(self, instance: Any, owner: type) -> Any:
+        if instance is None:
+            return self
+        value = getattr(instance, self.storage_name)
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value)
+            setattr(instance, self.storage_name, value)
+        return value
+    
+    def __set__(self, instance: Any, value: Any) -> None:
+        setattr(instance, self.storage_name, value)
+    
+    def isoformat(self, instance: Any) -> str:
+        """パースせずにISO形式の文字列を取得"""
+        value = getattr(instance, self.storage_name)
+        return value if isinstance(value, str) else value.isoformat()
+
+
+class LazyContainer:
+    """
+    空の場合はNoneのまま保持し、最初に参照されたときに空のdict/listを生成する属性
+    
+    読み込んだタスクの大半はmetadata等が空のため、空のコンテナを個別に確保しない。
+    """
+    
+    def __init__(self, name: str, factory: type):
+        self.name = name
+        self.storage_name = "_" + name
+        self.factory = factory
+    
+    def __get__(self, instance: Any, owner: type) -> Any:
+        if instance is None:
+            return self
+        value = getattr(instance, self.storage_name)
+        if value is None:
+            value = self.factory()
+            setattr(instance, self.storage_name, value)
+        return value
+    
+    def __set__(self, instance: Any, value: Any) -> None:
+        setattr(instance, self.storage_name, value)
+    
+    def peek(self, instance: Any) -> Any:
+        """生成済みのコンテナを保持せずに値を取得（空の場合は新しい空のコンテナ）"""
+        value = getattr(instance, self.storage_name)
+        return self.factory() if value is None else value
+
+
+def compact_model(timestamps: Tuple[str, ...] = (), containers: Optional[Dict[str, type]] = None):
+    """
+    dataclassを__slots__を持つクラスとして作り直すデコレーター
+    
+    インスタンスごとの__dict__をなくし、指定したフィールドをLazyTimestamp /
+    LazyContainerに置き換える（Python 3.9にはdataclass(slots=True)がないため）。
+    属性名・コンストラクタ・to_dict()の出力は変わらない。
+    
+    Args:
+        timestamps: 参照時にパースするdatetimeフィールド
+        containers: フィールド名 -> 空の場合に遅延生成するコンテナの型
+    
+    Returns:
+        @dataclassの上に重ねるクラスデコレーター
+    """
+    containers = containers or {}
+    
+    def wrap(cls: type) -> type:
+        lazy: Dict[str, Any] = {name: LazyTimestamp(name) for name in timestamps}
+        lazy.update(
+            (name, LazyContainer(name, factory)) for name, factory in containers.items()
+        )
+        field_names = [f.name for f in fields(cls)]
+        
+        namespace = {
+            key: value for key, value in cls.__dict__.items()
+            if key not in field_names and key not in ("__dict__", "__weakref__")
+        }
+        namespace["__slots__"] = tuple(
+            lazy[name].storage_name if name in lazy else name for name in field_names
+        )
+        slotted = type(cls)(cls.__name__, cls.__bases__, namespace)
+        for name, descriptor in lazy.items():
+            setattr(slotted, name, descriptor)
+        return slotted
+    
+    return wrap
+
+
+def _copy_slots(instance: Any) -> Any:
+    """compact_model()のインスタンスのスロットを浅くコピーした新しいインスタンスを作成"""
+    cls = type(instance)
+    clone = cls.__new__(cls)
+    for name in cls.__slots__:
+        setattr(clone, name, getattr(instance, name))
+    return clone
+
+
+def _copy_container(value: Any) -> Any:
+    """LazyContainerの保存値をコピー（未生成のNoneはそのまま）"""
+    return None if value is None else copy.deepcopy(value)
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    """繰り返し現れる識別子を共有する（Noneはそのまま）"""
+    return sys.intern(value) if value is not None else None
 
 
 class TaskState(Enum):
@@ -39,6 +159,7 @@ class ArtifactType(Enum):
     TEST_RESULT = "test"
 
 
+@compact_model(timestamps=("created_at",), containers={"metadata": dict})
 @dataclass
 class Artifact:
     """成果物の参照"""
@@ -54,10 +175,16 @@ class Artifact:
             "type": self.type.value,
             "uri": self.uri,
             "size_bytes": self.size_bytes,
-            "created_at": self.created_at.isoformat(),
-            "metadata": self.metadata,
+            "created_at": Artifact.created_at.isoformat(self),
+            "metadata": Artifact.metadata.peek(self),
         }
     
+    def copy(self) -> "Artifact":
+        """metadataもコピーした複製を作成"""
+        clone = _copy_slots(self)
+        clone._metadata = _copy_container(self._metadata)
+        return clone
+    
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "Artifact":
         """辞書から復元"""
@@ -65,11 +192,15 @@ class Artifact:
             type=ArtifactType(data["type"]),
             uri=data["uri"],
             size_bytes=data.get("size_bytes"),
-            created_at=datetime.fromisoformat(data["created_at"]),
-            metadata=data.get("metadata", {}),
+            created_at=data["created_at"],
+            metadata=data.get("metadata") or None,
         )
 
 
+@compact_model(
+    timestamps=("created_at", "updated_at"),
+    containers={"dependencies": list, "artifacts": list, "metadata": dict},
+)
 @dataclass
 class Task:
     """個別タスク"""
@@ -102,44 +233,60 @@ class Task:
             "title": self.title,
             "description": self.description,
             "state": self.state.value,
-            "dependencies": self.dependencies,
+            "dependencies": Task.dependencies.peek(self),
             "required_skill": self.required_skill,
             "priority": self.priority,
             "is_optional": self.is_optional,
             "assigned_slot": self.assigned_slot,
             "reserved_branch": self.reserved_branch,
             "runner_id": self.runner_id,
-            "artifacts": [artifact.to_dict() for artifact in self.artifacts],
-            "metadata": self.metadata,
-            "created_at": self.created_at.isoformat(),
-            "updated_at": self.updated_at.isoformat(),
+            "artifacts": [artifact.to_dict() for artifact in Task.artifacts.peek(self)],
+            "metadata": Task.metadata.peek(self),
+            "created_at": Task.created_at.isoformat(self),
+            "updated_at": Task.updated_at.isoformat(self),
         }
     
+    def copy(self) -> "Task":
+        """
+        変更用の複製を作成
+        
+        依存関係・成果物・metadataもコピーするため、複製を変更しても元のタスクは
+        変わらない（タイムスタンプは不変のため共有する）。
+        """
+        clone = _copy_slots(self)
+        if self._dependencies is not None:
+            clone._dependencies = list(self._dependencies)
+        if self._artifacts is not None:
+            clone._artifacts = [artifact.copy() for artifact in self._artifacts]
+        clone._metadata = _copy_container(self._metadata)
+        return clone
+    
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "Task":
         """辞書から復元"""
         return cls(
-            id=data["id"],
+            id=sys.intern(data["id"]),
             title=data["title"],
             description=data["description"],
             state=TaskState(data["state"]),
-            dependencies=data.get("dependencies", []),
-            required_skill=data.get("required_skill"),
+            dependencies=[sys.intern(dep) for dep in data.get("dependencies", ())] or None,
+            required_skill=_intern(data.get("required_skill")),
             priority=data.get("priority", 0),
             is_optional=data.get("is_optional", False),
-            assigned_slot=data.get("assigned_slot"),
+            assigned_slot=_intern(data.get("assigned_slot")),
             reserved_branch=data.get("reserved_branch"),
-            runner_id=data.get("runner_id"),
+            runner_id=_intern(data.get("runner_id")),
             artifacts=[
                 Artifact.from_dict(artifact_data)
-                for artifact_data in data.get("artifacts", [])
-            ],
-            metadata=data.get("metadata", {}),
-            created_at=datetime.fromisoformat(data["created_at"]),
-            updated_at=datetime.fromisoformat(data["updated_at"]),
+                for artifact_data in data.get("artifacts", ())
+            ] or None,
+            metadata=data.get("metadata") or None,
+            created_at=data["created_at"],
+            updated_at=data["updated_at"],
         )
 
 
+@compact_model(timestamps=("created_at", "updated_at"), containers={"metadata": dict})
 @dataclass
 class Taskset:
     """タスクセット"""
@@ -155,25 +302,42 @@ class Taskset:
         return {
             "spec_name": self.spec_name,
             "version": self.version,
-            "created_at": self.created_at.isoformat(),
-            "updated_at": self.updated_at.isoformat(),
+            "created_at": Taskset.created_at.isoformat(self),
+            "updated_at": Taskset.updated_at.isoformat(self),
             "tasks": [task.to_dict() for task in self.tasks],
-            "metadata": self.metadata,
+            "metadata": Taskset.metadata.peek(self),
         }
     
+    def copy(self, share_tasks: bool = False) -> "Taskset":
+        """
+        変更用の複製を作成
+        
+        Args:
+            share_tasks: Trueの場合はタスクのリストだけをコピーしてTaskを元のタスクセットと
+                共有する（変更するタスクは呼び出し元がTask.copy()で置き換える）
+        
+        Returns:
+            複製したTaskset
+        """
+        clone = _copy_slots(self)
+        clone.tasks = list(self.tasks) if share_tasks else [task.copy() for task in self.tasks]
+        clone._metadata = _copy_container(self._metadata)
+        return clone
+    
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "Taskset":
         """辞書から復元"""
         return cls(
-            spec_name=data["spec_name"],
+            spec_name=sys.intern(data["spec_name"]),
             version=data["version"],
-            created_at=datetime.fromisoformat(data["created_at"]),
-            updated_at=datetime.fromisoformat(data["updated_at"]),
+            created_at=data["created_at"],
+            updated_at=data["updated_at"],
             tasks=[Task.from_dict(task_data) for task_data in data["tasks"]],
-            metadata=data.get("metadata", {}),
+            metadata=data.get("metadata") or None,
         )
 
 
+@compact_model(timestamps=("timestamp",))
 @dataclass
 class TaskEvent:
     """タスクイベント"""
@@ -189,7 +353,7 @@ class TaskEvent:
             "event_type": self.event_type.value,
             "spec_name": self.spec_name,
             "task_id": self.task_id,
-            "timestamp": self.timestamp.isoformat(),
+            "timestamp": TaskEvent.timestamp.isoformat(self),
             "details": self.details,
         }
         return json.dumps(data, ensure_ascii=False)
@@ -197,14 +361,7 @@ class TaskEvent:
     @classmethod
     def from_jsonl(cls, line: str) -> "TaskEvent":
         """JSON Lines形式から復元"""
-        data = json.loads(line)
-        return cls(
-            event_type=EventType(data["event_type"]),
-            spec_name=data["spec_name"],
-            task_id=data["task_id"],
-            timestamp=datetime.fromisoformat(data["timestamp"]),
-            details=data.get("details", {}),
-        )
+        return cls.from_dict(json.loads(line))
     
     def to_dict(self) -> Dict[str, Any]:
         """辞書形式に変換"""
@@ -212,7 +369,7 @@ class TaskEvent:
             "event_type": self.event_type.value,
             "spec_name": self.spec_name,
             "task_id": self.task_id,
-            "timestamp": self.timestamp.isoformat(),
+            "timestamp": TaskEvent.timestamp.isoformat(self),
             "details": self.details,
         }
     
@@ -221,8 +378,8 @@ class TaskEvent:
         """辞書から復元"""
         return cls(
             event_type=EventType(data["event_type"]),
-            spec_name=data["spec_name"],
-            task_id=data["task_id"],
-            timestamp=datetime.fromisoformat(data["timestamp"]),
+            spec_name=sys.intern(data["spec_name"]),
+            task_id=sys.intern(data["task_id"]),
+            timestamp=data["timestamp"],
             details=data.get("details", {}),
         )
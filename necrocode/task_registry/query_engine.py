@@ -2,27 +2,111 @@
 QueryEngine - Search and filter functionality for tasks
 
 Provides methods to query, filter, and sort tasks from tasksets.
+
+Queries run on the shared cached taskset (TaskStore.load_shared_taskset()),
+and only the matching tasks are copied for the caller, so changing a returned
+task never affects the cache, the indexes or other readers.
 """
 
+import heapq
+import threading
+from collections import OrderedDict
+from itertools import islice
 from typing import Any, Dict, List, Optional
 from pathlib import Path
 
 from .models import Task, TaskState, Taskset
 from .task_store import TaskStore
+from .task_index import TaskIndex
 from .exceptions import TasksetNotFoundError
 
 
 class QueryEngine:
     """QueryEngine provides search and filtering capabilities for tasks"""
     
-    def __init__(self, task_store: TaskStore):
+    # TaskStore.find_tasks() に委譲できるフィルタ
+    INDEXED_FILTERS = ("state", "required_skill", "runner_id", "assigned_slot")
+    
+    # ソートキー（priorityは降順）
+    SORT_KEYS = {
+        "priority": lambda t: -t.priority,
+        "created_at": lambda t: t.created_at,
+        "updated_at": lambda t: t.updated_at,
+        "id": lambda t: t.id,
+    }
+    
+    def __init__(self, task_store: TaskStore, max_indexes: int = 32):
         """
         Initialize QueryEngine
         
         Args:
             task_store: TaskStore instance for loading tasksets
+            max_indexes: Maximum number of per-taskset indexes kept in memory
         """
         self.task_store = task_store
+        self.max_indexes = max_indexes
+        self._indexes: "OrderedDict[str, TaskIndex]" = OrderedDict()
+        self._index_lock = threading.RLock()
+    
+    def _get_index(self, taskset: Taskset) -> Optional[TaskIndex]:
+        """
+        Get the secondary index for a loaded taskset, rebuilding it if stale
+        
+        Indexes are only kept when the TaskStore caches tasksets; without a
+        cache every load yields a new object and an index would never be reused.
+        Call with _index_lock held.
+        
+        Args:
+            taskset: The loaded taskset
+            
+        Returns:
+            The TaskIndex, or None if indexing is not worthwhile
+        """
+        if self.task_store.cache is None:
+            return None
+        
+        index = self._indexes.get(taskset.spec_name)
+        if index is None or not index.is_current(taskset):
+            index = TaskIndex(taskset)
+            self._indexes[taskset.spec_name] = index
+        
+        self._indexes.move_to_end(taskset.spec_name)
+        while len(self._indexes) > self.max_indexes:
+            self._indexes.popitem(last=False)
+        return index
+    
+    def _detached(self, tasks: List[Task]) -> List[Task]:
+        """
+        Copy tasks taken from the shared cached taskset for the caller
+        
+        Without a cache every load yields new objects, which are returned as is.
+        """
+        if self.task_store.cache is None:
+            return tasks
+        return [task.copy() for task in tasks]
+    
+    def refresh_tasks(self, taskset: Taskset, tasks: List[Task], base: Optional[Taskset] = None) -> None:
+        """
+        Update the index after tasks of a taskset were modified and saved
+        
+        Args:
+            taskset: The saved taskset (version already incremented)
+            tasks: The tasks that changed
+            base: The taskset the changes were staged from, if taskset is a
+                copy of it sharing the unchanged tasks; its index is moved
+                over to the saved taskset
+        """
+        with self._index_lock:
+            index = self._indexes.get(taskset.spec_name)
+            if index is None:
+                return
+            if base is not None and index.is_current(base):
+                index.taskset = taskset
+                index.update(tasks, taskset.version)
+            elif index.taskset is taskset:
+                index.update(tasks, taskset.version)
+            else:
+                del self._indexes[taskset.spec_name]
     
     def filter_by_state(
         self,
@@ -43,10 +127,17 @@ class QueryEngine:
             ready_tasks = engine.filter_by_state("chat-app", TaskState.READY)
         """
         try:
-            taskset = self.task_store.load_taskset(spec_name)
+            if self.task_store.indexed_queries:
+                return self.task_store.find_tasks(spec_name, state=state)
+            taskset = self.task_store.load_shared_taskset(spec_name)
         except TasksetNotFoundError:
             return []
-        return [task for task in taskset.tasks if task.state == state]
+        
+        with self._index_lock:
+            index = self._get_index(taskset)
+            if index is not None:
+                return self._detached(index.in_order(index.lookup({"state": state})))
+        return self._detached([task for task in taskset.tasks if task.state == state])
     
     def filter_by_skill(
         self,
@@ -67,18 +158,26 @@ class QueryEngine:
             backend_tasks = engine.filter_by_skill("chat-app", "backend")
         """
         try:
-            taskset = self.task_store.load_taskset(spec_name)
+            if self.task_store.indexed_queries:
+                return self.task_store.find_tasks(spec_name, required_skill=required_skill)
+            taskset = self.task_store.load_shared_taskset(spec_name)
         except TasksetNotFoundError:
             return []
-        return [
+        
+        with self._index_lock:
+            index = self._get_index(taskset)
+            if index is not None:
+                return self._detached(index.in_order(index.lookup({"required_skill": required_skill})))
+        return self._detached([
             task for task in taskset.tasks
             if task.required_skill == required_skill
-        ]
+        ])
     
     def sort_by_priority(
         self,
         tasks: List[Task],
-        descending: bool = True
+        descending: bool = True,
+        limit: Optional[int] = None
     ) -> List[Task]:
         """
         Sort tasks by priority
@@ -86,6 +185,7 @@ class QueryEngine:
         Args:
             tasks: List of tasks to sort
             descending: If True, sort highest priority first (default: True)
+            limit: If given, only the first `limit` tasks are selected (top-k)
             
         Returns:
             Sorted list of tasks
@@ -93,6 +193,9 @@ class QueryEngine:
         Example:
             sorted_tasks = engine.sort_by_priority(tasks, descending=True)
         """
+        if limit is not None and limit < len(tasks):
+            sign = -1 if descending else 1
+            return heapq.nsmallest(limit, tasks, key=lambda t: sign * t.priority)
         return sorted(tasks, key=lambda t: t.priority, reverse=descending)
     
     def query(
@@ -132,20 +235,57 @@ class QueryEngine:
                 offset=0
             )
         """
-        # Load taskset
+        filters = dict(filters or {})
+        if isinstance(filters.get("state"), str):
+            filters["state"] = TaskState(filters["state"])
+        indexed_filters = {
+            key: filters.pop(key)
+            for key in self.INDEXED_FILTERS
+            if key in filters
+        }
+        
+        # Load taskset (indexed stores evaluate the indexed filters themselves)
         try:
-            taskset = self.task_store.load_taskset(spec_name)
+            if self.task_store.indexed_queries:
+                results = self.task_store.find_tasks(spec_name, **indexed_filters)
+                indexed_filters = {}
+            else:
+                taskset = self.task_store.load_shared_taskset(spec_name)
+                results = None
         except TasksetNotFoundError:
             return []
-        results = taskset.tasks.copy()
+        
+        if results is None:
+            with self._index_lock:
+                index = self._get_index(taskset)
+                if index is None:
+                    results = taskset.tasks.copy()
+                elif (
+                    sort_by == "priority"
+                    and limit is not None
+                    and not filters
+                    and indexed_filters.get("state") == TaskState.READY
+                ):
+                    # READYヒープを優先度順に辿り、必要な件数だけ取り出す
+                    matches = index.matcher(indexed_filters)
+                    ready = (t for t in index.iter_ready_by_priority() if matches(t))
+                    return self._detached(list(islice(ready, offset, offset + limit)))
+                else:
+                    task_ids = index.lookup(indexed_filters)
+                    if task_ids is None:
+                        results = taskset.tasks.copy()
+                    else:
+                        results = index.in_order(task_ids)
+                    indexed_filters = {}
         
         # Apply filters
-        if filters:
-            results = self._apply_filters(results, filters)
+        if indexed_filters or filters:
+            results = self._apply_filters(results, {**indexed_filters, **filters})
         
-        # Apply sorting
+        # Apply sorting (top-k selection when only one page is needed)
         if sort_by:
-            results = self._apply_sorting(results, sort_by)
+            top = offset + limit if limit is not None else None
+            results = self._apply_sorting(results, sort_by, top)
         
         # Apply pagination
         if offset > 0:
@@ -154,7 +294,8 @@ class QueryEngine:
         if limit is not None:
             results = results[:limit]
         
-        return results
+        # SQLiteバックエンドの結果は読み込んだばかりの新しいオブジェクト
+        return results if self.task_store.indexed_queries else self._detached(results)
     
     def _apply_filters(self, tasks: List[Task], filters: Dict[str, Any]) -> List[Task]:
         """
@@ -206,25 +347,29 @@ class QueryEngine:
         
         return results
     
-    def _apply_sorting(self, tasks: List[Task], sort_by: str) -> List[Task]:
+    def _apply_sorting(
+        self,
+        tasks: List[Task],
+        sort_by: str,
+        top: Optional[int] = None
+    ) -> List[Task]:
         """
         Apply sorting to a list of tasks
         
         Args:
             tasks: List of tasks to sort
             sort_by: Field name to sort by
+            top: If given, only the first `top` tasks are selected (top-k)
             
         Returns:
             Sorted list of tasks
         """
-        if sort_by == "priority":
-            return sorted(tasks, key=lambda t: t.priority, reverse=True)
-        elif sort_by == "created_at":
-            return sorted(tasks, key=lambda t: t.created_at)
-        elif sort_by == "updated_at":
-            return sorted(tasks, key=lambda t: t.updated_at)
-        elif sort_by == "id":
-            return sorted(tasks, key=lambda t: t.id)
-        else:
+        key = self.SORT_KEYS.get(sort_by)
+        if key is None:
             # Unknown sort field, return as-is
             return tasks
+        
+        # heapq.nsmallestは sorted(...)[:top] と同じ安定した結果を返す
+        if top is not None and top < len(tasks):
+            return heapq.nsmallest(top, tasks, key=key)
+        return sorted(tasks, key=key)
@@ -0,0 +1,326 @@
+"""
+Scheduling policies for ready tasks
+
+A scheduling policy decides the order in which READY tasks are handed out.
+The critical-path policy ranks tasks by the longest chain of remaining work
+that waits on them and by how many tasks transitively depend on them, so
+long dependency chains start early and the makespan of deep DAGs shrinks.
+Task durations can be estimated from the TaskAssigned -> TaskCompleted
+timestamps recorded in the event log.
+"""
+
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from .change_feed import EventCursor
+from .graph_visualizer import build_execution_plan
+from .models import EventType, Task, Taskset
+
+
+# タスクID -> (残りの最長パスの長さ, 推移的な依存元の数)
+PathMetrics = Dict[str, Tuple[float, int]]
+
+# int.bit_count()はPython 3.10以降
+_popcount = getattr(int, "bit_count", None) or (lambda mask: bin(mask).count("1"))
+
+
+def compute_path_metrics(
+    taskset: Taskset,
+    durations: Optional[Dict[str, float]] = None
+) -> PathMetrics:
+    """
+    各タスクの残りの最長パスと推移的な依存元の数を計算
+    
+    依存元を持つタスクから逆トポロジカル順に処理し、依存元の集合はビット集合
+    （int）で合成する。指標は依存関係の構造と所要時間だけで決まり、タスクの状態
+    には依存しない（READYのタスクの依存元は通常まだ完了していないため）。
+    循環依存のタスクは自身の所要時間のみを持つ。
+    
+    Args:
+        taskset: タスクセット
+        durations: タスクID -> 推定所要時間（Noneの場合はすべて1）
+    
+    Returns:
+        タスクID -> (残りの最長パスの長さ, 推移的な依存元の数)
+    """
+    tasks = {task.id: task for task in taskset.tasks}
+    dependents: Dict[str, List[str]] = {}
+    # 依存元の集合を参照し終えたら破棄するため、未処理の依存先の数を数える
+    pending_readers: Dict[str, int] = {}
+    for task in taskset.tasks:
+        for dep_id in task.dependencies:
+            if dep_id in tasks:
+                dependents.setdefault(dep_id, []).append(task.id)
+                pending_readers[task.id] = pending_readers.get(task.id, 0) + 1
+    
+    bits = {task.id: 1 << position for position, task in enumerate(taskset.tasks)}
+    
+    plan = build_execution_plan({task.id: task.dependencies for task in taskset.tasks})
+    order = [task_id for level in reversed(plan.levels) for task_id in level]
+    order.extend(plan.blocked_by_cycle)
+    order.extend(plan.cycle_members)
+    
+    remaining: Dict[str, float] = {}
+    reach: Dict[str, int] = {}
+    metrics: PathMetrics = {}
+    for task_id in order:
+        weight = durations.get(task_id, 1.0) if durations else 1.0
+        
+        longest = 0.0
+        mask = 0
+        for dependent_id in dependents.get(task_id, ()):
+            if dependent_id not in remaining:
+                # 循環依存の中の辺
+                continue
+            longest = max(longest, remaining[dependent_id])
+            mask |= reach[dependent_id] | bits[dependent_id]
+            pending_readers[dependent_id] -= 1
+            if pending_readers[dependent_id] == 0:
+                del reach[dependent_id]
+        
+        remaining[task_id] = weight + longest
+        reach[task_id] = mask
+        metrics[task_id] = (remaining[task_id], _popcount(mask))
+    
+    return metrics
+
+
+class SchedulingPolicy:
+    """Base class for ready task scheduling policies"""
+    
+    # get_policy()で指定する名前
+    name = ""
+    # Trueの場合はrank()にタスクセット全体と推定所要時間が必要
+    uses_graph = False
+    
+    def rank(
+        self,
+        tasks: List[Task],
+        taskset: Optional[Taskset] = None,
+        durations: Optional[Dict[str, float]] = None
+    ) -> List[Task]:
+        """
+        実行可能なタスクを実行すべき順に並べる
+        
+        Args:
+            tasks: 並べ替えるタスク（タスクセットの記述順）
+            taskset: タスクが属するタスクセット（uses_graphの場合のみ必要）
+            durations: タスクID -> 推定所要時間（uses_graphの場合のみ使用）
+        
+        Returns:
+            並べ替えたタスクのリスト
+        """
+        raise NotImplementedError
+
+
+class DependencyCountPolicy(SchedulingPolicy):
+    """Fewest dependencies first (the original ordering)"""
+    
+    name = "dependencies"
+    
+    def rank(self, tasks, taskset=None, durations=None):
+        return sorted(tasks, key=lambda task: len(task.dependencies))
+
+
+class PriorityPolicy(SchedulingPolicy):
+    """Highest Task.priority first, ties in taskset order"""
+    
+    name = "priority"
+    
+    def rank(self, tasks, taskset=None, durations=None):
+        return sorted(tasks, key=lambda task: -task.priority)
+
+
+class CriticalPathPolicy(SchedulingPolicy):
+    """Longest remaining path first, then most transitive dependents, then priority"""
+    
+    name = "critical_path"
+    uses_graph = True
+    
+    def __init__(self):
+        # spec_name -> (taskset, version, 依存関係の構造, durations, metrics)
+        self._cache: Dict[str, Tuple[Taskset, int, tuple, Optional[Dict[str, float]], PathMetrics]] = {}
+        self._lock = threading.Lock()
+    
+    def metrics(
+        self,
+        taskset: Taskset,
+        durations: Optional[Dict[str, float]] = None
+    ) -> PathMetrics:
+        """
+        タスクセットのパスの指標を取得
+        
+        同じオブジェクト・バージョン、または依存関係の構造が変わっていない場合は
+        前回の結果を再利用する（状態遷移だけでは再計算しない）。
+        
+        Args:
+            taskset: タスクセット
+            durations: タスクID -> 推定所要時間
+        
+        Returns:
+            compute_path_metrics()の結果
+        """
+        with self._lock:
+            cached = self._cache.get(taskset.spec_name)
+        if cached is not None and cached[3] == durations:
+            if cached[0] is taskset and cached[1] == taskset.version:
+                return cached[4]
+        
+        structure = tuple((task.id, tuple(task.dependencies)) for task in taskset.tasks)
+        if cached is not None and cached[3] == durations and cached[2] == structure:
+            metrics = cached[4]
+        else:
+            metrics = compute_path_metrics(taskset, durations)
+        
+        with self._lock:
+            self._cache[taskset.spec_name] = (taskset, taskset.version, structure, durations, metrics)
+        return metrics
+    
+    def rank(self, tasks, taskset=None, durations=None):
+        if taskset is None:
+            raise ValueError("critical_path policy requires the taskset")
+        metrics = self.metrics(taskset, durations)
+        
+        def key(task: Task) -> Tuple[float, int, int]:
+            remaining, dependents = metrics.get(task.id, (1.0, 0))
+            return (-remaining, -dependents, -task.priority)
+        
+        return sorted(tasks, key=key)
+
+
+POLICIES = {
+    policy.name: policy
+    for policy in (DependencyCountPolicy, PriorityPolicy, CriticalPathPolicy)
+}
+
+
+def available_policies() -> List[str]:
+    """
+    利用可能なスケジューリングポリシー名を取得
+    
+    Returns:
+        get_policy()で指定できる名前のリスト
+    """
+    return list(POLICIES)
+
+
+def get_policy(name: str) -> SchedulingPolicy:
+    """
+    スケジューリングポリシーを生成
+    
+    Args:
+        name: ポリシー名
+    
+    Returns:
+        SchedulingPolicy
+    
+    Raises:
+        ValueError: 不明なポリシー名の場合
+    """
+    policy_class = POLICIES.get(name)
+    if policy_class is None:
+        raise ValueError(
+            f"Unknown scheduling policy '{name}' (available: {', '.join(POLICIES)})"
+        )
+    return policy_class()
+
+
+class DurationHistory:
+    """
+    Task durations observed in the event log
+    
+    Pairs each TaskCompleted event with the preceding TaskAssigned event of
+    the same task. Each call resumes reading from the log position where the
+    previous call stopped, so repeated estimates stay cheap as the log grows
+    and events are counted in the order they were appended.
+    """
+    
+    # 1回のread_from()で読み込む最大イベント数
+    BATCH_SIZE = 1000
+    
+    def __init__(self, event_store: Any):
+        """
+        Args:
+            event_store: EventStore or SQLiteEventStore of the registry
+        """
+        self.event_store = event_store
+        # spec_name -> 次に読み込むイベントログの位置
+        self._positions: Dict[str, EventCursor] = {}
+        # spec_name -> タスクID -> 割り当て時刻
+        self._assigned_at: Dict[str, Dict[str, datetime]] = {}
+        # spec_name -> タスクID -> 最新の所要時間（秒）
+        self._durations: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+    
+    def observed(self, spec_name: str) -> Dict[str, float]:
+        """
+        イベントログから観測したタスクの所要時間を取得
+        
+        Args:
+            spec_name: Spec名
+        
+        Returns:
+            タスクID -> 直近の実行の所要時間（秒）
+        """
+        with self._lock:
+            position = self._positions.get(spec_name)
+            if position is None:
+                position = self.event_store.head_cursor(spec_name)
+            assigned_at = self._assigned_at.setdefault(spec_name, {})
+            durations = self._durations.setdefault(spec_name, {})
+            
+            while True:
+                batch, position = self.event_store.read_from(
+                    spec_name,
+                    position,
+                    max_events=self.BATCH_SIZE,
+                    event_types=[EventType.TASK_ASSIGNED, EventType.TASK_COMPLETED],
+                )
+                for event, _ in batch:
+                    if event.event_type == EventType.TASK_ASSIGNED:
+                        assigned_at[event.task_id] = event.timestamp
+                    elif event.task_id in assigned_at:
+                        started = assigned_at.pop(event.task_id)
+                        durations[event.task_id] = (event.timestamp - started).total_seconds()
+                if len(batch) < self.BATCH_SIZE:
+                    break
+            
+            self._positions[spec_name] = position
+            return dict(durations)
+    
+    def estimates(self, taskset: Taskset) -> Dict[str, float]:
+        """
+        タスクセットの各タスクの所要時間を推定
+        
+        タスク自身の実行履歴があればその値、なければ同じrequired_skillの
+        タスクの平均、それもなければ全体の平均を使う。
+        
+        Args:
+            taskset: タスクセット
+        
+        Returns:
+            タスクID -> 推定所要時間（秒）。履歴がない場合は空
+        """
+        observed = self.observed(taskset.spec_name)
+        if not observed:
+            return {}
+        
+        skill_totals: Dict[Optional[str], List[float]] = {}
+        for task in taskset.tasks:
+            if task.id in observed:
+                totals = skill_totals.setdefault(task.required_skill, [0.0, 0])
+                totals[0] += observed[task.id]
+                totals[1] += 1
+        overall = sum(observed.values()) / len(observed)
+        
+        estimates = {}
+        for task in taskset.tasks:
+            if task.id in observed:
+                estimates[task.id] = observed[task.id]
+            elif task.required_skill in skill_totals:
+                total, count = skill_totals[task.required_skill]
+                estimates[task.id] = total / count
+            else:
+                estimates[task.id] = overall
+        return estimates
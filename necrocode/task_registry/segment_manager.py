@@ -0,0 +1,462 @@
+"""
+Segment manager for JSONL event logs
+
+Rotates a spec's active ``events.jsonl`` into numbered segments
+(``events.jsonl.N``) by size or age, compresses closed segments, enforces
+retention limits, and keeps a ``manifest.json`` with the time range of every
+closed segment so that readers can skip segments outside a query without
+opening them.
+"""
+
+import gzip
+import json
+import os
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+
+from filelock import FileLock
+
+try:
+    # Python 3.14+
+    from compression import zstd
+except ImportError:
+    zstd = None
+
+
+ACTIVE_SEGMENT = "events.jsonl"
+MANIFEST_NAME = "manifest.json"
+
+# 拡張子 -> ファイルを開く関数
+COMPRESSED_SUFFIXES: Dict[str, Callable[..., BinaryIO]] = {".gz": gzip.open}
+if zstd is not None:
+    COMPRESSED_SUFFIXES[".zst"] = zstd.open
+
+COMPRESSION_METHODS = ("none", "gzip", "zstd")
+
+
+def is_compressed(segment: Path) -> bool:
+    """圧縮済みのセグメントかどうか"""
+    return segment.suffix in COMPRESSED_SUFFIXES
+
+
+def open_compressed(segment: Path) -> BinaryIO:
+    """圧縮済みセグメントを展開しながら読み込むファイルオブジェクトを開く"""
+    return COMPRESSED_SUFFIXES[segment.suffix](segment, 'rb')
+
+
+def segment_number(segment: Path) -> Optional[int]:
+    """
+    セグメントの番号を取得
+    
+    Args:
+        segment: セグメントファイルのパス
+    
+    Returns:
+        ローテーション番号（現在のログファイルや無関係なファイルの場合はNone）
+    """
+    name = segment.name
+    if not name.startswith(ACTIVE_SEGMENT + "."):
+        return None
+    suffix = name[len(ACTIVE_SEGMENT) + 1:]
+    if is_compressed(segment):
+        suffix = suffix[:-len(segment.suffix)]
+    return int(suffix) if suffix.isdigit() else None
+
+
+def read_lines_reverse(f: BinaryIO, start: int, end: int, block_size: int = 65536) -> Iterator[bytes]:
+    """
+    ファイルの範囲を末尾からブロック単位で読み、行を逆順に返す
+    
+    Args:
+        f: バイナリモードで開いたファイル
+        start: 範囲の開始オフセット（行頭）
+        end: 範囲の終了オフセット（行末の直後）
+        block_size: 1回に読み込むバイト数
+    
+    Yields:
+        末尾から順の行（改行を除く）
+    """
+    position = end
+    tail = b''
+    while position > start:
+        size = min(block_size, position - start)
+        position -= size
+        f.seek(position)
+        lines = (f.read(size) + tail).split(b'\n')
+        # 先頭の要素は行の途中から始まる可能性があるため次のブロックに回す
+        tail = lines[0]
+        for line in reversed(lines[1:]):
+            if line:
+                yield line
+    if tail:
+        yield tail
+
+
+@dataclass
+class SegmentPolicy:
+    """イベントログのローテーション・圧縮・保持の設定"""
+    # 現在のログがこのサイズに達したらローテーション（Noneで無効）
+    max_bytes: Optional[int] = None
+    # 現在のログの先頭イベントがこの秒数より古くなったらローテーション（Noneで無効）
+    max_age_seconds: Optional[float] = None
+    # "none" / "gzip" / "zstd"（標準ライブラリにzstdがない場合はgzip）
+    compression: str = "none"
+    # 保持するローテーション済みセグメント数（Noneで無制限）
+    retain_segments: Optional[int] = None
+    # 最後のイベントがこの秒数より古いセグメントを削除（Noneで無制限）
+    retain_seconds: Optional[float] = None
+    
+    def __post_init__(self):
+        """設定の検証"""
+        if self.compression not in COMPRESSION_METHODS:
+            raise ValueError(f"compression must be one of {COMPRESSION_METHODS}")
+        
+        if self.retain_segments is not None and self.retain_segments < 0:
+            raise ValueError("retain_segments must be non-negative")
+    
+    @property
+    def auto_rotate(self) -> bool:
+        """書き込み時にローテーションを判定するかどうか"""
+        return self.max_bytes is not None or self.max_age_seconds is not None
+    
+    @property
+    def retains(self) -> bool:
+        """保持数・保持期間によってセグメントを削除するかどうか"""
+        return self.retain_segments is not None or self.retain_seconds is not None
+    
+    @property
+    def compression_suffix(self) -> Optional[str]:
+        """圧縮済みセグメントの拡張子（圧縮しない場合はNone）"""
+        if self.compression == "none":
+            return None
+        if self.compression == "zstd" and zstd is not None:
+            return ".zst"
+        return ".gz"
+
+
+@dataclass
+class SegmentInfo:
+    """マニフェストに記録するローテーション済みセグメントの情報"""
+    number: int
+    file: str
+    first_timestamp: Optional[str] = None
+    last_timestamp: Optional[str] = None
+    size: int = 0
+    # セグメント内の最小・最大時刻（タイムスタンプは記録順とは限らない）
+    min_timestamp: Optional[str] = None
+    max_timestamp: Optional[str] = None
+    
+    def outside(self, start_time: Optional[datetime], end_time: Optional[datetime]) -> bool:
+        """
+        セグメントが期間と重ならないかどうか
+        
+        先頭・末尾のイベントの時刻は最小・最大とは限らないため、最小・最大時刻を
+        記録していないセグメント（旧バージョンのマニフェスト）は期間外と判定しない。
+        
+        Args:
+            start_time: 開始時刻（Noneの場合は下限なし）
+            end_time: 終了時刻（Noneの場合は上限なし）
+        
+        Returns:
+            期間外であることがマニフェストから分かる場合True
+        """
+        if end_time is not None and self.min_timestamp is not None:
+            if datetime.fromisoformat(self.min_timestamp) > end_time:
+                return True
+        if start_time is not None and self.max_timestamp is not None:
+            if datetime.fromisoformat(self.max_timestamp) < start_time:
+                return True
+        return False
+
+
+class SegmentManager:
+    """1つのspecのイベントログセグメントとマニフェストを管理"""
+    
+    def __init__(self, spec_dir: Path, policy: SegmentPolicy):
+        """
+        Args:
+            spec_dir: specのイベントログディレクトリ
+            policy: ローテーション・圧縮・保持の設定
+        """
+        self.spec_dir = Path(spec_dir)
+        self.policy = policy
+        self.manifest_path = self.spec_dir / MANIFEST_NAME
+        self._manifest_lock = FileLock(str(self.spec_dir / (MANIFEST_NAME + ".lock")))
+        self._cached: Optional[Tuple[Tuple[int, int], Dict[str, object]]] = None
+    
+    @property
+    def active_path(self) -> Path:
+        """現在のログファイル"""
+        return self.spec_dir / ACTIVE_SEGMENT
+    
+    def _segment_path(self, number: int) -> Path:
+        """未圧縮のローテーション済みセグメントのパス"""
+        return self.spec_dir / f"{ACTIVE_SEGMENT}.{number}"
+    
+    def _read_manifest(self, for_update: bool = False) -> Dict[str, object]:
+        """
+        マニフェストを読み込む（存在しない場合は既存のセグメントから作成）
+        
+        Args:
+            for_update: Trueの場合はキャッシュを使わず、変更してよい新しいオブジェクトを返す
+        """
+        try:
+            stat = os.stat(self.manifest_path)
+        except FileNotFoundError:
+            return self._scan_existing()
+        
+        key = (stat.st_mtime_ns, stat.st_size)
+        if not for_update and self._cached is not None and self._cached[0] == key:
+            return self._cached[1]
+        
+        with open(self.manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if not for_update:
+            self._cached = (key, manifest)
+        return manifest
+    
+    def _scan_existing(self) -> Dict[str, object]:
+        """マニフェスト導入前のローテーション済みセグメントを取り込む"""
+        segments: Dict[int, SegmentInfo] = {}
+        for path in self.spec_dir.glob(ACTIVE_SEGMENT + ".*"):
+            number = segment_number(path)
+            if number is not None and (number not in segments or not is_compressed(path)):
+                segments[number] = SegmentInfo(number=number, file=path.name)
+        
+        return {
+            "next_segment": max(segments, default=0) + 1,
+            "segments": [asdict(segments[number]) for number in sorted(segments)],
+        }
+    
+    def _write_manifest(self, manifest: Dict[str, object]) -> None:
+        """マニフェストをアトミックに書き込む"""
+        tmp_path = self.manifest_path.with_suffix(".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+        self._cached = None
+    
+    def segments(self) -> Dict[int, SegmentInfo]:
+        """
+        マニフェストに記録されたセグメントを取得
+        
+        Returns:
+            番号 -> SegmentInfo
+        """
+        if not self.manifest_path.exists():
+            return {}
+        return {
+            entry["number"]: SegmentInfo(**entry)
+            for entry in self._read_manifest()["segments"]
+        }
+    
+    def next_segment(self) -> int:
+        """現在のログがローテーションされた時に付く番号"""
+        return self._read_manifest()["next_segment"]
+    
+    def should_rotate(self, size: int, first_timestamp: Optional[datetime]) -> bool:
+        """
+        現在のログをローテーションすべきか判定
+        
+        Args:
+            size: 現在のログのサイズ
+            first_timestamp: 現在のログの最も古いイベントの時刻
+        
+        Returns:
+            サイズか経過時間の閾値を超えている場合True
+        """
+        if size <= 0:
+            return False
+        if self.policy.max_bytes is not None and size >= self.policy.max_bytes:
+            return True
+        if self.policy.max_age_seconds is not None and first_timestamp is not None:
+            age = datetime.now(first_timestamp.tzinfo) - first_timestamp
+            return age >= timedelta(seconds=self.policy.max_age_seconds)
+        return False
+    
+    def _last_timestamp(self, segment: Path, size: int) -> Optional[str]:
+        """セグメント末尾のイベントの時刻を読み込む"""
+        with open(segment, 'rb') as f:
+            for line in read_lines_reverse(f, 0, size):
+                try:
+                    return json.loads(line)["timestamp"]
+                except (json.JSONDecodeError, ValueError, KeyError, TypeError):
+                    continue
+        return None
+    
+    def rotate(
+        self,
+        time_bounds: Optional[Tuple[datetime, datetime]] = None,
+        apply_retention: bool = True
+    ) -> Optional[int]:
+        """
+        現在のログ（とサイドカー索引）を次の番号のセグメントへ移動
+        
+        Args:
+            time_bounds: 現在のログのイベントの最小・最大時刻（索引から分かる場合）。
+                Noneの場合はマニフェストに記録せず、時刻によるセグメントの絞り込みと
+                保持期間の判定には使われない
+            apply_retention: Falseの場合は保持数・保持期間を超えたセグメントを削除しない
+        
+        Returns:
+            ローテーション後のセグメント番号（ログが空の場合はNone）
+        """
+        with self._manifest_lock:
+            try:
+                size = self.active_path.stat().st_size
+            except FileNotFoundError:
+                return None
+            if size == 0:
+                return None
+            
+            manifest = self._read_manifest(for_update=True)
+            number = manifest["next_segment"]
+            rotated = self._segment_path(number)
+            
+            with open(self.active_path, 'rb') as f:
+                first_line = f.readline()
+            try:
+                first = json.loads(first_line)["timestamp"]
+            except (json.JSONDecodeError, ValueError, KeyError, TypeError):
+                first = None
+            last = self._last_timestamp(self.active_path, size)
+            
+            os.replace(self.active_path, rotated)
+            index_file = self.spec_dir / (ACTIVE_SEGMENT + ".idx")
+            if index_file.exists():
+                os.replace(index_file, rotated.with_name(rotated.name + ".idx"))
+            
+            # 新しい空のログファイルを作成
+            self.active_path.touch()
+            
+            manifest["next_segment"] = number + 1
+            manifest["segments"].append(asdict(SegmentInfo(
+                number=number,
+                file=rotated.name,
+                first_timestamp=first,
+                last_timestamp=last,
+                size=size,
+                min_timestamp=time_bounds[0].isoformat() if time_bounds is not None else None,
+                max_timestamp=time_bounds[1].isoformat() if time_bounds is not None else None,
+            )))
+            if apply_retention:
+                self._apply_retention(manifest)
+            self._write_manifest(manifest)
+        
+        return number
+    
+    def _remove_files(self, number: int) -> None:
+        """セグメントの全形式のファイルとサイドカー索引を削除"""
+        plain = self._segment_path(number)
+        for path in [plain, plain.with_name(plain.name + ".idx")] + [
+            plain.with_name(plain.name + suffix) for suffix in COMPRESSED_SUFFIXES
+        ]:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+    
+    def _expired(self, manifest: Dict[str, object]) -> List[Dict[str, object]]:
+        """保持数・保持期間を超えたセグメントのマニフェストのエントリを取得"""
+        segments: List[Dict[str, object]] = manifest["segments"]
+        expired = []
+        
+        if self.policy.retain_segments is not None:
+            excess = len(segments) - self.policy.retain_segments
+            if excess > 0:
+                expired.extend(segments[:excess])
+        
+        if self.policy.retain_seconds is not None:
+            for entry in segments:
+                # 最大時刻を記録していないセグメントは末尾のイベントの時刻で判定する
+                last = entry.get("max_timestamp") or entry.get("last_timestamp")
+                if last is None or entry in expired:
+                    continue
+                last_time = datetime.fromisoformat(last)
+                age = datetime.now(last_time.tzinfo) - last_time
+                if age > timedelta(seconds=self.policy.retain_seconds):
+                    expired.append(entry)
+        return expired
+    
+    def has_expired(self) -> bool:
+        """保持数・保持期間を超えたセグメントがあるかどうか"""
+        return bool(self._expired(self._read_manifest()))
+    
+    def _apply_retention(self, manifest: Dict[str, object]) -> None:
+        """保持数・保持期間を超えたセグメントを削除（マニフェストロック下で呼び出す）"""
+        segments: List[Dict[str, object]] = manifest["segments"]
+        expired = self._expired(manifest)
+        for entry in expired:
+            self._remove_files(entry["number"])
+        manifest["segments"] = [entry for entry in segments if entry not in expired]
+    
+    def enforce_retention(self) -> None:
+        """保持数・保持期間を超えたセグメントを削除"""
+        with self._manifest_lock:
+            manifest = self._read_manifest(for_update=True)
+            self._apply_retention(manifest)
+            self._write_manifest(manifest)
+    
+    def compress(self, number: int) -> Optional[Path]:
+        """
+        ローテーション済みセグメントを圧縮
+        
+        一時ファイルへ圧縮してからリネームし、マニフェストを更新した後に
+        元のセグメントを削除する。読み込み中のリーダーは開いたファイルを
+        そのまま読み続けられる。
+        
+        Args:
+            number: セグメント番号
+        
+        Returns:
+            圧縮後のパス（圧縮しない設定や既に処理済みの場合はNone）
+        """
+        suffix = self.policy.compression_suffix
+        source = self._segment_path(number)
+        if suffix is None or not source.exists():
+            return None
+        
+        target = source.with_name(source.name + suffix)
+        tmp_path = target.with_name(target.name + ".tmp")
+        with open(source, 'rb') as src, COMPRESSED_SUFFIXES[suffix](tmp_path, 'wb') as dst:
+            while True:
+                chunk = src.read(1024 * 1024)
+                if not chunk:
+                    break
+                dst.write(chunk)
+        
+        with self._manifest_lock:
+            manifest = self._read_manifest(for_update=True)
+            entry = next((e for e in manifest["segments"] if e["number"] == number), None)
+            if entry is None:
+                # 圧縮中に保持期限で削除された
+                tmp_path.unlink()
+                return None
+            
+            os.replace(tmp_path, target)
+            entry["file"] = target.name
+            self._write_manifest(manifest)
+            
+            source.unlink()
+            index_file = source.with_name(source.name + ".idx")
+            if index_file.exists():
+                index_file.unlink()
+        
+        return target
+    
+    def pending_compression(self) -> List[int]:
+        """
+        圧縮されていないローテーション済みセグメントの番号を取得
+        
+        Returns:
+            セグメント番号のリスト（古い順）
+        """
+        if self.policy.compression_suffix is None:
+            return []
+        return [
+            number
+            for number, info in sorted(self.segments().items())
+            if not is_compressed(self.spec_dir / info.file)
+        ]
@@ -0,0 +1,222 @@
+"""
+Serializers for taskset files
+
+TaskStore writes ``taskset.json`` through a pluggable serializer. JSON-based
+formats (compact JSON, orjson) are written as plain JSON; binary formats
+(msgpack, marshal) start with a header naming the format, so any taskset file
+can be loaded regardless of the serializer that is currently configured::
+
+    b"NCTS" <1 byte name length> <format name> <payload>
+
+marshal data is only readable by the Python version that wrote it, so its
+format name records the interpreter version (e.g. ``marshal-3.11``) and a file
+written by another version is rejected instead of being misread.
+
+orjson and msgpack are optional and only offered when installed.
+"""
+
+import json
+import marshal
+import sys
+from typing import Any, Callable, Dict, List
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+from .exceptions import TaskRegistryError
+
+
+# バイナリ形式のヘッダー
+MAGIC = b"NCTS"
+
+
+class TasksetSerializer:
+    """Base class for taskset serializers"""
+    
+    # 形式名（バイナリ形式ではヘッダーに書き込まれる）
+    name = ""
+    # Trueの場合はヘッダー付きで書き込む
+    binary = False
+    
+    def dumps(self, data: Dict[str, Any]) -> bytes:
+        """Serialize taskset data"""
+        raise NotImplementedError
+    
+    def loads(self, payload: bytes) -> Dict[str, Any]:
+        """Deserialize taskset data"""
+        raise NotImplementedError
+
+
+class JSONSerializer(TasksetSerializer):
+    """Standard library JSON (compact unless an indent is given)"""
+    
+    name = "json"
+    
+    def __init__(self, indent: Any = None):
+        """
+        Args:
+            indent: Indentation passed to json.dumps (None for compact output)
+        """
+        self.indent = indent
+        self.separators = None if indent is not None else (',', ':')
+    
+    def dumps(self, data: Dict[str, Any]) -> bytes:
+        return json.dumps(
+            data, ensure_ascii=False, indent=self.indent, separators=self.separators
+        ).encode('utf-8')
+    
+    def loads(self, payload: bytes) -> Dict[str, Any]:
+        return json.loads(payload)
+
+
+class OrjsonSerializer(TasksetSerializer):
+    """JSON via orjson"""
+    
+    name = "orjson"
+    
+    def dumps(self, data: Dict[str, Any]) -> bytes:
+        return orjson.dumps(data)
+    
+    def loads(self, payload: bytes) -> Dict[str, Any]:
+        return orjson.loads(payload)
+
+
+class MsgpackSerializer(TasksetSerializer):
+    """MessagePack via msgpack"""
+    
+    name = "msgpack"
+    binary = True
+    
+    def dumps(self, data: Dict[str, Any]) -> bytes:
+        return msgpack.packb(data, use_bin_type=True)
+    
+    def loads(self, payload: bytes) -> Dict[str, Any]:
+        return msgpack.unpackb(payload, raw=False)
+
+
+class MarshalSerializer(TasksetSerializer):
+    """Standard library marshal (readable only by the Python version that wrote it)"""
+    
+    # marshalの形式はPythonのバージョンごとに変わり得るため、ヘッダーにバージョンを記録する
+    name = f"marshal-{sys.version_info[0]}.{sys.version_info[1]}"
+    binary = True
+    
+    def dumps(self, data: Dict[str, Any]) -> bytes:
+        return marshal.dumps(data)
+    
+    def loads(self, payload: bytes) -> Dict[str, Any]:
+        return marshal.loads(payload)
+
+
+# 形式名 -> シリアライザーの生成関数（インストール済みのもののみ）
+SERIALIZERS: Dict[str, Callable[[], TasksetSerializer]] = {
+    "json": JSONSerializer,
+    "json-pretty": lambda: JSONSerializer(indent=2),
+    "marshal": MarshalSerializer,
+}
+if orjson is not None:
+    SERIALIZERS["orjson"] = OrjsonSerializer
+if msgpack is not None:
+    SERIALIZERS["msgpack"] = MsgpackSerializer
+
+# ファイルに書かれる形式名 -> 読み込み用のシリアライザー
+_BINARY_READERS: Dict[str, Callable[[], TasksetSerializer]] = {
+    MarshalSerializer.name: MarshalSerializer,
+}
+if msgpack is not None:
+    _BINARY_READERS["msgpack"] = MsgpackSerializer
+
+_json_reader: TasksetSerializer = OrjsonSerializer() if orjson is not None else JSONSerializer()
+
+
+def available_formats() -> List[str]:
+    """
+    Get the taskset formats that can be written in this environment
+    
+    Returns:
+        Format names accepted by get_serializer()
+    """
+    return ["auto"] + list(SERIALIZERS)
+
+
+def get_serializer(name: str = "json") -> TasksetSerializer:
+    """
+    Get a serializer by format name
+    
+    Args:
+        name: Format name, or "auto" for the fastest installed JSON encoder
+    
+    Returns:
+        The serializer
+    
+    Raises:
+        ValueError: If the format is unknown or its library is not installed
+    """
+    if name == "auto":
+        name = "orjson" if orjson is not None else "json"
+    
+    factory = SERIALIZERS.get(name)
+    if factory is None:
+        raise ValueError(
+            f"Unknown or unavailable taskset format '{name}' "
+            f"(available: {', '.join(available_formats())})"
+        )
+    return factory()
+
+
+def encode(serializer: TasksetSerializer, data: Dict[str, Any]) -> bytes:
+    """
+    Serialize taskset data into the self-describing file format
+    
+    Args:
+        serializer: The serializer to use
+        data: Taskset data (Taskset.to_dict())
+    
+    Returns:
+        File contents
+    """
+    payload = serializer.dumps(data)
+    if not serializer.binary:
+        return payload
+    
+    name = serializer.name.encode('ascii')
+    return MAGIC + bytes([len(name)]) + name + payload
+
+
+def decode(raw: bytes) -> Dict[str, Any]:
+    """
+    Deserialize a taskset file written in any supported format
+    
+    Args:
+        raw: File contents
+    
+    Returns:
+        Taskset data
+    
+    Raises:
+        json.JSONDecodeError: If a JSON file is malformed
+        TaskRegistryError: If the file uses a format that cannot be read here
+            (a missing library, or marshal data written by another Python version)
+    """
+    if not raw.startswith(MAGIC):
+        return _json_reader.loads(raw)
+    
+    length = raw[len(MAGIC)]
+    start = len(MAGIC) + 1
+    name = raw[start:start + length].decode('ascii')
+    factory = _BINARY_READERS.get(name)
+    if factory is None:
+        if name.startswith("marshal"):
+            raise TaskRegistryError(
+                f"Cannot read taskset format '{name}' with {MarshalSerializer.name}: "
+                f"load it with the Python version that wrote it and save it in a JSON format"
+            )
+        raise TaskRegistryError(f"Cannot read taskset format '{name}' (library not installed)")
+    return factory().loads(raw[start + length:])
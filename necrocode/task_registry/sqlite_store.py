@@ -0,0 +1,765 @@
+"""
+SQLite storage engine for Task Registry
+
+Provides drop-in replacements for TaskStore and EventStore backed by a single
+SQLite database in WAL mode, so that many processes can read concurrently while
+one writer commits, and queries by state/skill/task/time run as index seeks.
+"""
+
+import json
+import sqlite3
+import threading
+import weakref
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .models import EventType, Task, Taskset, TaskEvent, TaskState
+from .task_store import TaskStore
+from .change_feed import EventCursor
+from .event_store import EventStore
+from .event_sourcing import EventSourcedTaskStore
+from .taskset_cache import TasksetCache
+from .exceptions import TasksetNotFoundError, TaskRegistryError, VersionConflictError
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasksets (
+    spec_name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    metadata TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS tasks (
+    spec_name TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    required_skill TEXT,
+    priority INTEGER NOT NULL DEFAULT 0,
+    runner_id TEXT,
+    assigned_slot TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (spec_name, task_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_tasks_state ON tasks (spec_name, state);
+CREATE INDEX IF NOT EXISTS idx_tasks_skill ON tasks (spec_name, required_skill);
+CREATE INDEX IF NOT EXISTS idx_tasks_runner ON tasks (spec_name, runner_id);
+CREATE INDEX IF NOT EXISTS idx_tasks_slot ON tasks (spec_name, assigned_slot);
+
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    spec_name TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    event_type TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_events_task ON events (spec_name, task_id);
+CREATE INDEX IF NOT EXISTS idx_events_timestamp ON events (spec_name, timestamp);
+"""
+
+
+# find_tasks()で指定されなかったフィルタ（Noneは列がNULLのタスクに一致する）
+_UNSET: Any = object()
+
+
+def _timestamp_key(value: datetime) -> str:
+    """Fixed-width ISO timestamp so that string order equals time order"""
+    return value.isoformat(timespec="microseconds")
+
+
+class SQLiteConnectionFactory:
+    """Per-thread SQLite connections to one database file"""
+    
+    def __init__(self, database_path: Path, busy_timeout: float = 30.0):
+        """
+        Args:
+            database_path: SQLite database file
+            busy_timeout: Seconds to wait for a competing writer
+        """
+        self.database_path = Path(database_path)
+        self.database_path.parent.mkdir(parents=True, exist_ok=True)
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        # close()で閉じるための、開いた接続とそのスレッド
+        self._connections: List[Tuple["weakref.ref[threading.Thread]", sqlite3.Connection]] = []
+        self._connections_lock = threading.Lock()
+        
+        with self.connect() as conn:
+            conn.executescript(SCHEMA)
+    
+    def connect(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # close()は他のスレッドから接続を閉じる
+            conn = sqlite3.connect(
+                str(self.database_path), timeout=self.busy_timeout, check_same_thread=False
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                # 終了したスレッドの接続を閉じる
+                alive = []
+                for thread_ref, other in self._connections:
+                    thread = thread_ref()
+                    if thread is not None and thread.is_alive():
+                        alive.append((thread_ref, other))
+                    else:
+                        other.close()
+                alive.append((weakref.ref(threading.current_thread()), conn))
+                self._connections = alive
+        return conn
+    
+    def close(self) -> None:
+        """
+        Close the connections of all threads
+        
+        A thread that uses the factory again afterwards opens a new connection.
+        """
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+            self._local = threading.local()
+        for _, conn in connections:
+            conn.close()
+
+
+class SQLiteTaskStore(TaskStore):
+    """TaskStore implementation backed by SQLite"""
+    
+    indexed_queries = True
+    
+    def __init__(
+        self,
+        storage_dir: Path,
+        database_path: Path,
+        busy_timeout: float = 30.0,
+        cache: Optional[TasksetCache] = None
+    ):
+        """
+        Initialize SQLiteTaskStore
+        
+        Args:
+            storage_dir: Directory used for backups and temporary files
+            database_path: SQLite database file
+            busy_timeout: Seconds to wait for a competing writer
+            cache: Optional cache of parsed tasksets shared by all readers
+        """
+        super().__init__(storage_dir, cache=cache)
+        self.db = SQLiteConnectionFactory(database_path, busy_timeout)
+    
+    def _task_row(self, spec_name: str, position: int, task: Task) -> tuple:
+        """Build the row stored for a task"""
+        return (
+            spec_name,
+            task.id,
+            position,
+            task.state.value,
+            task.required_skill,
+            task.priority,
+            task.runner_id,
+            task.assigned_slot,
+            json.dumps(task.to_dict(), ensure_ascii=False, separators=(',', ':')),
+        )
+    
+    def _write_header(self, conn: sqlite3.Connection, taskset: Taskset) -> None:
+        """Upsert the taskset row"""
+        conn.execute(
+            "INSERT INTO tasksets (spec_name, version, created_at, updated_at, metadata) "
+            "VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(spec_name) DO UPDATE SET version = excluded.version, "
+            "created_at = excluded.created_at, updated_at = excluded.updated_at, "
+            "metadata = excluded.metadata",
+            (
+                taskset.spec_name,
+                taskset.version,
+                taskset.created_at.isoformat(),
+                taskset.updated_at.isoformat(),
+                json.dumps(taskset.metadata, ensure_ascii=False),
+            ),
+        )
+    
+    def save_taskset(self, taskset: Taskset) -> None:
+        """
+        Save a taskset, replacing all of its task rows
+        
+        Args:
+            taskset: The taskset to save
+        
+        Raises:
+            TaskRegistryError: If save operation fails
+        """
+        try:
+            taskset.updated_at = datetime.now()
+            self._replace_taskset(taskset)
+            self._cache_put(taskset)
+        except Exception as e:
+            self.invalidate_cache(taskset.spec_name)
+            raise TaskRegistryError(f"Failed to save taskset '{taskset.spec_name}': {e}") from e
+    
+    def _replace_taskset(self, taskset: Taskset) -> None:
+        """Replace the header and all task rows in one transaction"""
+        conn = self.db.connect()
+        with conn:
+            self._write_header(conn, taskset)
+            conn.execute("DELETE FROM tasks WHERE spec_name = ?", (taskset.spec_name,))
+            conn.executemany(
+                "INSERT INTO tasks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    self._task_row(taskset.spec_name, position, task)
+                    for position, task in enumerate(taskset.tasks)
+                ],
+            )
+    
+    def save_tasks(self, taskset: Taskset, tasks: List[Task]) -> None:
+        """
+        Update only the given task rows and the taskset header
+        
+        Args:
+            taskset: The taskset the tasks belong to (already modified in memory)
+            tasks: The tasks that changed
+        
+        Raises:
+            TaskRegistryError: If save operation fails
+        """
+        positions = {task.id: position for position, task in enumerate(taskset.tasks)}
+        try:
+            taskset.updated_at = datetime.now()
+            conn = self.db.connect()
+            with conn:
+                self._write_header(conn, taskset)
+                conn.executemany(
+                    "INSERT OR REPLACE INTO tasks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        self._task_row(taskset.spec_name, positions[task.id], task)
+                        for task in tasks
+                    ],
+                )
+            self._cache_put(taskset)
+        except Exception as e:
+            self.invalidate_cache(taskset.spec_name)
+            raise TaskRegistryError(f"Failed to save tasks for '{taskset.spec_name}': {e}") from e
+    
+    def save_tasks_if_version(self, taskset: Taskset, tasks: List[Task], expected_version: int) -> None:
+        """
+        Update the given task rows only if the stored version is still expected_version
+        
+        The version is compared and advanced by a single
+        ``UPDATE ... WHERE version = ?`` in the same transaction as the task
+        rows, so the check needs no extra round trip.
+        
+        Args:
+            taskset: The taskset the tasks belong to (already modified in memory)
+            tasks: The tasks that changed
+            expected_version: The version the taskset had when it was loaded
+        
+        Raises:
+            VersionConflictError: If the taskset was saved by another writer
+                after it was loaded
+            TaskRegistryError: If save operation fails
+        """
+        positions = {task.id: position for position, task in enumerate(taskset.tasks)}
+        try:
+            taskset.updated_at = datetime.now()
+            conn = self.db.connect()
+            with conn:
+                cursor = conn.execute(
+                    "UPDATE tasksets SET version = ?, updated_at = ?, metadata = ? "
+                    "WHERE spec_name = ? AND version = ?",
+                    (
+                        taskset.version,
+                        taskset.updated_at.isoformat(),
+                        json.dumps(taskset.metadata, ensure_ascii=False),
+                        taskset.spec_name,
+                        expected_version,
+                    ),
+                )
+                conflict = cursor.rowcount == 0
+                if not conflict:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO tasks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        [
+                            self._task_row(taskset.spec_name, positions[task.id], task)
+                            for task in tasks
+                        ],
+                    )
+        except Exception as e:
+            self.invalidate_cache(taskset.spec_name)
+            raise TaskRegistryError(f"Failed to save tasks for '{taskset.spec_name}': {e}") from e
+        
+        if conflict:
+            self.invalidate_cache(taskset.spec_name)
+            raise VersionConflictError(
+                taskset.spec_name, expected_version, self.stored_version(taskset.spec_name)
+            )
+        self._cache_put(taskset)
+    
+    def stored_version(self, spec_name: str) -> Optional[int]:
+        """
+        Get the version of the stored taskset
+        
+        Args:
+            spec_name: Name of the spec/taskset
+        
+        Returns:
+            The stored version, or None if the taskset doesn't exist
+        """
+        row = self.db.connect().execute(
+            "SELECT version FROM tasksets WHERE spec_name = ?", (spec_name,)
+        ).fetchone()
+        return row[0] if row else None
+    
+    def compact(self, taskset: Taskset) -> None:
+        """SQLite keeps no journal of its own; nothing to fold"""
+        return None
+    
+    def _fingerprint(self, spec_name: str) -> Optional[tuple]:
+        """
+        Get the version stamp of the stored taskset
+        
+        Returns:
+            (version, updated_at), or None if the taskset doesn't exist
+        """
+        return self.db.connect().execute(
+            "SELECT version, updated_at FROM tasksets WHERE spec_name = ?",
+            (spec_name,),
+        ).fetchone()
+    
+    def _read_taskset(self, spec_name: str) -> Taskset:
+        """
+        Read a taskset from the database
+        
+        Args:
+            spec_name: Name of the spec/taskset to load
+        
+        Returns:
+            The loaded Taskset object
+        
+        Raises:
+            TasksetNotFoundError: If taskset doesn't exist
+            TaskRegistryError: If load operation fails
+        """
+        conn = self.db.connect()
+        try:
+            # 1つの読み取りトランザクションでヘッダとタスクを取得（WALスナップショット）
+            conn.execute("BEGIN")
+            try:
+                header = conn.execute(
+                    "SELECT version, created_at, updated_at, metadata FROM tasksets "
+                    "WHERE spec_name = ?",
+                    (spec_name,),
+                ).fetchone()
+                rows = conn.execute(
+                    "SELECT data FROM tasks WHERE spec_name = ? ORDER BY position",
+                    (spec_name,),
+                ).fetchall()
+            finally:
+                conn.rollback()
+        except Exception as e:
+            raise TaskRegistryError(f"Failed to load taskset '{spec_name}': {e}") from e
+        
+        if header is None:
+            raise TasksetNotFoundError(spec_name)
+        
+        version, created_at, updated_at, metadata = header
+        return Taskset(
+            spec_name=spec_name,
+            version=version,
+            created_at=datetime.fromisoformat(created_at),
+            updated_at=datetime.fromisoformat(updated_at),
+            tasks=[Task.from_dict(json.loads(data)) for (data,) in rows],
+            metadata=json.loads(metadata),
+        )
+    
+    def find_tasks(
+        self,
+        spec_name: str,
+        state: Optional[TaskState] = _UNSET,
+        required_skill: Optional[str] = _UNSET,
+        runner_id: Optional[str] = _UNSET,
+        assigned_slot: Optional[str] = _UNSET
+    ) -> List[Task]:
+        """
+        Find tasks of a taskset using the column indexes
+        
+        Filters that are not given are not applied; a filter given as None
+        matches the tasks whose value is None, like QueryEngine's filters.
+        
+        Args:
+            spec_name: Name of the spec/taskset
+            state: Only tasks in this state
+            required_skill: Only tasks requiring this skill
+            runner_id: Only tasks assigned to this runner
+            assigned_slot: Only tasks assigned to this slot
+        
+        Returns:
+            Matching tasks in taskset order
+        
+        Raises:
+            TasksetNotFoundError: If taskset doesn't exist
+        """
+        if not self.taskset_exists(spec_name):
+            raise TasksetNotFoundError(spec_name)
+        
+        clauses = ["spec_name = ?"]
+        params: list = [spec_name]
+        if state is not _UNSET and state is not None:
+            state = TaskState(state).value
+        for column, value in (
+            ("state", state),
+            ("required_skill", required_skill),
+            ("runner_id", runner_id),
+            ("assigned_slot", assigned_slot),
+        ):
+            if value is _UNSET:
+                continue
+            if value is None:
+                clauses.append(f"{column} IS NULL")
+            else:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        
+        rows = self.db.connect().execute(
+            f"SELECT data FROM tasks WHERE {' AND '.join(clauses)} ORDER BY position",
+            params,
+        ).fetchall()
+        return [Task.from_dict(json.loads(data)) for (data,) in rows]
+    
+    def list_tasksets(self) -> List[str]:
+        """
+        Get list of all taskset names
+        
+        Returns:
+            List of spec names that have tasksets
+        """
+        rows = self.db.connect().execute(
+            "SELECT spec_name FROM tasksets ORDER BY spec_name"
+        ).fetchall()
+        return [spec_name for (spec_name,) in rows]
+    
+    def taskset_exists(self, spec_name: str) -> bool:
+        """
+        Check if a taskset exists
+        
+        Args:
+            spec_name: Name of the spec/taskset
+        
+        Returns:
+            True if taskset exists, False otherwise
+        """
+        row = self.db.connect().execute(
+            "SELECT 1 FROM tasksets WHERE spec_name = ?", (spec_name,)
+        ).fetchone()
+        return row is not None
+    
+    def delete_taskset(self, spec_name: str) -> None:
+        """
+        Delete a taskset and its tasks
+        
+        Args:
+            spec_name: Name of the spec/taskset to delete
+        
+        Raises:
+            TasksetNotFoundError: If taskset doesn't exist
+            TaskRegistryError: If delete operation fails
+        """
+        if not self.taskset_exists(spec_name):
+            raise TasksetNotFoundError(spec_name)
+        
+        try:
+            conn = self.db.connect()
+            with conn:
+                conn.execute("DELETE FROM tasks WHERE spec_name = ?", (spec_name,))
+                conn.execute("DELETE FROM tasksets WHERE spec_name = ?", (spec_name,))
+            self.invalidate_cache(spec_name)
+        except Exception as e:
+            raise TaskRegistryError(f"Failed to delete taskset '{spec_name}': {e}") from e
+    
+    def close(self) -> None:
+        """Close the database connections of all threads"""
+        self.db.close()
+
+
+class SQLiteEventStore(EventStore):
+    """EventStore implementation backed by SQLite"""
+    
+    def __init__(self, events_dir: Path, database_path: Path, busy_timeout: float = 30.0):
+        """
+        Initialize SQLiteEventStore
+        
+        Args:
+            events_dir: イベント関連ファイルの保存ディレクトリ
+            database_path: SQLiteデータベースファイル
+            busy_timeout: 競合する書き込みを待つ秒数
+        """
+        super().__init__(events_dir)
+        self.db = SQLiteConnectionFactory(database_path, busy_timeout)
+    
+    def close(self) -> None:
+        """データベース接続を閉じる（close()後に使用した場合は接続し直す）"""
+        super().close()
+        self.db.close()
+    
+    def record_events(self, events: List[TaskEvent]) -> None:
+        """
+        複数のイベントを1トランザクションで記録
+        
+        Args:
+            events: 記録するイベント（記録順）
+        
+        Raises:
+            TaskRegistryError: イベント記録に失敗した場合
+        """
+        if not events:
+            return
+        
+        try:
+            conn = self.db.connect()
+            with conn:
+                conn.executemany(
+                    "INSERT INTO events (spec_name, task_id, event_type, timestamp, data) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (
+                            event.spec_name,
+                            event.task_id,
+                            event.event_type.value,
+                            _timestamp_key(event.timestamp),
+                            event.to_jsonl(),
+                        )
+                        for event in events
+                    ],
+                )
+        except Exception as e:
+            raise TaskRegistryError(
+                f"Failed to record event for spec '{events[0].spec_name}': {e}"
+            ) from e
+        
+        for spec_name in {event.spec_name for event in events}:
+            self._notify_subscribers(spec_name)
+    
+    def iter_events(
+        self,
+        spec_name: str,
+        task_id: Optional[str] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        event_types: Optional[Iterable[EventType]] = None,
+        reverse: bool = False
+    ) -> Iterator[TaskEvent]:
+        """
+        条件に一致するイベントをカーソルから順に読み込むイテレータ
+        
+        Args:
+            spec_name: Spec名
+            task_id: タスクID（指定した場合はそのタスクのイベントのみ）
+            start_time: 開始時刻（指定した場合はこの時刻以降のイベントのみ）
+            end_time: 終了時刻（指定した場合はこの時刻以前のイベントのみ）
+            event_types: イベントタイプ（指定した場合はいずれかに一致するイベントのみ）
+            reverse: Trueの場合は新しい順
+        
+        Yields:
+            条件に一致するイベント
+        
+        Raises:
+            TaskRegistryError: 読み込みに失敗した場合
+        """
+        clauses = ["spec_name = ?"]
+        params: List[Any] = [spec_name]
+        if task_id is not None:
+            clauses.append("task_id = ?")
+            params.append(task_id)
+        if start_time is not None:
+            clauses.append("timestamp >= ?")
+            params.append(_timestamp_key(start_time))
+        if end_time is not None:
+            clauses.append("timestamp <= ?")
+            params.append(_timestamp_key(end_time))
+        if event_types is not None:
+            values = sorted({EventType(event_type).value for event_type in event_types})
+            clauses.append(f"event_type IN ({', '.join('?' for _ in values)})")
+            params.extend(values)
+        
+        order = "DESC" if reverse else "ASC"
+        try:
+            cursor = self.db.connect().execute(
+                f"SELECT data FROM events WHERE {' AND '.join(clauses)} ORDER BY id {order}",
+                params,
+            )
+            for (data,) in cursor:
+                yield TaskEvent.from_jsonl(data)
+        except Exception as e:
+            raise TaskRegistryError(
+                f"Failed to read events for spec '{spec_name}': {e}"
+            ) from e
+    
+    def head_cursor(self, spec_name: str) -> EventCursor:
+        """最も古いイベントの位置を取得（SQLiteでは行IDが0の位置）"""
+        return EventCursor(0, 0)
+    
+    def tail_cursor(self, spec_name: str) -> EventCursor:
+        """
+        記録済みのイベントの末尾の位置を取得
+        
+        Args:
+            spec_name: Spec名
+        
+        Returns:
+            Specの最後のイベントの行IDの位置
+        """
+        (last_id,) = self.db.connect().execute(
+            "SELECT COALESCE(MAX(id), 0) FROM events WHERE spec_name = ?", (spec_name,)
+        ).fetchone()
+        return EventCursor(0, last_id)
+    
+    def read_from(
+        self,
+        spec_name: str,
+        cursor: EventCursor,
+        max_events: int = 1000,
+        task_id: Optional[str] = None,
+        event_types: Optional[Iterable[EventType]] = None
+    ) -> Tuple[List[Tuple[TaskEvent, EventCursor]], EventCursor]:
+        """
+        カーソルの行ID以降に記録されたイベントを読み込む
+        
+        Args:
+            spec_name: Spec名
+            cursor: 読み込みを開始する位置
+            max_events: 最大イベント数
+            task_id: タスクID（指定した場合はそのタスクのイベントのみ）
+            event_types: イベントタイプ（指定した場合はいずれかに一致するイベントのみ）
+        
+        Returns:
+            ((イベント, そのイベントの位置) のリスト, 読み込んだ範囲の末尾の位置)
+        
+        Raises:
+            TaskRegistryError: 読み込みに失敗した場合
+        """
+        end = self.tail_cursor(spec_name)
+        clauses = ["spec_name = ?", "id > ?", "id <= ?"]
+        params: List[Any] = [spec_name, cursor.offset, end.offset]
+        if task_id is not None:
+            clauses.append("task_id = ?")
+            params.append(task_id)
+        if event_types is not None:
+            values = sorted({EventType(event_type).value for event_type in event_types})
+            clauses.append(f"event_type IN ({', '.join('?' for _ in values)})")
+            params.extend(values)
+        params.append(max_events)
+        
+        try:
+            rows = self.db.connect().execute(
+                f"SELECT id, data FROM events WHERE {' AND '.join(clauses)} ORDER BY id LIMIT ?",
+                params,
+            ).fetchall()
+            events = [(TaskEvent.from_jsonl(data), EventCursor(0, row_id)) for row_id, data in rows]
+        except Exception as e:
+            raise TaskRegistryError(
+                f"Failed to read events for spec '{spec_name}': {e}"
+            ) from e
+        
+        if len(events) == max_events:
+            return events, events[-1][1]
+        # 条件に一致しない行も含め、読み込み開始時点の末尾まで読み進めた
+        return events, max(end, cursor)
+    
+    def rotate_logs(self, max_size_mb: int = 100) -> None:
+        """SQLiteではログファイルのローテーションは不要"""
+        return None
+    
+    def clear_events(self, spec_name: str) -> None:
+        """
+        特定specのイベントをクリア（テスト用）
+        
+        Args:
+            spec_name: Spec名
+        """
+        conn = self.db.connect()
+        with conn:
+            conn.execute("DELETE FROM events WHERE spec_name = ?", (spec_name,))
+
+
+def migrate_to_sqlite(
+    registry_dir: Path,
+    database_path: Optional[Path] = None,
+    persistence_mode: str = "full"
+) -> Dict[str, int]:
+    """
+    既存のディレクトリ構成（taskset.json / events.jsonl）をSQLiteへ移行
+    
+    ジャーナルとローテーション済みイベントログも取り込みます。移行先に同名の
+    タスクセットがある場合は上書きし、そのspecのイベントは置き換えます。
+    
+    Args:
+        registry_dir: 移行元のレジストリディレクトリ
+        database_path: 移行先のデータベース（Noneの場合は registry_dir/registry.db）
+        persistence_mode: 移行元のRegistryConfig.persistence_mode。"event_sourced"の場合は
+            スナップショットより新しいイベントを再生した状態を移行する
+    
+    Returns:
+        移行したタスクセット数とイベント数
+    
+    Raises:
+        ValueError: persistence_modeが不正な場合
+    """
+    if persistence_mode not in ("full", "incremental", "event_sourced"):
+        raise ValueError("persistence_mode must be 'full', 'incremental' or 'event_sourced'")
+    
+    registry_dir = Path(registry_dir)
+    if database_path is None:
+        database_path = registry_dir / "registry.db"
+    
+    source_events_dir = registry_dir / "events"
+    source_events = EventStore(source_events_dir)
+    if persistence_mode == "event_sourced":
+        source_tasks: TaskStore = EventSourcedTaskStore(registry_dir / "tasksets", source_events)
+    else:
+        source_tasks = TaskStore(registry_dir / "tasksets")
+    target_tasks = SQLiteTaskStore(registry_dir / "tasksets", database_path)
+    target_events = SQLiteEventStore(source_events_dir, database_path)
+    
+    migrated = {"tasksets": 0, "events": 0}
+    
+    for spec_name in source_tasks.list_tasksets():
+        # updated_atを維持するためsave_tasksetを経由せずに書き込む
+        target_tasks._replace_taskset(source_tasks.load_taskset(spec_name))
+        migrated["tasksets"] += 1
+    
+    if source_events_dir.exists():
+        conn = target_events.db.connect()
+        for spec_dir in sorted(source_events_dir.iterdir()):
+            if not spec_dir.is_dir():
+                continue
+            
+            # 古いローテーションファイルから順に取り込む
+            rows = (
+                (
+                    event.spec_name,
+                    event.task_id,
+                    event.event_type.value,
+                    _timestamp_key(event.timestamp),
+                    event.to_jsonl(),
+                )
+                for event in source_events.iter_events(spec_dir.name)
+            )
+            
+            with conn:
+                conn.execute("DELETE FROM events WHERE spec_name = ?", (spec_dir.name,))
+                cursor = conn.executemany(
+                    "INSERT INTO events (spec_name, task_id, event_type, timestamp, data) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+            migrated["events"] += cursor.rowcount
+    
+    source_events.close()
+    target_tasks.close()
+    target_events.close()
+    return migrated
@@ -0,0 +1,350 @@
+"""
+TaskIndex / DependencyIndex - Secondary indexes over a loaded taskset
+
+Maintains hash indexes (state, required_skill, runner_id, assigned_slot ->
+task ids) and a priority heap of READY tasks for one Taskset object, so that
+QueryEngine can answer filtered and top-k queries without scanning or fully
+sorting the task list.
+
+DependencyIndex keeps a reverse dependency map and per-task counters of unmet
+dependencies, so completing a task only touches its direct dependents.
+"""
+
+import heapq
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from .models import Task, TaskState, Taskset
+
+
+class TaskIndex:
+    """Hash indexes and READY priority heap for a single taskset"""
+    
+    # インデックス対象のフィールド
+    FIELDS = ("state", "required_skill", "runner_id", "assigned_slot")
+    
+    def __init__(self, taskset: Taskset):
+        """
+        Build indexes for a taskset
+        
+        Args:
+            taskset: The taskset to index
+        """
+        self.taskset = taskset
+        self.version = taskset.version
+        self.tasks: Dict[str, Task] = {}
+        self.positions: Dict[str, int] = {}
+        self._keys: Dict[str, Tuple[Any, ...]] = {}
+        self._buckets: Dict[str, Dict[Any, Set[str]]] = {field: {} for field in self.FIELDS}
+        # (-priority, position, task_id) のヒープ。古いエントリは参照時に読み飛ばす
+        self._ready_heap: List[Tuple[int, int, str]] = []
+        
+        for position, task in enumerate(taskset.tasks):
+            self.positions[task.id] = position
+            self._add(task)
+            if task.state == TaskState.READY:
+                self._ready_heap.append(self._heap_entry(task))
+        heapq.heapify(self._ready_heap)
+    
+    def is_current(self, taskset: Taskset) -> bool:
+        """
+        Check whether the index still describes the given taskset
+        
+        Args:
+            taskset: The taskset about to be queried
+        
+        Returns:
+            True if the index was built for this object at its current version
+        """
+        return self.taskset is taskset and self.version == taskset.version
+    
+    def _key(self, task: Task) -> Tuple[Any, ...]:
+        """Get the indexed field values of a task"""
+        return (task.state, task.required_skill, task.runner_id, task.assigned_slot)
+    
+    def _heap_entry(self, task: Task) -> Tuple[int, int, str]:
+        """Get the READY heap entry of a task"""
+        return (-task.priority, self.positions[task.id], task.id)
+    
+    def _add(self, task: Task) -> None:
+        """Add a task to the hash indexes"""
+        key = self._key(task)
+        self.tasks[task.id] = task
+        self._keys[task.id] = key
+        for field, value in zip(self.FIELDS, key):
+            self._buckets[field].setdefault(value, set()).add(task.id)
+    
+    def _remove(self, task_id: str) -> None:
+        """Remove a task from the hash indexes (heap entries expire lazily)"""
+        key = self._keys.pop(task_id)
+        for field, value in zip(self.FIELDS, key):
+            bucket = self._buckets[field][value]
+            bucket.discard(task_id)
+            if not bucket:
+                del self._buckets[field][value]
+    
+    def update(self, tasks: List[Task], version: int) -> None:
+        """
+        Re-index tasks that changed in place
+        
+        Args:
+            tasks: The changed tasks
+            version: The taskset version after the change
+        """
+        for task in tasks:
+            if task.id not in self.positions:
+                self.positions[task.id] = len(self.positions)
+            elif task.id in self._keys:
+                self._remove(task.id)
+            self._add(task)
+            if task.state == TaskState.READY:
+                heapq.heappush(self._ready_heap, self._heap_entry(task))
+        
+        self.version = version
+        
+        # 古いエントリが溜まりすぎたらヒープを再構築
+        ready_ids = self._buckets["state"].get(TaskState.READY, set())
+        if len(self._ready_heap) > 2 * len(ready_ids) + 64:
+            self._ready_heap = [self._heap_entry(self.tasks[task_id]) for task_id in ready_ids]
+            heapq.heapify(self._ready_heap)
+    
+    def lookup(self, filters: Dict[str, Any]) -> Optional[Set[str]]:
+        """
+        Intersect the index buckets for the indexed filter keys
+        
+        Args:
+            filters: Filter criteria (only keys in FIELDS are used)
+        
+        Returns:
+            Matching task ids, or None if no indexed filter was given
+        """
+        buckets = [
+            self._buckets[field].get(filters[field], set())
+            for field in self.FIELDS
+            if field in filters
+        ]
+        if not buckets:
+            return None
+        
+        buckets.sort(key=len)
+        result = set(buckets[0])
+        for bucket in buckets[1:]:
+            if not result:
+                break
+            result &= bucket
+        return result
+    
+    def in_order(self, task_ids: Set[str]) -> List[Task]:
+        """
+        Get tasks for ids in taskset order
+        
+        Args:
+            task_ids: Task ids to resolve
+        
+        Returns:
+            The tasks ordered by their position in the taskset
+        """
+        return [
+            self.tasks[task_id]
+            for task_id in sorted(task_ids, key=self.positions.__getitem__)
+        ]
+    
+    def iter_ready_by_priority(self) -> Iterator[Task]:
+        """
+        Iterate READY tasks from highest to lowest priority
+        
+        Ties keep taskset order. The heap is walked without popping, so
+        taking the first k tasks costs O(k log k).
+        
+        Yields:
+            READY tasks in priority order
+        """
+        heap = self._ready_heap
+        if not heap:
+            return
+        
+        seen: Set[str] = set()
+        frontier = [(heap[0], 0)]
+        while frontier:
+            entry, i = heapq.heappop(frontier)
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (heap[child], child))
+            
+            # 状態や優先度が変わった古いエントリと重複エントリを読み飛ばす
+            neg_priority, _, task_id = entry
+            task = self.tasks[task_id]
+            if (
+                task_id not in seen
+                and self._keys[task_id][0] == TaskState.READY
+                and -task.priority == neg_priority
+            ):
+                seen.add(task_id)
+                yield task
+    
+    def matcher(self, filters: Dict[str, Any]) -> Callable[[Task], bool]:
+        """
+        Build a predicate for the indexed filter keys
+        
+        Args:
+            filters: Filter criteria (only keys in FIELDS are used)
+        
+        Returns:
+            Function returning True for tasks matching all indexed filters
+        """
+        checks = [
+            (self.FIELDS.index(field), filters[field])
+            for field in self.FIELDS
+            if field in filters
+        ]
+        
+        def matches(task: Task) -> bool:
+            key = self._keys[task.id]
+            return all(key[i] == value for i, value in checks)
+        
+        return matches
+
+
+class DependencyIndex:
+    """Reverse dependency map and unmet dependency counters for a single taskset"""
+    
+    def __init__(self, taskset: Taskset):
+        """
+        Build the reverse dependency map for a taskset
+        
+        Args:
+            taskset: The taskset to index
+        """
+        self.taskset = taskset
+        self.version = taskset.version
+        self.tasks: Dict[str, Task] = {task.id: task for task in taskset.tasks}
+        self.positions: Dict[str, int] = {task.id: i for i, task in enumerate(taskset.tasks)}
+        # fork()したインデックスで、タスクセットにコピーを置いたタスクのID
+        self._owned: Set[str] = set()
+        # 依存先のID -> そのタスクに依存するタスクのID（依存の記述順）
+        self.dependents: Dict[str, List[str]] = {}
+        # タスクID -> DONEになっていない依存タスクの数（存在しない依存先も未完了として数える）
+        self.unmet: Dict[str, int] = {}
+        self._done: Set[str] = {
+            task.id for task in taskset.tasks if task.state == TaskState.DONE
+        }
+        
+        for task in taskset.tasks:
+            unmet = 0
+            for dep_id in task.dependencies:
+                self.dependents.setdefault(dep_id, []).append(task.id)
+                if dep_id not in self._done:
+                    unmet += 1
+            self.unmet[task.id] = unmet
+    
+    def is_current(self, taskset: Taskset) -> bool:
+        """
+        Check whether the index still describes the given taskset
+        
+        Args:
+            taskset: The taskset about to be modified
+        
+        Returns:
+            True if the index was built for this object at its current version
+        """
+        return self.taskset is taskset and self.version == taskset.version
+    
+    def fork(self, draft: Taskset) -> "DependencyIndex":
+        """
+        Copy the index for a draft made with ``taskset.copy(share_tasks=True)``
+        
+        The counters are copied, so changes staged on the draft leave this
+        index (and the taskset it describes) untouched. Tasks of the draft are
+        still shared with the original until they are taken with writable().
+        
+        Args:
+            draft: Shallow copy of the indexed taskset
+        
+        Returns:
+            A DependencyIndex for the draft
+        """
+        fork = DependencyIndex.__new__(DependencyIndex)
+        fork.taskset = draft
+        fork.version = self.version
+        fork.tasks = dict(self.tasks)
+        # 依存関係は操作で変わらないため共有する
+        fork.positions = self.positions
+        fork.dependents = self.dependents
+        fork.unmet = dict(self.unmet)
+        fork._done = set(self._done)
+        fork._owned = set()
+        return fork
+    
+    def writable(self, task_id: str) -> Optional[Task]:
+        """
+        Get a task of the draft for modification, copying it on first use
+        
+        Args:
+            task_id: ID of the task to modify
+        
+        Returns:
+            The draft's own copy of the task, or None if it doesn't exist
+        """
+        task = self.tasks.get(task_id)
+        if task is None or task_id in self._owned:
+            return task
+        task = task.copy()
+        self.tasks[task_id] = task
+        self.taskset.tasks[self.positions[task_id]] = task
+        self._owned.add(task_id)
+        return task
+    
+    def mark(self, task: Task) -> None:
+        """
+        Update the counters of a task's dependents after its state changed
+        
+        Only transitions into or out of DONE touch the counters, and only
+        those of the task's direct dependents.
+        
+        Args:
+            task: A task whose state was changed in place
+        """
+        done = task.state == TaskState.DONE
+        if done == (task.id in self._done):
+            return
+        
+        if done:
+            self._done.add(task.id)
+            delta = -1
+        else:
+            self._done.discard(task.id)
+            delta = 1
+        for dependent_id in self.dependents.get(task.id, ()):
+            self.unmet[dependent_id] += delta
+    
+    def update(self, tasks: List[Task], version: int) -> None:
+        """
+        Apply in-place task changes
+        
+        Args:
+            tasks: The changed tasks
+            version: The taskset version after the change
+        """
+        for task in tasks:
+            self.mark(task)
+        self.version = version
+    
+    def unblockable_dependents(self, task_id: str) -> List[Task]:
+        """
+        Get BLOCKED direct dependents whose dependencies are all DONE
+        
+        Args:
+            task_id: ID of a task that was completed
+        
+        Returns:
+            The dependents that can move to READY, in taskset dependency order
+        """
+        result = []
+        seen: Set[str] = set()
+        for dependent_id in self.dependents.get(task_id, ()):
+            if dependent_id in seen:
+                continue
+            seen.add(dependent_id)
+            dependent = self.tasks[dependent_id]
+            if dependent.state == TaskState.BLOCKED and self.unmet[dependent_id] == 0:
+                result.append(dependent)
+        return result
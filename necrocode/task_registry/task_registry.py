@@ -4,10 +4,18 @@ TaskRegistry - Main API for task management
 Provides the primary interface for managing tasksets, task states, events, and synchronization.
 """
 
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict
+from contextlib import ExitStack, contextmanager, nullcontext
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Dict, Generator, List, Optional, Tuple, Any
 from datetime import datetime
 
+from necrocode.lock_metrics import LockMetrics
+
 from .models import (
     Task,
     TaskState,
@@ -17,20 +25,32 @@ from .models import (
     Artifact,
     ArtifactType,
 )
+from .batch import AddArtifact, BatchOperation, StateTransition, UpdateMetadata
 from .config import RegistryConfig
 from .task_store import TaskStore
 from .event_store import EventStore
+from .change_feed import EventCursor, EventSubscription
+from .sqlite_store import SQLiteTaskStore, SQLiteEventStore
+from .event_sourcing import EventSourcedTaskStore
+from .serializers import get_serializer
+from .taskset_cache import TasksetCache
 from .lock_manager import LockManager
 from .kiro_sync import KiroSyncManager, TaskDefinition, SyncResult
 from .query_engine import QueryEngine
-from .graph_visualizer import GraphVisualizer
+from .task_index import DependencyIndex
+from .dependency_validator import validate_dependencies
+from .scheduling import DurationHistory, SchedulingPolicy, get_policy
+from .graph_visualizer import ExecutionPlan, GraphVisualizer
 from .exceptions import (
     TaskRegistryError,
     TaskNotFoundError,
     TasksetNotFoundError,
     InvalidStateTransitionError,
+    VersionConflictError,
 )
 
+logger = logging.getLogger(__name__)
+
 
 class TaskRegistry:
     """
@@ -64,12 +84,144 @@ class TaskRegistry:
         self.config.ensure_directories()
         
         # コンポーネントの初期化
-        self.task_store = TaskStore(config.tasksets_dir)
-        self.event_store = EventStore(config.events_dir)
-        self.lock_manager = LockManager(config.locks_dir)
+        self.taskset_cache = (
+            TasksetCache(config.taskset_cache_size)
+            if config.taskset_cache_size > 0 else None
+        )
+        if config.storage_backend == "sqlite":
+            self.task_store = SQLiteTaskStore(
+                config.tasksets_dir,
+                config.database_path,
+                busy_timeout=config.lock_timeout,
+                cache=self.taskset_cache
+            )
+            self.event_store = SQLiteEventStore(
+                config.events_dir,
+                config.database_path,
+                busy_timeout=config.lock_timeout
+            )
+        else:
+            self.event_store = EventStore(
+                config.events_dir,
+                buffered=config.event_buffering,
+                flush_bytes=config.event_flush_bytes,
+                flush_interval=config.event_flush_interval,
+                fsync=config.event_fsync,
+                segment_policy=config.segment_policy
+            )
+            if config.persistence_mode == "event_sourced":
+                self.task_store = EventSourcedTaskStore(
+                    config.tasksets_dir,
+                    self.event_store,
+                    snapshot_interval=config.snapshot_interval,
+                    cache=self.taskset_cache,
+                    serializer=get_serializer(config.taskset_format)
+                )
+            else:
+                self.task_store = TaskStore(
+                    config.tasksets_dir,
+                    incremental=config.persistence_mode == "incremental",
+                    journal_compact_threshold=config.journal_compact_threshold,
+                    cache=self.taskset_cache,
+                    serializer=get_serializer(config.taskset_format)
+                )
+        self.lock_manager = LockManager(
+            config.locks_dir,
+            metrics=LockMetrics(enabled=config.lock_metrics)
+        )
+        # 書き込みと競合し続けた読み込みは共有ロックを取得して読み直す
+        self.task_store.read_lock = self._read_lock
         self.kiro_sync = KiroSyncManager(self)
         self.query_engine = QueryEngine(self.task_store)
         self.graph_visualizer = GraphVisualizer()
+        # spec_name -> キャッシュされたTasksetの依存関係インデックス
+        self._dependency_indexes: "OrderedDict[str, DependencyIndex]" = OrderedDict()
+        self._dependency_index_lock = threading.Lock()
+        # ポリシー名 -> SchedulingPolicy（指標のキャッシュを保持する）
+        self._scheduling_policies: Dict[str, SchedulingPolicy] = {}
+        self.duration_history = DurationHistory(self.event_store)
+        # spec_name -> 同じプロセス内の書き込みを直列化するロック（optimisticモード）
+        self._spec_mutexes: Dict[str, threading.RLock] = {}
+        self._spec_mutexes_lock = threading.Lock()
+    
+    @contextmanager
+    def _write_lock(self, spec_name: str) -> Generator[None, None, None]:
+        """
+        書き込み用にspecのロックを取得
+        
+        クリティカルセクションが例外で終了した場合は、次の読み込みで保存済みの
+        状態を読み直すようキャッシュを破棄する。
+        バッファ中のイベントはロック解放前に書き込む。
+        optimisticモードでは、同じプロセス内の楽観的書き込みと競合しないよう
+        specのプロセス内のロック（_spec_mutex()）も取得する。
+        
+        Args:
+            spec_name: Spec名
+        """
+        if self.config.write_concurrency == "optimistic":
+            mutex = self._spec_mutex(spec_name)
+        else:
+            mutex = nullcontext()
+        with mutex, self.lock_manager.acquire_lock(
+            spec_name,
+            timeout=self.config.lock_timeout,
+            retry_interval=self.config.lock_retry_interval
+        ):
+            try:
+                yield
+            except Exception:
+                self.task_store.invalidate_cache(spec_name)
+                raise
+            finally:
+                self.event_store.flush(spec_name)
+    
+    def _spec_mutex(self, spec_name: str) -> threading.RLock:
+        """
+        specに書き込むスレッドを直列化するプロセス内のロックを取得
+        
+        Args:
+            spec_name: Spec名
+        
+        Returns:
+            threading.RLock
+        """
+        with self._spec_mutexes_lock:
+            mutex = self._spec_mutexes.get(spec_name)
+            if mutex is None:
+                mutex = self._spec_mutexes[spec_name] = threading.RLock()
+            return mutex
+    
+    @contextmanager
+    def _read_lock(self, spec_name: str) -> Generator[None, None, None]:
+        """
+        読み込み用にspecの共有ロックを取得
+        
+        共有ロック同士は互いに待たず、書き込み中のロックの解放だけを待つ。
+        通常の読み込みはロックを取得しない（TaskStoreのスナップショット読み込み）。
+        
+        Args:
+            spec_name: Spec名
+        """
+        with self.lock_manager.acquire_lock(
+            spec_name,
+            timeout=self.config.lock_timeout,
+            retry_interval=self.config.lock_retry_interval,
+            shared=True
+        ):
+            yield
+    
+    def close(self) -> None:
+        """
+        バッファ中のイベントを書き込み、開いているリソースを解放
+        
+        ロックの統計はlocks/metrics/へ保存する（necrocode lock-statsで集計）。
+        SQLiteバックエンドでは全スレッドのデータベース接続を閉じる。
+        """
+        try:
+            self.event_store.close()
+        finally:
+            self.task_store.close()
+        self.lock_manager.save_metrics()
     
     def create_taskset(
         self,
@@ -84,22 +236,23 @@ class TaskRegistry:
             spec_name: Spec名
             tasks: タスク定義のリスト
             metadata: タスクセットのメタデータ
-            
+        
         Returns:
             作成されたTaskset
-            
+        
         Raises:
+            CircularDependencyError: 依存関係に循環がある場合
             TaskRegistryError: タスクセットの作成に失敗した場合
         """
-        with self.lock_manager.acquire_lock(
-            spec_name,
-            timeout=self.config.lock_timeout,
-            retry_interval=self.config.lock_retry_interval
-        ):
+        report = validate_dependencies({task_def.id: task_def.dependencies for task_def in tasks})
+        for message in report.dangling_messages():
+            logger.warning("%s (spec: %s)", message, spec_name)
+        
+        with self._write_lock(spec_name):
             # 既存のタスクセットがある場合はバージョンをインクリメント
             version = 1
             if self.task_store.taskset_exists(spec_name):
-                existing = self.task_store.load_taskset(spec_name)
+                existing = self.task_store.load_shared_taskset(spec_name)
                 version = existing.version + 1
             
             # TaskDefinitionからTaskオブジェクトを作成
@@ -136,34 +289,58 @@ class TaskRegistry:
             # 保存
             self.task_store.save_taskset(taskset)
             
-            # イベントを記録
-            for task in task_objects:
-                event = TaskEvent(
+            # イベントをまとめて記録
+            self.event_store.record_events([
+                TaskEvent(
                     event_type=EventType.TASK_CREATED,
                     spec_name=spec_name,
                     task_id=task.id,
                     timestamp=now,
-                    details={"title": task.title, "state": task.state.value}
+                    details={"title": task.title, "state": task.state.value, "version": version}
                 )
-                self.event_store.record_event(event)
+                for task in task_objects
+            ])
             
-            return taskset
+            # 保存したTasksetはキャッシュと共有されるため、呼び出し元にはコピーを返す
+            return taskset.copy() if self.task_store.cache is not None else taskset
     
     def get_taskset(self, spec_name: str) -> Taskset:
         """
         タスクセットを取得
         
+        ロックを取得せずに一貫したスナップショットを読み込むため、書き込みを
+        待たせない。返すTasksetは呼び出し元専用のコピーで、その後の書き込みでは
+        変わらず、変更しても保存されない。
+        
         Args:
             spec_name: Spec名
-            
+        
         Returns:
             Taskset
-            
+        
         Raises:
             TasksetNotFoundError: タスクセットが存在しない場合
         """
         return self.task_store.load_taskset(spec_name)
     
+    def snapshot_taskset(self, spec_name: str) -> Taskset:
+        """
+        タスクセットの現在の状態をtaskset.jsonへ書き出す
+        
+        event_sourcedモードではスナップショット以降のイベントの再生が不要になり、
+        incrementalモードではジャーナルが畳み込まれる。
+        
+        Args:
+            spec_name: Spec名
+        
+        Returns:
+            書き出したTaskset
+        """
+        with self._write_lock(spec_name):
+            taskset = self.task_store.load_taskset(spec_name)
+            self.task_store.compact(taskset)
+            return taskset.copy() if self.task_store.cache is not None else taskset
+    
     def update_task_state(
         self,
         spec_name: str,
@@ -179,71 +356,293 @@ class TaskRegistry:
             task_id: タスクID
             new_state: 新しい状態
             metadata: 状態遷移に関するメタデータ（assigned_slot, reserved_branch, runner_id等）
-            
+        
         Raises:
             TaskNotFoundError: タスクが存在しない場合
             InvalidStateTransitionError: 無効な状態遷移の場合
         """
-        with self.lock_manager.acquire_lock(
-            spec_name,
-            timeout=self.config.lock_timeout,
-            retry_interval=self.config.lock_retry_interval
-        ):
-            # タスクセットを取得
-            taskset = self.task_store.load_taskset(spec_name)
-            
-            # タスクを検索
-            task = None
-            for t in taskset.tasks:
-                if t.id == task_id:
-                    task = t
-                    break
-            
+        self.apply_batch(spec_name, [StateTransition(task_id, new_state, metadata)])
+    
+    def apply_batch(
+        self,
+        spec_name: str,
+        operations: List[BatchOperation]
+    ) -> List[TaskEvent]:
+        """
+        複数の操作を1つのトランザクションとして適用
+        
+        ロックの取得・タスクセットの読み込み・保存・イベントの追記をそれぞれ1回だけ行う。
+        操作は記述順に適用し、いずれかが無効な場合は何も保存しない。
+        
+        Args:
+            spec_name: Spec名
+            operations: StateTransition / AddArtifact / UpdateMetadata のリスト
+        
+        Returns:
+            記録したイベント（操作の順）
+        
+        Raises:
+            TaskNotFoundError: タスクが存在しない場合
+            InvalidStateTransitionError: 無効な状態遷移の場合
+        """
+        return self.apply_batches({spec_name: operations})[spec_name]
+    
+    def apply_batches(
+        self,
+        batches: Dict[str, List[BatchOperation]]
+    ) -> Dict[str, List[TaskEvent]]:
+        """
+        複数のSpecに対する操作をまとめて適用
+        
+        デッドロックを避けるため、ロックはSpec名の順に取得する。すべてのSpecの
+        操作を検証してから保存するため、無効な操作があればどのSpecも変更しない。
+        optimisticモードでも、Specをまたぐ原子性を保つため複数Specの場合はロックする。
+        
+        Args:
+            batches: Spec名 -> 操作のリスト
+        
+        Returns:
+            Spec名 -> 記録したイベント
+        
+        Raises:
+            TaskNotFoundError: タスクが存在しない場合
+            InvalidStateTransitionError: 無効な状態遷移の場合
+        """
+        if self.config.write_concurrency == "optimistic" and len(batches) == 1:
+            [(spec_name, operations)] = batches.items()
+            return {spec_name: self._apply_batch_optimistic(spec_name, operations)}
+        
+        spec_names = sorted(batches)
+        with ExitStack() as stack:
+            for spec_name in spec_names:
+                stack.enter_context(self._write_lock(spec_name))
+            
+            staged = []
+            for spec_name in spec_names:
+                base = self.task_store.load_shared_taskset(spec_name)
+                staged.append((base,) + self._stage_operations(base, batches[spec_name]))
+            
+            results = {}
+            for base, taskset, changed_tasks, events, dependency_index in staged:
+                if events:
+                    # 変更されたタスクのみを保存し、イベントは1回で追記
+                    self.task_store.save_tasks(taskset, changed_tasks)
+                    self._publish_staged(base, taskset, changed_tasks, dependency_index)
+                    self.event_store.record_events(events)
+                results[taskset.spec_name] = events
+            return results
+    
+    def _apply_batch_optimistic(
+        self,
+        spec_name: str,
+        operations: List[BatchOperation]
+    ) -> List[TaskEvent]:
+        """
+        楽観的並行制御で1つのSpecに操作を適用
+        
+        ロックを取得せずに読み込んで操作をコピーに適用し、保存済みのバージョンが
+        読み込んだ時点から変わっていない場合のみ保存してキャッシュに反映する。
+        specのロックはバージョンの比較と保存・イベントの追記の間だけ保持する。
+        競合した場合は待機して読み込みからやり直す（待機時間は再試行ごとに倍増し、
+        ジッターを加える）。
+        
+        Args:
+            spec_name: Spec名
+            operations: 操作のリスト
+        
+        Returns:
+            記録したイベント（操作の順）
+        
+        Raises:
+            VersionConflictError: 再試行の上限まで競合した場合
+            TaskNotFoundError: タスクが存在しない場合
+            InvalidStateTransitionError: 無効な状態遷移の場合
+        """
+        conflicts = 0
+        while True:
+            # 同じプロセス内の書き込み同士はバージョン競合させずに直列化する
+            with self._spec_mutex(spec_name):
+                base = self.task_store.load_shared_taskset(spec_name)
+                try:
+                    taskset, changed_tasks, events, dependency_index = self._stage_operations(base, operations)
+                    if not events:
+                        return events
+                    with self._write_lock(spec_name):
+                        # 保存に成功するまでキャッシュ済みのTasksetは変わらない
+                        self.task_store.save_tasks_if_version(taskset, changed_tasks, base.version)
+                        self._publish_staged(base, taskset, changed_tasks, dependency_index)
+                        self.event_store.record_events(events)
+                except VersionConflictError as e:
+                    self.task_store.invalidate_cache(spec_name)
+                    conflict = e
+                else:
+                    self.lock_manager.metrics.record_cas(spec_name, conflicts, committed=True)
+                    return events
+            
+            conflicts += 1
+            if conflicts > self.config.optimistic_max_retries:
+                self.lock_manager.metrics.record_cas(spec_name, conflicts, committed=False)
+                raise conflict
+            logger.debug(
+                "Version conflict on '%s' (expected %d, found %s), retrying",
+                spec_name, conflict.expected_version, conflict.actual_version
+            )
+            backoff = min(
+                self.config.optimistic_backoff_max,
+                self.config.optimistic_backoff * 2 ** (conflicts - 1)
+            )
+            time.sleep(random.uniform(0, backoff))
+    
+    def _stage_operations(
+        self,
+        base: Taskset,
+        operations: List[BatchOperation]
+    ) -> Tuple[Taskset, List[Task], List[TaskEvent], DependencyIndex]:
+        """
+        操作を検証しながらタスクセットのコピーに適用
+        
+        読み込んだタスクセットはキャッシュと共有されているため変更せず、タスクの
+        リストだけをコピーしたタスクセットに、変更するタスクのコピーを置いて適用する。
+        保存に成功するまで他の読み込みからは変更が見えず、例外で終了した場合は
+        コピーを捨てるだけでよい。
+        操作ごとにバージョンを1つ進め、各イベントに記録する（イベントからの再構築に使用）。
+        
+        Args:
+            base: ロックを保持して（optimisticモードではロックなしで）読み込んだタスクセット
+            operations: 操作のリスト
+        
+        Returns:
+            (変更後のタスクセット, 変更されたタスク, イベント, 変更後のタスクセットの依存関係インデックス)
+        
+        Raises:
+            TaskNotFoundError: タスクが存在しない場合
+            InvalidStateTransitionError: 無効な状態遷移の場合
+        """
+        taskset = base.copy(share_tasks=True)
+        dependency_index = self._get_dependency_index(base).fork(taskset)
+        spec_name = taskset.spec_name
+        now = datetime.now()
+        version = taskset.version
+        # タスクID -> 変更されたタスク（最初に変更された順）
+        changed: Dict[str, Task] = {}
+        events = []
+        
+        for operation in operations:
+            task = dependency_index.writable(operation.task_id)
             if task is None:
-                raise TaskNotFoundError(task_id, spec_name)
+                raise TaskNotFoundError(operation.task_id, spec_name)
+            version += 1
             
-            # 状態遷移の妥当性を検証
-            old_state = task.state
-            self._validate_state_transition(task, new_state)
-            
-            # 状態を更新
-            task.state = new_state
-            task.updated_at = datetime.now()
-            
-            # Running状態への遷移時にメタデータを記録
-            if new_state == TaskState.RUNNING and metadata:
-                if "assigned_slot" in metadata:
-                    task.assigned_slot = metadata["assigned_slot"]
-                if "reserved_branch" in metadata:
-                    task.reserved_branch = metadata["reserved_branch"]
-                if "runner_id" in metadata:
-                    task.runner_id = metadata["runner_id"]
+            if isinstance(operation, StateTransition):
+                new_state = operation.new_state
+                metadata = operation.metadata
+                
+                # 状態遷移の妥当性を検証
+                old_state = task.state
+                self._validate_state_transition(task, new_state)
+                
+                task.state = new_state
+                task.updated_at = now
+                
+                # Running状態への遷移時にメタデータを記録
+                if new_state == TaskState.RUNNING and metadata:
+                    if "assigned_slot" in metadata:
+                        task.assigned_slot = metadata["assigned_slot"]
+                    if "reserved_branch" in metadata:
+                        task.reserved_branch = metadata["reserved_branch"]
+                    if "runner_id" in metadata:
+                        task.runner_id = metadata["runner_id"]
+                
+                # Done状態への遷移時に依存タスクのBlocked状態を解除
+                unblocked = []
+                if new_state == TaskState.DONE:
+                    unblocked = self._unblock_dependent_tasks(dependency_index, task, now)
+                else:
+                    dependency_index.mark(task)
+                for unblocked_task in unblocked:
+                    changed.setdefault(unblocked_task.id, unblocked_task)
+                
+                # versionとunblockedはイベントからの再構築に使用
+                event_type = self._get_event_type_for_state(new_state)
+                details = {
+                    "old_state": old_state.value,
+                    "new_state": new_state.value,
+                    **(metadata or {}),
+                    "version": version,
+                    "unblocked": [t.id for t in unblocked],
+                }
             
-            # Done状態への遷移時に依存タスクのBlocked状態を解除
-            if new_state == TaskState.DONE:
-                self._unblock_dependent_tasks(taskset, task_id)
+            elif isinstance(operation, AddArtifact):
+                metadata = operation.metadata
+                artifact = Artifact(
+                    type=operation.artifact_type,
+                    uri=operation.uri,
+                    size_bytes=metadata.get("size_bytes") if metadata else None,
+                    created_at=now,
+                    metadata=metadata or {}
+                )
+                task.artifacts.append(artifact)
+                task.updated_at = now
+                
+                event_type = EventType.TASK_UPDATED
+                details = {
+                    "action": "artifact_added",
+                    "artifact_type": operation.artifact_type.value,
+                    "uri": operation.uri,
+                    "artifact": artifact.to_dict(),
+                    "version": version,
+                }
             
-            # バージョンをインクリメント
-            taskset.version += 1
-            taskset.updated_at = datetime.now()
+            elif isinstance(operation, UpdateMetadata):
+                task.metadata.update(operation.metadata)
+                task.updated_at = now
+                
+                event_type = EventType.TASK_UPDATED
+                details = {
+                    "action": "metadata_updated",
+                    "metadata": dict(operation.metadata),
+                    "version": version,
+                }
             
-            # タスクセットを保存
-            self.task_store.save_taskset(taskset)
+            else:
+                raise TypeError(f"Unsupported batch operation: {operation!r}")
             
-            # イベントを記録
-            event_type = self._get_event_type_for_state(new_state)
-            event = TaskEvent(
+            changed.setdefault(task.id, task)
+            events.append(TaskEvent(
                 event_type=event_type,
                 spec_name=spec_name,
-                task_id=task_id,
-                timestamp=datetime.now(),
-                details={
-                    "old_state": old_state.value,
-                    "new_state": new_state.value,
-                    **(metadata or {})
-                }
-            )
-            self.event_store.record_event(event)
+                task_id=task.id,
+                timestamp=now,
+                details=details
+            ))
+        
+        if events:
+            taskset.version = version
+            taskset.updated_at = now
+        return taskset, list(changed.values()), events, dependency_index
+    
+    def _publish_staged(
+        self,
+        base: Taskset,
+        taskset: Taskset,
+        changed_tasks: List[Task],
+        dependency_index: DependencyIndex
+    ) -> None:
+        """
+        保存した変更後のタスクセットにインデックスを切り替える（保存後に呼び出す）
+        
+        Args:
+            base: 変更前のタスクセット
+            taskset: 保存した変更後のタスクセット
+            changed_tasks: 変更されたタスク
+            dependency_index: _stage_operations()が返した依存関係インデックス
+        """
+        self.query_engine.refresh_tasks(taskset, changed_tasks, base)
+        dependency_index.update(changed_tasks, taskset.version)
+        if self.task_store.cache is None:
+            return
+        with self._dependency_index_lock:
+            self._dependency_indexes[taskset.spec_name] = dependency_index
     
     def _validate_state_transition(self, task: Task, new_state: TaskState) -> None:
         """
@@ -252,7 +651,7 @@ class TaskRegistry:
         Args:
             task: タスク
             new_state: 新しい状態
-            
+        
         Raises:
             InvalidStateTransitionError: 無効な状態遷移の場合
         """
@@ -278,33 +677,68 @@ class TaskRegistry:
                 new_state.value
             )
     
-    def _unblock_dependent_tasks(self, taskset: Taskset, completed_task_id: str) -> None:
+    def _get_dependency_index(self, taskset: Taskset) -> DependencyIndex:
+        """
+        読み込んだTasksetの依存関係インデックスを取得（古い場合は再構築）
+        
+        返すインデックスは読み込み専用で、変更する場合はfork()する。
+        
+        TaskStoreがTasksetをキャッシュする場合のみインデックスを保持する。
+        キャッシュがない場合は読み込みごとに別のオブジェクトになるため毎回構築する。
+        
+        Args:
+            taskset: 読み込んだタスクセット
+        
+        Returns:
+            DependencyIndex
+        """
+        if self.task_store.cache is None:
+            return DependencyIndex(taskset)
+        
+        spec_name = taskset.spec_name
+        with self._dependency_index_lock:
+            index = self._dependency_indexes.get(spec_name)
+            if index is None or not index.is_current(taskset):
+                index = DependencyIndex(taskset)
+                self._dependency_indexes[spec_name] = index
+            
+            self._dependency_indexes.move_to_end(spec_name)
+            while len(self._dependency_indexes) > self.task_store.cache.max_entries:
+                self._dependency_indexes.popitem(last=False)
+            return index
+    
+    def _unblock_dependent_tasks(
+        self,
+        index: DependencyIndex,
+        completed: Task,
+        now: Optional[datetime] = None
+    ) -> List[Task]:
         """
         完了したタスクに依存するタスクのBlocked状態を解除
         
+        逆依存マップと未完了の依存数のカウンタを使い、完了したタスクの
+        直接の依存元だけを確認する。
+        
         Args:
-            taskset: タスクセット
-            completed_task_id: 完了したタスクのID
-        """
-        for task in taskset.tasks:
-            if task.state == TaskState.BLOCKED and completed_task_id in task.dependencies:
-                # すべての依存タスクが完了しているか確認
-                all_deps_done = True
-                for dep_id in task.dependencies:
-                    dep_task = None
-                    for t in taskset.tasks:
-                        if t.id == dep_id:
-                            dep_task = t
-                            break
-                    
-                    if dep_task is None or dep_task.state != TaskState.DONE:
-                        all_deps_done = False
-                        break
-                
-                # すべての依存タスクが完了していればREADYに遷移
-                if all_deps_done:
-                    task.state = TaskState.READY
-                    task.updated_at = datetime.now()
+            index: 変更中のタスクセットの依存関係インデックス（DependencyIndex.fork()）
+            completed: 完了したタスク
+            now: 解除したタスクに記録する更新時刻（Noneの場合は現在時刻）
+        
+        Returns:
+            READYに遷移したタスクのリスト
+        """
+        index.mark(completed)
+        
+        unblocked = [
+            index.writable(task.id)
+            for task in index.unblockable_dependents(completed.id)
+        ]
+        updated_at = now or datetime.now()
+        for task in unblocked:
+            task.state = TaskState.READY
+            task.updated_at = updated_at
+        
+        return unblocked
     
     def _get_event_type_for_state(self, state: TaskState) -> EventType:
         """
@@ -312,7 +746,7 @@ class TaskRegistry:
         
         Args:
             state: タスクの状態
-            
+        
         Returns:
             EventType
         """
@@ -327,17 +761,30 @@ class TaskRegistry:
     def get_ready_tasks(
         self,
         spec_name: str,
-        required_skill: Optional[str] = None
+        required_skill: Optional[str] = None,
+        policy: Optional[str] = None,
+        use_history: Optional[bool] = None
     ) -> List[Task]:
         """
         実行可能なタスクを取得
         
+        返すタスクは呼び出し元専用のコピーで、その後の書き込みでは変わらず、
+        変更してもキャッシュや他の読み手には影響しない。
+        
         Args:
             spec_name: Spec名
             required_skill: 必要スキルでフィルタリング（Noneの場合はすべて）
-            
+            policy: 並び順のスケジューリングポリシー（Noneの場合は設定の既定値）
+                "critical_path": 残りの最長パス・推移的な依存元の数・優先度の順
+                "priority": 優先度の順
+                "dependencies": 依存関係の少ない順
+            use_history: イベントログの実績から所要時間を推定するか（Noneの場合は設定値）
+        
         Returns:
-            Ready状態のタスクのリスト
+            Ready状態のタスクのリスト（実行すべき順）
+        
+        Raises:
+            ValueError: 不明なポリシー名の場合
         """
         # QueryEngineを使用してReady状態のタスクを取得
         ready_tasks = self.query_engine.filter_by_state(spec_name, TaskState.READY)
@@ -349,11 +796,36 @@ class TaskRegistry:
                 if task.required_skill == required_skill
             ]
         
-        # 依存関係を考慮した実行順序でソート
-        # 依存関係が少ないタスクを優先
-        ready_tasks = sorted(ready_tasks, key=lambda t: len(t.dependencies))
+        if not ready_tasks:
+            return ready_tasks
+        
+        scheduler = self.get_scheduling_policy(policy or self.config.scheduling_policy)
+        if not scheduler.uses_graph:
+            return scheduler.rank(ready_tasks)
+        
+        taskset = self.task_store.load_shared_taskset(spec_name)
+        if use_history is None:
+            use_history = self.config.scheduling_use_history
+        durations = self.duration_history.estimates(taskset) if use_history else None
+        return scheduler.rank(ready_tasks, taskset, durations)
+    
+    def get_scheduling_policy(self, name: str) -> SchedulingPolicy:
+        """
+        スケジューリングポリシーを取得（レジストリ内で共有される）
         
-        return ready_tasks
+        Args:
+            name: ポリシー名
+        
+        Returns:
+            SchedulingPolicy
+        
+        Raises:
+            ValueError: 不明なポリシー名の場合
+        """
+        scheduler = self._scheduling_policies.get(name)
+        if scheduler is None:
+            scheduler = self._scheduling_policies.setdefault(name, get_policy(name))
+        return scheduler
     
     def add_artifact(
         self,
@@ -372,61 +844,49 @@ class TaskRegistry:
             artifact_type: 成果物のタイプ
             uri: 成果物のURI
             metadata: 成果物のメタデータ（サイズ、作成日時等）
-            
+        
         Raises:
             TaskNotFoundError: タスクが存在しない場合
         """
-        with self.lock_manager.acquire_lock(
+        self.apply_batch(spec_name, [AddArtifact(task_id, artifact_type, uri, metadata)])
+    
+    def subscribe(
+        self,
+        spec_name: str,
+        name: Optional[str] = None,
+        cursor: Optional[EventCursor] = None,
+        from_end: bool = False,
+        task_id: Optional[str] = None,
+        event_types: Optional[List[EventType]] = None,
+        poll_interval: float = 0.05
+    ) -> EventSubscription:
+        """
+        Specのイベント（状態遷移・成果物の追加等）を購読
+        
+        タスクセットを読み直さずに、イベントログをカーソルの位置から追跡して
+        コールバック（poll()/run()）または async for で配信する（at-least-once）。
+        
+        Args:
+            spec_name: Spec名
+            name: 購読名（指定した場合はカーソルを保存し、次回はその位置から再開する）
+            cursor: 開始位置（保存されたカーソルより優先）
+            from_end: 開始位置も保存されたカーソルもない場合、Trueなら現在の末尾から配信する
+            task_id: タスクID（指定した場合はそのタスクのイベントのみ）
+            event_types: イベントタイプ（指定した場合はいずれかに一致するイベントのみ）
+            poll_interval: 他のプロセスの書き込みを確認する間隔（秒）
+        
+        Returns:
+            EventSubscription（close()で購読を終了する）
+        """
+        return self.event_store.subscribe(
             spec_name,
-            timeout=self.config.lock_timeout,
-            retry_interval=self.config.lock_retry_interval
-        ):
-            # タスクセットを取得
-            taskset = self.task_store.load_taskset(spec_name)
-            
-            # タスクを検索
-            task = None
-            for t in taskset.tasks:
-                if t.id == task_id:
-                    task = t
-                    break
-            
-            if task is None:
-                raise TaskNotFoundError(task_id, spec_name)
-            
-            # 成果物を作成
-            artifact = Artifact(
-                type=artifact_type,
-                uri=uri,
-                size_bytes=metadata.get("size_bytes") if metadata else None,
-                created_at=datetime.now(),
-                metadata=metadata or {}
-            )
-            
-            # タスクに成果物を追加
-            task.artifacts.append(artifact)
-            task.updated_at = datetime.now()
-            
-            # バージョンをインクリメント
-            taskset.version += 1
-            taskset.updated_at = datetime.now()
-            
-            # タスクセットを保存
-            self.task_store.save_taskset(taskset)
-            
-            # イベントを記録
-            event = TaskEvent(
-                event_type=EventType.TASK_UPDATED,
-                spec_name=spec_name,
-                task_id=task_id,
-                timestamp=datetime.now(),
-                details={
-                    "action": "artifact_added",
-                    "artifact_type": artifact_type.value,
-                    "uri": uri
-                }
-            )
-            self.event_store.record_event(event)
+            name=name,
+            cursor=cursor,
+            from_end=from_end,
+            task_id=task_id,
+            event_types=event_types,
+            poll_interval=poll_interval
+        )
     
     def sync_with_kiro(self, spec_name: str, tasks_md_path: Optional[Path] = None) -> SyncResult:
         """
@@ -435,7 +895,7 @@ class TaskRegistry:
         Args:
             spec_name: Spec名
             tasks_md_path: tasks.mdファイルのパス（Noneの場合は自動検出）
-            
+        
         Returns:
             同期結果
         """
@@ -459,14 +919,14 @@ class TaskRegistry:
         
         Args:
             spec_name: Spec名
-            
+        
         Returns:
             DOT形式の文字列
-            
+        
         Raises:
             TasksetNotFoundError: タスクセットが存在しない場合
         """
-        taskset = self.get_taskset(spec_name)
+        taskset = self.task_store.load_shared_taskset(spec_name)
         return self.graph_visualizer.generate_dot(taskset)
     
     def export_dependency_graph_mermaid(self, spec_name: str) -> str:
@@ -475,14 +935,14 @@ class TaskRegistry:
         
         Args:
             spec_name: Spec名
-            
+        
         Returns:
             Mermaid形式の文字列
-            
+        
         Raises:
             TasksetNotFoundError: タスクセットが存在しない場合
         """
-        taskset = self.get_taskset(spec_name)
+        taskset = self.task_store.load_shared_taskset(spec_name)
         return self.graph_visualizer.generate_mermaid(taskset)
     
     def get_execution_order(self, spec_name: str) -> List[List[str]]:
@@ -491,12 +951,28 @@ class TaskRegistry:
         
         Args:
             spec_name: Spec名
-            
+        
         Returns:
             実行順序のリスト（各要素は並列実行可能なタスクIDのリスト）
-            
+        
         Raises:
             TasksetNotFoundError: タスクセットが存在しない場合
         """
-        taskset = self.get_taskset(spec_name)
+        taskset = self.task_store.load_shared_taskset(spec_name)
         return self.graph_visualizer.get_execution_order(taskset)
+    
+    def get_execution_plan(self, spec_name: str) -> ExecutionPlan:
+        """
+        依存関係を考慮した実行計画を取得
+        
+        Args:
+            spec_name: Spec名
+        
+        Returns:
+            実行レベル、クリティカルパス、レベルごとの並列度、循環依存を含むExecutionPlan
+        
+        Raises:
+            TasksetNotFoundError: タスクセットが存在しない場合
+        """
+        taskset = self.task_store.load_shared_taskset(spec_name)
+        return self.graph_visualizer.get_execution_plan(taskset)
@@ -2,30 +2,79 @@
 TaskStore - Persistence layer for tasksets
 
 Handles saving, loading, and managing tasksets in JSON format.
+
+In incremental mode, single-task changes are appended to a per-spec journal
+(``taskset.journal.jsonl``) instead of rewriting ``taskset.json``. Each journal
+record is stamped with the taskset version it produces and appended with a
+single write on an ``O_APPEND`` descriptor. The journal is folded back into
+``taskset.json`` once it grows past the compaction threshold; its records are
+counted from the file under the write lock, so appends by other processes
+are included.
+
+Reads take no lock. ``taskset.json`` is only ever replaced by an atomic
+rename, so a reader stamps the file it opened (inode, mtime, size) and, after
+applying the journal, checks that the path still refers to that file. If a
+writer swapped the file in the meantime the read is retried, and after
+``SNAPSHOT_RETRIES`` attempts it falls back to the shared read lock.
 """
 
+import hashlib
 import json
+import os
 import shutil
 from pathlib import Path
-from typing import List, Optional
+from typing import Callable, ContextManager, Dict, List, Optional, Tuple
 from datetime import datetime
 
-from .models import Taskset
-from .exceptions import TasksetNotFoundError, TaskRegistryError
+from .models import Task, Taskset
+from .serializers import TasksetSerializer, JSONSerializer, encode, decode
+from .taskset_cache import TasksetCache
+from .exceptions import TasksetNotFoundError, TaskRegistryError, VersionConflictError
 
 
 class TaskStore:
     """TaskStore manages persistence of tasksets to the filesystem"""
     
-    def __init__(self, storage_dir: Path):
+    # find_tasks()によるインデックス検索をサポートするか
+    indexed_queries = False
+    # 書き込みと競合した読み込みをロックなしで再試行する回数
+    SNAPSHOT_RETRIES = 3
+    # ジャーナルを識別するために比較する先頭のバイト数（最初のレコードのversionとupdated_at）
+    JOURNAL_HEAD_BYTES = 64
+    # フィンガープリントでハッシュするファイルの先頭（ジャーナルは末尾）のバイト数
+    FINGERPRINT_BYTES = 4096
+    
+    def __init__(
+        self,
+        storage_dir: Path,
+        incremental: bool = False,
+        journal_compact_threshold: int = 500,
+        cache: Optional[TasksetCache] = None,
+        serializer: Optional[TasksetSerializer] = None
+    ):
         """
         Initialize TaskStore
         
         Args:
             storage_dir: Directory where tasksets will be stored
+            incremental: If True, save_tasks() appends per-task journal records
+                instead of rewriting the whole taskset
+            journal_compact_threshold: Number of journal records after which
+                the journal is compacted into taskset.json
+            cache: Optional cache of parsed tasksets shared by all readers
+            serializer: Format used to write taskset.json (compact JSON by
+                default); files in any supported format can be loaded
         """
         self.storage_dir = Path(storage_dir)
         self.storage_dir.mkdir(parents=True, exist_ok=True)
+        self.incremental = incremental
+        self.journal_compact_threshold = journal_compact_threshold
+        self.cache = cache
+        self.serializer = serializer or JSONSerializer()
+        # spec_name -> (ジャーナルのinode, 先頭のバイト列, 数えたサイズ, レコード数)
+        self._journal_lengths: Dict[str, Tuple[int, bytes, int, int]] = {}
+        # spec_name -> 共有ロックのコンテキストマネージャー（TaskRegistryが設定する）
+        self.read_lock: Optional[Callable[[str], ContextManager[None]]] = None
     
     def _get_taskset_dir(self, spec_name: str) -> Path:
         """Get the directory path for a specific taskset"""
@@ -35,13 +84,168 @@ class TaskStore:
         """Get the file path for a taskset JSON file"""
         return self._get_taskset_dir(spec_name) / "taskset.json"
     
+    def _get_journal_file(self, spec_name: str) -> Path:
+        """Get the file path for a taskset journal file"""
+        return self._get_taskset_dir(spec_name) / "taskset.journal.jsonl"
+    
+    def fingerprint(self, spec_name: str) -> Optional[tuple]:
+        """
+        Get a value that changes whenever the stored taskset changes
+        
+        Comparing fingerprints is much cheaper than loading the taskset, so
+        callers polling for changes (such as KiroWatcher) use this instead.
+        
+        Args:
+            spec_name: Name of the spec/taskset
+        
+        Returns:
+            A comparable fingerprint, or None if the taskset doesn't exist
+        """
+        return self._fingerprint(spec_name)
+    
+    def _fingerprint(self, spec_name: str) -> Optional[tuple]:
+        """
+        Get a cheap fingerprint of the stored taskset
+        
+        Atomic saves replace taskset.json with a new inode and journal writes
+        only ever grow the journal, so (inode, mtime, size) of both files
+        changes whenever the stored taskset changes. Inodes can be reused
+        within the mtime resolution, so a digest of the head of taskset.json
+        (which holds the version and updated_at) and of the tail of the
+        journal (the newest record) is included as well.
+        
+        Returns:
+            The fingerprint, or None if the taskset doesn't exist
+        """
+        base = self._file_key(self._get_taskset_file(spec_name), from_end=False)
+        if base is None:
+            return None
+        journal = self._file_key(self._get_journal_file(spec_name), from_end=True)
+        return base + (journal,)
+    
+    @classmethod
+    def _file_key(cls, path: Path, from_end: bool) -> Optional[tuple]:
+        """
+        Stat a file and hash FINGERPRINT_BYTES of its content through the same descriptor
+        
+        Args:
+            path: File to fingerprint
+            from_end: Hash the last bytes instead of the first ones
+        
+        Returns:
+            (inode, mtime, size, digest), or None if the file doesn't exist
+        """
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            return None
+        with f:
+            stat = os.fstat(f.fileno())
+            if from_end:
+                f.seek(max(stat.st_size - cls.FINGERPRINT_BYTES, 0))
+            chunk = f.read(cls.FINGERPRINT_BYTES)
+        digest = hashlib.blake2b(chunk, digest_size=16).digest()
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size, digest)
+    
+    def _cache_put(self, taskset: Taskset) -> None:
+        """
+        Store a just-written taskset in the cache
+        
+        The saved object itself becomes the shared cached taskset, so callers
+        must not modify a taskset after saving it.
+        """
+        if self.cache is not None:
+            self.cache.put(taskset.spec_name, self._fingerprint(taskset.spec_name), taskset)
+    
+    def stored_version(self, spec_name: str) -> Optional[int]:
+        """
+        Read the version of the stored taskset, ignoring in-memory changes
+        
+        The version is read from taskset.json and the last journal record on
+        every call, bypassing the cache and its fingerprint, so a caller
+        holding the spec's write lock compares against what is actually stored.
+        
+        Args:
+            spec_name: Name of the spec/taskset
+        
+        Returns:
+            The stored version, or None if the taskset doesn't exist
+        
+        Raises:
+            TaskRegistryError: If the stored files cannot be read
+        """
+        try:
+            with open(self._get_taskset_file(spec_name), 'rb') as f:
+                version = decode(f.read())["version"]
+            journal_version = self._last_journal_version(spec_name)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            raise TaskRegistryError(f"Failed to read the version of taskset '{spec_name}': {e}") from e
+        
+        if journal_version is not None and journal_version > version:
+            return journal_version
+        return version
+    
+    def _last_journal_version(self, spec_name: str) -> Optional[int]:
+        """Get the version of the newest complete journal record, or None if there is none"""
+        try:
+            with open(self._get_journal_file(spec_name), 'rb') as f:
+                lines = [line for line in f if line.endswith(b'\n')]
+        except FileNotFoundError:
+            return None
+        
+        # 壊れたレコードは読み込み時と同じく読み飛ばす
+        for line in reversed(lines):
+            try:
+                return json.loads(line)["version"]
+            except json.JSONDecodeError:
+                continue
+        return None
+    
+    def save_tasks_if_version(self, taskset: Taskset, tasks: List[Task], expected_version: int) -> None:
+        """
+        Persist changed tasks only if the stored taskset is still at expected_version
+        
+        Files offer no compare-and-swap, so the caller must hold the spec's
+        write lock across the check and the write. The stored version is read
+        from disk, never from the cache.
+        
+        Args:
+            taskset: The taskset the tasks belong to (already modified in memory)
+            tasks: The tasks that changed
+            expected_version: The version the taskset had when it was loaded
+        
+        Raises:
+            VersionConflictError: If the taskset was saved by another writer
+                after it was loaded
+            TaskRegistryError: If save operation fails
+        """
+        current_version = self.stored_version(taskset.spec_name)
+        if current_version != expected_version:
+            raise VersionConflictError(taskset.spec_name, expected_version, current_version)
+        self.save_tasks(taskset, tasks)
+    
+    def invalidate_cache(self, spec_name: str) -> None:
+        """
+        Drop a taskset from the cache
+        
+        Called when a write could not be completed, so that the next load
+        reads the stored state again.
+        
+        Args:
+            spec_name: Name of the spec/taskset
+        """
+        if self.cache is not None:
+            self.cache.invalidate(spec_name)
+    
     def save_taskset(self, taskset: Taskset) -> None:
         """
         Save a taskset to JSON file
         
         Args:
             taskset: The taskset to save
-            
+        
         Raises:
             TaskRegistryError: If save operation fails
         """
@@ -54,30 +258,244 @@ class TaskStore:
             # Update the updated_at timestamp
             taskset.updated_at = datetime.now()
             
-            # Convert to dict and save as JSON
-            data = taskset.to_dict()
+            # Convert to dict and serialize
+            data = encode(self.serializer, taskset.to_dict())
             
             # Write to temporary file first, then rename (atomic operation)
             temp_file = taskset_file.with_suffix('.tmp')
-            with open(temp_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            with open(temp_file, 'wb') as f:
+                f.write(data)
             
             # Atomic rename
             temp_file.replace(taskset_file)
             
+            # The full snapshot supersedes any journal records
+            journal_file = self._get_journal_file(taskset.spec_name)
+            if journal_file.exists():
+                journal_file.unlink()
+            self._journal_lengths.pop(taskset.spec_name, None)
+            self._cache_put(taskset)
+        
         except Exception as e:
+            self.invalidate_cache(taskset.spec_name)
             raise TaskRegistryError(f"Failed to save taskset '{taskset.spec_name}': {e}") from e
     
+    def save_tasks(self, taskset: Taskset, tasks: List[Task]) -> None:
+        """
+        Persist changes to individual tasks of a taskset
+        
+        In incremental mode only the given tasks and the taskset header are
+        appended to the journal. Otherwise (or when the journal has reached
+        the compaction threshold) the whole taskset is rewritten.
+        
+        Args:
+            taskset: The taskset the tasks belong to (already modified in memory)
+            tasks: The tasks that changed
+        
+        Raises:
+            TaskRegistryError: If save operation fails
+        """
+        spec_name = taskset.spec_name
+        
+        if not self.incremental or not self.taskset_exists(spec_name):
+            self.save_taskset(taskset)
+            return
+        
+        try:
+            fd = os.open(self._get_journal_file(spec_name), os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                needs_compaction = self._journal_length(spec_name, fd) + 1 >= self.journal_compact_threshold
+                if not needs_compaction:
+                    taskset.updated_at = datetime.now()
+                    record = {
+                        "version": taskset.version,
+                        "updated_at": taskset.updated_at.isoformat(),
+                        "metadata": taskset.metadata,
+                        "tasks": [task.to_dict() for task in tasks],
+                    }
+                    line = json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+                    
+                    # 1回のwriteで追記（O_APPENDにより行単位でアトミック）
+                    os.write(fd, line.encode('utf-8'))
+            finally:
+                os.close(fd)
+            
+            if not needs_compaction:
+                self._cache_put(taskset)
+        
+        except Exception as e:
+            self.invalidate_cache(spec_name)
+            raise TaskRegistryError(f"Failed to save tasks for '{spec_name}': {e}") from e
+        
+        if needs_compaction:
+            self.compact(taskset)
+    
+    def compact(self, taskset: Taskset) -> None:
+        """
+        Fold the journal into taskset.json
+        
+        Args:
+            taskset: The current in-memory state of the taskset
+        
+        Raises:
+            TaskRegistryError: If save operation fails
+        """
+        self.save_taskset(taskset)
+    
+    def _journal_length(self, spec_name: str, fd: int) -> int:
+        """
+        Count the records in the open journal
+        
+        Called under the spec's write lock, so the count includes records
+        appended by other processes. Only the bytes appended since the last
+        count are read while the journal is the same file (same inode and
+        same first record).
+        
+        Args:
+            spec_name: Name of the spec/taskset
+            fd: Readable descriptor of the journal
+        
+        Returns:
+            The number of complete records
+        """
+        stat = os.fstat(fd)
+        os.lseek(fd, 0, os.SEEK_SET)
+        head = os.read(fd, self.JOURNAL_HEAD_BYTES)
+        
+        position, count = 0, 0
+        known = self._journal_lengths.get(spec_name)
+        if known is not None and known[:2] == (stat.st_ino, head) and known[2] <= stat.st_size:
+            position, count = known[2], known[3]
+        
+        os.lseek(fd, position, os.SEEK_SET)
+        while position < stat.st_size:
+            chunk = os.read(fd, min(stat.st_size - position, 1 << 20))
+            if not chunk:
+                break
+            count += chunk.count(b'\n')
+            position += len(chunk)
+        
+        self._journal_lengths[spec_name] = (stat.st_ino, head, position, count)
+        return count
+    
+    def _count_journal_records(self, spec_name: str) -> int:
+        """Count the records currently stored in the journal"""
+        journal_file = self._get_journal_file(spec_name)
+        if not journal_file.exists():
+            return 0
+        with open(journal_file, 'rb') as f:
+            return sum(1 for line in f if line.endswith(b'\n'))
+    
+    def _apply_journal(self, spec_name: str, data: dict) -> dict:
+        """
+        Apply journal records newer than the base snapshot to taskset data
+        
+        Records whose version is not newer than the base are skipped, so a
+        reader racing with compaction still sees a consistent snapshot.
+        
+        Args:
+            spec_name: Name of the spec/taskset
+            data: Parsed taskset.json contents
+        
+        Returns:
+            The taskset data with journal records applied
+        """
+        journal_file = self._get_journal_file(spec_name)
+        if not journal_file.exists():
+            return data
+        
+        task_positions = {task_data["id"]: i for i, task_data in enumerate(data["tasks"])}
+        
+        with open(journal_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                # 書き込み途中の末尾行は無視
+                if not line.endswith('\n'):
+                    break
+                
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                
+                if record["version"] <= data["version"]:
+                    continue
+                
+                for task_data in record["tasks"]:
+                    position = task_positions.get(task_data["id"])
+                    if position is None:
+                        task_positions[task_data["id"]] = len(data["tasks"])
+                        data["tasks"].append(task_data)
+                    else:
+                        data["tasks"][position] = task_data
+                
+                data["version"] = record["version"]
+                data["updated_at"] = record["updated_at"]
+                if "metadata" in record:
+                    data["metadata"] = record["metadata"]
+        
+        return data
+    
     def load_taskset(self, spec_name: str) -> Taskset:
         """
-        Load a taskset from JSON file
+        Load a taskset owned by the caller
+        
+        When tasksets are cached, a copy of the cached taskset is returned,
+        so later writes do not change it and changing it does not affect
+        other readers until it is saved.
         
         Args:
             spec_name: Name of the spec/taskset to load
-            
+        
         Returns:
             The loaded Taskset object
-            
+        
+        Raises:
+            TasksetNotFoundError: If taskset doesn't exist
+            TaskRegistryError: If load operation fails
+        """
+        taskset = self.load_shared_taskset(spec_name)
+        return taskset.copy() if self.cache is not None else taskset
+    
+    def load_shared_taskset(self, spec_name: str) -> Taskset:
+        """
+        Load a taskset, serving it from the cache while storage is unchanged
+        
+        The returned object may be shared with the cache and other readers
+        and must not be modified. Writers stage their changes on a copy
+        (Taskset.copy()) and publish it by saving it.
+        
+        Args:
+            spec_name: Name of the spec/taskset to load
+        
+        Returns:
+            The loaded Taskset object (read-only)
+        
+        Raises:
+            TasksetNotFoundError: If taskset doesn't exist
+            TaskRegistryError: If load operation fails
+        """
+        # 読み込み前に取得（読み込み中の更新は次回の検証で検出される）
+        fingerprint = self._fingerprint(spec_name)
+        if self.cache is not None and fingerprint is not None:
+            cached = self.cache.get(spec_name, fingerprint)
+            if cached is not None:
+                return cached
+        
+        taskset = self._read_taskset(spec_name)
+        if self.cache is not None:
+            self.cache.put(spec_name, fingerprint, taskset)
+        return taskset
+    
+    def _read_taskset(self, spec_name: str) -> Taskset:
+        """
+        Read and parse a taskset from JSON file
+        
+        Args:
+            spec_name: Name of the spec/taskset to load
+        
+        Returns:
+            The loaded Taskset object
+        
         Raises:
             TasksetNotFoundError: If taskset doesn't exist
             TaskRegistryError: If load operation fails
@@ -88,16 +506,51 @@ class TaskStore:
             raise TasksetNotFoundError(f"Taskset '{spec_name}' not found")
         
         try:
-            with open(taskset_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            for _ in range(self.SNAPSHOT_RETRIES):
+                data, consistent = self._read_snapshot(spec_name)
+                if consistent:
+                    break
+            else:
+                # 書き込みが続いている場合は共有ロックを取得して読む
+                if self.read_lock is not None:
+                    with self.read_lock(spec_name):
+                        data, _ = self._read_snapshot(spec_name)
             
             return Taskset.from_dict(data)
-            
+        
         except json.JSONDecodeError as e:
             raise ValueError(f"Invalid JSON in taskset '{spec_name}': {e}") from e
         except Exception as e:
             raise TaskRegistryError(f"Failed to load taskset '{spec_name}': {e}") from e
     
+    def _read_snapshot(self, spec_name: str) -> Tuple[dict, bool]:
+        """
+        Read taskset.json and apply the journal without taking a lock
+        
+        Args:
+            spec_name: Name of the spec/taskset to load
+        
+        Returns:
+            (taskset data, True if taskset.json was not replaced while the
+            base file and the journal were being read)
+        """
+        taskset_file = self._get_taskset_file(spec_name)
+        with open(taskset_file, 'rb') as f:
+            stamp = os.fstat(f.fileno())
+            data = decode(f.read())
+        
+        data = self._apply_journal(spec_name, data)
+        
+        try:
+            current = os.stat(taskset_file)
+        except FileNotFoundError:
+            return data, False
+        consistent = (
+            (current.st_ino, current.st_mtime_ns, current.st_size)
+            == (stamp.st_ino, stamp.st_mtime_ns, stamp.st_size)
+        )
+        return data, consistent
+    
     def list_tasksets(self) -> List[str]:
         """
         Get list of all taskset names
@@ -124,7 +577,7 @@ class TaskStore:
         
         Args:
             spec_name: Name of the spec/taskset
-            
+        
         Returns:
             True if taskset exists, False otherwise
         """
@@ -136,7 +589,7 @@ class TaskStore:
         
         Args:
             spec_name: Name of the spec/taskset to delete
-            
+        
         Raises:
             TasksetNotFoundError: If taskset doesn't exist
             TaskRegistryError: If delete operation fails
@@ -148,6 +601,8 @@ class TaskStore:
         
         try:
             shutil.rmtree(taskset_dir)
+            self._journal_lengths.pop(spec_name, None)
+            self.invalidate_cache(spec_name)
         except Exception as e:
             raise TaskRegistryError(f"Failed to delete taskset '{spec_name}': {e}") from e
     
@@ -158,10 +613,10 @@ class TaskStore:
         Args:
             spec_name: Name of the spec/taskset to backup
             backup_dir: Directory where backup will be stored
-            
+        
         Returns:
             Path to the backup file
-            
+        
         Raises:
             TasksetNotFoundError: If taskset doesn't exist
             TaskRegistryError: If backup operation fails
@@ -182,14 +637,14 @@ class TaskStore:
             backup_path = backup_dir / backup_filename
             
             # Load taskset to verify integrity
-            taskset = self.load_taskset(spec_name)
+            taskset = self.load_shared_taskset(spec_name)
             
             # Save to backup location
             with open(backup_path, 'w', encoding='utf-8') as f:
                 json.dump(taskset.to_dict(), f, indent=2, ensure_ascii=False)
             
             return backup_path
-            
+        
         except TasksetNotFoundError:
             raise
         except Exception as e:
@@ -201,10 +656,10 @@ class TaskStore:
         
         Args:
             backup_path: Path to the backup file
-            
+        
         Returns:
             The spec_name of the restored taskset
-            
+        
         Raises:
             TaskRegistryError: If restore operation fails
         """
@@ -229,7 +684,7 @@ class TaskStore:
             self.save_taskset(taskset)
             
             return taskset.spec_name
-            
+        
         except json.JSONDecodeError as e:
             raise ValueError(f"Invalid JSON in backup file: {e}") from e
         except Exception as e:
@@ -241,7 +696,7 @@ class TaskStore:
         
         Args:
             data: The parsed JSON data from backup
-            
+        
         Returns:
             True if backup is valid, False otherwise
         """
@@ -262,3 +717,12 @@ class TaskStore:
         
         # Basic validation passed
         return True
+    
+    def close(self) -> None:
+        """
+        Release resources held by the store
+        
+        The file-based store holds none; stores backed by a database close
+        their connections.
+        """
+        return None
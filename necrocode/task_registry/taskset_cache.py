@@ -0,0 +1,102 @@
+"""
+TasksetCache - In-process cache of parsed tasksets
+
+Keeps recently loaded Taskset objects keyed by spec name, together with the
+storage fingerprint (file stat or database version) they were read at. A
+cached entry is only served while the fingerprint still matches, so writes by
+other processes are picked up on the next load.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from .models import Taskset
+
+
+class TasksetCache:
+    """LRU cache of parsed tasksets validated by storage fingerprints"""
+    
+    def __init__(self, max_entries: int = 32):
+        """
+        Initialize TasksetCache
+        
+        Args:
+            max_entries: Maximum number of tasksets kept in memory
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Hashable, Taskset]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, spec_name: str, fingerprint: Hashable) -> Optional[Taskset]:
+        """
+        Get a cached taskset if it was read at the given fingerprint
+        
+        Args:
+            spec_name: Name of the spec/taskset
+            fingerprint: Current storage fingerprint of the taskset
+        
+        Returns:
+            The cached Taskset, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(spec_name)
+            if entry is None or entry[0] != fingerprint:
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(spec_name)
+            self.hits += 1
+            return entry[1]
+    
+    def put(self, spec_name: str, fingerprint: Hashable, taskset: Taskset) -> None:
+        """
+        Store a taskset, evicting the least recently used entry if needed
+        
+        Args:
+            spec_name: Name of the spec/taskset
+            fingerprint: Storage fingerprint the taskset corresponds to
+            taskset: The parsed taskset
+        """
+        if self.max_entries <= 0:
+            return
+        
+        with self._lock:
+            self._entries[spec_name] = (fingerprint, taskset)
+            self._entries.move_to_end(spec_name)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, spec_name: str) -> None:
+        """
+        Drop the cached entry for a taskset
+        
+        Args:
+            spec_name: Name of the spec/taskset
+        """
+        with self._lock:
+            self._entries.pop(spec_name, None)
+    
+    def clear(self) -> None:
+        """Drop all cached entries"""
+        with self._lock:
+            self._entries.clear()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics
+        
+        Returns:
+            Dictionary with entries, hits, misses and hit_rate
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark memory usage of Task Registry models
+
+Loads a synthetic taskset and event log the way the registry does
+(json.loads + Taskset.from_dict(), TaskEvent.from_jsonl()) and reports the
+memory retained per task/event (measured with tracemalloc).
+
+Usage:
+    python scripts/benchmark_model_memory.py [--tasks 10000] [--events 100000]
+"""
+
+import argparse
+import gc
+import json
+import sys
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from necrocode.task_registry.models import EventType, TaskEvent, TaskState, Taskset
+
+
+def build_taskset_data(task_count: int) -> dict:
+    """ベンチマーク用のタスクセット（to_dict()形式）を生成"""
+    now = datetime.now().isoformat()
+    tasks = []
+    for i in range(task_count):
+        tasks.append({
+            "id": f"{i // 10 + 1}.{i % 10 + 1}",
+            "title": f"Task {i}",
+            "description": f"Implement feature number {i}",
+            "state": TaskState.DONE.value if i % 3 == 0 else TaskState.READY.value,
+            "dependencies": [f"{(i - 1) // 10 + 1}.{(i - 1) % 10 + 1}"] if i % 10 else [],
+            "required_skill": "backend",
+            "priority": i % 5,
+            "is_optional": False,
+            "assigned_slot": None,
+            "reserved_branch": None,
+            "runner_id": None,
+            "artifacts": [],
+            "metadata": {},
+            "created_at": now,
+            "updated_at": now,
+        })
+    return {
+        "spec_name": "benchmark",
+        "version": 1,
+        "created_at": now,
+        "updated_at": now,
+        "tasks": tasks,
+        "metadata": {},
+    }
+
+
+def build_event_lines(event_count: int, task_count: int) -> list:
+    """ベンチマーク用のイベントログ（JSON Lines）を生成"""
+    start = datetime.now()
+    return [
+        json.dumps({
+            "event_type": EventType.TASK_UPDATED.value,
+            "spec_name": "benchmark",
+            "task_id": f"{(i % task_count) // 10 + 1}.{i % 10 + 1}",
+            "timestamp": (start + timedelta(milliseconds=i)).isoformat(),
+            "details": {"new_state": TaskState.RUNNING.value, "version": i + 2},
+        })
+        for i in range(event_count)
+    ]
+
+
+def retained(func):
+    """funcの戻り値が保持しているメモリ量（バイト）を返す"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = func()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tasks", type=int, default=10000)
+    parser.add_argument("--events", type=int, default=100000)
+    args = parser.parse_args()
+
+    raw = json.dumps(build_taskset_data(args.tasks))
+    lines = build_event_lines(args.events, args.tasks)
+
+    taskset, taskset_bytes = retained(lambda: Taskset.from_dict(json.loads(raw)))
+    events, event_bytes = retained(lambda: [TaskEvent.from_jsonl(line) for line in lines])
+
+    print(f"taskset: {args.tasks} tasks, {taskset_bytes / 1024 / 1024:.1f} MiB "
+          f"({taskset_bytes / args.tasks:.0f} bytes/task)")
+    print(f"events:  {args.events} events, {event_bytes / 1024 / 1024:.1f} MiB "
+          f"({event_bytes / args.events:.0f} bytes/event)")
+
+    # タイムスタンプと空のコンテナを参照した後の増加分
+    def touch():
+        for task in taskset.tasks:
+            task.updated_at, task.metadata, task.artifacts
+        for event in events:
+            event.timestamp
+
+    _, touched_bytes = retained(touch)
+    print(f"after accessing timestamps/containers: +{touched_bytes / 1024 / 1024:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark taskset serialization formats
+
+Measures file size, save time and load time of TaskStore for every taskset
+format available in this environment.
+
+Usage:
+    python scripts/benchmark_taskset_serialization.py [--tasks 1000 10000] [--repeat 5]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from necrocode.task_registry.models import Artifact, ArtifactType, Task, TaskState, Taskset
+from necrocode.task_registry.serializers import available_formats, get_serializer
+from necrocode.task_registry.task_store import TaskStore
+
+
+def build_taskset(task_count: int) -> Taskset:
+    """ベンチマーク用のタスクセットを生成"""
+    now = datetime.now()
+    tasks = []
+    for i in range(task_count):
+        tasks.append(Task(
+            id=f"{i // 10 + 1}.{i % 10 + 1}",
+            title=f"Task {i}",
+            description=f"Implement feature number {i} with tests and documentation",
+            state=TaskState.DONE if i % 3 == 0 else TaskState.READY,
+            dependencies=[f"{(i - 1) // 10 + 1}.{(i - 1) % 10 + 1}"] if i else [],
+            created_at=now,
+            updated_at=now,
+            required_skill="backend",
+            priority=i % 5,
+            artifacts=[
+                Artifact(
+                    type=ArtifactType.DIFF,
+                    uri=f"file:///artifacts/{i}.diff",
+                    size_bytes=1024,
+                    created_at=now,
+                )
+            ] if i % 3 == 0 else [],
+            metadata={"files_to_create": [f"src/module_{i}.py"]},
+        ))
+    return Taskset(
+        spec_name="benchmark",
+        version=1,
+        created_at=now,
+        updated_at=now,
+        tasks=tasks,
+    )
+
+
+def timed(func, repeat: int) -> float:
+    """最速の実行時間（ミリ秒）を返す"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tasks", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    formats = [name for name in available_formats() if name != "auto"]
+    print(f"{'tasks':>6}  {'format':<12} {'size (KB)':>10} {'save (ms)':>10} "
+          f"{'load (ms)':>10} {'load+access (ms)':>17}")
+
+    for task_count in args.tasks:
+        taskset = build_taskset(task_count)
+        for name in formats:
+            with tempfile.TemporaryDirectory() as tmp:
+                store = TaskStore(Path(tmp), serializer=get_serializer(name))
+                save_ms = timed(lambda: store.save_taskset(taskset), args.repeat)
+                load_ms = timed(lambda: store.load_taskset("benchmark"), args.repeat)
+
+                def load_and_access():
+                    for task in store.load_taskset("benchmark").tasks:
+                        task.updated_at
+
+                access_ms = timed(load_and_access, args.repeat)
+                size_kb = store._get_taskset_file("benchmark").stat().st_size / 1024
+
+            print(f"{task_count:>6}  {name:<12} {size_kb:>10.1f} {save_ms:>10.1f} "
+                  f"{load_ms:>10.1f} {access_ms:>17.1f}")
+
+
+if __name__ == "__main__":
+    main()
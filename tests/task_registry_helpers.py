@@ -0,0 +1,14 @@
+"""Task Registryのテストで共有するヘルパー"""
+from necrocode.task_registry.kiro_sync import TaskDefinition
+
+
+def task_def(task_id, dependencies=None):
+    """テスト用のTaskDefinitionを作成"""
+    return TaskDefinition(
+        id=task_id,
+        title=f"Task {task_id}",
+        description=f"Description {task_id}",
+        is_optional=False,
+        is_completed=False,
+        dependencies=dependencies or [],
+    )
@@ -0,0 +1,71 @@
+"""イベントの購読（変更フィード）のテスト"""
+import pytest
+
+from necrocode.task_registry import RegistryConfig, TaskRegistry, TaskState
+from task_registry_helpers import task_def
+
+
+@pytest.mark.parametrize("storage_backend", ["json", "sqlite"])
+def test_subscription_delivers_events_at_least_once_from_saved_cursor(tmp_path, storage_backend):
+    """保存したカーソルからat-least-onceでイベントを配信することのテスト"""
+    import asyncio
+    from necrocode.task_registry import EventType
+    
+    config = RegistryConfig(
+        registry_dir=tmp_path / "registry",
+        storage_backend=storage_backend,
+        event_log_compression="gzip",
+    )
+    registry = TaskRegistry(config=config)
+    registry.create_taskset("spec", [task_def("1"), task_def("2"), task_def("3")])
+    
+    # コールバックが失敗したイベントはコミットされず、次のpoll()で再配信される
+    received = []
+    def fail_on_second(event):
+        if event.task_id == "2" and not any(e.task_id == "2" for e in received):
+            received.append(event)
+            raise RuntimeError("consumer failed")
+        received.append(event)
+    subscription = registry.subscribe("spec", name="dashboard")
+    with pytest.raises(RuntimeError):
+        subscription.poll(fail_on_second)
+    assert subscription.poll(fail_on_second) == 2
+    assert [e.task_id for e in received] == ["1", "2", "2", "3"]
+    assert subscription.poll(fail_on_second) == 0
+    subscription.close()
+    
+    if storage_backend == "json":
+        # ローテーション・圧縮されたセグメントをまたいで読み進める
+        registry.update_task_state("spec", "1", TaskState.RUNNING)
+        registry.event_store.rotate_logs(max_size_mb=0)
+        registry.event_store.close()
+        assert list((config.events_dir / "spec").glob("events.jsonl.1.gz"))
+    registry.update_task_state("spec", "2", TaskState.RUNNING)
+    
+    # 同じ名前の購読は保存されたカーソルから再開する
+    resumed = TaskRegistry(config=config).subscribe("spec", name="dashboard", event_types=[EventType.TASK_ASSIGNED])
+    events = []
+    resumed.poll(events.append)
+    expected = ["1", "2"] if storage_backend == "json" else ["2"]
+    assert [e.task_id for e in events] == expected
+    resumed.close()
+    
+    async def consume():
+        feed = registry.subscribe("spec", from_end=True, poll_interval=5.0)
+        
+        async def writer():
+            await asyncio.sleep(0.05)
+            registry.update_task_state("spec", "3", TaskState.RUNNING)
+            registry.update_task_state("spec", "3", TaskState.DONE)
+        
+        writing = asyncio.ensure_future(writer())
+        states = []
+        # 同じプロセスの書き込みはpoll_intervalを待たずに通知される
+        async for event in feed:
+            states.append(event.event_type)
+            if len(states) == 2:
+                feed.close()
+        await writing
+        return states
+    
+    assert asyncio.run(asyncio.wait_for(consume(), 3.0)) == [EventType.TASK_ASSIGNED, EventType.TASK_COMPLETED]
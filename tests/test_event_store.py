@@ -0,0 +1,308 @@
+"""EventStore（索引・書き込み・セグメント）のテスト"""
+import pytest
+
+from necrocode.task_registry import RegistryConfig, TaskRegistry, TaskState
+from task_registry_helpers import task_def
+
+
+def test_event_index_covers_rotated_segments(tmp_path, monkeypatch):
+    """サイドカー索引によるタスク別・期間検索がローテーション済みログも対象にすることのテスト"""
+    from datetime import datetime, timedelta
+    
+    from necrocode.task_registry import EventStore, EventType, SegmentPolicy, TaskEvent
+    from necrocode.task_registry.event_index import SegmentIndex
+    
+    monkeypatch.setattr(SegmentIndex, "CHECKPOINT_INTERVAL", 4)
+    store = EventStore(tmp_path / "events", segment_policy=SegmentPolicy(compression="none"))
+    base = datetime(2025, 1, 1)
+    
+    def record(i):
+        store.record_event(TaskEvent(
+            event_type=EventType.TASK_UPDATED,
+            spec_name="spec",
+            task_id=str(i % 3),
+            timestamp=base + timedelta(minutes=i),
+            details={"i": i},
+        ))
+    
+    for i in range(20):
+        record(i)
+    store.rotate_logs(max_size_mb=0)
+    for i in range(20, 30):
+        record(i)
+    
+    spec_dir = tmp_path / "events" / "spec"
+    assert (spec_dir / "events.jsonl.1.idx").exists()
+    assert (spec_dir / "events.jsonl.idx").exists()
+    
+    # 新しいインスタンスはサイドカーから索引を読み込む
+    reader = EventStore(tmp_path / "events")
+    events = reader.get_events_by_task("spec", "1")
+    assert [e.details["i"] for e in events] == [i for i in range(30) if i % 3 == 1]
+    
+    events = reader.get_events_by_timerange(
+        "spec", base + timedelta(minutes=7), base + timedelta(minutes=22)
+    )
+    assert [e.details["i"] for e in events] == list(range(7, 23))
+    assert len(reader.get_all_events("spec")) == 30
+
+
+@pytest.mark.parametrize("interval", [4, None])
+def test_event_index_handles_out_of_order_timestamps(tmp_path, monkeypatch, interval):
+    """タイムスタンプが記録順に並んでいない場合も期間検索が全件を返すことのテスト"""
+    import random
+    from datetime import datetime, timedelta
+    
+    from necrocode.task_registry import EventStore, EventType, SegmentPolicy, TaskEvent
+    from necrocode.task_registry.event_index import SegmentIndex
+    
+    if interval is not None:
+        monkeypatch.setattr(SegmentIndex, "CHECKPOINT_INTERVAL", interval)
+    store = EventStore(tmp_path / "events", segment_policy=SegmentPolicy(compression="none"))
+    base = datetime(2025, 1, 1)
+    rng = random.Random(7)
+    # 呼び出し元が指定した時刻・遅れて書き込まれたバッファ・時計のずれを模した並び
+    minutes = list(range(300))
+    rng.shuffle(minutes)
+    
+    def record(i):
+        store.record_event(TaskEvent(
+            event_type=EventType.TASK_UPDATED,
+            spec_name="spec",
+            task_id=str(i % 5),
+            timestamp=base + timedelta(minutes=minutes[i]),
+            details={"i": i},
+        ))
+    
+    for i in range(150):
+        record(i)
+    store.rotate_logs(max_size_mb=0)
+    for i in range(150, 300):
+        record(i)
+    
+    reader = EventStore(tmp_path / "events")
+    all_events = reader.get_all_events("spec")
+    assert len(all_events) == 300
+    for start, end in [(0, 299), (10, 21), (100, 160), (250, 251), (299, 400), (-10, 0)]:
+        start_time, end_time = base + timedelta(minutes=start), base + timedelta(minutes=end)
+        expected = [e.details["i"] for e in all_events if start_time <= e.timestamp <= end_time]
+        events = reader.get_events_by_timerange("spec", start_time, end_time)
+        assert [e.details["i"] for e in events] == expected
+        assert len(expected) == min(end, 299) - max(start, 0) + 1
+    
+    # 時刻順に記録されたログは二分探索で範囲を絞り込む
+    ordered = EventStore(tmp_path / "ordered")
+    for i in range(40):
+        ordered.record_event(TaskEvent(
+            event_type=EventType.TASK_UPDATED,
+            spec_name="spec",
+            task_id="1",
+            timestamp=base + timedelta(minutes=i),
+        ))
+    index = ordered._get_index(ordered._get_event_file_path("spec"))
+    assert index.blocks_ordered
+    assert index.time_bounds() == (base, base + timedelta(minutes=39))
+    start_offset, end_offset = index.scan_bounds(base + timedelta(minutes=50), None)
+    assert start_offset == end_offset == index.indexed_upto
+    
+    # マニフェストには先頭・末尾ではなく最小・最大の時刻を記録する
+    info = reader._segment_manager("spec").segments()[1]
+    assert info.min_timestamp == (base + timedelta(minutes=min(minutes[:150]))).isoformat()
+    assert info.max_timestamp == (base + timedelta(minutes=max(minutes[:150]))).isoformat()
+    
+    current = reader._get_index(reader._get_event_file_path("spec"))
+    assert not current.blocks_ordered
+    assert current.time_bounds() == (
+        min(base + timedelta(minutes=m) for m in minutes[150:]),
+        max(base + timedelta(minutes=m) for m in minutes[150:]),
+    )
+
+
+def test_event_index_catches_up_unindexed_lines(tmp_path):
+    """サイドカーに載っていない追記行も索引化されることのテスト"""
+    from datetime import datetime
+    
+    from necrocode.task_registry import EventStore, EventType, TaskEvent
+    
+    store = EventStore(tmp_path / "events")
+    event = TaskEvent(
+        event_type=EventType.TASK_CREATED,
+        spec_name="spec",
+        task_id="1",
+        timestamp=datetime(2025, 1, 1),
+        details={},
+    )
+    store.record_event(event)
+    
+    # 索引を介さない追記（旧バージョンの書き込み）
+    with open(store._get_event_file_path("spec"), "a", encoding="utf-8") as f:
+        f.write(event.to_jsonl() + "\n")
+    
+    assert len(store.get_events_by_task("spec", "1")) == 2
+    store.record_event(event)
+    assert len(EventStore(tmp_path / "events").get_events_by_task("spec", "1")) == 3
+
+
+def test_record_events_appends_in_one_write(tmp_path, monkeypatch):
+    """record_eventsがSpecごとに1回の書き込みで追記し索引化することのテスト"""
+    import os
+    
+    from necrocode.task_registry import EventStore, EventType, TaskEvent
+    
+    store = EventStore(tmp_path / "events")
+    writes = []
+    real_write = os.write
+    monkeypatch.setattr(os, "write", lambda fd, data: writes.append(data) or real_write(fd, data))
+    
+    store.record_events([
+        TaskEvent(event_type=EventType.TASK_CREATED, spec_name=spec, task_id=str(i))
+        for i in range(50)
+        for spec in ("a", "b")
+    ])
+    
+    event_writes = [data for data in writes if data.startswith(b"{")]
+    assert len(event_writes) == 2
+    assert [e.task_id for e in store.get_events_by_task("a", "7")] == ["7"]
+    assert len(store.get_all_events("b")) == 50
+
+
+def test_buffered_events_flushed_on_lock_release(tmp_path):
+    """バッファ付き書き込みがロック解放時・close時に書き込まれることのテスト"""
+    config = RegistryConfig(
+        registry_dir=tmp_path / "registry",
+        event_buffering=True,
+        event_flush_interval=60.0,
+    )
+    registry = TaskRegistry(config=config)
+    registry.create_taskset("spec", [task_def("1"), task_def("2", ["1"])])
+    registry.update_task_state("spec", "1", TaskState.RUNNING)
+    
+    # 別インスタンスからもロック解放後は見える
+    other = TaskRegistry(tmp_path / "registry")
+    assert len(other.event_store.get_all_events("spec")) == 3
+    
+    # ロック外で記録されたイベントはclose()で書き込まれる
+    from necrocode.task_registry import EventType, TaskEvent
+    
+    registry.event_store.record_event(
+        TaskEvent(event_type=EventType.TASK_UPDATED, spec_name="spec", task_id="2")
+    )
+    assert len(other.event_store.get_all_events("spec")) == 3
+    registry.close()
+    assert len(other.event_store.get_all_events("spec")) == 4
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_iter_events_streams_with_filters(tmp_path, backend):
+    """iter_eventsの逆順・イベントタイプ・期間指定と圧縮セグメントの読み込みのテスト"""
+    from datetime import datetime, timedelta
+    
+    from necrocode.task_registry import EventType, TaskEvent
+    
+    registry = TaskRegistry(
+        config=RegistryConfig(
+            registry_dir=tmp_path / "registry",
+            storage_backend=backend,
+            event_log_compression="gzip",
+        )
+    )
+    store = registry.event_store
+    base = datetime(2025, 1, 1)
+    types = [EventType.TASK_ASSIGNED, EventType.TASK_COMPLETED, EventType.TASK_FAILED]
+    
+    def record(i):
+        store.record_event(TaskEvent(
+            event_type=types[i % 3],
+            spec_name="spec",
+            task_id=str(i % 2),
+            timestamp=base + timedelta(minutes=i),
+            details={"i": i},
+        ))
+    
+    for i in range(10):
+        record(i)
+    if backend == "json":
+        # ローテーション後に圧縮されたセグメント
+        store.rotate_logs(max_size_mb=0)
+        store.close()
+        assert (tmp_path / "registry" / "events" / "spec" / "events.jsonl.1.gz").exists()
+    for i in range(10, 20):
+        record(i)
+    
+    def numbers(events):
+        return [e.details["i"] for e in events]
+    
+    assert numbers(store.iter_events("spec")) == list(range(20))
+    assert numbers(store.iter_events("spec", reverse=True)) == list(range(19, -1, -1))
+    
+    failed = store.iter_events("spec", event_types=[EventType.TASK_FAILED], reverse=True)
+    assert numbers(failed) == [i for i in range(19, -1, -1) if i % 3 == 2]
+    
+    events = store.iter_events(
+        "spec",
+        task_id="1",
+        start_time=base + timedelta(minutes=5),
+        end_time=base + timedelta(minutes=14),
+        reverse=True,
+    )
+    assert numbers(events) == [13, 11, 9, 7, 5]
+    
+    # 途中で打ち切れる
+    stream = store.iter_events("spec")
+    assert next(stream).details["i"] == 0
+    stream.close()
+
+
+def test_rotate_logs_keeps_plain_segments_by_default(tmp_path):
+    """既定の設定ではrotate_logs()が従来どおり圧縮しないセグメントを残すことのテスト"""
+    registry = TaskRegistry(tmp_path / "registry")
+    registry.create_taskset("spec", [task_def("1")])
+    registry.event_store.rotate_logs(max_size_mb=0)
+    registry.event_store.close()
+    
+    spec_dir = tmp_path / "registry" / "events" / "spec"
+    assert (spec_dir / "events.jsonl.1").exists()
+    assert not list(spec_dir.glob("*.gz"))
+    assert len(registry.event_store.get_all_events("spec")) == 1
+
+
+def test_segment_rotation_compression_and_retention(tmp_path, monkeypatch):
+    """サイズによる自動ローテーション・圧縮・保持数とマニフェストによるスキップのテスト"""
+    import json
+    from datetime import datetime, timedelta
+    
+    from necrocode.task_registry import EventStore, EventType, SegmentPolicy, TaskEvent
+    from necrocode.task_registry import event_store as event_store_module
+    
+    policy = SegmentPolicy(max_bytes=2000, compression="gzip", retain_segments=3)
+    store = EventStore(tmp_path / "events", segment_policy=policy)
+    base = datetime(2025, 1, 1)
+    for i in range(100):
+        store.record_event(TaskEvent(
+            event_type=EventType.TASK_UPDATED,
+            spec_name="spec",
+            task_id="1",
+            timestamp=base + timedelta(minutes=i),
+            details={"i": i},
+        ))
+    store.close()
+    
+    spec_dir = tmp_path / "events" / "spec"
+    manifest = json.loads((spec_dir / "manifest.json").read_text())
+    assert len(manifest["segments"]) == 3
+    assert all(entry["file"].endswith(".gz") for entry in manifest["segments"])
+    assert not list(spec_dir.glob("events.jsonl.[0-9]"))
+    
+    numbers = [e.details["i"] for e in store.iter_events("spec")]
+    oldest = numbers[0]
+    assert oldest > 0 and numbers == list(range(oldest, 100))
+    
+    # マニフェストから期間外と分かる圧縮済みセグメントは開かない
+    opened = []
+    real_open = event_store_module.open_compressed
+    monkeypatch.setattr(
+        event_store_module, "open_compressed", lambda path: opened.append(path) or real_open(path)
+    )
+    events = store.get_events_by_timerange("spec", base + timedelta(minutes=99), base + timedelta(days=1))
+    assert [e.details["i"] for e in events] == [99]
+    assert opened == []
@@ -0,0 +1,268 @@
+"""Kiro同期（tasks.mdの解析・同期・監視）のテスト"""
+import pytest
+
+from necrocode.task_registry import RegistryConfig, TaskRegistry, TaskState
+
+
+def test_parse_tasks_md_single_pass(tmp_path):
+    """tasks.mdを1回の走査で解析することのテスト"""
+    registry = TaskRegistry(registry_dir=tmp_path / "registry")
+    tasks_md = tmp_path / "tasks.md"
+    tasks_md.write_text(
+        "# Implementation Plan\n"
+        "\n"
+        "- [x] 1. Set up project\n"
+        "  - Create package layout\n"
+        "  - [ ] not a task line\n"
+        "  - _Requirements: 0.1_\n"
+        "  - [ ]* 1.1 Write tests\n"
+        "    - _Requirements: 1_\n"
+        "- [-] 2. Build API \r\n"
+        "    - [ ] 2.1 Endpoint\n"
+        "  - [ ] 3.1 Orphan subtask\n"
+        "\n"
+        "## Notes\n"
+        "- trailing bullet\n",
+        encoding="utf-8",
+    )
+    
+    tasks = registry.kiro_sync.parse_tasks_md(tasks_md)
+    assert [(t.id, t.parent_id, t.line_number) for t in tasks] == [
+        ("1", None, 3), ("1.1", "1", 7), ("2", None, 9), ("2.1", "2", 10), ("3.1", "2", 11),
+    ]
+    assert tasks[0].is_completed and tasks[1].is_optional
+    assert tasks[0].description == "Create package layout\n_Requirements: 0.1_"
+    assert tasks[0].dependencies == ["0.1"] and tasks[1].dependencies == ["1"]
+    assert tasks[2].title == "Build API" and tasks[2].description == "Build API "
+    # 最後のタスクの説明はファイル末尾まで続く
+    assert tasks[4].description == "trailing bullet"
+    assert registry.kiro_sync._parse_content(tasks_md.read_text(encoding="utf-8")) == tasks
+    
+    # チェックボックスの更新も同じ行を対象にする
+    states = {"1": TaskState.READY, "1.1": TaskState.DONE, "2": TaskState.RUNNING}
+    assert registry.kiro_sync.update_tasks_md(tasks_md, states) == 2
+    assert [(t.id, t.is_completed) for t in registry.kiro_sync.parse_tasks_md(tasks_md)][:3] == [
+        ("1", False), ("1.1", True), ("2", False),
+    ]
+
+
+def test_parse_tasks_md_parents_follow_indentation(tmp_path):
+    """親タスクがタスクIDではなくインデントで決まることのテスト"""
+    registry = TaskRegistry(registry_dir=tmp_path / "registry")
+    tasks_md = tmp_path / "tasks.md"
+    tasks_md.write_text(
+        "- [ ] 1. Backend\n"
+        "  - [ ] 2.1 Mismatched child\n"
+        "    - [ ] 7 Grandchild without dots\n"
+        "  - [ ] 1.2 Sibling after a deeper task\n"
+        "\t- [ ] 1.3 Tab indented child\n"
+        "- [ ] 1.4 Top level despite its ID\n"
+        "   - [ ] 5 Odd indentation\n",
+        encoding="utf-8",
+    )
+    
+    tasks = registry.kiro_sync.parse_tasks_md(tasks_md)
+    assert [(t.id, t.parent_id) for t in tasks] == [
+        ("1", None), ("2.1", "1"), ("7", "2.1"), ("1.2", "1"), ("1.3", "1"), ("1.4", None), ("5", "1.4"),
+    ]
+
+
+@pytest.mark.parametrize("persistence_mode", ["full", "incremental", "event_sourced"])
+def test_sync_from_kiro_applies_only_changed_tasks(tmp_path, persistence_mode):
+    """Kiroからの同期が変更されたタスクだけを適用することのテスト"""
+    from necrocode.task_registry.models import EventType
+    
+    config = RegistryConfig(registry_dir=tmp_path / "registry", persistence_mode=persistence_mode)
+    registry = TaskRegistry(config=config)
+    tasks_md = tmp_path / "tasks.md"
+    tasks_md.write_text("- [ ] 1. Setup\n- [ ] 2. API\n- [ ] 3. UI\n", encoding="utf-8")
+    assert registry.sync_with_kiro("spec", tasks_md).tasks_added == ["1", "2", "3"]
+    
+    # tasks.mdが変わらなければバージョンもRegistry側の状態も変わらない
+    registry.update_task_state("spec", "1", TaskState.RUNNING)
+    version = registry.get_taskset("spec").version
+    result = registry.sync_with_kiro("spec", tasks_md)
+    assert result.success and not result.tasks_updated
+    assert registry.get_taskset("spec").version == version
+    
+    saved = []
+    original_save_tasks = registry.task_store.save_tasks
+    registry.task_store.save_tasks = lambda taskset, tasks: (
+        saved.append([t.id for t in tasks]), original_save_tasks(taskset, tasks)
+    )
+    tasks_md.write_text(
+        "- [ ] 1. Setup\n- [x] 2. API v2\n  - _Requirements: 1_\n- [ ] 3. UI\n\n## Notes\n",
+        encoding="utf-8",
+    )
+    result = registry.sync_with_kiro("spec", tasks_md)
+    assert result.tasks_updated == ["2"] and saved == [["2"]]
+    updated = [
+        e.task_id for e in registry.event_store.iter_events("spec")
+        if e.event_type == EventType.TASK_UPDATED
+    ]
+    assert updated == ["2"]
+    
+    # 再起動後も同期結果とtasks.mdのハッシュが復元される
+    registry.close()
+    reloaded = TaskRegistry(config=config)
+    tasks = {t.id: t for t in reloaded.get_taskset("spec").tasks}
+    assert tasks["1"].state == TaskState.RUNNING
+    assert (tasks["2"].title, tasks["2"].state, tasks["2"].dependencies) == ("API v2", TaskState.DONE, ["1"])
+    version = reloaded.get_taskset("spec").version
+    assert reloaded.sync_with_kiro("spec", tasks_md).success
+    assert reloaded.get_taskset("spec").version == version
+
+
+def test_sync_from_kiro_persists_hash_only_updates_in_event_sourced_mode(tmp_path):
+    """イベントを伴わない同期（ハッシュの記録のみ）がevent_sourcedモードで再読み込み後も残ることのテスト"""
+    config = RegistryConfig(registry_dir=tmp_path / "registry", persistence_mode="event_sourced")
+    registry = TaskRegistry(config=config)
+    tasks_md = tmp_path / "tasks.md"
+    tasks_md.write_text("- [ ] 1. Setup\n- [ ] 2. API\n", encoding="utf-8")
+    # tasks.mdと同じ内容のタスクセット（ハッシュ未記録）
+    registry.create_taskset("spec", registry.kiro_sync.parse_tasks_md(tasks_md))
+    
+    result = registry.sync_with_kiro("spec", tasks_md)
+    assert result.success and not result.tasks_updated
+    synced = registry.get_taskset("spec")
+    assert synced.version == 2
+    
+    reloaded = TaskRegistry(config=RegistryConfig(
+        registry_dir=tmp_path / "registry",
+        persistence_mode="event_sourced",
+        taskset_cache_size=0,
+    ))
+    assert reloaded.get_taskset("spec").to_dict() == synced.to_dict()
+    assert reloaded.sync_with_kiro("spec", tasks_md).success
+    assert reloaded.get_taskset("spec").version == 2
+
+
+def test_kiro_watcher_syncs_changed_specs_both_ways(tmp_path):
+    """KiroWatcherが変更されたspecを双方向に同期することのテスト"""
+    from necrocode.task_registry import KiroWatcher
+    
+    registry = TaskRegistry(registry_dir=tmp_path / "registry")
+    specs_dir = tmp_path / "specs"
+    for spec_name in ("alpha", "beta"):
+        (specs_dir / spec_name).mkdir(parents=True)
+        (specs_dir / spec_name / "tasks.md").write_text("- [ ] 1. First\n- [ ] 2. Second\n", encoding="utf-8")
+    
+    synced = []
+    watcher = KiroWatcher(
+        registry,
+        specs_dir=specs_dir,
+        debounce=0,
+        max_workers=1,
+        on_sync=lambda spec, direction, changes, errors: synced.append((spec, direction, changes)),
+    )
+    
+    def poll():
+        started = watcher.poll()
+        assert watcher.wait_idle(timeout=10)
+        return started
+    
+    # ワーカーの上限を超えた分は次のポーリングで同期する
+    assert poll() == ["alpha"]
+    assert poll() == ["beta"]
+    assert synced == [("alpha", "from_kiro", 2), ("beta", "from_kiro", 2)]
+    assert poll() == []
+    
+    # Registry側の変更はチェックボックスへ書き戻し、その書き込みは変更として扱わない
+    registry.update_task_state("alpha", "1", TaskState.DONE)
+    assert poll() == ["alpha"]
+    assert (specs_dir / "alpha" / "tasks.md").read_text(encoding="utf-8").startswith("- [x] 1. First")
+    assert poll() == []
+    
+    # tasks.mdの変更は変更されたspecのみ取り込む
+    (specs_dir / "beta" / "tasks.md").write_text("- [ ] 1. First\n- [x] 2. Second\n", encoding="utf-8")
+    assert poll() == ["beta"]
+    assert registry.get_taskset("beta").tasks[1].state == TaskState.DONE
+    assert watcher.stats.synced_from_kiro == 3 and watcher.stats.synced_to_kiro == 1
+    watcher.close()
+
+
+def test_kiro_watcher_picks_up_edit_made_right_after_its_own_write(tmp_path, monkeypatch):
+    """KiroWatcherの書き戻しの直後にtasks.mdが編集された場合も取り込むことのテスト"""
+    from necrocode.task_registry import KiroWatcher
+    
+    registry = TaskRegistry(registry_dir=tmp_path / "registry")
+    tasks_md = tmp_path / "specs" / "alpha" / "tasks.md"
+    tasks_md.parent.mkdir(parents=True)
+    tasks_md.write_text("- [ ] 1. First\n- [ ] 2. Second\n", encoding="utf-8")
+    watcher = KiroWatcher(registry, specs_dir=tmp_path / "specs", debounce=0)
+    
+    def poll():
+        started = watcher.poll()
+        assert watcher.wait_idle(timeout=10)
+        return started
+    
+    assert poll() == ["alpha"]
+    
+    # チェックボックスの書き戻しの直後にエディタがタスク2を完了にする
+    kiro_sync = registry.kiro_sync
+    original_patch = kiro_sync._patch_in_place
+    def patch_then_edit(f, data, patches):
+        written = original_patch(f, data, patches)
+        tasks_md.write_text("- [x] 1. First\n- [x] 2. Second\n", encoding="utf-8")
+        return written
+    monkeypatch.setattr(kiro_sync, "_patch_in_place", patch_then_edit)
+    registry.update_task_state("alpha", "1", TaskState.DONE)
+    assert poll() == ["alpha"]
+    monkeypatch.undo()
+    
+    # 編集は同期済みとして記録されず、次のポーリングで取り込まれる
+    assert poll() == ["alpha"]
+    assert registry.get_taskset("alpha").tasks[1].state == TaskState.DONE
+    assert poll() == []
+    watcher.close()
+
+
+def test_kiro_sync_hashes_written_content_like_the_file(tmp_path):
+    """書き込んだ内容のハッシュがファイルのハッシュと一致することのテスト"""
+    registry = TaskRegistry(registry_dir=tmp_path / "registry")
+    tasks_md = tmp_path / "tasks.md"
+    tasks_md.write_bytes("- [ ] 1. 最初\r\n- [ ] 2. Second\r\n".encode("utf-8"))
+    
+    count, written_hash = registry.kiro_sync.write_task_states(tasks_md, {"1": TaskState.DONE})
+    assert count == 1
+    assert written_hash == registry.kiro_sync.hash_tasks_md(tasks_md)
+    assert registry.kiro_sync.write_task_states(tasks_md, {"1": TaskState.DONE}) == (0, None)
+
+
+def test_update_tasks_md_patches_checkboxes_in_place(tmp_path, monkeypatch):
+    """tasks.mdのチェックボックスがその場で書き換えられることのテスト"""
+    registry = TaskRegistry(registry_dir=tmp_path / "registry")
+    kiro_sync = registry.kiro_sync
+    tasks_md = tmp_path / "tasks.md"
+    tasks_md.write_bytes(
+        "- [ ] 1. Setup <!-- owner: a -->\r\n"
+        "　- [ ] 1.1 全角インデント\r\n"
+        "- [x] 2 No dot\r\n".encode("utf-8")
+    )
+    inode = tasks_md.stat().st_ino
+    
+    states = {"1": TaskState.DONE, "1.1": TaskState.RUNNING, "2": TaskState.READY}
+    assert kiro_sync.update_tasks_md(tasks_md, states) == 3
+    assert kiro_sync.update_tasks_md(tasks_md, states) == 0
+    # チェックボックス以外のバイトと改行コードはそのまま
+    assert tasks_md.read_bytes() == (
+        "- [x] 1. Setup <!-- owner: a -->\r\n"
+        "　- [-] 1.1 全角インデント\r\n"
+        "- [ ] 2 No dot\r\n".encode("utf-8")
+    )
+    assert tasks_md.stat().st_ino == inode
+    
+    # 読み込み後に書き換えられた場合は読み直してrenameで置き換える
+    original_patches = kiro_sync._checkbox_patches
+    
+    def edit_after_read(data, task_states):
+        patches = original_patches(data, task_states)
+        if data.startswith(b"- [x]"):
+            tasks_md.write_bytes(b"# Plan\n" + data)
+        return patches
+    
+    monkeypatch.setattr(kiro_sync, "_checkbox_patches", edit_after_read)
+    assert kiro_sync.update_tasks_md(tasks_md, {"1": TaskState.READY}) == 1
+    assert tasks_md.read_bytes().startswith(b"# Plan\n- [ ] 1. Setup <!-- owner: a -->\r\n")
+    assert tasks_md.stat().st_ino != inode
+    assert [p.name for p in tmp_path.iterdir() if p.name.endswith(".tmp")] == []
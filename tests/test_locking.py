@@ -0,0 +1,303 @@
+"""ロックと並行書き込みのテスト"""
+import pytest
+
+from necrocode.task_registry import RegistryConfig, TaskRegistry, TaskState
+from task_registry_helpers import task_def
+
+
+def test_shared_locks_and_lock_free_snapshot_reads(tmp_path):
+    """共有ロックとロックを取得しないスナップショット読み込みのテスト"""
+    import threading
+    import time
+    from necrocode.task_registry import LockTimeoutError
+    from necrocode.task_registry.lock_manager import LockManager
+    
+    manager = LockManager(tmp_path / "locks")
+    with manager.acquire_lock("spec", shared=True):
+        with manager.acquire_lock("spec", timeout=1.0, shared=True):
+            assert manager.is_locked("spec")
+        with pytest.raises(LockTimeoutError):
+            with manager.acquire_lock("spec", timeout=0.05):
+                pass
+    
+    # 待機中の書き込みは共有ロックの解放と同時に取得する
+    acquired = []
+    def writer():
+        with manager.acquire_lock("spec", timeout=5.0):
+            acquired.append(time.monotonic())
+    thread = threading.Thread(target=writer)
+    with manager.acquire_lock("spec", shared=True):
+        thread.start()
+        time.sleep(0.1)
+        assert acquired == []
+        released = time.monotonic()
+    thread.join()
+    assert acquired[0] >= released
+    
+    # 読み込み中にtaskset.jsonが置き換えられた場合は読み直す
+    config = RegistryConfig(registry_dir=tmp_path / "registry", persistence_mode="incremental")
+    TaskRegistry(config=config).create_taskset("spec", [task_def("1")])
+    reader, writer_registry = TaskRegistry(config=config), TaskRegistry(config=config)
+    store = reader.task_store
+    original_apply_journal = store._apply_journal
+    reads = []
+    def racing_apply_journal(spec_name, data):
+        reads.append(data["version"])
+        if len(reads) == 1:
+            writer_registry.update_task_state("spec", "1", TaskState.RUNNING)
+            writer_registry.snapshot_taskset("spec")
+        return original_apply_journal(spec_name, data)
+    store._apply_journal = racing_apply_journal
+    
+    taskset = store._read_taskset("spec")
+    assert reads == [1, 2]
+    assert (taskset.version, taskset.tasks[0].state) == (2, TaskState.RUNNING)
+    
+    # 書き込みが続く場合は共有ロックを取得して読む
+    locked = []
+    store.read_lock = lambda spec_name: (locked.append(spec_name), manager.acquire_lock(spec_name, shared=True))[1]
+    def always_racing(spec_name, data):
+        writer_registry.snapshot_taskset("spec")
+        return original_apply_journal(spec_name, data)
+    store._apply_journal = always_racing
+    store._read_taskset("spec")
+    assert locked == ["spec"]
+
+
+@pytest.mark.parametrize("write_concurrency", ["locking", "optimistic"])
+def test_readers_never_see_a_half_applied_batch(tmp_path, write_concurrency):
+    """書き込みのバッチの適用中に別スレッドの読み込みが途中の状態を見ないことのテスト"""
+    import threading
+    from necrocode.task_registry import StateTransition
+    
+    config = RegistryConfig(registry_dir=tmp_path / "registry", write_concurrency=write_concurrency)
+    registry = TaskRegistry(config=config)
+    registry.create_taskset("spec", [task_def("1"), task_def("2"), task_def("3", ["1"])])
+    
+    # 2つ目の操作の検証中に書き込みを止める
+    staged_first = threading.Event()
+    resume = threading.Event()
+    original_validate = registry._validate_state_transition
+    validated = []
+    def pausing_validate(task, new_state):
+        validated.append(task.id)
+        if len(validated) == 2:
+            staged_first.set()
+            resume.wait(5)
+        return original_validate(task, new_state)
+    registry._validate_state_transition = pausing_validate
+    
+    writer = threading.Thread(target=registry.apply_batch, args=("spec", [
+        StateTransition("1", TaskState.DONE),
+        StateTransition("2", TaskState.RUNNING),
+    ]))
+    writer.start()
+    try:
+        assert staged_first.wait(5)
+        observed = {}
+        def reader():
+            taskset = registry.get_taskset("spec")
+            observed["version"] = taskset.version
+            observed["states"] = [task.state for task in taskset.tasks]
+            observed["shared"] = [task.state for task in registry.task_store.load_shared_taskset("spec").tasks]
+            observed["ready"] = [task.id for task in registry.get_ready_tasks("spec")]
+            observed["query"] = [task.id for task in registry.query_engine.query("spec", filters={"state": TaskState.DONE})]
+        thread = threading.Thread(target=reader)
+        thread.start()
+        thread.join(5)
+    finally:
+        resume.set()
+        writer.join(5)
+    
+    before = [TaskState.READY, TaskState.READY, TaskState.BLOCKED]
+    assert observed == {
+        "version": 1, "states": before, "shared": before, "ready": ["1", "2"], "query": [],
+    }
+    taskset = registry.get_taskset("spec")
+    assert taskset.version == 3
+    assert [task.state for task in taskset.tasks] == [TaskState.DONE, TaskState.RUNNING, TaskState.READY]
+    assert [task.id for task in registry.get_ready_tasks("spec")] == ["3"]
+
+
+def test_lock_metrics_record_contention_and_merge_across_processes(tmp_path):
+    """ロックの競合の記録とプロセスをまたいだ統計の合算のテスト"""
+    import json
+    import threading
+    from click.testing import CliRunner
+    from necrocode.cli import cli
+    from necrocode.lock_metrics import LockMetrics
+    from necrocode.repo_pool.lock_manager import LockManager as SlotLockManager
+    
+    config = RegistryConfig(registry_dir=tmp_path / "registry", lock_timeout=5.0)
+    registry = TaskRegistry(config=config)
+    registry.create_taskset("spec", [task_def("1")])
+    
+    holding, release = threading.Event(), threading.Event()
+    def hold_lock():
+        with registry._write_lock("spec"):
+            holding.set()
+            release.wait()
+    thread = threading.Thread(target=hold_lock)
+    thread.start()
+    holding.wait()
+    threading.Timer(0.05, release.set).start()
+    registry.update_task_state("spec", "1", TaskState.RUNNING)
+    thread.join()
+    
+    stats = registry.lock_manager.metrics.stats()["spec"]
+    assert (stats.acquisitions, stats.contended, stats.timeouts) == (3, 1, 0)
+    assert stats.wait.max >= 0.04 and stats.hold.count == 3
+    assert [key for key, _ in registry.lock_manager.metrics.top_contended()] == ["spec"]
+    registry.close()
+    
+    # 別プロセスのRepo Poolのロックも同じ形式で保存・集計できる
+    slots = SlotLockManager(config.locks_dir)
+    with slots.acquire_slot_lock("slot1"):
+        pass
+    slots.save_metrics()
+    merged = LockMetrics.load(config.locks_dir)
+    assert set(merged.stats()) == {"spec", "slot1"}
+    
+    runner = CliRunner()
+    result = runner.invoke(cli, ['lock-stats', '--locks-dir', str(config.locks_dir), '--format', 'json'])
+    assert result.exit_code == 0
+    assert json.loads(result.output)["top_contended"] == ["spec"]
+    result = runner.invoke(cli, ['lock-stats', '--locks-dir', str(config.locks_dir), '--reset'])
+    assert result.exit_code == 0 and "spec" in result.output
+    assert LockMetrics.load(config.locks_dir).stats() == {}
+
+
+@pytest.mark.parametrize("persistence_mode,storage_backend", [
+    ("full", "json"),
+    ("incremental", "json"),
+    ("full", "sqlite"),
+])
+def test_optimistic_writes_retry_on_version_conflict(tmp_path, persistence_mode, storage_backend):
+    """楽観的書き込みがバージョン競合時に読み込みからやり直すことのテスト"""
+    from necrocode.task_registry import ArtifactType, VersionConflictError
+    
+    config = RegistryConfig(
+        registry_dir=tmp_path / "registry",
+        persistence_mode=persistence_mode,
+        storage_backend=storage_backend,
+        write_concurrency="optimistic",
+        optimistic_backoff=0.0,
+    )
+    registry = TaskRegistry(config=config)
+    registry.create_taskset("spec", [task_def("1"), task_def("2"), task_def("3")])
+    # 別プロセスの書き込み
+    other = TaskRegistry(config=config)
+    
+    # 読み込み後・保存前に別の書き込みが割り込むと、読み込みからやり直す
+    original_stage = registry._stage_operations
+    staged_versions = []
+    def racing_stage(taskset, operations):
+        staged_versions.append(taskset.version)
+        if len(staged_versions) == 1:
+            other.update_task_state("spec", "2", TaskState.RUNNING)
+        return original_stage(taskset, operations)
+    registry._stage_operations = racing_stage
+    
+    registry.update_task_state("spec", "1", TaskState.RUNNING)
+    assert staged_versions == [1, 2]
+    states = {t.id: t.state for t in TaskRegistry(config=config).get_taskset("spec").tasks}
+    assert states == {"1": TaskState.RUNNING, "2": TaskState.RUNNING, "3": TaskState.READY}
+    stats = registry.lock_manager.metrics.stats()["spec"]
+    assert (stats.cas_commits, stats.cas_conflicts, stats.cas_failures) == (1, 1, 0)
+    
+    # 競合が続く場合は再試行の上限で失敗し、何も保存しない
+    registry.config.optimistic_max_retries = 2
+    def always_racing(taskset, operations):
+        other.add_artifact("spec", "2", ArtifactType.LOG, f"file:///{taskset.version}.log")
+        return original_stage(taskset, operations)
+    registry._stage_operations = always_racing
+    with pytest.raises(VersionConflictError):
+        registry.update_task_state("spec", "3", TaskState.RUNNING)
+    assert registry.get_taskset("spec").tasks[2].state == TaskState.READY
+    stats = registry.lock_manager.metrics.stats()["spec"]
+    assert (stats.cas_conflicts, stats.cas_failures) == (4, 1)
+    assert stats.conflict_rate == pytest.approx(0.8)
+
+
+@pytest.mark.parametrize("storage_backend", ["json", "sqlite"])
+def test_optimistic_writes_publish_only_saved_changes(tmp_path, storage_backend):
+    """楽観的書き込みが保存に成功した変更だけをキャッシュに反映することのテスト"""
+    import threading
+    
+    config = RegistryConfig(
+        registry_dir=tmp_path / "registry",
+        storage_backend=storage_backend,
+        write_concurrency="optimistic",
+        optimistic_backoff=0.0,
+    )
+    registry = TaskRegistry(config=config)
+    registry.create_taskset("spec", [task_def("1"), task_def("2")])
+    other = TaskRegistry(config=config)
+    base = registry.task_store.load_shared_taskset("spec")
+    
+    # 1回目の適用後に別の書き込みを割り込ませる
+    original_stage = registry._stage_operations
+    staged = []
+    def racing_stage(taskset, operations):
+        result = original_stage(taskset, operations)
+        staged.append(result[0])
+        if len(staged) == 1:
+            other.update_task_state("spec", "2", TaskState.RUNNING)
+        return result
+    registry._stage_operations = racing_stage
+    
+    # バージョンの比較の直前に、ロックを取得しない読み込みが見る状態を記録する
+    store = registry.task_store
+    original_save = store.save_tasks_if_version
+    seen = []
+    def observing_save(taskset, tasks, expected_version):
+        def reader():
+            seen.append([task.state for task in registry.get_taskset("spec").tasks])
+        thread = threading.Thread(target=reader)
+        thread.start()
+        thread.join(5)
+        return original_save(taskset, tasks, expected_version)
+    store.save_tasks_if_version = observing_save
+    
+    registry.update_task_state("spec", "1", TaskState.RUNNING)
+    
+    # 競合した1回目と再試行の保存前のどちらでも、読み込みには保存済みの状態だけが見える
+    assert seen == [[TaskState.READY, TaskState.RUNNING]] * 2
+    # 読み込んだTasksetは変更されず、競合した試行のコピーは捨てられる
+    assert [task.state for task in base.tasks] == [TaskState.READY, TaskState.READY]
+    assert base.version == 1
+    assert staged[0] is not base
+    assert registry.task_store.load_shared_taskset("spec") is staged[1]
+    
+    published = registry.task_store.load_shared_taskset("spec")
+    assert published.version == 3
+    assert [task.state for task in published.tasks] == [TaskState.RUNNING, TaskState.RUNNING]
+    assert [task.id for task in registry.query_engine.filter_by_state("spec", TaskState.RUNNING)] == ["1", "2"]
+
+
+@pytest.mark.parametrize("persistence_mode", ["full", "incremental"])
+def test_optimistic_version_check_reads_stored_files(tmp_path, persistence_mode):
+    """楽観的書き込みのバージョン比較がキャッシュやフィンガープリントを使わずファイルを読むことのテスト"""
+    from necrocode.task_registry import VersionConflictError
+    
+    config = RegistryConfig(
+        registry_dir=tmp_path / "registry",
+        persistence_mode=persistence_mode,
+        write_concurrency="optimistic",
+        optimistic_backoff=0.0,
+        optimistic_max_retries=0,
+    )
+    registry = TaskRegistry(config=config)
+    store = registry.task_store
+    # フィンガープリントが変化を検出できず、キャッシュが古いタスクセットを返す場合
+    store._fingerprint = lambda spec_name: ("unchanged",)
+    registry.create_taskset("spec", [task_def("1"), task_def("2")])
+    assert store.stored_version("spec") == 1
+    
+    TaskRegistry(config=config).update_task_state("spec", "2", TaskState.RUNNING)
+    assert store.stored_version("spec") == 2
+    
+    with pytest.raises(VersionConflictError) as excinfo:
+        registry.update_task_state("spec", "1", TaskState.RUNNING)
+    assert excinfo.value.actual_version == 2
+    assert TaskRegistry(config=config).get_taskset("spec").tasks[0].state == TaskState.READY
@@ -0,0 +1,167 @@
+"""Task Registryのデータモデル（__slots__・遅延タイムスタンプ・遅延コンテナ）のテスト"""
+import copy
+import dataclasses
+import pickle
+from datetime import datetime
+
+import pytest
+
+from necrocode.task_registry.models import (
+    Artifact,
+    ArtifactType,
+    EventType,
+    Task,
+    TaskEvent,
+    TaskState,
+    Taskset,
+)
+
+
+NOW = datetime(2024, 1, 2, 3, 4, 5, 678901)
+
+
+def make_task(task_id="1", **kwargs):
+    """テスト用のTaskを作成"""
+    return Task(
+        id=task_id,
+        title=f"Task {task_id}",
+        description=f"Description {task_id}",
+        state=TaskState.READY,
+        created_at=NOW,
+        updated_at=NOW,
+        **kwargs
+    )
+
+
+def make_taskset():
+    """空のタスクと中身のあるタスクを含むTasksetを作成"""
+    artifact = Artifact(
+        type=ArtifactType.DIFF,
+        uri="file:///diff",
+        size_bytes=10,
+        created_at=NOW,
+        metadata={"lines": 3},
+    )
+    return Taskset(
+        spec_name="spec",
+        version=3,
+        tasks=[
+            make_task("1"),
+            make_task(
+                "2",
+                dependencies=["1"],
+                artifacts=[artifact],
+                metadata={"kiro_content_hash": "abc"},
+                runner_id="runner-1",
+            ),
+        ],
+        created_at=NOW,
+        updated_at=NOW,
+        metadata={"kiro_file_hash": "def"},
+    )
+
+
+def test_round_trip_keeps_empty_containers_lazy():
+    """空のコンテナとタイムスタンプが参照されるまで生成されず、to_dict()が変わらないことのテスト"""
+    taskset = make_taskset()
+    data = taskset.to_dict()
+    
+    loaded = Taskset.from_dict(copy.deepcopy(data))
+    empty, full = loaded.tasks
+    # 読み込んだだけでは空のコンテナもdatetimeも生成されない
+    assert (empty._dependencies, empty._artifacts, empty._metadata) == (None, None, None)
+    assert isinstance(empty._created_at, str)
+    # to_dict()も空のコンテナを生成しない
+    assert loaded.to_dict() == data
+    assert (empty._dependencies, empty._metadata) == (None, None)
+    
+    # 参照すると生成され、変更はto_dict()に反映される
+    assert empty.metadata == {} and empty.created_at == NOW
+    empty.metadata["key"] = "value"
+    assert Task.from_dict(empty.to_dict()).metadata == {"key": "value"}
+    assert full.artifacts[0].metadata == {"lines": 3}
+    assert Taskset.from_dict(loaded.to_dict()).to_dict() == loaded.to_dict()
+
+
+def test_task_event_round_trip():
+    """TaskEventのJSON Lines形式の往復のテスト"""
+    event = TaskEvent(
+        event_type=EventType.TASK_UPDATED,
+        spec_name="spec",
+        task_id="1",
+        timestamp=NOW,
+        details={"version": 2},
+    )
+    loaded = TaskEvent.from_jsonl(event.to_jsonl())
+    assert isinstance(loaded._timestamp, str)
+    assert loaded.to_jsonl() == event.to_jsonl()
+    assert loaded == event
+
+
+def test_constructed_and_loaded_models_are_equal():
+    """コンストラクタで作成したモデルと読み込んだモデルが等しいことのテスト"""
+    taskset = make_taskset()
+    loaded = Taskset.from_dict(taskset.to_dict())
+    
+    assert loaded == taskset
+    assert loaded.tasks[0] == make_task("1")
+    assert loaded.tasks[1] != make_task("2")
+    assert Artifact.from_dict(taskset.tasks[1].artifacts[0].to_dict()) == taskset.tasks[1].artifacts[0]
+
+
+@pytest.mark.parametrize("loaded", [False, True])
+def test_copy_pickle_and_replace(loaded):
+    """copy・pickle・dataclasses.replaceがslotsのモデルで動作することのテスト"""
+    taskset = make_taskset()
+    if loaded:
+        taskset = Taskset.from_dict(taskset.to_dict())
+    expected = taskset.to_dict()
+    
+    for clone in (
+        copy.copy(taskset),
+        copy.deepcopy(taskset),
+        pickle.loads(pickle.dumps(taskset)),
+        taskset.copy(),
+        taskset.copy(share_tasks=True),
+    ):
+        assert clone is not taskset
+        assert clone.to_dict() == expected
+        assert clone == taskset
+    
+    replaced = dataclasses.replace(taskset.tasks[0], state=TaskState.RUNNING, runner_id="runner-2")
+    assert (replaced.state, replaced.runner_id, replaced.id) == (TaskState.RUNNING, "runner-2", "1")
+    assert taskset.tasks[0].state == TaskState.READY
+    
+    # copy()の複製を変更しても元のモデルは変わらない
+    clone = taskset.copy()
+    task = clone.tasks[1]
+    task.dependencies.append("3")
+    task.metadata["kiro_content_hash"] = "changed"
+    task.artifacts[0].metadata["lines"] = 4
+    clone.tasks[0].metadata["new"] = True
+    clone.metadata["kiro_file_hash"] = "changed"
+    assert taskset.to_dict() == expected
+    
+    # share_tasks=Trueではタスクのリストだけがコピーされる
+    shared = taskset.copy(share_tasks=True)
+    shared.tasks.pop()
+    assert shared.tasks[0] is taskset.tasks[0]
+    assert len(taskset.tasks) == 2
+
+
+@pytest.mark.parametrize(
+    "model",
+    [
+        make_task(),
+        make_taskset(),
+        Artifact(type=ArtifactType.LOG, uri="file:///log"),
+        TaskEvent(event_type=EventType.TASK_CREATED, spec_name="spec", task_id="1"),
+    ],
+    ids=lambda model: type(model).__name__,
+)
+def test_models_have_no_instance_dict(model):
+    """モデルがインスタンスごとの__dict__を持たないことのテスト"""
+    assert not hasattr(model, "__dict__")
+    assert "__slots__" in type(model).__dict__
+    with pytest.raises(AttributeError):
+        model.unknown_attribute = 1
@@ -0,0 +1,351 @@
+"""Task Registryのテスト"""
+import pytest
+
+from necrocode.task_registry import RegistryConfig, TaskRegistry, TaskState
+from task_registry_helpers import task_def
+
+
+def test_query_engine_index_matches_linear_scan(tmp_path):
+    """インデックス経由のクエリが線形走査と同じ結果を返すことのテスト"""
+    import random
+    
+    rng = random.Random(0)
+    registry = TaskRegistry(tmp_path / "registry")
+    linear = TaskRegistry(
+        config=RegistryConfig(registry_dir=tmp_path / "registry", taskset_cache_size=0)
+    )
+    registry.create_taskset("spec", [task_def(str(i)) for i in range(40)])
+    
+    taskset = registry.get_taskset("spec")
+    for task in taskset.tasks:
+        task.priority = rng.randint(0, 5)
+        task.required_skill = rng.choice(["backend", "frontend", None])
+    taskset.version += 1
+    registry.task_store.save_taskset(taskset)
+    
+    queries = [
+        ({"state": "ready"}, "priority", 5, 0),
+        ({"state": TaskState.READY, "required_skill": "backend"}, "priority", 3, 1),
+        ({"state": "running"}, "id", None, 0),
+        ({"runner_id": "r1", "is_optional": False}, None, None, 0),
+        ({}, "priority", 10, 5),
+    ]
+    for step in range(30):
+        task_id = str(rng.randrange(40))
+        state = registry.get_taskset("spec").tasks[int(task_id)].state
+        new_state = TaskState.RUNNING if state == TaskState.READY else TaskState.READY
+        registry.update_task_state(
+            "spec", task_id, new_state, {"runner_id": rng.choice(["r1", "r2"])}
+        )
+        
+        for filters, sort_by, limit, offset in queries:
+            expected = linear.query_engine.query("spec", filters, sort_by, limit, offset)
+            actual = registry.query_engine.query("spec", filters, sort_by, limit, offset)
+            assert [t.id for t in actual] == [t.id for t in expected], (step, filters)
+
+
+def test_query_results_are_copies(tmp_path):
+    """クエリの結果を変更してもキャッシュやインデックスが変わらないことのテスト"""
+    registry = TaskRegistry(tmp_path / "registry")
+    registry.create_taskset("spec", [task_def("1"), task_def("2"), task_def("3", ["1"])])
+    engine = registry.query_engine
+    
+    results = [
+        engine.filter_by_state("spec", TaskState.READY),
+        engine.filter_by_skill("spec", None),
+        engine.query("spec", {"state": "ready"}, "priority", 1),
+        engine.query("spec", {"is_optional": False}),
+        registry.get_ready_tasks("spec"),
+    ]
+    for tasks in results:
+        for task in tasks:
+            task.state = TaskState.DONE
+            task.priority = 99
+            task.dependencies.append("9")
+    
+    shared = registry.task_store.load_shared_taskset("spec")
+    assert [(t.state, t.priority, t.dependencies) for t in shared.tasks] == [
+        (TaskState.READY, 0, []), (TaskState.READY, 0, []), (TaskState.BLOCKED, 0, ["1"]),
+    ]
+    assert [t.id for t in engine.filter_by_state("spec", TaskState.READY)] == ["1", "2"]
+    assert engine.query("spec", {"state": "done"}) == []
+    assert [t.id for t in engine.query("spec", {"state": "ready"}, "priority", 1)] == ["1"]
+
+
+@pytest.mark.parametrize("cache_size", [32, 0])
+def test_completion_unblocks_only_ready_dependents(tmp_path, cache_size):
+    """完了時に依存先がすべて完了したタスクだけがReadyになることのテスト"""
+    config = RegistryConfig(registry_dir=tmp_path / "registry", taskset_cache_size=cache_size)
+    registry = TaskRegistry(config=config)
+    fan_out = [task_def(f"2.{i}", ["1"]) for i in range(200)]
+    registry.create_taskset("spec", [task_def("1"), *fan_out, task_def("3", ["1", "2.0"])])
+    
+    def states():
+        return {t.id: t.state for t in registry.get_taskset("spec").tasks}
+    
+    registry.update_task_state("spec", "1", TaskState.DONE)
+    assert all(states()[f"2.{i}"] == TaskState.READY for i in range(200))
+    assert states()["3"] == TaskState.BLOCKED
+    
+    # 再実行で依存先が未完了に戻った場合はカウンタも戻る
+    registry.update_task_state("spec", "1", TaskState.READY)
+    registry.update_task_state("spec", "2.0", TaskState.DONE)
+    assert states()["3"] == TaskState.BLOCKED
+    
+    registry.update_task_state("spec", "1", TaskState.DONE)
+    assert states()["3"] == TaskState.READY
+    events = registry.event_store.get_events_by_task("spec", "1")
+    assert events[-1].details["unblocked"] == ["3"]
+
+
+def test_execution_plan_levels_critical_path_and_cycles():
+    """実行計画のレベル分け・クリティカルパス・循環の検出のテスト"""
+    from necrocode.task_registry import build_execution_plan
+    
+    plan = build_execution_plan({
+        "1": [],
+        "2": ["1"],
+        "3": ["1", "missing"],
+        "4": ["2", "3"],
+        "5": [],
+        "6": ["7"],
+        "7": ["6"],
+        "8": ["7", "4"],
+    })
+    assert plan.levels == [["1", "5"], ["2", "3"], ["4"]]
+    assert plan.critical_path == ["1", "2", "4"]
+    assert plan.level_widths == [2, 2, 1]
+    assert plan.max_width == 2
+    assert plan.cycle_members == ["6", "7"]
+    assert plan.blocked_by_cycle == ["8"]
+    assert plan.dangling_dependencies == {"3": ["missing"]}
+    
+    # 5万タスクの鎖でも線形時間で計算できる
+    chain = {str(i): [str(i - 1)] if i else [] for i in range(50000)}
+    plan = build_execution_plan(chain)
+    assert plan.critical_path_length == 50000
+    assert plan.max_width == 1
+
+
+def test_ready_tasks_ranked_by_critical_path_and_history(tmp_path):
+    """実行可能なタスクがクリティカルパスと実績の所要時間で並ぶことのテスト"""
+    from datetime import datetime, timedelta
+    from necrocode.task_registry import EventType, TaskEvent
+    
+    registry = TaskRegistry(registry_dir=tmp_path / "registry")
+    registry.create_taskset("spec", [
+        task_def("a"),
+        task_def("b"),
+        task_def("c", ["b"]),
+        task_def("d", ["c"]),
+        task_def("x"),
+    ])
+    
+    def ready_ids(**kwargs):
+        return [t.id for t in registry.get_ready_tasks("spec", **kwargs)]
+    
+    # 既定の並び順は従来どおり依存関係の少ない順
+    assert ready_ids() == ["a", "b", "x"]
+    assert ready_ids(policy="critical_path") == ["b", "a", "x"]
+    with pytest.raises(ValueError):
+        ready_ids(policy="unknown")
+    
+    # 実績の所要時間で重み付けすると、長くかかるタスクが先になる
+    start = datetime.now() - timedelta(hours=1)
+    for task_id, seconds in (("x", 3600), ("b", 10), ("c", 10), ("d", 10), ("a", 1)):
+        registry.event_store.record_events([
+            TaskEvent(EventType.TASK_ASSIGNED, "spec", task_id, start),
+            TaskEvent(EventType.TASK_COMPLETED, "spec", task_id, start + timedelta(seconds=seconds)),
+        ])
+    assert ready_ids(policy="critical_path", use_history=True) == ["x", "b", "a"]
+    
+    # 後から追記された、それより古い時刻のイベントも読み込まれる
+    registry.event_store.record_events([
+        TaskEvent(EventType.TASK_ASSIGNED, "spec", "a", start - timedelta(hours=3)),
+        TaskEvent(EventType.TASK_COMPLETED, "spec", "a", start - timedelta(hours=1)),
+    ])
+    assert ready_ids(policy="critical_path", use_history=True) == ["a", "x", "b"]
+
+
+def test_dependency_validator_reports_all_cycles_and_dangling(tmp_path):
+    """すべての循環依存と存在しない依存先が報告されることのテスト"""
+    from necrocode.task_registry import CircularDependencyError, analyze_dependencies
+    
+    report = analyze_dependencies({
+        "1": ["2"],
+        "2": ["3"],
+        "3": ["1"],
+        "4": ["4"],
+        "5": ["missing", "1"],
+        "6": ["7"],
+        "7": ["6"],
+    })
+    assert report.cycles == [["1", "2", "3"], ["4"], ["6", "7"]]
+    assert report.cycle_paths == [["1", "2", "3", "1"], ["4", "4"], ["6", "7", "6"]]
+    assert report.dangling == {"5": ["missing"]}
+    
+    registry = TaskRegistry(registry_dir=tmp_path / "registry")
+    with pytest.raises(CircularDependencyError) as exc_info:
+        registry.create_taskset("spec", [task_def("a", ["b"]), task_def("b", ["a"]), task_def("c", ["c"])])
+    assert exc_info.value.cycles == [["a", "b", "a"], ["c", "c"]]
+    assert not registry.task_store.taskset_exists("spec")
+    
+    # 再帰の上限を超える長さの依存チェーンも検証できる
+    chain = [task_def("0")] + [task_def(str(i), [str(i - 1)]) for i in range(1, 5000)]
+    assert not registry.kiro_sync.verify_no_circular_dependencies(chain).has_cycles
+
+
+@pytest.mark.parametrize("persistence_mode", ["full", "event_sourced"])
+def test_apply_batch_is_transactional(tmp_path, persistence_mode):
+    """apply_batchがすべての操作を適用するか何も適用しないことのテスト"""
+    from necrocode.task_registry import (
+        AddArtifact,
+        ArtifactType,
+        InvalidStateTransitionError,
+        StateTransition,
+        UpdateMetadata,
+    )
+    
+    config = RegistryConfig(registry_dir=tmp_path / "registry", persistence_mode=persistence_mode)
+    registry = TaskRegistry(config=config)
+    registry.create_taskset("spec", [task_def("1"), task_def("2", ["1"]), task_def("3")])
+    registry.create_taskset("other", [task_def("1")])
+    
+    calls = []
+    original_save_tasks = registry.task_store.save_tasks
+    registry.task_store.save_tasks = lambda taskset, tasks: (
+        calls.append("save_tasks"), original_save_tasks(taskset, tasks)
+    )
+    original_record_events = registry.event_store.record_events
+    registry.event_store.record_events = lambda events: (
+        calls.append(len(events)), original_record_events(events)
+    )
+    
+    version = registry.get_taskset("spec").version
+    events = registry.apply_batch("spec", [
+        StateTransition("1", TaskState.RUNNING, {"runner_id": "r1"}),
+        StateTransition("1", TaskState.DONE),
+        AddArtifact("1", ArtifactType.DIFF, "file:///1.diff"),
+        UpdateMetadata("3", {"attempt": 2}),
+    ])
+    assert calls == ["save_tasks", 4]
+    assert [e.details["version"] for e in events] == [version + 1, version + 2, version + 3, version + 4]
+    assert events[1].details["unblocked"] == ["2"]
+    
+    # 無効な遷移を含むバッチはどのSpecも変更しない
+    calls.clear()
+    with pytest.raises(InvalidStateTransitionError):
+        registry.apply_batches({
+            "other": [StateTransition("1", TaskState.RUNNING)],
+            "spec": [StateTransition("3", TaskState.RUNNING), StateTransition("2", TaskState.FAILED)],
+        })
+    assert calls == []
+    assert registry.get_taskset("other").tasks[0].state == TaskState.READY
+    assert registry.get_taskset("spec").tasks[2].state == TaskState.READY
+    
+    registry.close()
+    tasks = {t.id: t for t in TaskRegistry(config=config).get_taskset("spec").tasks}
+    assert (tasks["1"].state, tasks["1"].runner_id, len(tasks["1"].artifacts)) == (TaskState.DONE, "r1", 1)
+    assert tasks["2"].state == TaskState.READY
+    assert tasks["3"].metadata == {"attempt": 2}
+
+
+def test_async_registry_coalesces_reads_and_writes(tmp_path):
+    """AsyncTaskRegistryが同時の読み込み・書き込みをまとめることのテスト"""
+    import asyncio
+    import threading
+    from necrocode.task_registry import ArtifactType, AsyncTaskRegistry, EventType, TaskNotFoundError
+    
+    registry = TaskRegistry(config=RegistryConfig(registry_dir=tmp_path / "registry"))
+    registry.create_taskset("spec", [task_def(str(i)) for i in range(1, 21)])
+    
+    batch_sizes = []
+    original_apply_batch = registry.apply_batch
+    def counting_apply_batch(spec_name, operations):
+        batch_sizes.append(len(operations))
+        return original_apply_batch(spec_name, operations)
+    registry.apply_batch = counting_apply_batch
+    
+    loads = []
+    original_load = registry.task_store.load_shared_taskset
+    release_load = threading.Event()
+    def slow_load(spec_name):
+        loads.append(spec_name)
+        release_load.wait(5)
+        return original_load(spec_name)
+    registry.task_store.load_shared_taskset = slow_load
+    
+    async def scenario():
+        async with AsyncTaskRegistry(registry, max_workers=4) as facade:
+            # 同時の読み込みは1回の読み込みを共有し、呼び出し元ごとにコピーを返す
+            readers = [asyncio.ensure_future(facade.get_taskset("spec")) for _ in range(5)]
+            await asyncio.sleep(0.05)
+            release_load.set()
+            tasksets = await asyncio.gather(*readers)
+            assert loads == ["spec"]
+            assert all(taskset == tasksets[0] for taskset in tasksets)
+            assert len({id(taskset) for taskset in tasksets}) == 5
+            
+            # 同時の書き込みはまとめて適用され、不正な操作はその呼び出し元だけが失敗する
+            results = await asyncio.gather(
+                *[facade.update_task_state("spec", str(i), TaskState.RUNNING) for i in range(1, 21)],
+                facade.add_artifact("spec", "1", ArtifactType.LOG, "file:///1.log"),
+                facade.update_task_state("spec", "missing", TaskState.RUNNING),
+                return_exceptions=True
+            )
+            assert all(result is None for result in results[:21])
+            assert isinstance(results[21], TaskNotFoundError)
+            assert sum(batch_sizes) - len(batch_sizes) > 0
+            
+            ready = await facade.get_ready_tasks("spec")
+            assert ready == []
+            events = [event async for event in facade.iter_events("spec", event_types=[EventType.TASK_ASSIGNED])]
+            assert len(events) == 20
+            assert len(await facade.get_events_by_task("spec", "1")) == 3
+            
+            async with facade.lock("spec"):
+                assert registry.lock_manager.is_locked("spec")
+            assert not registry.lock_manager.is_locked("spec")
+    
+    asyncio.run(scenario())
+    states = {t.id: t.state for t in TaskRegistry(config=registry.config).get_taskset("spec").tasks}
+    assert set(states.values()) == {TaskState.RUNNING}
+
+
+def test_async_registry_skips_writes_cancelled_before_their_batch(tmp_path):
+    """まとめて適用される前にキャンセルされた書き込みが適用されないことのテスト"""
+    import asyncio
+    import threading
+    from necrocode.task_registry import AsyncTaskRegistry
+    
+    registry = TaskRegistry(config=RegistryConfig(registry_dir=tmp_path / "registry"))
+    registry.create_taskset("spec", [task_def("1"), task_def("2"), task_def("3")])
+    
+    applied = []
+    original_apply_batch = registry.apply_batch
+    release_first = threading.Event()
+    def blocking_apply_batch(spec_name, operations):
+        applied.append([operation.task_id for operation in operations])
+        if len(applied) == 1:
+            release_first.wait(5)
+        return original_apply_batch(spec_name, operations)
+    registry.apply_batch = blocking_apply_batch
+    
+    async def scenario():
+        async with AsyncTaskRegistry(registry) as facade:
+            first = asyncio.ensure_future(facade.update_task_state("spec", "1", TaskState.RUNNING))
+            await asyncio.sleep(0.05)
+            # 1つ目の書き込みの適用中に届いた書き込みは次のバッチを待つ
+            cancelled = asyncio.ensure_future(facade.update_task_state("spec", "2", TaskState.RUNNING))
+            kept = asyncio.ensure_future(facade.update_task_state("spec", "3", TaskState.RUNNING))
+            await asyncio.sleep(0.05)
+            cancelled.cancel()
+            await asyncio.sleep(0)
+            release_first.set()
+            await asyncio.gather(first, kept)
+            assert cancelled.cancelled()
+    
+    asyncio.run(scenario())
+    assert applied == [["1"], ["3"]]
+    states = {t.id: t.state for t in TaskRegistry(config=registry.config).get_taskset("spec").tasks}
+    assert states == {"1": TaskState.RUNNING, "2": TaskState.READY, "3": TaskState.RUNNING}
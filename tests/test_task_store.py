@@ -0,0 +1,466 @@
+"""TaskStore（永続化モード・バックエンド・キャッシュ・保存形式）のテスト"""
+import pytest
+
+from necrocode.task_registry import ArtifactType, RegistryConfig, TaskRegistry, TaskState, migrate_to_sqlite
+from task_registry_helpers import task_def
+
+
+@pytest.fixture
+def incremental_registry(tmp_path):
+    """ジャーナル永続化モードのTask Registry"""
+    config = RegistryConfig(
+        registry_dir=tmp_path / "registry",
+        persistence_mode="incremental",
+        journal_compact_threshold=4,
+    )
+    return TaskRegistry(config=config)
+
+
+def test_incremental_update_appends_journal(incremental_registry):
+    """状態遷移がtaskset.jsonを書き換えずジャーナルに追記されることのテスト"""
+    registry = incremental_registry
+    registry.create_taskset("spec", [task_def("1"), task_def("2", ["1"])])
+    store = registry.task_store
+    base_before = store._get_taskset_file("spec").read_bytes()
+    
+    registry.update_task_state("spec", "1", TaskState.RUNNING)
+    registry.update_task_state("spec", "1", TaskState.DONE)
+    
+    assert store._get_taskset_file("spec").read_bytes() == base_before
+    assert store._count_journal_records("spec") == 2
+    
+    taskset = registry.get_taskset("spec")
+    states = {task.id: task.state for task in taskset.tasks}
+    assert states == {"1": TaskState.DONE, "2": TaskState.READY}
+    assert taskset.version == 3
+
+
+def test_incremental_journal_compaction(incremental_registry):
+    """閾値到達時にジャーナルがtaskset.jsonへ畳み込まれることのテスト"""
+    registry = incremental_registry
+    registry.create_taskset("spec", [task_def("1")])
+    
+    for state in (TaskState.RUNNING, TaskState.READY, TaskState.RUNNING, TaskState.DONE):
+        registry.update_task_state("spec", "1", state)
+    
+    store = registry.task_store
+    assert not store._get_journal_file("spec").exists()
+    
+    taskset = registry.get_taskset("spec")
+    assert taskset.tasks[0].state == TaskState.DONE
+    assert taskset.version == 5
+
+
+def test_incremental_compaction_counts_records_of_other_processes(incremental_registry):
+    """別プロセスが追記したレコードも数えて閾値でコンパクションすることのテスト"""
+    registry = incremental_registry
+    other = TaskRegistry(config=registry.config)
+    registry.create_taskset("spec", [task_def("1"), task_def("2")])
+    store = registry.task_store
+    journal_file = store._get_journal_file("spec")
+    
+    registry.update_task_state("spec", "1", TaskState.RUNNING)
+    other.update_task_state("spec", "2", TaskState.RUNNING)
+    # 読み込んだ後、保存する前に別プロセスが追記する
+    taskset = store.load_taskset("spec")
+    other.update_task_state("spec", "2", TaskState.DONE)
+    assert store._count_journal_records("spec") == 3
+    
+    # 保存時のジャーナルのレコード数で判断するため、4件目で閾値に達する
+    taskset.version += 1
+    store.save_tasks(taskset, [taskset.tasks[0]])
+    assert not journal_file.exists()
+    
+    # コンパクション後に作り直されたジャーナルは最初から数え直す
+    for _ in range(3):
+        other.add_artifact("spec", "2", ArtifactType.LOG, "file:///log")
+    assert store._count_journal_records("spec") == 3
+    registry.add_artifact("spec", "1", ArtifactType.LOG, "file:///log")
+    assert not journal_file.exists()
+
+
+def test_incremental_record_is_appended_with_one_write(incremental_registry, monkeypatch):
+    """ジャーナルのレコードがO_APPENDのファイル記述子への1回のwriteで追記されることのテスト"""
+    import os
+    
+    registry = incremental_registry
+    registry.create_taskset("spec", [task_def("1")])
+    
+    writes = []
+    original_write = os.write
+    def recording_write(fd, data):
+        writes.append((os.fstat(fd).st_ino, bytes(data)))
+        return original_write(fd, data)
+    monkeypatch.setattr(os, "write", recording_write)
+    registry.update_task_state("spec", "1", TaskState.RUNNING)
+    monkeypatch.undo()
+    
+    journal_file = registry.task_store._get_journal_file("spec")
+    journal_writes = [data for inode, data in writes if inode == journal_file.stat().st_ino]
+    assert journal_writes == [journal_file.read_bytes()]
+    assert journal_writes[0].endswith(b"\n") and journal_writes[0].count(b"\n") == 1
+
+
+def test_incremental_reader_skips_stale_records(incremental_registry):
+    """ベースより古いジャーナルレコードが無視されることのテスト"""
+    registry = incremental_registry
+    registry.create_taskset("spec", [task_def("1")])
+    registry.update_task_state("spec", "1", TaskState.RUNNING)
+    journal = registry.task_store._get_journal_file("spec").read_text()
+    
+    # コンパクション後に古いジャーナルが残っている状況を再現
+    registry.update_task_state("spec", "1", TaskState.DONE)
+    registry.task_store.compact(registry.get_taskset("spec"))
+    registry.task_store._get_journal_file("spec").write_text(journal)
+    
+    assert registry.get_taskset("spec").tasks[0].state == TaskState.DONE
+
+
+def test_sqlite_backend_roundtrip(tmp_path):
+    """SQLiteバックエンドでの状態遷移とインデックス検索のテスト"""
+    config = RegistryConfig(registry_dir=tmp_path / "registry", storage_backend="sqlite")
+    registry = TaskRegistry(config=config)
+    registry.create_taskset("spec", [task_def("1"), task_def("2", ["1"])])
+    
+    registry.update_task_state("spec", "1", TaskState.RUNNING, {"runner_id": "runner-1"})
+    assert [t.id for t in registry.query_engine.query("spec", {"runner_id": "runner-1"})] == ["1"]
+    # Noneを指定したフィルタは値が未設定のタスクに一致する（JSONバックエンドと同じ）
+    assert [t.id for t in registry.query_engine.query("spec", {"runner_id": None})] == ["2"]
+    assert [t.id for t in registry.query_engine.query("spec", {"required_skill": None})] == ["1", "2"]
+    
+    registry.update_task_state("spec", "1", TaskState.DONE)
+    assert [t.id for t in registry.get_ready_tasks("spec")] == ["2"]
+    assert registry.get_taskset("spec").version == 3
+    
+    events = registry.event_store.get_events_by_task("spec", "1")
+    assert [e.event_type.value for e in events] == ["TaskCreated", "TaskAssigned", "TaskCompleted"]
+
+
+def test_sqlite_close_closes_connections_of_all_threads(tmp_path):
+    """close()が全スレッドのデータベース接続を閉じることのテスト"""
+    import sqlite3
+    import threading
+    
+    config = RegistryConfig(registry_dir=tmp_path / "registry", storage_backend="sqlite")
+    registry = TaskRegistry(config=config)
+    registry.create_taskset("spec", [task_def("1")])
+    
+    connections = [registry.task_store.db.connect()]
+    started = threading.Event()
+    finish = threading.Event()
+    
+    def read():
+        connections.append(registry.task_store.db.connect())
+        registry.task_store.find_tasks("spec", state=TaskState.READY)
+        started.set()
+        finish.wait()
+    
+    thread = threading.Thread(target=read)
+    thread.start()
+    started.wait()
+    registry.close()
+    finish.set()
+    thread.join()
+    
+    for conn in connections:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+    # close()後に使用した場合は接続し直す
+    assert registry.get_taskset("spec").version == 1
+    registry.close()
+
+
+@pytest.mark.parametrize("persistence_mode", ["full", "event_sourced"])
+def test_migrate_to_sqlite(tmp_path, persistence_mode):
+    """JSONディレクトリ構成からSQLiteへの移行のテスト"""
+    registry_dir = tmp_path / "registry"
+    json_registry = TaskRegistry(config=RegistryConfig(
+        registry_dir=registry_dir, persistence_mode=persistence_mode
+    ))
+    json_registry.create_taskset("spec", [task_def("1"), task_def("2", ["1"])])
+    json_registry.update_task_state("spec", "1", TaskState.RUNNING)
+    original = json_registry.get_taskset("spec")
+    json_registry.close()
+    
+    migrated = migrate_to_sqlite(registry_dir, persistence_mode=persistence_mode)
+    assert migrated == {"tasksets": 1, "events": 3}
+    
+    sqlite_registry = TaskRegistry(
+        config=RegistryConfig(registry_dir=registry_dir, storage_backend="sqlite")
+    )
+    taskset = sqlite_registry.get_taskset("spec")
+    # event_sourcedではスナップショット以降のイベントも反映されている
+    assert taskset.to_dict() == original.to_dict()
+    assert taskset.tasks[0].state == TaskState.RUNNING
+    assert len(sqlite_registry.event_store.get_all_events("spec")) == 3
+    sqlite_registry.close()
+
+
+def test_taskset_cache_serves_unchanged_taskset(tmp_path):
+    """変更のないタスクセットがキャッシュから返されることのテスト"""
+    registry = TaskRegistry(tmp_path / "registry")
+    registry.create_taskset("spec", [task_def("1")])
+    
+    first = registry.task_store.load_shared_taskset("spec")
+    second = registry.task_store.load_shared_taskset("spec")
+    assert first is second
+    assert registry.taskset_cache.get_stats()["hits"] >= 1
+    
+    # get_tasksetは呼び出し元ごとのコピーを返す
+    copy = registry.get_taskset("spec")
+    assert copy == first
+    assert copy is not first
+    assert copy.tasks[0] is not first.tasks[0]
+
+
+def test_cached_taskset_is_not_changed_by_writers_or_callers(tmp_path):
+    """キャッシュ済みのTasksetが書き込みや呼び出し元の変更で書き換わらないことのテスト"""
+    registry = TaskRegistry(tmp_path / "registry")
+    registry.create_taskset("spec", [task_def("1"), task_def("2", ["1"])])
+    
+    held = registry.get_taskset("spec")
+    shared = registry.task_store.load_shared_taskset("spec")
+    registry.update_task_state("spec", "1", TaskState.RUNNING)
+    registry.add_artifact("spec", "1", ArtifactType.LOG, "file:///log")
+    registry.update_task_state("spec", "1", TaskState.DONE)
+    
+    # 保持しているTasksetは読み込んだ時点のまま
+    for taskset in (held, shared):
+        assert taskset.version == 1
+        assert [task.state for task in taskset.tasks] == [TaskState.READY, TaskState.BLOCKED]
+        assert taskset.tasks[0].artifacts == []
+    
+    current = registry.get_taskset("spec")
+    assert current.version == 4
+    assert [task.state for task in current.tasks] == [TaskState.DONE, TaskState.READY]
+    assert len(current.tasks[0].artifacts) == 1
+    
+    # 呼び出し元の変更は保存されず、他の読み込みにも見えない
+    current.tasks[0].state = TaskState.FAILED
+    current.tasks[0].artifacts.clear()
+    current.tasks[1].metadata["note"] = "unsaved"
+    reloaded = registry.get_taskset("spec")
+    assert reloaded.tasks[0].state == TaskState.DONE
+    assert len(reloaded.tasks[0].artifacts) == 1
+    assert reloaded.tasks[1].metadata == {}
+    assert [task.id for task in registry.get_ready_tasks("spec")] == ["2"]
+    
+    # 変更されていないタスクは前のバージョンと共有される
+    before = registry.task_store.load_shared_taskset("spec")
+    registry.update_task_state("spec", "2", TaskState.RUNNING)
+    after = registry.task_store.load_shared_taskset("spec")
+    assert after is not before
+    assert after.tasks[0] is before.tasks[0]
+    assert after.tasks[1] is not before.tasks[1]
+    assert before.tasks[1].state == TaskState.READY
+
+
+def test_taskset_cache_detects_external_write(tmp_path):
+    """別プロセス（別インスタンス）による書き込みが検出されることのテスト"""
+    registry = TaskRegistry(tmp_path / "registry")
+    other = TaskRegistry(tmp_path / "registry")
+    registry.create_taskset("spec", [task_def("1")])
+    assert registry.get_taskset("spec").tasks[0].state == TaskState.READY
+    
+    other.update_task_state("spec", "1", TaskState.RUNNING)
+    
+    taskset = registry.get_taskset("spec")
+    assert taskset.tasks[0].state == TaskState.RUNNING
+    assert taskset.version == 2
+
+
+def test_taskset_cache_detects_rewrite_with_same_stat(tmp_path):
+    """inode・mtime・サイズが同じまま内容が変わった場合もキャッシュが使われないことのテスト"""
+    import os
+    
+    registry = TaskRegistry(tmp_path / "registry")
+    registry.create_taskset("spec", [task_def("1")])
+    assert registry.get_taskset("spec").version == 1
+    
+    # inodeの再利用と同じ状態を再現するため、同じファイルを同じサイズで書き換えてmtimeを戻す
+    taskset_file = registry.task_store._get_taskset_file("spec")
+    stat = taskset_file.stat()
+    data = taskset_file.read_bytes()
+    assert b'"version":1,' in data
+    with open(taskset_file, 'r+b') as f:
+        f.write(data.replace(b'"version":1,', b'"version":7,'))
+    os.utime(taskset_file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    rewritten = taskset_file.stat()
+    assert (rewritten.st_ino, rewritten.st_mtime_ns, rewritten.st_size) == (
+        stat.st_ino, stat.st_mtime_ns, stat.st_size
+    )
+    
+    assert registry.get_taskset("spec").version == 7
+
+
+def test_event_sourced_mode_replays_events_after_snapshot(tmp_path):
+    """event_sourcedモードでスナップショット以降のイベントから状態を再構築するテスト"""
+    from necrocode.task_registry import ArtifactType
+    
+    config = RegistryConfig(
+        registry_dir=tmp_path / "registry",
+        persistence_mode="event_sourced",
+        snapshot_interval=10,
+    )
+    registry = TaskRegistry(config=config)
+    registry.create_taskset("spec", [task_def("1"), task_def("2", ["1"])])
+    snapshot_file = registry.task_store._get_taskset_file("spec")
+    snapshot_before = snapshot_file.read_bytes()
+    
+    registry.update_task_state("spec", "1", TaskState.RUNNING, {"runner_id": "runner-1"})
+    registry.add_artifact("spec", "1", ArtifactType.DIFF, "file:///diff", {"size_bytes": 10})
+    registry.update_task_state("spec", "1", TaskState.DONE)
+    
+    # 更新はイベントの追記のみ
+    assert snapshot_file.read_bytes() == snapshot_before
+    expected = registry.get_taskset("spec").to_dict()
+    
+    # 別プロセス（キャッシュなし）はスナップショット + イベントの再生で同じ状態になる
+    recovered = TaskRegistry(config=RegistryConfig(
+        registry_dir=tmp_path / "registry",
+        persistence_mode="event_sourced",
+        taskset_cache_size=0,
+    ))
+    taskset = recovered.get_taskset("spec")
+    assert taskset.version == 4
+    assert {t.id: t.state for t in taskset.tasks} == {"1": TaskState.DONE, "2": TaskState.READY}
+    assert taskset.tasks[0].runner_id == "runner-1"
+    assert [a.uri for a in taskset.tasks[0].artifacts] == ["file:///diff"]
+    assert [t.to_dict() for t in taskset.tasks] == expected["tasks"]
+    
+    # 別インスタンスの更新はキャッシュ済みのTasksetにも再生される
+    recovered.update_task_state("spec", "2", TaskState.RUNNING)
+    assert registry.get_taskset("spec").tasks[1].state == TaskState.RUNNING
+    
+    recovered.snapshot_taskset("spec")
+    assert snapshot_file.read_bytes() != snapshot_before
+    assert registry.get_taskset("spec").version == 5
+
+
+def test_event_sourced_cache_replays_tail_once_for_concurrent_readers(tmp_path, monkeypatch):
+    """キャッシュ済みのTasksetへのイベント再生が並行する読み込みで1回だけ行われることのテスト"""
+    import threading
+    import time
+    from necrocode.task_registry import event_sourcing
+    
+    config = RegistryConfig(registry_dir=tmp_path / "registry", persistence_mode="event_sourced")
+    registry = TaskRegistry(config=config)
+    registry.create_taskset("spec", [task_def("1"), task_def("2", ["1"])])
+    cached = registry.task_store.load_shared_taskset("spec")
+    # 別インスタンスの更新でキャッシュ済みのTasksetより新しいイベントができる
+    TaskRegistry(config=config).update_task_state("spec", "1", TaskState.RUNNING)
+    
+    replays = []
+    original_replay = event_sourcing.replay_events
+    
+    def slow_replay(taskset, events):
+        replays.append(len(events))
+        time.sleep(0.05)
+        return original_replay(taskset, events)
+    
+    monkeypatch.setattr(event_sourcing, "replay_events", slow_replay)
+    barrier = threading.Barrier(6)
+    results = []
+    
+    def read():
+        barrier.wait()
+        results.append(registry.task_store.load_shared_taskset("spec"))
+    
+    threads = [threading.Thread(target=read) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert replays == [1]
+    assert len({id(taskset) for taskset in results}) == 1
+    assert results[0].version == 2 and results[0].tasks[0].state == TaskState.RUNNING
+    # キャッシュ済みだったTasksetは変更されない
+    assert cached.version == 1 and cached.tasks[0].state == TaskState.READY
+
+
+def test_event_sourced_retention_keeps_events_newer_than_snapshot(tmp_path, caplog):
+    """保持によるセグメントの削除前にスナップショットを書き、イベントを失わないことのテスト"""
+    config = RegistryConfig(
+        registry_dir=tmp_path / "registry",
+        persistence_mode="event_sourced",
+        event_log_compression="none",
+        event_log_retention_segments=1,
+    )
+    registry = TaskRegistry(config=config)
+    registry.create_taskset("spec", [task_def("1"), task_def("2", ["1"]), task_def("3")])
+    
+    registry.update_task_state("spec", "1", TaskState.RUNNING)
+    registry.event_store.rotate_logs(max_size_mb=0)
+    registry.update_task_state("spec", "1", TaskState.DONE)
+    registry.event_store.rotate_logs(max_size_mb=0)
+    # 最初のセグメント（スナップショット以降の最初のイベント）が削除される
+    def segments():
+        return sorted(p.name for p in (config.events_dir / "spec").glob("events.jsonl.[0-9]"))
+    
+    assert segments() == ["events.jsonl.2"]
+    expected = registry.get_taskset("spec").to_dict()
+    
+    recovered = TaskRegistry(config=RegistryConfig(
+        registry_dir=tmp_path / "registry",
+        persistence_mode="event_sourced",
+        taskset_cache_size=0,
+    ))
+    taskset = recovered.get_taskset("spec")
+    assert taskset.version == 3
+    assert {t.id: t.state for t in taskset.tasks}["2"] == TaskState.READY
+    assert taskset.to_dict() == expected
+    
+    # スナップショットを書けない場合はセグメントを削除しない
+    def fail(spec_name):
+        raise OSError("disk full")
+    
+    registry.task_store.snapshot = fail
+    registry.update_task_state("spec", "3", TaskState.RUNNING)
+    registry.event_store.rotate_logs(max_size_mb=0)
+    assert segments() == ["events.jsonl.2", "events.jsonl.3"]
+    assert "retention hook failed" in caplog.text
+
+
+@pytest.mark.parametrize("taskset_format", ["json", "json-pretty", "marshal", "auto"])
+def test_taskset_formats_roundtrip_and_read_each_other(tmp_path, taskset_format):
+    """保存形式ごとの往復変換と、別の形式で保存されたタスクセットの読み込みのテスト"""
+    config = RegistryConfig(registry_dir=tmp_path / "registry", taskset_format=taskset_format)
+    registry = TaskRegistry(config=config)
+    registry.create_taskset("spec", [task_def("1"), task_def("2", ["1"])])
+    registry.update_task_state("spec", "1", TaskState.DONE)
+    expected = registry.get_taskset("spec").to_dict()
+    
+    # 書き込み形式が異なるレジストリからも読み込める
+    reader = TaskRegistry(config=RegistryConfig(
+        registry_dir=tmp_path / "registry",
+        taskset_format="json",
+        taskset_cache_size=0,
+    ))
+    taskset = reader.get_taskset("spec")
+    assert taskset.to_dict() == expected
+    assert taskset.tasks[0].updated_at.isoformat() == expected["tasks"][0]["updated_at"]
+    
+    with pytest.raises(ValueError):
+        RegistryConfig(registry_dir=tmp_path / "other", taskset_format="yaml")
+
+
+def test_marshal_taskset_from_another_python_version_is_rejected(tmp_path):
+    """別のPythonバージョンで書き込まれたmarshal形式のタスクセットを読み込まずにエラーにすることのテスト"""
+    import marshal
+    import sys
+    from necrocode.task_registry import TaskRegistryError
+    from necrocode.task_registry.serializers import MAGIC, decode
+    
+    config = RegistryConfig(registry_dir=tmp_path / "registry", taskset_format="marshal")
+    registry = TaskRegistry(config=config)
+    registry.create_taskset("spec", [task_def("1")])
+    raw = registry.task_store._get_taskset_file("spec").read_bytes()
+    # ヘッダーの形式名に書き込んだPythonのバージョンが記録される
+    name = f"marshal-{sys.version_info[0]}.{sys.version_info[1]}".encode()
+    assert raw.startswith(MAGIC + bytes([len(name)]) + name)
+    
+    data = registry.get_taskset("spec").to_dict()
+    for name in (b"marshal-2.7", b"marshal"):
+        with pytest.raises(TaskRegistryError, match="Python version"):
+            decode(MAGIC + bytes([len(name)]) + name + marshal.dumps(data))